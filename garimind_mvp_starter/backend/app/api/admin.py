@@ -0,0 +1,44 @@
+# backend/app/api/admin.py
+# Perfilado del worker que atiende el request (solo con PROFILING_ENABLED y X-Admin-Token).
+import os
+import time
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from ..core import profiling
+from ..core.config import settings
+from .users import require_admin
+
+router = APIRouter(prefix="/api/admin/profile", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.get("", response_class=PlainTextResponse)
+def sample_profile(seconds: float = Query(10, gt=0, le=settings.PROFILE_MAX_SECONDS),
+                   hz: int = Query(settings.PROFILE_SAMPLE_HZ, ge=1, le=profiling.MAX_HZ),
+                   idle: bool = False):
+    """
+    Muestrea las pilas de este worker durante `seconds` y las devuelve en formato folded
+    (flamegraph.pl, inferno-flamegraph o speedscope). `idle=true` incluye los hilos en espera.
+    """
+    try:
+        folded = profiling.sample(seconds, hz, include_idle=idle)
+    except profiling.ProfilerBusy:
+        raise HTTPException(status_code=409, detail="Ya hay un muestreo en curso en este worker")
+    name = f"garimind-{os.getpid()}-{time.strftime('%Y%m%dT%H%M%S')}.folded"
+    return PlainTextResponse(folded, headers={"Content-Disposition": f'attachment; filename="{name}"',
+                                              "X-Profile-Pid": str(os.getpid())})
+
+@router.get("/slow")
+def slow_requests() -> Dict[str, Any]:
+    """Requests lentos de este worker (los más recientes primero), sin los marcos."""
+    items: List[Dict[str, Any]] = [{k: v for k, v in e.items() if k != "marcos"} for e in reversed(profiling.slow)]
+    return {"pid": os.getpid(), "umbral_ms": settings.PROFILE_SLOW_REQUEST_MS,
+            "capacidad": profiling.slow.maxlen, "items": items}
+
+@router.get("/slow/{entry_id}")
+def slow_request(entry_id: int) -> Dict[str, Any]:
+    for e in profiling.slow:
+        if e["id"] == entry_id:
+            return e
+    raise HTTPException(status_code=404, detail="No está en el buffer de este worker (o ya salió)")
@@ -1,10 +1,19 @@
 import os
+import time
 import requests
-from typing import Dict, Any, List, Optional
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
-from openai import OpenAI
+
+from ..core.config import settings
+from ..core.resilience import call
+from ..services import model_router
+from ..services.tool_output import compact_logged, source_fields
+from .users import current_user_id
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 # =========================================
 # Router
@@ -15,23 +24,39 @@ router = APIRouter(prefix="/api/ai", tags=["ai"])
 # Config desde entorno
 # =========================================
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")  # usa tu "gpt-5-thinking" si quieres
+# Modelos: OPENAI_MODEL (grande) y OPENAI_MODEL_SMALL, ver services/model_router.py
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # p. ej. el fake local: python -m bench.fakes openai
 APP_BASE_URL = os.getenv("APP_BASE_URL", "http://localhost:8000")
 
 # =========================================
 # Cliente OpenAI (lazy)
 # =========================================
-_client: Optional[OpenAI] = None
+_client: Optional["OpenAI"] = None  # uno por worker: es un pool de conexiones, no estado compartible
 
-def get_client() -> OpenAI:
+def get_client() -> "OpenAI":
     """Devuelve el cliente de OpenAI inicializado (lazy)."""
     global _client
     if _client is None:
         if not OPENAI_API_KEY:
             raise HTTPException(status_code=400, detail="Falta OPENAI_API_KEY en variables de entorno")
-        _client = OpenAI(api_key=OPENAI_API_KEY)
+        from openai import OpenAI  # lazy: el SDK pesa ~0.5s de import
+        # los reintentos los hace core/resilience.py (con presupuesto y circuit breaker), no el SDK
+        _client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
     return _client
 
+def set_client(client: Optional["OpenAI"]):
+    """Reemplaza el cliente (un doble en pruebas locales); None vuelve al real."""
+    global _client
+    _client = client
+
+# Prompt de sistema único para todos los pases: con el mismo prefijo (tools + system + user)
+# el proveedor reutiliza su caché de prompts en el segundo pase. Nada dinámico aquí.
+SYSTEM_PROMPT = (
+    "Eres Gari, el Motor de Razonamiento de GariMind Second Brain CésarStyle™. "
+    "Piensas de forma estratégica y humana; si te ayuda, llama herramientas. "
+    "Sé práctico, claro, cálido y accionable."
+)
+
 # =========================================
 # Herramientas que el modelo puede invocar
 # (formato compatible con la API Responses de OpenAI)
@@ -70,7 +95,11 @@ TOOLS = [
     },
 ]
 
-def call_tool(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+def auth_headers(request: Request) -> Dict[str, str]:
+    """Credenciales del request original, para que las herramientas actúen como el mismo usuario."""
+    return {k: v for k in ("Authorization", "X-Api-Key") if (v := request.headers.get(k))}
+
+def call_tool(name: str, args: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
     """Ejecución real de las herramientas del lado servidor."""
     try:
         if name == "get_today_unified":
@@ -79,7 +108,10 @@ def call_tool(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
                 params={
                     "max_emails": int(args.get("max_emails", 50)),
                     "max_drive": int(args.get("max_drive", 10)),
+                    # solo los campos que la compactación va a conservar
+                    "fields": source_fields(name),
                 },
+                headers=headers,
                 timeout=30,
             )
             r.raise_for_status()
@@ -95,6 +127,7 @@ def call_tool(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
                     "proyecto_id": args.get("proyecto_id"),
                     "fecha_limite": args.get("fecha_limite"),
                 },
+                headers=headers,
                 timeout=30,
             )
             r.raise_for_status()
@@ -113,6 +146,7 @@ def call_tool(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
 class ReasonIn(BaseModel):
     prompt: str
     context: Optional[Dict[str, Any]] = None  # por si luego quieres enriquecer
+    route: Optional[str] = None  # "rapido" | "profundo" fuerza la ruta; si no, decide el clasificador
 
 class ChatIn(BaseModel):
     prompt: str
@@ -148,31 +182,38 @@ def _output_text(resp_obj) -> str:
 # Endpoint principal de razonamiento
 # =========================================
 @router.post("/reason")
-def reason(payload: ReasonIn):
+def reason(payload: ReasonIn, request: Request, user_id: int = Depends(current_user_id)):
     """
     Motor de razonamiento de GariMind. El modelo puede llamar herramientas
     para leer el 'hoy unificado' o crear tareas, y luego produce una respuesta final.
     """
     cli = get_client()
+    r = model_router.route(payload.prompt, payload.route)
+    t0 = time.perf_counter()
+    tokens = {"input": 0, "cached": 0, "output": 0}
+
+    def create(messages: List[Dict[str, Any]], tool_choice: str):
+        # mismo modelo, tools y prefijo en todos los pases; solo se agregan mensajes al final
+        resp = call(
+            "openai", "responses.create", cli.responses.create,
+            model=r.model,
+            input=list(messages),
+            tools=TOOLS,
+            tool_choice=tool_choice,
+            temperature=0.2,
+            extra_body={"prompt_cache_key": settings.AI_PROMPT_CACHE_KEY} if settings.AI_PROMPT_CACHE_KEY else None,
+        )
+        for k, v in model_router.usage_of(resp).items():
+            tokens[k] += v
+        return resp
+
+    messages: List[Dict[str, Any]] = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": payload.prompt},
+    ]
 
     # 1) Primer pase: permitir que el modelo decida si usar herramientas
-    first = cli.responses.create(
-        model=OPENAI_MODEL,
-        input=[
-            {
-                "role": "system",
-                "content": (
-                    "Eres Gari, el Motor de Razonamiento de GariMind Second Brain CésarStyle™. "
-                    "Piensas de forma estratégica y humana; si te ayuda, llama herramientas. "
-                    "Sé práctico, claro, cálido y accionable."
-                ),
-            },
-            {"role": "user", "content": payload.prompt},
-        ],
-        tools=TOOLS,
-        tool_choice="auto",
-        temperature=0.2,
-    )
+    first = create(messages, "auto")
 
     # 2) Si hay llamadas a herramientas, las resolvemos (hasta 2 hops)
     tool_outputs: List[Dict[str, Any]] = []
@@ -183,49 +224,43 @@ def reason(payload: ReasonIn):
         hops += 1
         # Ejecutar cada tool y recolectar
         for c in calls:
-            result = call_tool(c["name"], c["arguments"])
+            result = call_tool(c["name"], c["arguments"], auth_headers(request))
+            # JSON compacto dentro del presupuesto de tokens (services/tool_output.py)
+            content, tool_tokens = compact_logged(c["name"], result)
             tool_outputs.append({
                 "call_id": c["id"],
                 "name": c["name"],
-                "output": result,
+                "content": content,
+                "tokens": tool_tokens,
+            })
+            messages.append({
+                "role": "tool",
+                "name": c["name"],
+                "tool_call_id": c["id"],
+                "content": content,
             })
 
         # 3) Nuevo pase aportando los resultados como bloques "tool"
-        second = cli.responses.create(
-            model=OPENAI_MODEL,
-            input=[
-                {"role": "system", "content": "Eres GariMind, un razonador ejecutivo y cálido."},
-                {"role": "user", "content": payload.prompt},
-                *[
-                    {
-                        "role": "tool",
-                        "name": o["name"],
-                        "tool_call_id": o["call_id"],
-                        "content": str(o["output"]),
-                    }
-                    for o in tool_outputs
-                ],
-            ],
-            tools=TOOLS,
-            tool_choice="none",
-            temperature=0.2,
-        )
+        second = create(messages, "none")
 
         # Ver si el modelo quiere hacer más tool-calls
         calls = _extract_tool_calls(second)
         if not calls:
             # ya no hay tool-calls → tomar texto final
             answer = _output_text(second)
-            return {"answer": answer, "tools_used": [o["name"] for o in tool_outputs]}
+            return {"answer": answer, "tools_used": [o["name"] for o in tool_outputs],
+                    "tool_tokens": [{"name": o["name"], **o["tokens"]} for o in tool_outputs],
+                    "route": model_router.record(r, time.perf_counter() - t0, tokens)}
 
     # Si no hubo calls en el primer pase:
     final_text = _output_text(first)
-    return {"answer": final_text, "tools_used": []}
+    return {"answer": final_text, "tools_used": [],
+            "route": model_router.record(r, time.perf_counter() - t0, tokens)}
 
 # =========================================
 # Alias compatible: /api/ai/chat  → reutiliza /reason
 # =========================================
 @router.post("/chat")
-def chat(payload: ChatIn):
+def chat(payload: ChatIn, request: Request, user_id: int = Depends(current_user_id)):
     """Alias para compatibilidad con frontends que llaman /api/ai/chat."""
-    return reason(ReasonIn(prompt=payload.prompt))
+    return reason(ReasonIn(prompt=payload.prompt), request, user_id)
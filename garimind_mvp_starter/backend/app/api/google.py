@@ -1,22 +1,34 @@
 import os, json, datetime
-from fastapi import APIRouter, Request, HTTPException
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+from fastapi import APIRouter, Depends, Request, HTTPException, Query, Response
 from fastapi.responses import RedirectResponse
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
+from ..core.config import settings
+from ..core.pagination import TOTAL_HEADER
+from ..core.resilience import call
+from ..core.security import sign_state, verify_state
+from ..core.serialization import ndjson_response
+from ..services import calendar, credentials, drive, mirror
+from .users import current_user_id
+
+# Los SDKs de Google (google-auth, oauthlib, googleapiclient) se importan en el
+# primer uso: importar este módulo no debe pagar su costo de arranque.
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
 
 router = APIRouter(prefix="/api/google", tags=["google"])
 
-CREDS_DIR = "data/creds"
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 GOOGLE_REDIRECT_PATH = os.getenv("GOOGLE_REDIRECT_PATH", "/api/google/oauth2/callback")
 APP_BASE_URL = os.getenv("APP_BASE_URL", "http://localhost:8000")
 REDIRECT_URI = APP_BASE_URL + GOOGLE_REDIRECT_PATH
+# Permite apuntar las APIs de Google a otro host (p.ej. los fakes de backend/bench)
+GOOGLE_API_ENDPOINT = os.getenv("GOOGLE_API_ENDPOINT")
 
 SCOPES = [
     "https://www.googleapis.com/auth/drive.readonly",
     "https://www.googleapis.com/auth/calendar.readonly",
+    "https://www.googleapis.com/auth/gmail.readonly",
     "openid", "email", "profile"
 ]
 
@@ -33,29 +45,31 @@ def client_config():
         }
     }
 
-def token_path():
-    return os.path.join(CREDS_DIR, "google_token.json")
+def build_service(name: str, version: str, creds):
+    from googleapiclient.discovery import build
+    options = {"api_endpoint": GOOGLE_API_ENDPOINT} if GOOGLE_API_ENDPOINT else None
+    return build(name, version, credentials=creds, client_options=options)
 
-def load_creds():
-    p = token_path()
-    if os.path.exists(p):
-        with open(p, "r") as f:
-            data = json.load(f)
-        return Credentials.from_authorized_user_info(data, SCOPES)
-    return None
+def load_creds(user_id: int):
+    data = credentials.load(user_id, "google")
+    if data is None:
+        return None
+    from google.oauth2.credentials import Credentials
+    return Credentials.from_authorized_user_info(data, SCOPES)
 
-def save_creds(creds: Credentials):
-    os.makedirs(CREDS_DIR, exist_ok=True)
-    with open(token_path(), "w") as f:
-        f.write(creds.to_json())
+def save_creds(creds: "Credentials", user_id: int):
+    credentials.save(user_id, "google", json.loads(creds.to_json()))
 
 @router.get("/auth-url")
-def auth_url():
+def auth_url(user_id: int = Depends(current_user_id)):
+    from google_auth_oauthlib.flow import Flow
     flow = Flow.from_client_config(client_config(), scopes=SCOPES, redirect_uri=REDIRECT_URI)
+    # el state firmado dice a qué usuario pertenece el callback
     url, state = flow.authorization_url(
         access_type="offline",
         include_granted_scopes="true",
-        prompt="consent"
+        prompt="consent",
+        state=sign_state(user_id),
     )
     return {"auth_url": url, "state": state}
 
@@ -64,81 +78,239 @@ def oauth2_callback(request: Request):
     code = request.query_params.get("code")
     if not code:
         raise HTTPException(status_code=400, detail="No code provided")
+    user_id = verify_state(request.query_params.get("state"))
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="state inválido o expirado, vuelve a /api/google/auth-url")
+    from google_auth_oauthlib.flow import Flow
     flow = Flow.from_client_config(client_config(), scopes=SCOPES, redirect_uri=REDIRECT_URI)
-    flow.fetch_token(code=code)
+    call("google", "oauth2.fetch_token", flow.fetch_token, code=code, retry=False)  # el código es de un solo uso
     creds = flow.credentials
-    save_creds(creds)
+    save_creds(creds, user_id)
     return RedirectResponse(url="/docs")
 
+def fetch_drive_recent(creds, limit: int = 10):
+    """Los `limit` archivos modificados más recientemente: pageSize topa en 1000, se sigue nextPageToken."""
+    service = build_service("drive", "v3", creds)
+    files: List[Dict[str, Any]] = []
+    page_token = None
+    while len(files) < limit:
+        results = call("google", "drive.files.list", service.files().list(
+            pageSize=min(DRIVE_PAGE_SIZE, limit - len(files)), pageToken=page_token,
+            fields="nextPageToken,files(id, name, modifiedTime, webViewLink)", orderBy="modifiedTime desc"
+        ).execute)
+        files.extend(results.get("files", []))
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            break
+    return files[:limit]
+
+# --- Espejo de Drive con changes.list: ver services/drive.py ---
+DRIVE_FILE_FIELDS = "id,name,mimeType,modifiedTime,webViewLink,size,trashed"
+DRIVE_PAGE_SIZE = 1000  # máximo de files.list y changes.list
+
+def drive_start_page_token(creds) -> str:
+    service = build_service("drive", "v3", creds)
+    resp = call("google", "drive.changes.getStartPageToken", service.changes().getStartPageToken().execute)
+    return resp["startPageToken"]
+
+def drive_list_files(creds, page_token: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Una página de archivos no borrados, del más reciente al más viejo, y el token de la siguiente."""
+    service = build_service("drive", "v3", creds)
+    resp = call("google", "drive.files.list", service.files().list(
+        q="trashed = false", orderBy="modifiedTime desc", pageSize=DRIVE_PAGE_SIZE, pageToken=page_token,
+        fields=f"nextPageToken,files({DRIVE_FILE_FIELDS})",
+    ).execute)
+    return resp.get("files", []), resp.get("nextPageToken")
+
+def drive_changes(creds, page_token: str) -> Tuple[List[Dict[str, Any]], str]:
+    """Cambios desde `page_token` (todas las páginas) y el token desde el que seguir la próxima vez."""
+    service = build_service("drive", "v3", creds)
+    changes: List[Dict[str, Any]] = []
+    while True:
+        resp = call("google", "drive.changes.list", service.changes().list(
+            pageToken=page_token, pageSize=DRIVE_PAGE_SIZE, spaces="drive", includeRemoved=True,
+            fields=f"nextPageToken,newStartPageToken,changes(fileId,removed,file({DRIVE_FILE_FIELDS}))",
+        ).execute)
+        changes.extend(resp.get("changes", []))
+        if "newStartPageToken" in resp:
+            return changes, resp["newStartPageToken"]
+        page_token = resp["nextPageToken"]
+
+def drive_export(creds, file_id: str, mime_type: str) -> bytes:
+    """Contenido de un archivo nativo (Docs, Slides, Sheets) exportado a `mime_type` (máx. 10 MB)."""
+    service = build_service("drive", "v3", creds)
+    return call("google", "drive.files.export", service.files().export(fileId=file_id, mimeType=mime_type).execute)
+
+# Proyección en el servidor de Google: solo lo que usa event_item
+CALENDAR_FIELDS = "nextPageToken,items(id,summary,start,end,location,organizer/email,htmlLink)"
+CALENDAR_PAGE_SIZE = 250
+
+def event_item(e: Dict[str, Any]) -> Dict[str, Any]:
+    start, end = e.get("start") or {}, e.get("end") or {}
+    return {
+        "id": e.get("id"),
+        "title": e.get("summary"),
+        "start": start.get("dateTime") or start.get("date"),
+        "end": end.get("dateTime") or end.get("date"),
+        "allDay": "date" in start,  # los eventos de día completo traen date, no dateTime
+        "location": e.get("location"),
+        "organizer": (e.get("organizer") or {}).get("email"),
+        "link": e.get("htmlLink"),
+    }
+
+def fetch_calendar(creds, start: datetime.datetime, end: datetime.datetime) -> List[Dict[str, Any]]:
+    """Eventos que se cruzan con [start, end) (datetimes con zona), todas las páginas."""
+    service = build_service("calendar", "v3", creds)
+    items: List[Dict[str, Any]] = []
+    token = None
+    while True:
+        resp = call("google", "calendar.events.list", service.events().list(
+            calendarId="primary", timeMin=start.isoformat(), timeMax=end.isoformat(), singleEvents=True,
+            orderBy="startTime", maxResults=CALENDAR_PAGE_SIZE, pageToken=token, fields=CALENDAR_FIELDS,
+        ).execute)
+        items.extend(event_item(e) for e in resp.get("items", []))
+        token = resp.get("nextPageToken")
+        if not token:
+            return items
+
 @router.get("/drive/recent")
-def drive_recent():
-    creds = load_creds()
+def drive_recent(response: Response, limit: int = Query(10, ge=1, le=500), offset: int = Query(0, ge=0),
+                 user_id: int = Depends(current_user_id)):
+    # con el espejo de changes.list al día no se llama a Drive
+    if drive.synced(user_id):
+        response.headers[TOTAL_HEADER] = str(drive.count(user_id))
+        return drive.recent(user_id, limit, offset)
+    creds = load_creds(user_id)
     if not creds:
         raise HTTPException(status_code=401, detail="Conecta Google primero (/api/google/auth-url)")
-    service = build("drive", "v3", credentials=creds)
-    results = service.files().list(
-        pageSize=10, fields="files(id, name, modifiedTime, webViewLink)",
-        orderBy="modifiedTime desc"
-    ).execute()
-    return results.get("files", [])
+    return fetch_drive_recent(creds, offset + limit)[offset:]
+
+@router.get("/drive/search")
+def drive_search(q: str = Query(..., min_length=2, max_length=200), limit: int = Query(20, ge=1, le=100),
+                 user_id: int = Depends(current_user_id)):
+    """Archivos de Drive por nombre y, si se indexa su contenido, por texto (desde el espejo)."""
+    if not drive.synced(user_id):
+        raise HTTPException(status_code=409, detail="Drive aún no está sincronizado (SYNC_ENABLED)")
+    return drive.search(user_id, q, limit)
 
 @router.get("/calendar/today")
-def calendar_today():
-    creds = load_creds()
-    if not creds:
+def calendar_today(user_id: int = Depends(current_user_id)):
+    # del cubo del día local (services/calendar.py), no del espejo: ese no sabe de qué día es
+    day = calendar.today()
+    events = calendar.events(user_id, "google", day, day)
+    if events is None:
         raise HTTPException(status_code=401, detail="Conecta Google primero (/api/google/auth-url)")
-    service = build("calendar", "v3", credentials=creds)
-    now = datetime.datetime.utcnow()
-    start = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat() + "Z"
-    end = (now.replace(hour=23, minute=59, second=59, microsecond=0)).isoformat() + "Z"
-    events_result = service.events().list(
-        calendarId="primary", timeMin=start, timeMax=end, singleEvents=True, orderBy="startTime"
-    ).execute()
-    return events_result.get("items", [])
+    return events
 
 # === Gmail ===
-from googleapiclient.discovery import build as gbuild
+GMAIL_METADATA_HEADERS = ["From", "Subject", "Date"]
+GMAIL_MESSAGE_FIELDS = "id,snippet,labelIds,payload/headers"
 
-@router.get("/gmail/inbox")
-def gmail_inbox(max_results: int = 50):
-    creds = load_creds()
+def gmail_get(service, mid: str) -> Dict[str, Any]:
+    return call("google", "gmail.messages.get", service.users().messages().get(
+        userId="me", id=mid, format="metadata", metadataHeaders=GMAIL_METADATA_HEADERS, fields=GMAIL_MESSAGE_FIELDS
+    ).execute)
+
+def gmail_item(m: Dict[str, Any]) -> Dict[str, Any]:
+    headers = {h["name"]: h["value"] for h in m.get("payload", {}).get("headers", [])}
+    return {
+        "id": m["id"],
+        "from": headers.get("From"),
+        "subject": headers.get("Subject"),
+        "date": headers.get("Date"),
+        "snippet": m.get("snippet", ""),
+        "isRead": "UNREAD" not in m.get("labelIds", []),
+    }
+
+GMAIL_MAX_LIST = 500  # maxResults máximo de messages.list
+
+def iter_gmail(creds, limit: int, unread: bool = False, offset: int = 0,
+               page_size: int = GMAIL_MAX_LIST) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Páginas de mensajes (metadata) del inbox siguiendo nextPageToken, hasta `limit` en total
+    después de saltar `offset`. Perezoso: la página siguiente se pide al consumir la anterior.
+    """
+    service = build_service("gmail", "v1", creds)
+    query = {"q": "is:unread in:inbox"} if unread else {"labelIds": ["INBOX"]}
+    token, skip, left = None, offset, limit
+    while left > 0:
+        # los ids del offset se saltan listando (páginas grandes, sin pedir su metadata)
+        n = min(GMAIL_MAX_LIST, skip + min(page_size, left))
+        resp = call("google", "gmail.messages.list", service.users().messages().list(
+            userId="me", maxResults=n, pageToken=token, fields="nextPageToken,messages/id", **query).execute)
+        ids = [m["id"] for m in resp.get("messages", [])]
+        dropped = min(skip, len(ids))
+        skip -= dropped
+        ids = ids[dropped:dropped + left]
+        if ids:
+            left -= len(ids)
+            yield [gmail_item(gmail_get(service, mid)) for mid in ids]
+        token = resp.get("nextPageToken")
+        if not token:
+            return
+
+def fetch_gmail(creds, max_results: int = 50, unread: bool = False, offset: int = 0):
+    """
+    Lista mensajes (metadata) del inbox; `unread` filtra solo no leídos. Con `offset` se
+    listan solo ids hasta offset+max_results y se pide la metadata de la página nada más.
+    """
+    return [m for page in iter_gmail(creds, max_results, unread, offset) for m in page]
+
+# --- Push (users.watch + Pub/Sub): ver services/push.py ---
+def gmail_profile(creds) -> Dict[str, Any]:
+    service = build_service("gmail", "v1", creds)
+    return call("google", "gmail.getProfile", service.users().getProfile(userId="me").execute)
+
+def gmail_watch(creds, topic: str) -> Dict[str, Any]:
+    """Activa las notificaciones del INBOX hacia el topic de Pub/Sub. Devuelve historyId y expiration (ms)."""
+    service = build_service("gmail", "v1", creds)
+    body = {"topicName": topic, "labelIds": ["INBOX"]}
+    return call("google", "gmail.watch", service.users().watch(userId="me", body=body).execute)
+
+def gmail_history(creds, start_history_id: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Cambios del buzón desde `start_history_id` (todas las páginas) y el historyId más reciente."""
+    service = build_service("gmail", "v1", creds)
+    records: List[Dict[str, Any]] = []
+    latest, token = None, None
+    while True:
+        resp = call("google", "gmail.history.list", service.users().history().list(
+            userId="me", startHistoryId=start_history_id, pageToken=token,
+            historyTypes=["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"],
+        ).execute)
+        records.extend(resp.get("history", []))
+        latest = resp.get("historyId", latest)
+        token = resp.get("nextPageToken")
+        if not token:
+            return records, latest
+
+def _gmail(user_id: int, fuente: str, max_results: int, offset: int, response: Response, unread: bool = False):
+    cached = mirror.read(user_id, fuente, max_results, offset)
+    if cached is not None:
+        response.headers[TOTAL_HEADER] = str(mirror.count(user_id, fuente))
+        return cached
+    creds = load_creds(user_id)
     if not creds:
         raise HTTPException(status_code=401, detail="Conecta Google primero (/api/google/auth-url)")
-    service = gbuild("gmail", "v1", credentials=creds)
-    msgs_meta = service.users().messages().list(userId="me", labelIds=["INBOX"], maxResults=max_results).execute()
-    ids = [m["id"] for m in msgs_meta.get("messages", [])]
-    items = []
-    for mid in ids:
-        m = service.users().messages().get(userId="me", id=mid, format="metadata", metadataHeaders=["From","Subject","Date"]).execute()
-        headers = {h["name"]: h["value"] for h in m.get("payload", {}).get("headers", [])}
-        snippet = m.get("snippet", "")
-        items.append({
-            "id": mid,
-            "from": headers.get("From"),
-            "subject": headers.get("Subject"),
-            "date": headers.get("Date"),
-            "snippet": snippet
-        })
-    return items
+    return fetch_gmail(creds, max_results, unread=unread, offset=offset)
 
-@router.get("/gmail/unread")
-def gmail_unread(max_results: int = 50):
-    creds = load_creds()
+@router.get("/gmail/stream")
+def gmail_stream(limit: int = Query(1000, ge=1, le=settings.MAIL_STREAM_MAX_ITEMS), unread: bool = False,
+                 user_id: int = Depends(current_user_id)):
+    """
+    Recorre el buzón en vivo y lo devuelve como NDJSON (un mensaje por línea) a medida que llegan
+    las páginas de Gmail, para lecturas más grandes que el espejo.
+    """
+    creds = load_creds(user_id)
     if not creds:
         raise HTTPException(status_code=401, detail="Conecta Google primero (/api/google/auth-url)")
-    service = gbuild("gmail", "v1", credentials=creds)
-    msgs_meta = service.users().messages().list(userId="me", q="is:unread in:inbox", maxResults=max_results).execute()
-    ids = [m["id"] for m in msgs_meta.get("messages", [])]
-    items = []
-    for mid in ids:
-        m = service.users().messages().get(userId="me", id=mid, format="metadata", metadataHeaders=["From","Subject","Date"]).execute()
-        headers = {h["name"]: h["value"] for h in m.get("payload", {}).get("headers", [])}
-        snippet = m.get("snippet", "")
-        items.append({
-            "id": mid,
-            "from": headers.get("From"),
-            "subject": headers.get("Subject"),
-            "date": headers.get("Date"),
-            "snippet": snippet
-        })
-    return items
+    return ndjson_response(iter_gmail(creds, limit, unread=unread, page_size=settings.MAIL_STREAM_PAGE_SIZE))
+
+@router.get("/gmail/inbox")
+def gmail_inbox(response: Response, max_results: int = 50, offset: int = Query(0, ge=0),
+                user_id: int = Depends(current_user_id)):
+    return _gmail(user_id, "gmail", max_results, offset, response)
+
+@router.get("/gmail/unread")
+def gmail_unread(response: Response, max_results: int = 50, offset: int = Query(0, ge=0),
+                 user_id: int = Depends(current_user_id)):
+    return _gmail(user_id, "gmail_unread", max_results, offset, response, unread=True)
@@ -1,11 +1,18 @@
-import os, json, datetime, requests
-from fastapi import APIRouter, HTTPException
+import os, datetime, time, requests
+from typing import Iterator, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.responses import RedirectResponse
-import msal
+from ..core import cache
+from ..core.config import settings
+from ..core.pagination import TOTAL_HEADER
+from ..core.resilience import call
+from ..core.security import sign_state, verify_state
+from ..core.serialization import ndjson_response
+from ..services import calendar, credentials, mirror
+from .users import current_user_id
 
 router = APIRouter(prefix="/api/ms", tags=["microsoft"])
 
-CREDS_DIR = "data/creds"
 MS_CLIENT_ID = os.getenv("MS_CLIENT_ID")
 MS_CLIENT_SECRET = os.getenv("MS_CLIENT_SECRET")
 MS_TENANT = os.getenv("MS_TENANT", "common")
@@ -14,111 +21,244 @@ APP_BASE_URL = os.getenv("APP_BASE_URL", "http://localhost:8000")
 REDIRECT_URI = APP_BASE_URL + MS_REDIRECT_PATH
 AUTHORITY = f"https://login.microsoftonline.com/{MS_TENANT}"
 SCOPE = ["Calendars.Read", "Mail.Read", "offline_access", "openid", "profile", "email"]
-GRAPH = "https://graph.microsoft.com/v1.0"
+GRAPH = os.getenv("MS_GRAPH_URL", "https://graph.microsoft.com/v1.0")
 
-def token_path():
-    return os.path.join(CREDS_DIR, "ms_token.json")
+def save_token(token: dict, user_id: int) -> dict:
+    # expires_in es relativo a la respuesta: se guarda el vencimiento absoluto
+    token = dict(token, expires_at=time.time() + int(token.get("expires_in", 3600)))
+    credentials.save(user_id, "microsoft", token)
+    return token
 
-def save_token(token: dict):
-    os.makedirs(CREDS_DIR, exist_ok=True)
-    with open(token_path(), "w") as f:
-        json.dump(token, f)
-
-def load_token():
-    p = token_path()
-    if os.path.exists(p):
-        with open(p, "r") as f:
-            return json.load(f)
-    return None
+def load_token(user_id: int, fresh: bool = False):
+    return credentials.load(user_id, "microsoft", fresh=fresh)
 
 def build_app():
     if not MS_CLIENT_ID or not MS_CLIENT_SECRET:
         raise HTTPException(status_code=400, detail="Faltan MS_CLIENT_ID/SECRET en .env")
+    import msal  # lazy: solo lo paga quien usa Microsoft
     return msal.ConfidentialClientApplication(
         MS_CLIENT_ID, authority=AUTHORITY, client_credential=MS_CLIENT_SECRET
     )
 
 @router.get("/auth-url")
-def auth_url():
+def auth_url(user_id: int = Depends(current_user_id)):
     app = build_app()
-    url = app.get_authorization_request_url(SCOPE, redirect_uri=REDIRECT_URI)
+    # el state firmado dice a qué usuario pertenece el callback
+    url = app.get_authorization_request_url(SCOPE, state=sign_state(user_id), redirect_uri=REDIRECT_URI)
     return {"auth_url": url}
 
 @router.get("/oauth2/callback")
-def oauth2_callback(code: str | None = None):
+def oauth2_callback(code: str | None = None, state: str | None = None):
     if not code:
         raise HTTPException(status_code=400, detail="No code provided")
+    user_id = verify_state(state)
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="state inválido o expirado, vuelve a /api/ms/auth-url")
     app = build_app()
-    token = app.acquire_token_by_authorization_code(code, scopes=SCOPE, redirect_uri=REDIRECT_URI)
+    token = call("microsoft", "oauth2.acquire_token", app.acquire_token_by_authorization_code, code,
+                 scopes=SCOPE, redirect_uri=REDIRECT_URI, retry=False)  # el código es de un solo uso
     if "access_token" not in token:
         raise HTTPException(status_code=400, detail=f"Token error: {token}")
-    save_token(token)
+    save_token(token, user_id)
     return RedirectResponse(url="/docs")
 
-def ensure_access_token():
-    token = load_token()
+def _expiring(token: dict) -> bool:
+    # los tokens guardados antes de expires_at se renuevan una vez
+    return token.get("expires_at", 0) - time.time() < 60
+
+def ensure_access_token(user_id: int):
+    token = load_token(user_id)
     if not token:
         raise HTTPException(status_code=401, detail="Conecta Microsoft primero (/api/ms/auth-url)")
-    # naive refresh support if refresh_token present (msal will handle it in acquire_token_by_refresh_token)
-    if token.get("expires_in", 3600) < 60 and "refresh_token" in token:
-        app = build_app()
-        new_token = app.acquire_token_by_refresh_token(token["refresh_token"], scopes=SCOPE)
-        if "access_token" in new_token:
-            save_token(new_token)
-            token = new_token
+    if _expiring(token) and "refresh_token" in token:
+        # un refresh a la vez (también entre workers): los demás usan el token que deja el primero
+        with cache.lock(f"ms-token:{user_id}"):
+            token = load_token(user_id, fresh=True)
+            if _expiring(token) and "refresh_token" in token:
+                app = build_app()
+                new_token = call("microsoft", "oauth2.refresh_token", app.acquire_token_by_refresh_token,
+                                 token["refresh_token"], scopes=SCOPE)
+                if "access_token" in new_token:
+                    token = save_token(new_token, user_id)
     return token["access_token"]
 
-@router.get("/calendar/today")
-def calendar_today():
-    access = ensure_access_token()
+def graph_error(r: requests.Response) -> HTTPException:
+    """Error de Graph hacia el cliente: 429 con su Retry-After, 5xx como 502 y el resto con su código."""
+    if r.status_code == 429:
+        ra = r.headers.get("Retry-After")
+        return HTTPException(status_code=429, detail="Microsoft Graph está limitando las llamadas",
+                             headers={"Retry-After": ra} if ra else None)
+    if r.status_code >= 500:
+        return HTTPException(status_code=502, detail=f"Microsoft Graph respondió {r.status_code}")
+    if r.status_code == 401:
+        return HTTPException(status_code=401, detail="Microsoft rechazó el token: reconecta (/api/ms/auth-url)")
+    return HTTPException(status_code=r.status_code, detail=r.text)
+
+GRAPH_MAX_TOP = 1000  # $top máximo de /me/messages
+
+def graph_pages(access: str, path: str, params: dict, op: str, limit: Optional[int] = None,
+                prefer: Optional[str] = None) -> Iterator[list]:
+    """
+    Páginas (`value`) de una colección de Graph siguiendo @odata.nextLink, hasta `limit` items en
+    total. Perezoso: la página siguiente se pide al consumir la anterior.
+    """
     headers = {"Authorization": f"Bearer {access}"}
-    now = datetime.datetime.utcnow()
-    start = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()+"Z"
-    end = now.replace(hour=23, minute=59, second=59, microsecond=0).isoformat()+"Z"
-    params = {"startDateTime": start, "endDateTime": end, "$orderby": "start/dateTime"}
-    r = requests.get(f"https://graph.microsoft.com/v1.0/me/calendarView", headers=headers, params=params, timeout=10)
-    if r.status_code != 200:
-        raise HTTPException(status_code=r.status_code, detail=r.text)
-    return r.json().get("value", [])
+    if prefer:
+        headers["Prefer"] = prefer
+    url, left = f"{GRAPH}{path}", limit
+    while url and (left is None or left > 0):
+        r = call("microsoft", op, requests.get, url, headers=headers, params=params, timeout=10)
+        if r.status_code != 200:
+            raise graph_error(r)
+        data = r.json()
+        page = data.get("value", [])
+        if left is not None:
+            page = page[:left]
+            left -= len(page)
+        if page:
+            yield page
+        url, params = data.get("@odata.nextLink"), None  # el nextLink ya trae los parámetros
 
-@router.get("/mail/inbox")
-def mail_inbox(top: int = 50):
-    access = ensure_access_token()
+# $select: Graph devuelve por defecto el evento entero (body, attendees, ...)
+EVENT_SELECT = "subject,start,end,isAllDay,location,organizer,webLink"
+
+CALENDAR_PAGE_SIZE = 500
+
+def _event_time(t: dict, all_day: bool = False):
+    # con Prefer outlook.timezone="UTC" llega "2025-11-03T08:00:00.0000000"; se deja en ISO con Z.
+    # Los de día completo quedan como fecha sola, igual que en Google.
+    if not t or not t.get("dateTime"):
+        return None
+    dt = t["dateTime"]
+    if all_day:
+        return dt[:10]
+    return dt.split(".")[0] + "Z" if t.get("timeZone") == "UTC" else dt
+
+def event_item(e: dict) -> dict:
+    all_day = bool(e.get("isAllDay"))
+    return {
+        "id": e.get("id"),
+        "title": e.get("subject"),
+        "start": _event_time(e.get("start"), all_day),
+        "end": _event_time(e.get("end"), all_day),
+        "allDay": all_day,
+        "location": (e.get("location") or {}).get("displayName") or None,
+        "organizer": (e.get("organizer") or {}).get("emailAddress", {}).get("address"),
+        "link": e.get("webLink"),
+    }
+
+def fetch_calendar(access: str, start: datetime.datetime, end: datetime.datetime) -> list:
+    """Eventos que se cruzan con [start, end) (datetimes con zona), todas las páginas."""
+    params = {"startDateTime": _graph_datetime(start), "endDateTime": _graph_datetime(end),
+              "$orderby": "start/dateTime", "$select": EVENT_SELECT, "$top": CALENDAR_PAGE_SIZE}
+    pages = graph_pages(access, "/me/calendarView", params, "graph.calendarView", prefer='outlook.timezone="UTC"')
+    return [event_item(e) for page in pages for e in page]
+
+MAIL_SELECT = "sender,subject,receivedDateTime,isRead,bodyPreview"
+
+def mail_item(m: dict) -> dict:
+    return {
+        "id": m.get("id"),
+        "from": (m.get("sender") or {}).get("emailAddress", {}).get("address"),
+        "subject": m.get("subject"),
+        "date": m.get("receivedDateTime"),
+        "isRead": m.get("isRead"),
+        "snippet": m.get("bodyPreview")
+    }
+
+def iter_mail(access: str, limit: int, unread: bool = False, skip: int = 0,
+              page_size: int = GRAPH_MAX_TOP) -> Iterator[list]:
+    """Páginas de mensajes recientes, hasta `limit` en total después de `skip`; `unread` filtra solo no leídos."""
+    params = {"$top": str(min(page_size, limit, GRAPH_MAX_TOP)), "$select": MAIL_SELECT,
+              "$orderby": "receivedDateTime desc"}
+    if skip:
+        params["$skip"] = str(skip)
+    if unread:
+        params["$filter"] = "isRead eq false"
+    for page in graph_pages(access, "/me/messages", params, "graph.messages", limit):
+        yield [mail_item(m) for m in page]
+
+def fetch_mail(access: str, top: int = 50, unread: bool = False, skip: int = 0):
+    """Lista mensajes recientes (`skip` para paginar); `unread` filtra solo no leídos."""
+    return [m for page in iter_mail(access, top, unread, skip) for m in page]
+
+def fetch_message(access: str, message_id: str):
+    """Un solo mensaje (para aplicar una notificación push); None si ya no existe."""
     headers = {"Authorization": f"Bearer {access}"}
-    params = {"$top": str(top), "$select": "sender,subject,receivedDateTime,isRead,bodyPreview", "$orderby": "receivedDateTime desc"}
-    r = requests.get(f"{GRAPH}/me/messages", headers=headers, params=params, timeout=10)
+    r = call("microsoft", "graph.messages.get", requests.get, f"{GRAPH}/me/messages/{message_id}", headers=headers,
+             params={"$select": MAIL_SELECT}, timeout=10)
+    if r.status_code == 404:
+        return None
     if r.status_code != 200:
-        raise HTTPException(status_code=r.status_code, detail=r.text)
-    data = r.json().get("value", [])
-    items = []
-    for m in data:
-        items.append({
-            "id": m.get("id"),
-            "from": (m.get("sender") or {}).get("emailAddress", {}).get("address"),
-            "subject": m.get("subject"),
-            "date": m.get("receivedDateTime"),
-            "isRead": m.get("isRead"),
-            "snippet": m.get("bodyPreview")
-        })
-    return items
+        raise graph_error(r)
+    return r.json()
 
-@router.get("/mail/unread")
-def mail_unread(top: int = 50):
-    access = ensure_access_token()
+# --- Change notifications (subscriptions): ver services/push.py ---
+def _graph_datetime(dt: datetime.datetime) -> str:
+    return dt.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.0000000Z")
+
+def create_subscription(access: str, resource: str, notification_url: str, client_state: str,
+                        expiration: datetime.datetime) -> dict:
     headers = {"Authorization": f"Bearer {access}"}
-    params = {"$top": str(top), "$select": "sender,subject,receivedDateTime,isRead,bodyPreview", "$orderby": "receivedDateTime desc", "$filter": "isRead eq false"}
-    r = requests.get(f"{GRAPH}/me/messages", headers=headers, params=params, timeout=10)
+    body = {
+        "changeType": "created,updated,deleted",
+        "notificationUrl": notification_url,
+        "lifecycleNotificationUrl": notification_url,
+        "resource": resource,
+        "expirationDateTime": _graph_datetime(expiration),
+        "clientState": client_state,
+    }
+    # Graph valida notificationUrl (validationToken) antes de responder
+    r = call("microsoft", "graph.subscriptions.create", requests.post, f"{GRAPH}/subscriptions", headers=headers,
+             json=body, timeout=30, retry=False)  # un reintento podría duplicar la subscription
+    if r.status_code not in (200, 201):
+        raise graph_error(r)
+    return r.json()
+
+def renew_subscription(access: str, subscription_id: str, expiration: datetime.datetime):
+    """Extiende una subscription; None si Graph ya la borró (hay que recrearla)."""
+    headers = {"Authorization": f"Bearer {access}"}
+    r = call("microsoft", "graph.subscriptions.renew", requests.patch, f"{GRAPH}/subscriptions/{subscription_id}",
+             headers=headers, json={"expirationDateTime": _graph_datetime(expiration)}, timeout=10)
+    if r.status_code == 404:
+        return None
     if r.status_code != 200:
-        raise HTTPException(status_code=r.status_code, detail=r.text)
-    data = r.json().get("value", [])
-    items = []
-    for m in data:
-        items.append({
-            "id": m.get("id"),
-            "from": (m.get("sender") or {}).get("emailAddress", {}).get("address"),
-            "subject": m.get("subject"),
-            "date": m.get("receivedDateTime"),
-            "isRead": m.get("isRead"),
-            "snippet": m.get("bodyPreview")
-        })
-    return items
+        raise graph_error(r)
+    return r.json()
+
+@router.get("/calendar/today")
+def calendar_today(user_id: int = Depends(current_user_id)):
+    # del cubo del día local (services/calendar.py), no del espejo: ese no sabe de qué día es
+    day = calendar.today()
+    events = calendar.events(user_id, "microsoft", day, day)
+    if events is None:
+        raise HTTPException(status_code=401, detail="Conecta Microsoft primero (/api/ms/auth-url)")
+    return events
+
+def _mail(user_id: int, fuente: str, top: int, offset: int, response: Response, unread: bool = False):
+    cached = mirror.read(user_id, fuente, top, offset)
+    if cached is not None:
+        response.headers[TOTAL_HEADER] = str(mirror.count(user_id, fuente))
+        return cached
+    # en vivo Graph no da el total: la página llena indica que puede haber más
+    return fetch_mail(ensure_access_token(user_id), top, unread=unread, skip=offset)
+
+@router.get("/mail/stream")
+def mail_stream(limit: int = Query(1000, ge=1, le=settings.MAIL_STREAM_MAX_ITEMS), unread: bool = False,
+                user_id: int = Depends(current_user_id)):
+    """
+    Recorre el buzón en vivo y lo devuelve como NDJSON (un mensaje por línea) a medida que llegan
+    las páginas de Graph, para lecturas más grandes que el espejo.
+    """
+    access = ensure_access_token(user_id)
+    return ndjson_response(iter_mail(access, limit, unread=unread, page_size=settings.MAIL_STREAM_PAGE_SIZE))
+
+@router.get("/mail/inbox")
+def mail_inbox(response: Response, top: int = 50, offset: int = Query(0, ge=0),
+               user_id: int = Depends(current_user_id)):
+    return _mail(user_id, "outlook_mail", top, offset, response)
+
+@router.get("/mail/unread")
+def mail_unread(response: Response, top: int = 50, offset: int = Query(0, ge=0),
+                user_id: int = Depends(current_user_id)):
+    return _mail(user_id, "outlook_unread", top, offset, response, unread=True)
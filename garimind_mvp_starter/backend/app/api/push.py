@@ -0,0 +1,113 @@
+# backend/app/api/push.py
+# Receptores de notificaciones push (Graph y Gmail vía Pub/Sub) y alta de suscripciones.
+# Los receptores solo validan y encolan: el trabajo lo hacen los workers de services/push.py.
+import base64
+import binascii
+import hmac
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..core.config import settings
+from ..services import push
+from .users import current_user_id
+
+router = APIRouter(prefix="/api/push", tags=["push"])
+
+@router.on_event("startup")
+async def start_queue():
+    push.queue.start()
+
+@router.on_event("shutdown")
+async def stop_queue():
+    await push.queue.stop()
+
+def _graph_notification_ok(n) -> bool:
+    if not isinstance(n, dict) or not isinstance(n.get("subscriptionId"), str) or not isinstance(n.get("clientState"), str):
+        return False
+    if any(n.get(k) is not None and not isinstance(n[k], str) for k in ("lifecycleEvent", "changeType")):
+        return False
+    data = n.get("resourceData")
+    return data is None or (isinstance(data, dict) and (data.get("id") is None or isinstance(data["id"], str)))
+
+@router.post("/graph")
+async def graph_notifications(request: Request, validationToken: Optional[str] = None):
+    """Change notifications (y lifecycle) de Graph. Al crear una subscription Graph valida la URL con `validationToken`."""
+    if validationToken is not None:
+        return PlainTextResponse(validationToken)
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="JSON inválido")
+    # sin autenticación: la forma se valida antes de tocar la DB (el clientState lo valida route_graph)
+    notifications = body.get("value", []) if isinstance(body, dict) else None
+    if not isinstance(notifications, list) or not all(_graph_notification_ok(n) for n in notifications):
+        raise HTTPException(status_code=400, detail="Notificación de Graph inválida")
+    for key, changes in await run_in_threadpool(push.route_graph, notifications):
+        push.queue.put(key, changes)
+    # Graph espera 202 en menos de 3 s o reintenta
+    return Response(status_code=202)
+
+@router.post("/gmail")
+async def gmail_notification(request: Request, token: Optional[str] = None):
+    """
+    Push de Pub/Sub: message.data (base64) trae {emailAddress, historyId}. La suscripción push
+    de Pub/Sub debe apuntar a <PUSH_BASE_URL>/api/push/gmail?token=<PUSH_VERIFICATION_TOKEN>.
+    """
+    if not settings.PUSH_VERIFICATION_TOKEN or not hmac.compare_digest(token or "", settings.PUSH_VERIFICATION_TOKEN):
+        raise HTTPException(status_code=403, detail="Token de verificación inválido")
+    try:
+        body = await request.json()
+        data = json.loads(base64.b64decode(body["message"]["data"]))
+        email = data["emailAddress"]
+        # el cuerpo no viene firmado: nada de lo que trae puede tumbar el endpoint
+        history_id = data.get("historyId")
+        history_id = int(history_id) if history_id is not None else None
+        if not isinstance(email, str):
+            raise TypeError("emailAddress")
+    except (ValueError, KeyError, TypeError, AttributeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Mensaje de Pub/Sub inválido")
+    for key in await run_in_threadpool(push.route_gmail, email, history_id):
+        push.queue.put(key)
+    # cualquier 2xx confirma el mensaje (si no, Pub/Sub lo reenvía)
+    return Response(status_code=204)
+
+@router.post("/graph/subscriptions")
+async def graph_subscribe(user_id: int = Depends(current_user_id)):
+    """Suscribe el correo (Inbox) y el calendario de Microsoft del usuario."""
+    if not settings.MICROSOFT_ENABLED:
+        raise HTTPException(status_code=400, detail="Microsoft está desactivado (MICROSOFT_ENABLED)")
+    # en un hilo: mientras tanto Graph llama a /api/push/graph para validar la URL
+    subs = await run_in_threadpool(push.subscribe_graph, user_id)
+    # snapshot base sobre el que se aplican los cambios incrementales
+    for s in subs:
+        for fuente in s["cubre"]:
+            push.queue.put(("refresh", user_id, fuente))
+    return subs
+
+@router.post("/gmail/watch")
+async def gmail_watch(user_id: int = Depends(current_user_id)):
+    """Activa Gmail watch (INBOX) hacia GMAIL_PUBSUB_TOPIC."""
+    if not settings.GOOGLE_ENABLED:
+        raise HTTPException(status_code=400, detail="Google está desactivado (GOOGLE_ENABLED)")
+    if not settings.GMAIL_PUBSUB_TOPIC:
+        raise HTTPException(status_code=400, detail="Falta GMAIL_PUBSUB_TOPIC en .env")
+    from . import google as g  # aquí y no arriba: carga drive, indexer y calendar (ver main.py)
+    if await run_in_threadpool(g.load_creds, user_id) is None:
+        raise HTTPException(status_code=401, detail="Conecta Google primero (/api/google/auth-url)")
+    sub = await run_in_threadpool(push.watch_gmail, user_id)
+    for fuente in sub["cubre"]:
+        push.queue.put(("refresh", user_id, fuente))
+    return sub
+
+@router.get("/status")
+def push_status(user_id: int = Depends(current_user_id)):
+    return {
+        "running": push.queue.running,
+        "pendientes": push.queue.depth(),
+        "stats": push.queue.stats,
+        "suscripciones": push.subscriptions(user_id),
+    }
@@ -1,19 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-import os, re
+import os
 from ..core.config import settings
+from ..core.http_cache import conditional, make_etag
+from ..core.pagination import Page, fetch_page, page_params
+from ..core.serialization import json_response, rows_response
 from ..models.models import Proyecto, Tarea, Recuerdo, Interaccion
-from ..models.base import Base
-from ..db.session import get_session_factory
+from ..db.routing import get_session_router
+from ..db.migrations import check_schema
+from ..db import versions
+from ..services import capture, enrich, indexer
+from ..services.indexer import project_dir, to_slug
+from .users import current_user_id
 from datetime import datetime
-import pathlib
 
 router = APIRouter(prefix="/api")
 
-SessionFactory = get_session_factory(settings.DATABASE_URL)
+db = get_session_router(
+    settings.DATABASE_URL, settings.DATABASE_REPLICA_URL,
+    sticky_seconds=settings.REPLICA_STICKY_SECONDS,
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    lag_check_seconds=settings.REPLICA_LAG_CHECK_SECONDS,
+)
+SessionFactory = db.writer   # escrituras (y lecturas que deben ver lo recién escrito)
+ReadSession = db.reader      # listados y búsquedas: réplica si está configurada y al día
 
 # Pydantic schemas
 class ProyectoIn(BaseModel):
@@ -36,6 +49,7 @@ class TareaIn(BaseModel):
     proyecto_id: Optional[int] = None
     fecha_limite: Optional[datetime] = None
     estado: Optional[str] = "abierta"
+    tags: Optional[str] = None
 
 class TareaOut(BaseModel):
     id: int
@@ -46,6 +60,7 @@ class TareaOut(BaseModel):
     fecha_limite: Optional[datetime]
     estado: str
     creada_en: datetime
+    tags: Optional[str] = None
     class Config:
         from_attributes = True
 
@@ -67,98 +82,153 @@ class RecuerdoOut(BaseModel):
     class Config:
         from_attributes = True
 
+MAX_ENTRADA = 20_000  # caracteres de una captura (un recuerdo); una tarea cabe en tareas.titulo
+MAX_TITULO = Tarea.__table__.c.titulo.type.length
+
 class CapturaIn(BaseModel):
-    entrada: str
+    entrada: str = Field(..., max_length=MAX_ENTRADA)
     como: Optional[str] = "tarea"  # tarea | recuerdo
     proyecto_id: Optional[int] = None
 
-def to_slug(name: str) -> str:
-    s = re.sub(r"[^a-zA-Z0-9\-\_\s]", "", name).strip().lower()
-    s = re.sub(r"\s+", "-", s)
-    return s[:60] if s else "proyecto"
-
-# Init DB (create tables)
-def init_db():
-    from sqlalchemy import create_engine
-    from ..db.utils import is_async_url
-    url = settings.DATABASE_URL
-    if is_async_url(url):
-        # create tables with a sync engine for simplicity
-        sync_url = url.replace("+aiosqlite", "").replace("postgresql+asyncpg", "postgresql+psycopg2")
-        engine = create_engine(sync_url, future=True)
-    else:
-        engine = create_engine(url, future=True)
-    Base.metadata.create_all(bind=engine)
+    @model_validator(mode="after")
+    def titulo_cabe(self):
+        # 422 aquí y no un error del drainer: una captura que no entra en la columna nunca se aplicaría
+        if self.como != "recuerdo" and len(self.entrada) > MAX_TITULO:
+            raise ValueError(f"Una tarea tiene como mucho {MAX_TITULO} caracteres; guárdala como recuerdo")
+        return self
+
+def out_columns(model, schema) -> list:
+    """Columnas del modelo que expone el schema *Out, en su orden (para selects de solo columnas)."""
+    return [getattr(model, name) for name in schema.model_fields]
+
+# Camino rápido de los listados: el schema es nuestro y las columnas salen de él, así que las
+# filas se serializan tal cual (orjson) sin hidratar objetos ORM ni validar cada uno.
+PROYECTO_COLS = out_columns(Proyecto, ProyectoOut)
+TAREA_COLS = out_columns(Tarea, TareaOut)
+RECUERDO_COLS = out_columns(Recuerdo, RecuerdoOut)
+
+def table_etag(session: Session, request: Request, user_id: int, *tablas: str) -> str:
+    """ETag de un listado: cambia cuando cambia cualquiera de las tablas que lee (db/versions.py)."""
+    vers = versions.current(session, user_id, tablas)
+    return make_etag(request, user_id, *(f"{t}:{v}" for t, v in vers.items()))
+
+def check_proyecto(session: Session, user_id: int, proyecto_id: Optional[int]):
+    """Un usuario solo puede colgar cosas de sus propios proyectos."""
+    if proyecto_id is None:
+        return
+    owner = session.execute(select(Proyecto.user_id).where(Proyecto.id == proyecto_id)).scalar_one_or_none()
+    if owner != user_id:
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+
+# Esquema: lo crean las migraciones (alembic upgrade head), no el arranque
+schema_state: dict = {}
 
 @router.on_event("startup")
 def startup():
-    init_db()
+    schema_state.update(check_schema(SessionFactory, migrate=settings.DB_MIGRATE_ON_STARTUP))
 
 @router.post("/projects", response_model=ProyectoOut)
-def create_project(payload: ProyectoIn):
+def create_project(payload: ProyectoIn, user_id: int = Depends(current_user_id)):
     with SessionFactory() as session:
-        p = Proyecto(nombre=payload.nombre, objetivo=payload.objetivo)
+        p = Proyecto(user_id=user_id, nombre=payload.nombre, objetivo=payload.objetivo)
         session.add(p)
         session.commit()
         session.refresh(p)
 
     # create folder
-    projects_dir = settings.DATA_DIR
-    pathlib.Path(projects_dir).mkdir(parents=True, exist_ok=True)
-    folder = pathlib.Path(projects_dir) / to_slug(payload.nombre)
+    folder = project_dir(user_id) / to_slug(payload.nombre)
     folder.mkdir(parents=True, exist_ok=True)
 
     return p
 
-@router.get("/projects", response_model=List[ProyectoOut])
-def list_projects():
+@router.post("/projects/{proyecto_id}/indexar")
+def indexar_proyecto(proyecto_id: int, user_id: int = Depends(current_user_id)):
+    """Pone al día el índice de la carpeta del proyecto (solo lo que cambió) y devuelve los conteos."""
     with SessionFactory() as session:
-        res = session.execute(select(Proyecto).order_by(Proyecto.fecha_inicio.desc()))
-        return [r[0] for r in res.all()]
+        p = session.get(Proyecto, proyecto_id)
+        if p is None or p.user_id != user_id:
+            raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+        nombre = p.nombre
+    return {"proyecto_id": proyecto_id, **indexer.index_project(proyecto_id, user_id, nombre)}
+
+@router.get("/documentos/buscar")
+def buscar_documentos(q: str = Query(..., min_length=2), proyecto_id: Optional[int] = None,
+                      origen: Optional[str] = Query(None, pattern="^(carpeta|drive)$"),
+                      limit: int = Query(20, ge=1, le=100), user_id: int = Depends(current_user_id)):
+    """
+    Búsqueda full-text en los documentos de las carpetas de proyecto y de Google Drive (si se
+    indexa su contenido, DRIVE_INDEX_CONTENT), con todas las palabras de `q`.
+    """
+    with ReadSession() as session:
+        return indexer.search(session, user_id, q, proyecto_id, limit, origen)
+
+@router.get("/projects", response_model=List[ProyectoOut])
+def list_projects(request: Request, response: Response, page: Page = Depends(page_params),
+                  user_id: int = Depends(current_user_id)):
+    with ReadSession() as session:
+        not_modified = conditional(request, response, table_etag(session, request, user_id, "proyectos"))
+        if not_modified is not None:
+            return not_modified
+        stmt = (select(*PROYECTO_COLS).where(Proyecto.user_id == user_id)
+                .order_by(Proyecto.fecha_inicio.desc(), Proyecto.id.desc()))
+        rows = fetch_page(session, stmt, page, response.headers)
+    return rows_response(rows, ProyectoOut.model_fields, response.headers)
 
 @router.post("/tareas", response_model=TareaOut)
-def create_tarea(payload: TareaIn):
+def create_tarea(payload: TareaIn, user_id: int = Depends(current_user_id)):
     with SessionFactory() as session:
-        t = Tarea(**payload.model_dump())
+        check_proyecto(session, user_id, payload.proyecto_id)
+        t = Tarea(user_id=user_id, **payload.model_dump())
         session.add(t)
         session.commit()
         session.refresh(t)
         return t
 
 @router.get("/tareas", response_model=List[TareaOut])
-def list_tareas(proyecto_id: Optional[int] = None, estado: Optional[str] = None):
-    with SessionFactory() as session:
-        stmt = select(Tarea)
+def list_tareas(request: Request, response: Response, proyecto_id: Optional[int] = None,
+                estado: Optional[str] = None, page: Page = Depends(page_params),
+                user_id: int = Depends(current_user_id)):
+    with ReadSession() as session:
+        not_modified = conditional(request, response, table_etag(session, request, user_id, "tareas"))
+        if not_modified is not None:
+            return not_modified
+        stmt = select(*TAREA_COLS).where(Tarea.user_id == user_id)
         if proyecto_id:
             stmt = stmt.where(Tarea.proyecto_id == proyecto_id)
         if estado:
             stmt = stmt.where(Tarea.estado == estado)
-        stmt = stmt.order_by(Tarea.creada_en.desc())
-        res = session.execute(stmt).scalars().all()
-        return res
+        stmt = stmt.order_by(Tarea.creada_en.desc(), Tarea.id.desc())
+        rows = fetch_page(session, stmt, page, response.headers)
+    return rows_response(rows, TareaOut.model_fields, response.headers)
 
 @router.post("/recuerdos", response_model=RecuerdoOut)
-def create_recuerdo(payload: RecuerdoIn):
+def create_recuerdo(payload: RecuerdoIn, user_id: int = Depends(current_user_id)):
     with SessionFactory() as session:
-        r = Recuerdo(**payload.model_dump())
+        check_proyecto(session, user_id, payload.proyecto_id)
+        r = Recuerdo(user_id=user_id, **payload.model_dump())
         session.add(r)
         session.commit()
         session.refresh(r)
         return r
 
 @router.get("/recuerdos", response_model=List[RecuerdoOut])
-def list_recuerdos(tag: Optional[str] = None, q: Optional[str] = None, proyecto_id: Optional[int] = None):
-    with SessionFactory() as session:
-        stmt = select(Recuerdo)
+def list_recuerdos(request: Request, response: Response, tag: Optional[str] = None, q: Optional[str] = None,
+                   proyecto_id: Optional[int] = None, page: Page = Depends(page_params),
+                   user_id: int = Depends(current_user_id)):
+    with ReadSession() as session:
+        not_modified = conditional(request, response, table_etag(session, request, user_id, "recuerdos"))
+        if not_modified is not None:
+            return not_modified
+        stmt = select(*RECUERDO_COLS).where(Recuerdo.user_id == user_id)
         if proyecto_id:
             stmt = stmt.where(Recuerdo.proyecto_id == proyecto_id)
         if tag:
             stmt = stmt.where(Recuerdo.tags.ilike(f"%{tag}%"))
         if q:
             stmt = stmt.where(Recuerdo.contenido.ilike(f"%{q}%"))
-        stmt = stmt.order_by(Recuerdo.fecha.desc())
-        res = session.execute(stmt).scalars().all()
-        return res
+        stmt = stmt.order_by(Recuerdo.fecha.desc(), Recuerdo.id.desc())
+        rows = fetch_page(session, stmt, page, response.headers)
+    return rows_response(rows, RecuerdoOut.model_fields, response.headers)
 
 @router.get("/daily-magnet")
 def daily_magnet():
@@ -171,128 +241,196 @@ def daily_magnet():
     }
 
 @router.get("/diario")
-def diario(desde: Optional[str] = None, hasta: Optional[str] = None):
+def diario(request: Request, response: Response, desde: Optional[str] = None, hasta: Optional[str] = None,
+           user_id: int = Depends(current_user_id)):
     # Demo: junta cambios recientes de tareas y recuerdos
-    with SessionFactory() as session:
-        tareas = session.execute(select(Tarea).order_by(Tarea.creada_en.desc()).limit(20)).scalars().all()
-        recuerdos = session.execute(select(Recuerdo).order_by(Recuerdo.fecha.desc()).limit(20)).scalars().all()
+    with ReadSession() as session:
+        not_modified = conditional(request, response, table_etag(session, request, user_id, "tareas", "recuerdos"))
+        if not_modified is not None:
+            return not_modified
+        tareas = session.execute(
+            select(Tarea.titulo, Tarea.creada_en, Tarea.estado)
+            .where(Tarea.user_id == user_id).order_by(Tarea.creada_en.desc()).limit(20)
+        ).all()
+        recuerdos = session.execute(
+            select(Recuerdo.contenido, Recuerdo.fecha, Recuerdo.tags)
+            .where(Recuerdo.user_id == user_id).order_by(Recuerdo.fecha.desc()).limit(20)
+        ).all()
     timeline = []
-    for t in tareas:
-        timeline.append({"tipo": "tarea", "titulo": t.titulo, "fecha": t.creada_en.isoformat(), "estado": t.estado})
-    for r in recuerdos:
-        timeline.append({"tipo": "recuerdo", "contenido": r.contenido, "fecha": r.fecha.isoformat(), "tags": r.tags})
-    return sorted(timeline, key=lambda x: x["fecha"], reverse=True)
+    for titulo, fecha, estado in tareas:
+        timeline.append({"tipo": "tarea", "titulo": titulo, "fecha": fecha.isoformat(), "estado": estado})
+    for contenido, fecha, tags in recuerdos:
+        timeline.append({"tipo": "recuerdo", "contenido": contenido, "fecha": fecha.isoformat(), "tags": tags})
+    return json_response(sorted(timeline, key=lambda x: x["fecha"], reverse=True), response.headers)
+
+@router.on_event("startup")
+def start_capture_journal():
+    # después de check_schema: el drainer escribe en `capturas`
+    if settings.CAPTURE_JOURNAL_ENABLED:
+        capture.journal.start()
+
+@router.on_event("shutdown")
+def stop_capture_journal():
+    if capture.journal.running:
+        capture.journal.stop()
+
+@router.on_event("startup")
+def start_enricher():
+    if settings.ENRICH_ENABLED:
+        enrich.enricher.start()
+
+@router.on_event("shutdown")
+def stop_enricher():
+    if enrich.enricher.running:
+        enrich.enricher.stop()
+
+@router.on_event("startup")
+def start_indexer():
+    if settings.INDEX_ENABLED:
+        indexer.indexer.start()
+
+@router.on_event("shutdown")
+def stop_indexer():
+    if indexer.indexer.running:
+        indexer.indexer.stop()
 
 @router.post("/inbox/capturar")
-def capturar(payload: CapturaIn):
-    # Si como=tarea -> crea una Tarea; si como=recuerdo -> crea Recuerdo
-    if payload.como == "recuerdo":
-        with SessionFactory() as session:
-            r = Recuerdo(contenido=payload.entrada, proyecto_id=payload.proyecto_id)
-            session.add(r)
-            session.commit()
-            session.refresh(r)
-            return {"tipo":"recuerdo","id": r.id}
-    else:
-        with SessionFactory() as session:
-            t = Tarea(titulo=payload.entrada, proyecto_id=payload.proyecto_id)
-            session.add(t)
-            session.commit()
-            session.refresh(t)
-            return {"tipo":"tarea","id": t.id}
+def capturar(payload: CapturaIn, response: Response, user_id: int = Depends(current_user_id),
+             idempotency_key: Optional[str] = Header(None, max_length=64)):
+    """
+    Si como=tarea crea una Tarea; si como=recuerdo, un Recuerdo. Con el journal activo responde
+    202 `estado: pendiente` en cuanto la captura está en disco (el id llega al aplicarla, ver
+    GET /api/inbox/capturas/{clave}). Un reintento con el mismo `Idempotency-Key` no duplica.
+    """
+    # un proyecto ajeno es 404 con o sin journal (el drenado solo cubre el que se borra entre medias)
+    with SessionFactory() as session:
+        check_proyecto(session, user_id, payload.proyecto_id)
+    rec = capture.record(user_id, payload.como, payload.entrada, payload.proyecto_id, idempotency_key)
+    if capture.journal.running:
+        try:
+            out = capture.journal.submit(rec)
+        except capture.JournalError:
+            # disco lleno / sin permisos: se guarda directo en la DB, con la misma idempotencia
+            return capture.apply_one(rec)
+        if out["estado"] == "pendiente":
+            response.status_code = 202
+        return out
+    # sin journal: directo a la DB, pero también por `capturas` (un reintento no duplica)
+    return capture.apply_one(rec)
+
+@router.get("/inbox/capturas/{clave}")
+def estado_captura(clave: str, user_id: int = Depends(current_user_id)):
+    """Estado de una captura por su clave: pendiente (en el journal), guardada (con su id) o descartada."""
+    out = capture.journal.status(user_id, clave)
+    if out is None:
+        raise HTTPException(status_code=404, detail="Captura no encontrada")
+    return out
 
 
 # === Unified 'today' and quick-actions ===
 from fastapi import Body
 from typing import Dict, Any
-from .google import load_creds as g_load_creds
-from .microsoft import ensure_access_token
-from googleapiclient.discovery import build as gbuild
-import requests as _requests
-import datetime as _dt
+from datetime import date
+from ..services import calendar, mirror
+from ..services.items import parse_fields, project
 
 @router.get("/unified/today")
-def unified_today(max_emails: int = 50, max_drive: int = 10):
+def unified_today(request: Request, response: Response, max_emails: int = 50, max_drive: int = 10,
+                  fields: Optional[str] = None, user_id: int = Depends(current_user_id)):
+    """
+    Correos, eventos y archivos del día en el esquema compacto de services/items.py.
+    `fields=subject,start,...` recorta cada item a esas claves (más el id).
+    """
+    wanted = parse_fields(fields)
     out: Dict[str, Any] = {"gmail": [], "outlook_mail": [], "gcal": [], "mscal": [], "drive": []}
+    # como en main.py: el módulo de una integración deshabilitada no se importa
+    if settings.GOOGLE_ENABLED:
+        from . import google as g
+    if settings.MICROSOFT_ENABLED:
+        from . import microsoft as ms
+
+    # Correo y Drive salen del espejo local (services/sync.py); solo si nunca se sincronizó se
+    # consulta al proveedor en vivo. El calendario sale de los cubos por día de services/calendar.py:
+    # el espejo de gcal/mscal no sabe de qué día es y pasada la medianoche serviría el de ayer.
+    def _google(fetch):
+        gcreds = g.load_creds(user_id)
+        return fetch(gcreds) if gcreds else []
+
+    def _microsoft(fetch):
+        return fetch(ms.ensure_access_token(user_id))
+
+    def _calendar(proveedor):
+        # el día local de settings.TIMEZONE
+        day = calendar.today()
+        found = calendar.events(user_id, proveedor, day, day)
+        if found is None and proveedor == "microsoft":
+            ms.ensure_access_token(user_id)  # sin conectar: el mismo error que el correo de Outlook
+        return found or []
+
+    # (clave, habilitada, límite, en vivo, del espejo)
+    sections = [
+        ("gmail", settings.GOOGLE_ENABLED, max_emails, lambda: _google(lambda c: g.fetch_gmail(c, max_emails)), True),
+        ("outlook_mail", settings.MICROSOFT_ENABLED, max_emails, lambda: _microsoft(lambda a: ms.fetch_mail(a, max_emails)), True),
+        ("gcal", settings.GOOGLE_ENABLED, None, lambda: _calendar("google"), False),
+        ("mscal", settings.MICROSOFT_ENABLED, None, lambda: _calendar("microsoft"), False),
+        ("drive", settings.GOOGLE_ENABLED, max_drive, lambda: _google(lambda c: g.fetch_drive_recent(c, max_drive)), True),
+    ]
+
+    def _section(key, limit, live, mirrored):
+        try:
+            cached = mirror.read(user_id, key, limit) if mirrored else None
+            out[key] = project(cached if cached is not None else live(), wanted)
+        except Exception as e:
+            out[f"{key}_error"] = str(e)
+
+    # El calendario se lee antes (de la cache): entra en la versión tal cual. Si el resto sale del
+    # espejo, su parte de la versión es la ultima_sync de cada bloque: un 304 no lee esos items
+    calendar_keys = [key for key, enabled, _, _, mirrored in sections if enabled and not mirrored]
+    for key, enabled, limit, live, mirrored in sections:
+        if enabled and not mirrored:
+            _section(key, limit, live, mirrored)
+    keys = [key for key, enabled, _, _, mirrored in sections if enabled and mirrored]
+    synced = mirror.synced_at(user_id, keys, max(max_emails, max_drive))
+    if synced is not None:
+        seen = [(k, out.get(k), out.get(f"{k}_error")) for k in calendar_keys]
+        not_modified = conditional(request, response, make_etag(request, user_id, *synced, *seen))
+        if not_modified is not None:
+            return not_modified
+
+    for key, enabled, limit, live, mirrored in sections:
+        if enabled and mirrored:
+            _section(key, limit, live, mirrored)
+
+    # items JSON planos (espejo o proveedor): directo a orjson, sin jsonable_encoder
+    return json_response(out, response.headers)
+
+@router.get("/calendar/range")
+def calendar_range(desde: date = Query(..., alias="from"), hasta: date = Query(..., alias="to"),
+                   user_id: int = Depends(current_user_id)):
+    """
+    Eventos de Google y Outlook entre dos días locales (YYYY-MM-DD, inclusive) en una sola línea de
+    tiempo ordenada; cada evento lleva `source`. Sale de los cubos por día de services/calendar.py.
+    """
+    if hasta < desde:
+        raise HTTPException(status_code=400, detail="`to` no puede ser anterior a `from`")
+    if (hasta - desde).days + 1 > settings.CALENDAR_MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Máximo {settings.CALENDAR_MAX_RANGE_DAYS} días por consulta")
+    events, errors = calendar.timeline(user_id, desde, hasta)
+    out: Dict[str, Any] = {"from": desde.isoformat(), "to": hasta.isoformat(), "timezone": settings.TIMEZONE,
+                           "events": events}
+    for proveedor, error in errors.items():
+        out[f"{proveedor}_error"] = error
+    return json_response(out)
 
-    # Gmail (optional)
-    try:
-        gcreds = g_load_creds()
-        if gcreds:
-            gsvc = gbuild("gmail", "v1", credentials=gcreds)
-            msgs_meta = gsvc.users().messages().list(userId="me", labelIds=["INBOX"], maxResults=max_emails).execute()
-            ids = [m["id"] for m in msgs_meta.get("messages", [])]
-            gmails = []
-            for mid in ids:
-                m = gsvc.users().messages().get(userId="me", id=mid, format="metadata", metadataHeaders=["From","Subject","Date"]).execute()
-                hdrs = {h["name"]: h["value"] for h in m.get("payload", {}).get("headers", [])}
-                gmails.append({"id": mid, "from": hdrs.get("From"), "subject": hdrs.get("Subject"), "date": hdrs.get("Date"), "snippet": m.get("snippet","")})
-            out["gmail"] = gmails
-    except Exception as e:
-        out["gmail_error"] = str(e)
-
-    # Outlook Mail (optional)
-    try:
-        access = ensure_access_token()
-        if access:
-            headers = {"Authorization": f"Bearer {access}"}
-            params = {"$top": str(max_emails), "$select": "sender,subject,receivedDateTime,isRead,bodyPreview", "$orderby": "receivedDateTime desc"}
-            r = _requests.get("https://graph.microsoft.com/v1.0/me/messages", headers=headers, params=params, timeout=10)
-            if r.status_code == 200:
-                data = r.json().get("value", [])
-                om = []
-                for m in data:
-                    om.append({
-                        "id": m.get("id"),
-                        "from": (m.get("sender") or {}).get("emailAddress", {}).get("address"),
-                        "subject": m.get("subject"),
-                        "date": m.get("receivedDateTime"),
-                        "isRead": m.get("isRead"),
-                        "snippet": m.get("bodyPreview")
-                    })
-                out["outlook_mail"] = om
-    except Exception as e:
-        out["outlook_mail_error"] = str(e)
-
-    # Google Calendar today
-    try:
-        gcreds = g_load_creds()
-        if gcreds:
-            cal = gbuild("calendar", "v3", credentials=gcreds)
-            now = _dt.datetime.utcnow()
-            start = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat() + "Z"
-            end = now.replace(hour=23, minute=59, second=59, microsecond=0).isoformat() + "Z"
-            evs = cal.events().list(calendarId="primary", timeMin=start, timeMax=end, singleEvents=True, orderBy="startTime").execute().get("items", [])
-            out["gcal"] = evs
-    except Exception as e:
-        out["gcal_error"] = str(e)
-
-    # Outlook Calendar today
-    try:
-        access = ensure_access_token()
-        if access:
-            headers = {"Authorization": f"Bearer {access}"}
-            now = _dt.datetime.utcnow()
-            start = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()+"Z"
-            end = now.replace(hour=23, minute=59, second=59, microsecond=0).isoformat()+"Z"
-            params = {"startDateTime": start, "endDateTime": end, "$orderby": "start/dateTime"}
-            r = _requests.get("https://graph.microsoft.com/v1.0/me/calendarView", headers=headers, params=params, timeout=10)
-            if r.status_code == 200:
-                out["mscal"] = r.json().get("value", [])
-    except Exception as e:
-        out["mscal_error"] = str(e)
-
-    # Google Drive recent
-    try:
-        gcreds = g_load_creds()
-        if gcreds:
-            drv = gbuild("drive", "v3", credentials=gcreds)
-            files = drv.files().list(pageSize=max_drive, fields="files(id, name, modifiedTime, webViewLink)", orderBy="modifiedTime desc").execute().get("files", [])
-            out["drive"] = files
-    except Exception as e:
-        out["drive_error"] = str(e)
+@router.on_event("startup")
+def start_calendar_prefetch():
+    if settings.CALENDAR_PREFETCH_ENABLED:
+        calendar.prefetcher.start()
 
-    return out
+@router.on_event("shutdown")
+def stop_calendar_prefetch():
+    if calendar.prefetcher.running:
+        calendar.prefetcher.stop()
 
 class QuickTaskIn(BaseModel):
     titulo: str
@@ -300,19 +438,21 @@ class QuickTaskIn(BaseModel):
     fecha_limite: datetime | None = None
 
 @router.post("/actions/task_from_email")
-def task_from_email(data: QuickTaskIn = Body(...)):
+def task_from_email(data: QuickTaskIn = Body(...), user_id: int = Depends(current_user_id)):
     # create a Tarea from an email summary (subject, optional link)
     with SessionFactory() as session:
-        t = Tarea(titulo=data.titulo, proyecto_id=data.proyecto_id, fecha_limite=data.fecha_limite)
+        check_proyecto(session, user_id, data.proyecto_id)
+        t = Tarea(user_id=user_id, titulo=data.titulo, proyecto_id=data.proyecto_id, fecha_limite=data.fecha_limite)
         session.add(t)
         session.commit()
         session.refresh(t)
         return {"ok": True, "tarea_id": t.id}
 
 @router.post("/actions/task_from_event")
-def task_from_event(data: QuickTaskIn = Body(...)):
+def task_from_event(data: QuickTaskIn = Body(...), user_id: int = Depends(current_user_id)):
     with SessionFactory() as session:
-        t = Tarea(titulo=data.titulo, proyecto_id=data.proyecto_id, fecha_limite=data.fecha_limite)
+        check_proyecto(session, user_id, data.proyecto_id)
+        t = Tarea(user_id=user_id, titulo=data.titulo, proyecto_id=data.proyecto_id, fecha_limite=data.fecha_limite)
         session.add(t)
         session.commit()
         session.refresh(t)
@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends
+
+from ..core.config import settings
+from ..services import mirror
+from ..services.sync import scheduler
+from .users import current_user_id
+
+router = APIRouter(prefix="/api/sync", tags=["sync"])
+
+@router.on_event("startup")
+async def start_scheduler():
+    if settings.SYNC_ENABLED:
+        scheduler.start()
+
+@router.on_event("shutdown")
+async def stop_scheduler():
+    await scheduler.stop()
+
+@router.get("/status")
+def sync_status(user_id: int = Depends(current_user_id)):
+    """Última sincronización, lag y errores por fuente del usuario."""
+    by_source = {s["fuente"]: s for s in mirror.status(user_id)}
+    sources = []
+    for fuente, (proveedor, _) in scheduler.sources.items():
+        s = by_source.get(fuente, {"fuente": fuente, "ultima_sync": None, "lag_seconds": None,
+                                   "ultimo_intento": None, "ultimo_error": None, "fallos": 0})
+        nxt = scheduler.next_run.get((user_id, fuente))
+        s["proveedor"] = proveedor
+        s["proxima_sync"] = datetime.fromtimestamp(nxt, timezone.utc).isoformat() if nxt else None
+        sources.append(s)
+    return {"enabled": settings.SYNC_ENABLED, "running": scheduler.running, "sources": sources}
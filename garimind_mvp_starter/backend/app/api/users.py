@@ -0,0 +1,90 @@
+# backend/app/api/users.py
+# Usuarios y autenticación por API token (Authorization: Bearer gm_... o X-Api-Key).
+import hmac
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from pydantic import BaseModel
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from ..core.config import settings
+from ..core.resilience import current_account
+from ..core.security import hash_token, new_api_token
+from ..db.routing import current_client
+from ..db.session import get_session_factory
+from ..models.models import DEFAULT_USER_ID, Usuario
+
+router = APIRouter(prefix="/api/usuarios")
+SessionFactory = get_session_factory(settings.DATABASE_URL)
+
+# hash del token -> user_id (solo aciertos: un token inválido siempre va a la DB)
+_token_cache: "OrderedDict[str, int]" = OrderedDict()
+_TOKEN_CACHE_SIZE = 4096
+_lock = threading.Lock()
+
+def _lookup(token_hash: str) -> Optional[int]:
+    with _lock:
+        if token_hash in _token_cache:
+            _token_cache.move_to_end(token_hash)
+            return _token_cache[token_hash]
+    with SessionFactory() as session:
+        user_id = session.execute(select(Usuario.id).where(Usuario.token_hash == token_hash)).scalar_one_or_none()
+    if user_id is not None:
+        with _lock:
+            _token_cache[token_hash] = user_id
+            while len(_token_cache) > _TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return user_id
+
+async def current_user_id(
+    authorization: Optional[str] = Header(default=None),
+    x_api_key: Optional[str] = Header(default=None),
+) -> int:
+    """Dependencia de FastAPI: id del usuario dueño del request."""
+    token = x_api_key
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    if not token:
+        if settings.AUTH_REQUIRED:
+            raise HTTPException(status_code=401, detail="Falta el API token", headers={"WWW-Authenticate": "Bearer"})
+        user_id = DEFAULT_USER_ID
+    else:
+        user_id = await run_in_threadpool(_lookup, hash_token(token))
+        if user_id is None:
+            raise HTTPException(status_code=401, detail="API token inválido", headers={"WWW-Authenticate": "Bearer"})
+    # read-your-writes por usuario, no por IP
+    current_client.set(f"user:{user_id}")
+    current_account.set(user_id)  # rate limit de proveedores por cuenta (core/resilience.py)
+    return user_id
+
+class UsuarioIn(BaseModel):
+    email: str
+    nombre: Optional[str] = None
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Dependencia de los endpoints de administración: X-Admin-Token igual a ADMIN_TOKEN."""
+    if not settings.ADMIN_TOKEN or not hmac.compare_digest((x_admin_token or "").encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Se requiere X-Admin-Token")
+
+@router.post("", dependencies=[Depends(require_admin)])
+def create_user(payload: UsuarioIn):
+    """Alta de usuario. Devuelve el API token una sola vez (solo se guarda su hash)."""
+    token = new_api_token()
+    with SessionFactory() as session:
+        if session.execute(select(Usuario.id).where(Usuario.email == payload.email)).first():
+            raise HTTPException(status_code=409, detail="Ya existe un usuario con ese email")
+        u = Usuario(email=payload.email, nombre=payload.nombre, token_hash=hash_token(token))
+        session.add(u)
+        session.commit()
+        return {"id": u.id, "email": u.email, "nombre": u.nombre, "api_token": token}
+
+@router.get("/me")
+def me(user_id: int = Depends(current_user_id)):
+    with SessionFactory() as session:
+        u = session.get(Usuario, user_id)
+        if u is None:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        return {"id": u.id, "email": u.email, "nombre": u.nombre}
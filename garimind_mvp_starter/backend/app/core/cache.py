@@ -0,0 +1,339 @@
+# backend/app/core/cache.py
+# Cache compartida entre workers. Con `uvicorn --workers N` cada proceso tenía su propia cache de
+# calendario y refrescaba por su cuenta: N workers, N llamadas al proveedor. CACHE_BACKEND elige:
+#   - memory: LRU en proceso (por defecto; un solo worker);
+#   - shared: SQLite en WAL sobre CACHE_DIR (/dev/shm si existe: el archivo vive en memoria y
+#     cada proceso lo mapea con mmap) y locks con flock sobre LOCK_STRIPES archivos fijos;
+#   - redis:  cualquier servidor con protocolo Redis en CACHE_URL (paquete `redis`, opcional).
+# Los valores deben ser serializables a JSON. Cada entrada vence a los `ttl` segundos pero se
+# guarda CACHE_STALE_SECONDS más, para servirla vencida si el proveedor falla (get_value(stale=True)).
+# `lock(name)` es el single-flight: un solo proceso (e hilo) a la vez hace el fetch; los demás
+# esperan y encuentran la cache llena.
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from . import metrics
+from .config import settings
+
+log = logging.getLogger("garimind.cache")
+
+LOCK_POLL_SECONDS = 0.01
+LOCK_STRIPES = 64  # shared: archivos de flock fijos; cada nombre cae en uno (hash mod N)
+_PURGE_EVERY = 256  # sets entre purgas de vencidos (shared)
+
+stats: Dict[Tuple[str, str], int] = defaultdict(int)
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+class _NamedLocks:
+    """Un threading.Lock por nombre; se borra al quedar sin hilos que lo tengan o esperen (no crece sin fin)."""
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._locks: Dict[str, list] = {}  # name -> [lock, hilos que lo tienen o esperan]
+
+    def acquire(self, name: str, timeout: float) -> Tuple[list, bool]:
+        with self._mutex:
+            entry = self._locks.get(name)
+            if entry is None:
+                entry = self._locks[name] = [threading.Lock(), 0]
+            entry[1] += 1
+        return entry, entry[0].acquire(timeout=max(0.0, timeout))
+
+    def release(self, name: str, entry: list, acquired: bool):
+        if acquired:
+            entry[0].release()
+        with self._mutex:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[name]
+
+class MemoryCache:
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, float, Any]]" = OrderedDict()  # key -> (vence, purga, valor)
+        self._lock = threading.Lock()
+        self._locks = _NamedLocks()
+
+    def get(self, key: str, stale: bool = False) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None or hit[1] < now or (hit[0] < now and not stale):
+                return None
+            self._data.move_to_end(key)
+            return hit[2]
+
+    def set(self, key: str, value: Any, ttl: float):
+        expires = time.time() + ttl
+        with self._lock:
+            self._data[key] = (expires, expires + settings.CACHE_STALE_SECONDS, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def add(self, key: str, value: Any, ttl: float) -> bool:
+        """Guarda solo si no hay una entrada vigente. True si la guardó (p. ej. quién hace la ronda)."""
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and hit[0] >= time.time():
+                return False
+            expires = time.time() + ttl
+            self._data[key] = (expires, expires, value)
+            return True
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    @contextmanager
+    def lock(self, name: str, timeout: float) -> Iterator[bool]:
+        entry, acquired = self._locks.acquire(name, timeout)
+        try:
+            yield acquired
+        finally:
+            self._locks.release(name, entry, acquired)
+
+    def size(self) -> Optional[int]:
+        return len(self._data)
+
+class SharedCache:
+    name = "shared"
+
+    def __init__(self, directory: str, max_entries: int):
+        import fcntl  # solo POSIX: en Windows queda CACHE_BACKEND=memory
+        self._fcntl = fcntl
+        self.max_entries = max_entries
+        self.path = os.path.join(directory, "cache.sqlite3")
+        self.lock_dir = os.path.join(directory, "locks")
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self._local = threading.local()
+        self._sets = 0
+        self._names = _NamedLocks()
+        # franja -> [fd con el flock, nombres de este proceso que la usan]. El flock es del proceso:
+        # dos nombres que caen en la misma franja no se bloquean entre sí dentro de él (ni anidados)
+        self._stripes: Dict[int, list] = {}
+        self._stripes_mutex = threading.Lock()
+        self._conn().execute("CREATE TABLE IF NOT EXISTS cache (k TEXT PRIMARY KEY, v TEXT NOT NULL, "
+                             "vence REAL NOT NULL, purga REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # una conexión por hilo; autocommit: cada sentencia es su propia transacción
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # es una cache: perderla en un corte no importa
+            conn.execute(f"PRAGMA mmap_size={64 * 1024 * 1024}")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, stale: bool = False) -> Optional[Any]:
+        now = time.time()
+        row = self._conn().execute("SELECT v, vence FROM cache WHERE k = ? AND purga >= ?", (key, now)).fetchone()
+        if row is None or (row[1] < now and not stale):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float):
+        expires = time.time() + ttl
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO cache (k, v, vence, purga) VALUES (?, ?, ?, ?)",
+                     (key, _dumps(value), expires, expires + settings.CACHE_STALE_SECONDS))
+        self._sets += 1
+        if self._sets % _PURGE_EVERY == 0:
+            self._purge(conn)
+
+    def _purge(self, conn: sqlite3.Connection):
+        conn.execute("DELETE FROM cache WHERE purga < ?", (time.time(),))
+        conn.execute("DELETE FROM cache WHERE k IN (SELECT k FROM cache ORDER BY purga DESC LIMIT -1 OFFSET ?)",
+                     (self.max_entries,))
+
+    def add(self, key: str, value: Any, ttl: float) -> bool:
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO cache (k, v, vence, purga) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(k) DO UPDATE SET v = excluded.v, vence = excluded.vence, purga = excluded.purga "
+            "WHERE cache.vence < ?", (key, _dumps(value), now + ttl, now + ttl, now))
+        return cur.rowcount == 1
+
+    def delete_prefix(self, prefix: str):
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        self._conn().execute("DELETE FROM cache WHERE k LIKE ? ESCAPE '\\'", (escaped + "%",))
+
+    @contextmanager
+    def lock(self, name: str, timeout: float) -> Iterator[bool]:
+        # entre hilos decide el lock por nombre; entre procesos, flock sobre un archivo fijo de
+        # LOCK_STRIPES (se libera solo si el proceso muere). Nombres de la misma franja en otro
+        # proceso esperan de más, pero los archivos no crecen con los nombres
+        deadline = time.monotonic() + timeout
+        stripe = int.from_bytes(hashlib.sha1(name.encode()).digest()[:4], "big") % LOCK_STRIPES
+        entry, named = self._names.acquire(name, timeout)
+        acquired = named and self._stripe_acquire(stripe, deadline)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self._stripe_release(stripe)
+            self._names.release(name, entry, named)
+
+    def _stripe_acquire(self, stripe: int, deadline: float) -> bool:
+        while True:
+            with self._stripes_mutex:
+                held = self._stripes.get(stripe)
+                if held is not None:
+                    held[1] += 1
+                    return True
+                path = os.path.join(self.lock_dir, f"stripe-{stripe:02d}.lock")
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    self._fcntl.flock(fd, self._fcntl.LOCK_EX | self._fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                else:
+                    self._stripes[stripe] = [fd, 1]
+                    return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(LOCK_POLL_SECONDS)
+
+    def _stripe_release(self, stripe: int):
+        with self._stripes_mutex:
+            held = self._stripes[stripe]
+            held[1] -= 1
+            if held[1] == 0:
+                del self._stripes[stripe]
+                self._fcntl.flock(held[0], self._fcntl.LOCK_UN)
+                os.close(held[0])
+
+    def size(self) -> Optional[int]:
+        return self._conn().execute("SELECT count(*) FROM cache").fetchone()[0]
+
+# libera el lock solo si sigue siendo nuestro (pudo vencer y tomarlo otro)
+_UNLOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+class RedisCache:
+    name = "redis"
+
+    def __init__(self, url: str):
+        import redis  # lazy: solo con CACHE_BACKEND=redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = settings.CACHE_KEY_PREFIX
+
+    def get(self, key: str, stale: bool = False) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        expires, value = json.loads(raw)
+        return value if stale or expires >= time.time() else None
+
+    def set(self, key: str, value: Any, ttl: float):
+        self.client.set(self.prefix + key, _dumps([time.time() + ttl, value]),
+                        px=int((ttl + settings.CACHE_STALE_SECONDS) * 1000))
+
+    def add(self, key: str, value: Any, ttl: float) -> bool:
+        return bool(self.client.set(self.prefix + key, _dumps([time.time() + ttl, value]), nx=True,
+                                    px=max(1, int(ttl * 1000))))
+
+    def delete_prefix(self, prefix: str):
+        keys = list(self.client.scan_iter(match=self.prefix + prefix + "*", count=500))
+        if keys:
+            self.client.delete(*keys)
+
+    @contextmanager
+    def lock(self, name: str, timeout: float) -> Iterator[bool]:
+        key = self.prefix + "lock:" + name
+        token = uuid.uuid4().hex
+        lease = int(settings.CACHE_LOCK_LEASE_SECONDS * 1000)  # si el dueño muere, el lock vence solo
+        deadline = time.monotonic() + timeout
+        acquired = bool(self.client.set(key, token, nx=True, px=lease))
+        while not acquired and time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_SECONDS)
+            acquired = bool(self.client.set(key, token, nx=True, px=lease))
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.client.eval(_UNLOCK, 1, key, token)
+
+    def size(self) -> Optional[int]:
+        return None  # DBSIZE incluiría claves ajenas
+
+def _shared_dir() -> str:
+    if settings.CACHE_DIR:
+        return settings.CACHE_DIR
+    return "/dev/shm/garimind" if os.path.isdir("/dev/shm") else os.path.join("data", "cache")
+
+@lru_cache(maxsize=1)
+def get_cache():
+    kind = settings.CACHE_BACKEND
+    if kind == "shared":
+        return SharedCache(_shared_dir(), settings.CACHE_MAX_ENTRIES)
+    if kind == "redis":
+        return RedisCache(settings.CACHE_URL)
+    if kind != "memory":
+        log.warning("CACHE_BACKEND=%s desconocido: se usa memory", kind)
+    return MemoryCache(settings.CACHE_MAX_ENTRIES)
+
+# ------------------------------------------------------------------
+# API del módulo (con conteo para /metrics)
+# ------------------------------------------------------------------
+def get_value(key: str, stale: bool = False) -> Optional[Any]:
+    value = get_cache().get(key, stale)
+    stats[("get", "miss" if value is None else "hit")] += 1
+    return value
+
+def set_value(key: str, value: Any, ttl: float):
+    get_cache().set(key, value, ttl)
+    stats[("set", "ok")] += 1
+
+def add(key: str, value: Any, ttl: float) -> bool:
+    done = get_cache().add(key, value, ttl)
+    stats[("add", "ok" if done else "existe")] += 1
+    return done
+
+def delete_prefix(prefix: str):
+    get_cache().delete_prefix(prefix)
+    stats[("delete", "ok")] += 1
+
+@contextmanager
+def lock(name: str, timeout: Optional[float] = None) -> Iterator[bool]:
+    """
+    Single-flight entre hilos y workers. Cede True con el lock tomado; tras `timeout`
+    (CACHE_LOCK_TIMEOUT_SECONDS) cede False y el llamador sigue sin él (mejor dos fetch que un 500).
+    """
+    start = time.perf_counter()
+    with get_cache().lock(name, settings.CACHE_LOCK_TIMEOUT_SECONDS if timeout is None else timeout) as acquired:
+        waited = time.perf_counter() - start
+        stats[("lock", "ok" if acquired else "timeout")] += 1
+        if waited > LOCK_POLL_SECONDS:
+            stats[("lock", "espera")] += 1
+        yield acquired
+
+@metrics.register_collector
+def _cache_metrics():
+    if not stats:
+        return []
+    backend = get_cache()
+    lines = metrics.counter_lines("garimind_cache_ops_total", "Operaciones sobre la cache compartida (lock: tomados, "
+                                  "con espera y vencidos por timeout)",
+                                  [({"backend": backend.name, "op": op, "resultado": r}, n)
+                                   for (op, r), n in sorted(stats.items())])
+    n = backend.size()
+    if n is not None:
+        lines += metrics.gauge_lines("garimind_cache_entries", "Entradas en la cache (incluye vencidas aún no purgadas)",
+                                     [({"backend": backend.name}, n)])
+    return lines
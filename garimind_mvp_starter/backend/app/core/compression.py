@@ -0,0 +1,132 @@
+# backend/app/core/compression.py
+# Compresión de respuestas: Brotli si el cliente lo acepta y el paquete `brotli` está
+# instalado, si no gzip. Las respuestas pequeñas (< minimum_size) y los streams
+# (text/event-stream, NDJSON) pasan tal cual; los ETag fuertes se marcan con la
+# codificación ("...-br") para que cada representación tenga el suyo.
+import zlib
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # opcional: sin él solo gzip
+    brotli = None
+
+# Hasta este tamaño el cuerpo se junta entero (un solo bloque comprimido, con Content-Length);
+# por encima se comprime en streaming
+MAX_BUFFER = 1024 * 1024
+
+SKIP_TYPES = ("text/event-stream", "application/x-ndjson", "image/", "audio/", "video/",
+              "application/zip", "application/gzip", "application/octet-stream")
+
+def _accepted(accept_encoding: str) -> set:
+    out = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            out.add(name.strip())
+    return out
+
+class _Gzip:
+    def __init__(self, level: int):
+        # wbits 16+MAX_WBITS = cabecera gzip
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes, final: bool) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes, final: bool) -> bytes:
+        out = self._c.process(data)
+        return out + (self._c.finish() if final else self._c.flush())
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _encoding(self, scope: Scope) -> Optional[str]:
+        accepted = _accepted(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = self._encoding(scope) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _Responder(self, encoding, send).run(scope, receive)
+
+class _Responder:
+    def __init__(self, mw: CompressionMiddleware, encoding: str, send: Send):
+        self.mw = mw
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.pending: List[bytes] = []  # trozos retenidos hasta decidir (ver MAX_BUFFER)
+        self.pending_size = 0
+        self.compressor = None
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive) -> None:
+        await self.mw.app(scope, receive, self.wrapped_send)
+
+    def _new_compressor(self):
+        if self.encoding == "br":
+            return _Brotli(self.mw.brotli_quality)
+        return _Gzip(self.mw.gzip_level)
+
+    async def wrapped_send(self, message: Message) -> None:
+        kind = message["type"]
+        if kind == "http.response.start":
+            # se retiene hasta ver el cuerpo (o sus primeros MAX_BUFFER bytes)
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = ("content-encoding" in headers or message["status"] in (204, 206, 304)
+                                or headers.get("content-type", "").startswith(SKIP_TYPES))
+            if self.passthrough:
+                await self.send(message)
+            return
+        if kind != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+        body, more = message.get("body", b""), message.get("more_body", False)
+        if self.compressor is not None:
+            await self.send({"type": kind, "body": self.compressor.chunk(body, final=not more), "more_body": more})
+            return
+        # detrás de los middlewares @app.middleware todo llega en varios trozos: se acumula
+        self.pending.append(body)
+        self.pending_size += len(body)
+        if more and self.pending_size < MAX_BUFFER:
+            return
+        body, size, self.pending = b"".join(self.pending), self.pending_size, []
+        headers = MutableHeaders(raw=self.start["headers"])
+        if not more and size < self.mw.minimum_size:
+            self.passthrough = True
+            headers["Content-Length"] = str(size)
+            await self.send(self.start)
+            await self.send({"type": kind, "body": body, "more_body": False})
+            return
+        self.compressor = self._new_compressor()
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/") and etag.endswith('"'):
+            headers["ETag"] = f'{etag[:-1]}-{self.encoding}"'
+        data = self.compressor.chunk(body, final=not more)
+        if more:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(len(data))
+        await self.send(self.start)
+        await self.send({"type": kind, "body": data, "more_body": more})
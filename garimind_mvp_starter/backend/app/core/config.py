@@ -3,10 +3,157 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def _flag(name: str, default: str = "true") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
 class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./garimind.db")
+    # Solo para desarrollo / una instancia: aplica `alembic upgrade head` al arrancar
+    DB_MIGRATE_ON_STARTUP: bool = _flag("DB_MIGRATE_ON_STARTUP", "false")
+    # Réplica de lectura (opcional): listados y búsquedas van ahí, salvo justo después de escribir
+    DATABASE_REPLICA_URL: str | None = os.getenv("DATABASE_REPLICA_URL") or None
+    REPLICA_STICKY_SECONDS: float = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+    REPLICA_LAG_CHECK_SECONDS: float = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "5"))
+
+    # Pool de conexiones (un solo engine por proceso, ver db/session.py)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = _flag("DB_POOL_PRE_PING")
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 = sin límite (Postgres)
+    # SQLite: WAL + busy_timeout para que escrituras concurrentes esperen en vez de "database is locked"
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
     OPENAI_API_KEY: str | None = os.getenv("OPENAI_API_KEY")
     TIMEZONE: str = os.getenv("TIMEZONE", "America/Bogota")
     DATA_DIR: str = os.getenv("DATA_DIR", "data/projects")
 
+    # Compresión de respuestas (Brotli si está instalado y el cliente lo acepta, si no gzip)
+    COMPRESSION_ENABLED: bool = _flag("COMPRESSION_ENABLED")
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+    # Journal de capturas rápidas (/api/inbox/capturar): se confirma al quedar en disco y un
+    # drainer las pasa a la DB en lotes; lo pendiente se reaplica al arrancar (services/capture.py)
+    CAPTURE_JOURNAL_ENABLED: bool = _flag("CAPTURE_JOURNAL_ENABLED")
+    CAPTURE_JOURNAL_DIR: str = os.getenv("CAPTURE_JOURNAL_DIR", "data/journal")
+    CAPTURE_FSYNC_DELAY_MS: float = float(os.getenv("CAPTURE_FSYNC_DELAY_MS", "2"))  # espera para juntar más en un fsync
+    CAPTURE_BATCH_SIZE: int = int(os.getenv("CAPTURE_BATCH_SIZE", "200"))
+    CAPTURE_SEGMENT_BYTES: int = int(os.getenv("CAPTURE_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+
+    # Enriquecimiento de capturas en segundo plano (services/enrich.py): tags, prioridad, proyecto y
+    # tipo en lotes; con el modelo si hay IA configurada, si no con el clasificador local
+    ENRICH_ENABLED: bool = _flag("ENRICH_ENABLED")
+    ENRICH_USE_MODEL: bool = _flag("ENRICH_USE_MODEL")
+    ENRICH_BATCH_SIZE: int = int(os.getenv("ENRICH_BATCH_SIZE", "25"))  # items por llamada al modelo
+    ENRICH_LINGER_SECONDS: float = float(os.getenv("ENRICH_LINGER_SECONDS", "2"))  # espera para juntar capturas
+    ENRICH_INTERVAL_SECONDS: int = int(os.getenv("ENRICH_INTERVAL_SECONDS", "60"))
+    ENRICH_MAX_CHARS: int = int(os.getenv("ENRICH_MAX_CHARS", "500"))  # texto de cada item enviado al modelo
+
+    # Indexado de las carpetas de proyecto (services/indexer.py): incremental por mtime/tamaño/hash
+    INDEX_ENABLED: bool = _flag("INDEX_ENABLED")
+    INDEX_WATCH: bool = _flag("INDEX_WATCH")  # con watchdog instalado: cambios sin re-escanear
+    INDEX_INTERVAL_SECONDS: int = int(os.getenv("INDEX_INTERVAL_SECONDS", "900"))  # re-escaneo completo; 0 = nunca
+    INDEX_DEBOUNCE_SECONDS: float = float(os.getenv("INDEX_DEBOUNCE_SECONDS", "1"))
+    INDEX_CHUNK_CHARS: int = int(os.getenv("INDEX_CHUNK_CHARS", "1500"))
+    INDEX_CHUNK_OVERLAP: int = int(os.getenv("INDEX_CHUNK_OVERLAP", "200"))
+    INDEX_MAX_FILE_BYTES: int = int(os.getenv("INDEX_MAX_FILE_BYTES", str(200 * 1024 * 1024)))
+    INDEX_MAX_CHUNKS_PER_FILE: int = int(os.getenv("INDEX_MAX_CHUNKS_PER_FILE", "5000"))
+
+    # Multi-usuario: con AUTH_REQUIRED=false los requests sin token son del usuario por defecto (id 1)
+    AUTH_REQUIRED: bool = _flag("AUTH_REQUIRED", "false")
+    ADMIN_TOKEN: str | None = os.getenv("ADMIN_TOKEN") or None  # para POST /api/usuarios
+    CREDENTIALS_KEY: str | None = os.getenv("CREDENTIALS_KEY") or None  # clave Fernet de los tokens OAuth
+
+    # Integraciones: si están apagadas ni se montan sus routers ni se importan sus SDKs
+    GOOGLE_ENABLED: bool = _flag("GOOGLE_ENABLED")
+    MICROSOFT_ENABLED: bool = _flag("MICROSOFT_ENABLED")
+    AI_ENABLED: bool = _flag("AI_ENABLED")
+    # Salidas de herramientas que vuelven al modelo en ai.reason (services/tool_output.py)
+    AI_TOOL_OUTPUT_MAX_TOKENS: int = int(os.getenv("AI_TOOL_OUTPUT_MAX_TOKENS", "2000"))
+    AI_TOOL_OUTPUT_SUMMARY: bool = _flag("AI_TOOL_OUTPUT_SUMMARY")  # resumen (conteos, remitentes) de listas largas
+    AI_TOOL_OUTPUT_SUMMARY_MIN_ITEMS: int = int(os.getenv("AI_TOOL_OUTPUT_SUMMARY_MIN_ITEMS", "10"))
+    # Enrutado de modelos (services/model_router.py): saludos y consultas puntuales al pequeño
+    AI_ROUTING_ENABLED: bool = _flag("AI_ROUTING_ENABLED")
+    AI_MODEL_LARGE: str = os.getenv("OPENAI_MODEL", "gpt-4o")
+    AI_MODEL_SMALL: str = os.getenv("OPENAI_MODEL_SMALL", "gpt-4o-mini")
+    AI_ROUTE_MAX_WORDS: int = int(os.getenv("AI_ROUTE_MAX_WORDS", "40"))  # más largo → siempre el grande
+    AI_MODEL_PRICES: str | None = os.getenv("AI_MODEL_PRICES") or None  # JSON {modelo: [in, cached, out]} USD/1M
+    # Agrupa los pedidos en el mismo caché de prompts del proveedor; vacío = no se envía
+    AI_PROMPT_CACHE_KEY: str = os.getenv("AI_PROMPT_CACHE_KEY", "garimind-reason")
+
+    # Sincronización en segundo plano de integraciones (Google / Microsoft)
+    SYNC_ENABLED: bool = _flag("SYNC_ENABLED")
+    SYNC_INTERVAL_SECONDS: int = int(os.getenv("SYNC_INTERVAL_SECONDS", "300"))
+    SYNC_JITTER_SECONDS: int = int(os.getenv("SYNC_JITTER_SECONDS", "30"))
+    SYNC_MAX_BACKOFF_SECONDS: int = int(os.getenv("SYNC_MAX_BACKOFF_SECONDS", "3600"))
+    SYNC_CONCURRENCY: int = int(os.getenv("SYNC_CONCURRENCY", "2"))
+    SYNC_MAX_ITEMS: int = int(os.getenv("SYNC_MAX_ITEMS", "50"))
+
+    # Resiliencia de llamadas salientes (core/resilience.py): rate limit por cuenta, reintentos y circuit breaker
+    RESILIENCE_ENABLED: bool = _flag("RESILIENCE_ENABLED")
+    RATE_LIMIT_GOOGLE_PER_SECOND: float = float(os.getenv("RATE_LIMIT_GOOGLE_PER_SECOND", "40"))  # Gmail: 250 unidades/s, un get = 5
+    RATE_LIMIT_MICROSOFT_PER_SECOND: float = float(os.getenv("RATE_LIMIT_MICROSOFT_PER_SECOND", "15"))  # Graph: 10.000 pedidos / 10 min por buzón
+    RATE_LIMIT_OPENAI_PER_SECOND: float = float(os.getenv("RATE_LIMIT_OPENAI_PER_SECOND", "5"))
+    RATE_LIMIT_BURST: float = float(os.getenv("RATE_LIMIT_BURST", "50"))
+    RATE_LIMIT_MAX_WAIT_SECONDS: float = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "5"))  # más → 429 local
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))  # intentos totales por llamada
+    RETRY_BASE_DELAY_SECONDS: float = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "0.5"))
+    RETRY_MAX_DELAY_SECONDS: float = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "10"))  # también tope del Retry-After
+    RETRY_BUDGET_RATIO: float = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))  # reintentos por llamada
+    RETRY_BUDGET_CAP: float = float(os.getenv("RETRY_BUDGET_CAP", "10"))  # saldo inicial y máximo
+    BREAKER_FAILURES: int = int(os.getenv("BREAKER_FAILURES", "5"))  # fallos seguidos (5xx / red) para abrir
+    BREAKER_COOLDOWN_SECONDS: float = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "30"))
+
+    # Recorridos en vivo del buzón en NDJSON (/api/google/gmail/stream, /api/ms/mail/stream)
+    MAIL_STREAM_MAX_ITEMS: int = int(os.getenv("MAIL_STREAM_MAX_ITEMS", "10000"))  # tope de ?limit=
+    MAIL_STREAM_PAGE_SIZE: int = int(os.getenv("MAIL_STREAM_PAGE_SIZE", "100"))  # mensajes por página al proveedor
+
+    # Espejo de Google Drive (services/drive.py): changes.list desde el último startPageToken
+    DRIVE_MAX_FILES: int = int(os.getenv("DRIVE_MAX_FILES", "5000"))  # tope del listado inicial
+    DRIVE_INDEX_CONTENT: bool = _flag("DRIVE_INDEX_CONTENT", "false")  # exporta Docs/Slides/Sheets al índice
+    DRIVE_INDEX_PER_SYNC: int = int(os.getenv("DRIVE_INDEX_PER_SYNC", "50"))  # exports por vuelta del sync
+
+    # Cache compartida entre workers (core/cache.py): memory (en proceso), shared (SQLite + flock) o redis
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_DIR: str = os.getenv("CACHE_DIR", "")  # shared; vacío: /dev/shm/garimind (o data/cache)
+    CACHE_URL: str = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+    CACHE_KEY_PREFIX: str = os.getenv("CACHE_KEY_PREFIX", "garimind:")  # redis
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "20000"))
+    CACHE_STALE_SECONDS: int = int(os.getenv("CACHE_STALE_SECONDS", "86400"))  # vencidas servibles si el proveedor falla
+    CACHE_LOCK_TIMEOUT_SECONDS: float = float(os.getenv("CACHE_LOCK_TIMEOUT_SECONDS", "30"))
+    CACHE_LOCK_LEASE_SECONDS: float = float(os.getenv("CACHE_LOCK_LEASE_SECONDS", "60"))  # redis: vence si el dueño muere
+
+    # Calendario por días locales (services/calendar.py): cubos por (usuario, proveedor, día) en TIMEZONE
+    CALENDAR_CACHE_TTL_SECONDS: int = int(os.getenv("CALENDAR_CACHE_TTL_SECONDS", "600"))
+    CALENDAR_MAX_RANGE_DAYS: int = int(os.getenv("CALENDAR_MAX_RANGE_DAYS", "62"))  # tope de /api/calendar/range
+    CALENDAR_PREFETCH_ENABLED: bool = _flag("CALENDAR_PREFETCH_ENABLED")
+    CALENDAR_PREFETCH_DAYS: int = int(os.getenv("CALENDAR_PREFETCH_DAYS", "7"))  # hoy + los próximos N días
+    CALENDAR_PREFETCH_INTERVAL_SECONDS: int = int(os.getenv("CALENDAR_PREFETCH_INTERVAL_SECONDS", "300"))
+
+    # Perfilado en producción (core/profiling.py, /api/admin/profile con X-Admin-Token). Apagado no instala nada
+    PROFILING_ENABLED: bool = _flag("PROFILING_ENABLED", "false")
+    PROFILE_MAX_SECONDS: int = int(os.getenv("PROFILE_MAX_SECONDS", "60"))  # tope del muestreo bajo demanda
+    PROFILE_SAMPLE_HZ: int = int(os.getenv("PROFILE_SAMPLE_HZ", "100"))  # muestras por segundo por defecto
+    PROFILE_SLOW_REQUEST_MS: float = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "0"))  # 0: sin cProfile por request
+    PROFILE_SLOW_SAMPLE_RATE: float = float(os.getenv("PROFILE_SLOW_SAMPLE_RATE", "1.0"))  # fracción con cProfile
+    PROFILE_SLOW_BUFFER: int = int(os.getenv("PROFILE_SLOW_BUFFER", "50"))  # requests lentos guardados por worker
+    PROFILE_TOP_FRAMES: int = int(os.getenv("PROFILE_TOP_FRAMES", "25"))
+
+    # Ingesta push (Graph change notifications / Gmail watch vía Pub/Sub) hacia el espejo local
+    PUSH_ENABLED: bool = _flag("PUSH_ENABLED", "false")
+    PUSH_BASE_URL: str = os.getenv("PUSH_BASE_URL") or os.getenv("APP_BASE_URL", "http://localhost:8000")  # URL pública
+    PUSH_VERIFICATION_TOKEN: str | None = os.getenv("PUSH_VERIFICATION_TOKEN") or None  # ?token= del push de Pub/Sub
+    GMAIL_PUBSUB_TOPIC: str | None = os.getenv("GMAIL_PUBSUB_TOPIC") or None  # projects/<proyecto>/topics/<topic>
+    PUSH_GRAPH_EXPIRATION_MINUTES: int = int(os.getenv("PUSH_GRAPH_EXPIRATION_MINUTES", "4230"))
+    PUSH_RENEW_BEFORE_SECONDS: int = int(os.getenv("PUSH_RENEW_BEFORE_SECONDS", "86400"))
+    PUSH_RENEW_CHECK_SECONDS: int = int(os.getenv("PUSH_RENEW_CHECK_SECONDS", "3600"))
+    # Las fuentes cubiertas por push solo se consultan cada tanto, como red de seguridad
+    PUSH_FALLBACK_POLL_SECONDS: int = int(os.getenv("PUSH_FALLBACK_POLL_SECONDS", "21600"))
+    PUSH_WORKERS: int = int(os.getenv("PUSH_WORKERS", "2"))
+
 settings = Settings()
@@ -0,0 +1,47 @@
+# backend/app/core/http_cache.py
+# GET condicionales: ETag fuerte a partir de un contador de versión barato
+# (db/versions.py, ultima_sync del espejo) y 304 si el cliente ya lo tiene.
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+# Cada respuesta es por usuario y debe revalidarse (If-None-Match) antes de reutilizarse
+CACHE_CONTROL = "private, no-cache"
+
+def make_etag(request: Request, *parts: Any) -> str:
+    """ETag fuerte de la representación: ruta + query + versiones de lo que se lee."""
+    h = hashlib.blake2b(digest_size=12)
+    for p in (request.url.path, str(sorted(request.query_params.multi_items())), *parts):
+        h.update(str(p).encode())
+        h.update(b"\0")
+    return f'"{h.hexdigest()}"'
+
+def _opaque(tag: str) -> str:
+    # If-None-Match compara en débil: ignora W/ y el sufijo que añade la compresión ("...-gzip")
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    return tag.rsplit("-", 1)[0] if tag.endswith(("-gzip", "-br")) else tag
+
+def matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    want = _opaque(etag)
+    return any(_opaque(t) == want for t in if_none_match.split(","))
+
+def conditional(request: Request, response: Response, etag: Optional[str]) -> Optional[Response]:
+    """
+    Devuelve un 304 si If-None-Match coincide con `etag`; si no, deja ETag y Cache-Control
+    en `response` (la que inyecta FastAPI) y devuelve None para seguir con el endpoint.
+    """
+    if etag is None:
+        return None
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,152 @@
+# backend/app/core/metrics.py
+# Métricas de latencia en proceso: histogramas exportados en formato
+# Prometheus (/metrics) y spans por request para el header Server-Timing.
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[LabelKey, List] = {}  # labels -> [counts por bucket, suma, total]
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    s[0][i] += 1
+            s[1] += value
+            s[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+        for key, counts, total, n in sorted(series):
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+            sep = "," if base else ""
+            for b, c in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{b}"}} {c}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {n}')
+            labels = f"{{{base}}}" if base else ""
+            lines.append(f"{self.name}_sum{labels} {total:.6f}")
+            lines.append(f"{self.name}_count{labels} {n}")
+        return lines
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+REGISTRY: List[Histogram] = []
+
+def histogram(name: str, help: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+    h = Histogram(name, help, buckets)
+    REGISTRY.append(h)
+    return h
+
+# Collectors: callbacks que devuelven líneas ya formateadas (gauges leídos al vuelo)
+COLLECTORS: List[Callable[[], List[str]]] = []
+
+def register_collector(fn: Callable[[], List[str]]):
+    COLLECTORS.append(fn)
+    return fn
+
+def _sample_lines(kind: str, name: str, help: str, samples: List[Tuple[Dict[str, str], float]]) -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        base = ",".join(f'{k}="{_escape(str(v))}"' for k, v in sorted(labels.items()))
+        lines.append(f"{name}{{{base}}} {value}" if base else f"{name} {value}")
+    return lines
+
+def gauge_lines(name: str, help: str, samples: List[Tuple[Dict[str, str], float]]) -> List[str]:
+    return _sample_lines("gauge", name, help, samples)
+
+def counter_lines(name: str, help: str, samples: List[Tuple[Dict[str, str], float]]) -> List[str]:
+    """Contadores acumulados desde que arrancó el proceso (los `*_total`): rate() / increase() sobre ellos."""
+    return _sample_lines("counter", name, help, samples)
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for h in REGISTRY:
+        lines.extend(h.render())
+    for fn in COLLECTORS:
+        lines.extend(fn())
+    return "\n".join(lines) + "\n"
+
+HTTP_REQUESTS = histogram("garimind_http_request_duration_seconds", "Duración de requests HTTP por ruta")
+OUTBOUND_CALLS = histogram("garimind_outbound_call_duration_seconds", "Duración de llamadas salientes (google, microsoft, openai)")
+DB_QUERIES = histogram("garimind_db_query_duration_seconds", "Duración de queries SQL", buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+
+# ------------------------------------------------------------------
+# Spans por request → Server-Timing
+# ------------------------------------------------------------------
+# Lista mutable compartida con los threads del threadpool (el contexto se copia,
+# la lista es la misma), así los endpoints sync también reportan sus spans.
+_request_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_spans", default=None)
+
+def begin_request() -> List[Tuple[str, float]]:
+    spans: List[Tuple[str, float]] = []
+    _request_spans.set(spans)
+    return spans
+
+def _record_span(kind: str, seconds: float):
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((kind, seconds))
+
+@contextmanager
+def span(provider: str, operation: str):
+    """Mide una llamada saliente: `with span("google", "gmail.list"): ...execute()`."""
+    t0 = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        dt = time.perf_counter() - t0
+        OUTBOUND_CALLS.observe(dt, provider=provider, operation=operation, status=status)
+        _record_span(provider, dt)
+
+def server_timing(spans: List[Tuple[str, float]], total: float) -> str:
+    agg: Dict[str, List[float]] = {}
+    for kind, dt in spans:
+        a = agg.setdefault(kind, [0.0, 0])
+        a[0] += dt
+        a[1] += 1
+    parts = [f'{kind};dur={dt * 1000:.1f};desc="{n}x"' for kind, (dt, n) in agg.items()]
+    parts.append(f"app;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+# ------------------------------------------------------------------
+# SQLAlchemy: eventos a nivel de clase Engine (cubre todos los engines)
+# ------------------------------------------------------------------
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("query_start")
+    if not stack:
+        return
+    dt = time.perf_counter() - stack.pop()
+    op = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+    DB_QUERIES.observe(dt, operation=op)
+    _record_span("db", dt)
@@ -0,0 +1,37 @@
+# backend/app/core/pagination.py
+# Paginación limit/offset de los listados. Sin `limit` el endpoint responde todo como
+# antes; con `limit` devuelve esa página y el total en el header X-Total-Count.
+from dataclasses import dataclass
+from typing import MutableMapping, Optional
+
+from fastapi import Query
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+MAX_LIMIT = 500
+TOTAL_HEADER = "X-Total-Count"
+
+@dataclass(frozen=True)
+class Page:
+    limit: Optional[int] = None
+    offset: int = 0
+
+    @property
+    def paged(self) -> bool:
+        return self.limit is not None or self.offset > 0
+
+def page_params(limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT, description="Filas por página"),
+                offset: int = Query(0, ge=0, description="Filas a saltar")) -> Page:
+    return Page(limit, offset)
+
+def fetch_page(session: Session, stmt: Select, page: Page, headers: MutableMapping[str, str]) -> list:
+    """
+    Ejecuta `stmt` (ya ordenado, con desempate estable) limitado a la página; si la
+    petición es paginada cuenta el total con el mismo WHERE y lo deja en `headers`.
+    """
+    if not page.paged:
+        return session.execute(stmt).all()
+    total = session.execute(select(func.count()).select_from(stmt.order_by(None).subquery())).scalar_one()
+    headers[TOTAL_HEADER] = str(total)
+    return session.execute(stmt.limit(page.limit).offset(page.offset)).all()
@@ -0,0 +1,168 @@
+# backend/app/core/profiling.py
+# Perfilado en producción (solo con PROFILING_ENABLED; apagado no se instala nada):
+#   - sample(): muestreo de las pilas de todos los hilos del worker durante N segundos, en formato
+#     "folded" (una línea por pila: marco;marco;... cuenta) que leen flamegraph.pl, inferno y speedscope;
+#   - instrument(app): cProfile de cada endpoint (o una fracción, PROFILE_SLOW_SAMPLE_RATE) y, si
+#     pasa de PROFILE_SLOW_REQUEST_MS, guarda ruta, parámetros y los marcos más caros en un buffer
+#     circular de PROFILE_SLOW_BUFFER entradas.
+# Todo es por worker: cada proceso de uvicorn perfila y guarda lo suyo.
+import cProfile
+import functools
+import inspect
+import itertools
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from . import metrics
+from .config import settings
+
+MAX_HZ = 1000
+_PARAM_MAX_CHARS = 200
+# hoja de la pila de un hilo que espera (lock, cola, socket, event loop): no gasta CPU
+_IDLE_LEAVES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("selectors.py", "select"),
+    ("queue.py", "get"), ("socket.py", "accept"), ("socketserver.py", "serve_forever"),
+    ("inotify_c.py", "read_events"),  # watcher de carpetas (services/indexer.py)
+}
+
+stats: Dict[str, int] = defaultdict(int)
+
+class ProfilerBusy(Exception):
+    pass
+
+# ------------------------------------------------------------------
+# Muestreo bajo demanda
+# ------------------------------------------------------------------
+_sampling = threading.Lock()  # un muestreo a la vez por worker
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def sample(seconds: float, hz: int, include_idle: bool = False) -> str:
+    """Pilas de todos los hilos (menos este) cada 1/hz s durante `seconds`, en formato folded."""
+    if not _sampling.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        stats["muestreos"] += 1
+        me = threading.get_ident()
+        interval = 1.0 / max(1, min(hz, MAX_HZ))
+        stacks: Counter = Counter()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                code = frame.f_code
+                if not include_idle and (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    continue
+                parts = []
+                while frame is not None:
+                    parts.append(_label(frame.f_code))
+                    frame = frame.f_back
+                parts.append(names.get(ident, f"thread-{ident}"))
+                stacks[";".join(reversed(parts))] += 1
+            time.sleep(interval)
+        return "".join(f"{stack} {n}\n" for stack, n in stacks.most_common())
+    finally:
+        _sampling.release()
+
+# ------------------------------------------------------------------
+# Requests lentos (cProfile por endpoint)
+# ------------------------------------------------------------------
+slow: Deque[Dict[str, Any]] = deque(maxlen=max(1, settings.PROFILE_SLOW_BUFFER))
+_ids = itertools.count(1)
+
+def _params(values: Dict[str, Any]) -> Dict[str, Any]:
+    # solo valores simples (query, path, user_id): nada de Request, sesiones ni cuerpos enteros
+    out = {}
+    for k, v in values.items():
+        if v is None or isinstance(v, (bool, int, float)):
+            out[k] = v
+        elif isinstance(v, str):
+            out[k] = v[:_PARAM_MAX_CHARS]
+    return out
+
+def _top(prof: cProfile.Profile, n: int) -> List[Dict[str, Any]]:
+    st = pstats.Stats(prof)
+    rows = sorted(st.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:n]  # por tiempo acumulado
+    return [{"funcion": f"{name} ({os.path.basename(path)}:{line})", "llamadas": nc,
+             "propio_ms": round(tt * 1000, 3), "acumulado_ms": round(ct * 1000, 3)}
+            for (path, line, name), (_, nc, tt, ct, _) in rows]
+
+def _record(route: str, method: str, values: Dict[str, Any], seconds: float, prof: Optional[cProfile.Profile]):
+    if seconds * 1000 < settings.PROFILE_SLOW_REQUEST_MS:
+        return
+    stats["lentos"] += 1
+    slow.append({
+        "id": next(_ids), "pid": os.getpid(), "ruta": route, "metodo": method,
+        "en": datetime.now(timezone.utc).isoformat(), "duracion_ms": round(seconds * 1000, 3),
+        "parametros": _params(values),
+        "marcos": _top(prof, settings.PROFILE_TOP_FRAMES) if prof is not None else [],
+    })
+
+def _start() -> Optional[cProfile.Profile]:
+    if random.random() >= settings.PROFILE_SLOW_SAMPLE_RATE:
+        return None
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:  # Python 3.12+: otro profiler activo en el proceso
+        stats["ocupado"] += 1
+        return None
+    stats["perfilados"] += 1
+    return prof
+
+def _wrap(call: Callable, route: str, method: str) -> Callable:
+    if inspect.iscoroutinefunction(call):
+        # corre en el event loop intercalado con otros requests: se mide, sin cProfile
+        @functools.wraps(call)
+        async def timed(**values):
+            t0 = time.perf_counter()
+            try:
+                return await call(**values)
+            finally:
+                _record(route, method, values, time.perf_counter() - t0, None)
+        return timed
+
+    @functools.wraps(call)
+    def profiled(**values):
+        # los endpoints síncronos corren en un hilo del threadpool: cProfile ve solo este request
+        prof = _start()
+        t0 = time.perf_counter()
+        try:
+            return call(**values)
+        finally:
+            dt = time.perf_counter() - t0
+            if prof is not None:
+                prof.disable()
+            _record(route, method, values, dt, prof)
+    return profiled
+
+def instrument(app) -> int:
+    """Envuelve el endpoint de cada ruta de `app` (menos las de admin). Devuelve cuántas rutas."""
+    n = 0
+    for route in app.routes:
+        dependant = getattr(route, "dependant", None)
+        if dependant is None or dependant.call is None or "admin" in (getattr(route, "tags", None) or []):
+            continue
+        # FastAPI lee dependant.call en cada request; el wrapper conserva la firma (functools.wraps)
+        # y si es corrutina o no, que es lo que FastAPI fijó al crear la ruta
+        dependant.call = _wrap(dependant.call, route.path, ",".join(sorted(route.methods or [])))
+        n += 1
+    return n
+
+@metrics.register_collector
+def _profiling_metrics():
+    if not stats:
+        return []
+    return metrics.counter_lines("garimind_profiling_total", "Muestreos bajo demanda, requests perfilados con "
+                                 "cProfile, lentos guardados y perfiles descartados por otro profiler activo",
+                                 [({"evento": k}, v) for k, v in sorted(stats.items())])
@@ -0,0 +1,291 @@
+# backend/app/core/resilience.py
+# Resiliencia de las llamadas salientes (Google, Microsoft, OpenAI). `call(...)` reemplaza al
+# `with span(...)` de cada llamada y agrega, por proveedor:
+#   - token bucket por (proveedor, cuenta): espera su turno o responde 429 si la espera es larga;
+#     un Retry-After del proveedor pausa el bucket de esa cuenta;
+#   - reintentos con backoff exponencial y jitter (o el Retry-After) para 429, 5xx y errores de red,
+#     limitados por un presupuesto de reintentos (una fracción de las llamadas);
+#   - circuit breaker: tras BREAKER_FAILURES fallos seguidos (5xx / red) responde 503 sin llamar
+#     durante BREAKER_COOLDOWN_SECONDS y después deja pasar una prueba.
+# La cuenta es el usuario del request (api/users.py) o del trabajo en segundo plano.
+import email.utils
+import random
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+from fastapi import HTTPException
+
+from . import metrics
+from .config import settings
+
+current_account: ContextVar[Optional[int]] = ContextVar("current_account", default=None)
+
+PROVIDERS = ("google", "microsoft", "openai")
+_BUCKETS_SIZE = 4096
+# errores de red del SDK de OpenAI (no heredan de OSError)
+_NETWORK_ERRORS = ("APIConnectionError", "APITimeoutError")
+_RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")  # 403 de cuota en Google
+
+class CircuitOpen(HTTPException):
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(status_code=503, detail=f"{provider} no disponible (circuito abierto), reintenta en {retry_after:.0f}s",
+                         headers={"Retry-After": str(max(1, round(retry_after)))})
+
+class RateLimited(HTTPException):
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(status_code=429, detail=f"Demasiadas llamadas a {provider}, reintenta en {retry_after:.0f}s",
+                         headers={"Retry-After": str(max(1, round(retry_after)))})
+
+# ------------------------------------------------------------------
+# Clasificación de respuestas y errores
+# ------------------------------------------------------------------
+def status_code(exc: Exception) -> Optional[int]:
+    """Código HTTP de un error de proveedor (HTTPException, googleapiclient HttpError, requests u OpenAI)."""
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        resp = getattr(exc, "resp", None) or getattr(exc, "response", None)
+        code = getattr(resp, "status", None) or getattr(resp, "status_code", None)
+    try:
+        return int(code) if code is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _header(obj: Any, name: str) -> Optional[str]:
+    headers = getattr(obj, "headers", None)
+    if headers is None and isinstance(obj, dict):  # httplib2.Response (googleapiclient) es un dict
+        headers = obj
+    return headers.get(name) or headers.get(name.lower()) if headers is not None else None
+
+def retry_after(result: Any = None, exc: Optional[Exception] = None) -> Optional[float]:
+    """Segundos del header Retry-After (número o fecha HTTP), si vino."""
+    sources = [result] if exc is None else [exc, getattr(exc, "resp", None), getattr(exc, "response", None)]
+    value = next((v for v in (_header(s, "Retry-After") for s in sources if s is not None) if v), None)
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+def classify(result: Any = None, exc: Optional[Exception] = None) -> Optional[str]:
+    """"throttled" (429 / cuota), "unavailable" (5xx / red) o None (éxito o error del cliente)."""
+    if exc is not None:
+        if isinstance(exc, (CircuitOpen, RateLimited)):
+            return None
+        code = status_code(exc)
+        if code is None:
+            network = isinstance(exc, (OSError, requests.RequestException)) or type(exc).__name__ in _NETWORK_ERRORS
+            return "unavailable" if network else None
+        if code == 403 and any(r in str(exc) for r in _RATE_LIMIT_REASONS):
+            return "throttled"
+    else:
+        code = getattr(result, "status_code", None)  # requests.Response: el llamador decide qué levantar
+        if not isinstance(code, int):
+            return None
+    if code == 429:
+        return "throttled"
+    return "unavailable" if code >= 500 else None
+
+# ------------------------------------------------------------------
+# Token bucket, presupuesto de reintentos y circuit breaker
+# ------------------------------------------------------------------
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate, self.burst = rate, burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Toma un token y devuelve cuánto esperar por él; None (sin tomarlo) si serían más de max_wait."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(0.0, self.paused_until - now)
+            if self.tokens < 1:
+                wait = max(wait, (1 - self.tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def wait_hint(self) -> float:
+        with self._lock:
+            return max(self.paused_until - time.monotonic(), (1 - self.tokens) / self.rate, 1.0)
+
+class RetryBudget:
+    """Cada llamada deposita `ratio` reintentos (hasta `cap`); cada reintento gasta uno."""
+
+    def __init__(self, ratio: float, cap: float):
+        self.ratio, self.cap = ratio, cap
+        self.balance = cap
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.balance = min(self.cap, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+class CircuitBreaker:
+    def __init__(self, provider: str, failures: int, cooldown: float):
+        self.provider = provider
+        self.threshold, self.cooldown = failures, cooldown
+        self.failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before(self):
+        """Levanta CircuitOpen si el circuito está abierto; pasado el cooldown deja pasar una prueba."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            left = self.opened_at + self.cooldown - time.monotonic()
+            if left > 0 or self._probing:
+                stats[(self.provider, "rechazada")] += 1
+                raise CircuitOpen(self.provider, max(left, 1.0))
+            self.state, self._probing = HALF_OPEN, True
+
+    def success(self):
+        with self._lock:
+            self.failures, self.state, self._probing = 0, CLOSED, False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                if self.state != OPEN:
+                    stats[(self.provider, "apertura")] += 1
+                self.state, self.opened_at = OPEN, time.monotonic()
+
+    def release(self):
+        """La prueba no llegó al proveedor (p. ej. rate limit local): otro puede intentarla."""
+        with self._lock:
+            self._probing = False
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+
+    @property
+    def closed(self) -> bool:
+        return self.state == CLOSED
+
+def _rate(provider: str) -> float:
+    return {"google": settings.RATE_LIMIT_GOOGLE_PER_SECOND, "microsoft": settings.RATE_LIMIT_MICROSOFT_PER_SECOND,
+            "openai": settings.RATE_LIMIT_OPENAI_PER_SECOND}.get(provider, settings.RATE_LIMIT_GOOGLE_PER_SECOND)
+
+breakers: Dict[str, CircuitBreaker] = {
+    p: CircuitBreaker(p, settings.BREAKER_FAILURES, settings.BREAKER_COOLDOWN_SECONDS) for p in PROVIDERS
+}
+budgets: Dict[str, RetryBudget] = {p: RetryBudget(settings.RETRY_BUDGET_RATIO, settings.RETRY_BUDGET_CAP) for p in PROVIDERS}
+_buckets: "OrderedDict[Tuple[str, Optional[int]], TokenBucket]" = OrderedDict()
+_lock = threading.Lock()
+stats: Dict[Tuple[str, str], int] = defaultdict(int)
+
+def bucket(provider: str, account: Optional[int]) -> TokenBucket:
+    key = (provider, account)
+    with _lock:
+        b = _buckets.get(key)
+        if b is None:
+            b = _buckets[key] = TokenBucket(_rate(provider), settings.RATE_LIMIT_BURST)
+            while len(_buckets) > _BUCKETS_SIZE:
+                _buckets.popitem(last=False)
+        _buckets.move_to_end(key)
+        return b
+
+def _backoff(attempt: int) -> float:
+    # full jitter: uniforme entre 0 y el exponencial
+    return random.uniform(0, min(settings.RETRY_MAX_DELAY_SECONDS, settings.RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+
+def call(provider: str, operation: str, fn: Callable[..., Any], *args, retry: bool = True, **kwargs) -> Any:
+    """
+    Ejecuta `fn(*args, **kwargs)` contra `provider` con rate limit, reintentos y circuit breaker.
+    Los errores se propagan como los levanta `fn`; si devuelve una respuesta de requests con 429/5xx
+    se reintenta y al final se devuelve la última (el llamador decide el error). `retry=False` para
+    llamadas que no se deben repetir (canje de códigos OAuth, altas de suscripciones).
+    """
+    if not settings.RESILIENCE_ENABLED:
+        with metrics.span(provider, operation):
+            return fn(*args, **kwargs)
+    breaker, budget = breakers[provider], budgets[provider]
+    limiter = bucket(provider, current_account.get())
+    breaker.before()
+    budget.deposit()
+    attempt = 0
+    while True:
+        wait = limiter.reserve(settings.RATE_LIMIT_MAX_WAIT_SECONDS)
+        if wait is None:
+            breaker.release()
+            stats[(provider, "rate_limit_rechazo")] += 1
+            raise RateLimited(provider, limiter.wait_hint())
+        if wait > 0:
+            stats[(provider, "rate_limit_espera")] += 1
+            time.sleep(wait)
+        result, exc = None, None
+        try:
+            with metrics.span(provider, operation):
+                result = fn(*args, **kwargs)
+        except Exception as e:
+            exc = e
+        kind = classify(result, exc)
+        if kind is None:
+            breaker.success()
+            if exc is not None:
+                raise exc
+            return result
+        stats[(provider, kind)] += 1
+        delay = retry_after(result, exc)
+        if kind == "throttled":
+            breaker.success()  # el proveedor responde: 429 es cuota de la cuenta, no caída
+            if delay is not None:
+                limiter.pause(delay)  # las demás llamadas de la cuenta también esperan
+        else:
+            breaker.failure()
+        if delay is None:
+            delay = _backoff(attempt)
+        attempt += 1
+        if (not retry or attempt >= settings.RETRY_MAX_ATTEMPTS or delay > settings.RETRY_MAX_DELAY_SECONDS
+                or not breaker.closed):
+            break
+        if not budget.withdraw():
+            stats[(provider, "presupuesto_agotado")] += 1
+            break
+        stats[(provider, "reintento")] += 1
+        time.sleep(delay)
+    if exc is not None:
+        raise exc
+    return result
+
+@metrics.register_collector
+def _resilience_metrics():
+    lines = metrics.gauge_lines("garimind_circuit_state", "Circuit breaker por proveedor (0 cerrado, 1 prueba, 2 abierto)",
+                                [({"provider": p}, b.state) for p, b in breakers.items()])
+    lines += metrics.gauge_lines("garimind_retry_budget", "Reintentos disponibles en el presupuesto por proveedor",
+                                 [({"provider": p}, round(b.balance, 2)) for p, b in budgets.items()])
+    if stats:
+        lines += metrics.counter_lines("garimind_resilience_events_total", "Llamadas limitadas (429), caídas (5xx / red), "
+                                       "reintentos, esperas y rechazos del rate limit, aperturas y rechazos del circuito",
+                                       [({"provider": p, "evento": e}, n) for (p, e), n in sorted(stats.items())])
+    return lines
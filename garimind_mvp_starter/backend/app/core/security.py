@@ -0,0 +1,71 @@
+# backend/app/core/security.py
+# API tokens de usuario, cifrado de credenciales OAuth y firma del `state` de OAuth.
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import time
+from functools import lru_cache
+from typing import Optional
+
+from .config import settings
+
+log = logging.getLogger("garimind.security")
+
+KEY_FILE = os.path.join("data", "creds", "credentials.key")
+
+def new_api_token() -> str:
+    return "gm_" + secrets.token_urlsafe(32)
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+@lru_cache(maxsize=1)
+def _key() -> bytes:
+    """Clave Fernet: CREDENTIALS_KEY o, en desarrollo, una generada en data/creds/credentials.key."""
+    if settings.CREDENTIALS_KEY:
+        return settings.CREDENTIALS_KEY.encode()
+    if os.path.exists(KEY_FILE):
+        with open(KEY_FILE, "rb") as f:
+            return f.read().strip()
+    from cryptography.fernet import Fernet
+    key = Fernet.generate_key()
+    os.makedirs(os.path.dirname(KEY_FILE), exist_ok=True)
+    fd = os.open(KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    log.warning("CREDENTIALS_KEY no configurada: se generó %s (defínela en producción)", KEY_FILE)
+    return key
+
+@lru_cache(maxsize=1)
+def _fernet():
+    from cryptography.fernet import Fernet
+    return Fernet(_key())
+
+def encrypt(data: str) -> str:
+    return _fernet().encrypt(data.encode()).decode()
+
+def decrypt(token: str) -> str:
+    return _fernet().decrypt(token.encode()).decode()
+
+def _sign(payload: str) -> str:
+    mac = hmac.new(_key(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(mac[:16]).decode().rstrip("=")
+
+def sign_state(user_id: int) -> str:
+    """`state` de OAuth que identifica al usuario en el callback."""
+    payload = f"{user_id}.{int(time.time())}.{secrets.token_urlsafe(8)}"
+    return f"{payload}.{_sign(payload)}"
+
+def verify_state(state: Optional[str], max_age: int = 900) -> Optional[int]:
+    if not state or state.count(".") != 3:
+        return None
+    payload, sig = state.rsplit(".", 1)
+    if not hmac.compare_digest(sig, _sign(payload)):
+        return None
+    user_id, ts, _ = payload.split(".")
+    if time.time() - int(ts) > max_age:
+        return None
+    return int(user_id)
@@ -0,0 +1,57 @@
+# backend/app/core/serialization.py
+# JSON con orjson: respuesta por defecto de la app y camino rápido para listados
+# (filas de columnas → bytes, sin hidratar objetos ORM ni validar con Pydantic).
+import logging
+from typing import Any, Iterable, Iterator, Mapping, Optional, Sequence
+
+import orjson
+from fastapi.responses import JSONResponse, StreamingResponse
+
+log = logging.getLogger("garimind.serialization")
+
+NDJSON = "application/x-ndjson"  # la compresión lo deja pasar sin buffer (core/compression.py)
+
+# OPT_UTC_Z: "…Z" para UTC, igual que Pydantic; los naive (SQLite) salen sin offset en ambos
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=OPTIONS)
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def json_response(content: Any, headers: Optional[Mapping[str, str]] = None) -> ORJSONResponse:
+    """
+    Respuesta ya serializada: FastAPI no pasa el contenido por jsonable_encoder ni por el
+    response_model. `headers` suele ser el `response.headers` inyectado (ETag, etc.), que
+    FastAPI no copia cuando el endpoint devuelve su propia Response.
+    """
+    return ORJSONResponse(content, headers=dict(headers) if headers else None)
+
+def rows_response(rows: Iterable[Sequence[Any]], columns: Sequence[str],
+                  headers: Optional[Mapping[str, str]] = None) -> ORJSONResponse:
+    """Filas (tuplas de un select de columnas) → lista de objetos JSON con esas claves."""
+    return json_response([dict(zip(columns, r)) for r in rows], headers)
+
+def _lines(items: Iterable[Any]) -> bytes:
+    return b"".join(dumps(item) + b"\n" for item in items)
+
+def ndjson_response(pages: Iterator[Iterable[Any]], headers: Optional[Mapping[str, str]] = None) -> StreamingResponse:
+    """
+    Una línea JSON por item, página a página a medida que el iterador las entrega. La primera
+    página se pide antes de responder: un 401/429 del proveedor sigue siendo un error HTTP. Si
+    falla una página posterior, el cuerpo termina con una línea {"error": ...}.
+    """
+    first = next(pages, [])
+
+    def body():
+        yield _lines(first)
+        try:
+            for page in pages:
+                yield _lines(page)
+        except Exception as e:
+            log.warning("NDJSON cortado a mitad de camino: %s", e)
+            yield dumps({"error": getattr(e, "detail", None) or str(e)}) + b"\n"
+
+    return StreamingResponse(body(), media_type=NDJSON, headers=dict(headers) if headers else None)
@@ -0,0 +1,57 @@
+# backend/app/db/migrations.py
+# El esquema lo manejan las migraciones de Alembic (backend/migrations), que se
+# corren una sola vez fuera del arranque: `cd backend && alembic upgrade head`.
+# Al arrancar cada worker solo se compara la revisión de la DB con la head.
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+log = logging.getLogger("garimind.db")
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
+def alembic_config(url: Optional[str] = None):
+    from alembic.config import Config
+    cfg = Config(ALEMBIC_INI)
+    cfg.attributes["configure_logger"] = False
+    if url:
+        cfg.attributes["url"] = url
+    return cfg
+
+@lru_cache(maxsize=1)
+def head_revision() -> str:
+    from alembic.script import ScriptDirectory
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+def upgrade_head(url: Optional[str] = None):
+    from alembic import command
+    command.upgrade(alembic_config(url), "head")
+
+def schema_status(session_factory) -> Dict[str, Any]:
+    """
+    Verifica conectividad (SELECT 1 por el pool) y lee la revisión aplicada.
+    Lanza la excepción del driver si la DB no responde.
+    """
+    with session_factory() as session:
+        session.execute(text("SELECT 1"))
+        try:
+            current = session.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        except Exception:
+            current = None  # sin tabla alembic_version: DB nunca migrada
+    head = head_revision()
+    return {"current": current, "head": head, "ok": current == head}
+
+def check_schema(session_factory, migrate: bool = False) -> Dict[str, Any]:
+    """Chequeo de arranque; con `migrate` aplica `upgrade head` si el esquema está atrasado."""
+    status = schema_status(session_factory)
+    if not status["ok"] and migrate:
+        log.warning("Esquema en %s, migrando a %s", status["current"], status["head"])
+        upgrade_head()
+        status = schema_status(session_factory)
+    if not status["ok"]:
+        log.error("Esquema desactualizado (%s, se espera %s): corre `alembic upgrade head`",
+                  status["current"], status["head"])
+    return status
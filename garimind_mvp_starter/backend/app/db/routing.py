@@ -0,0 +1,99 @@
+# backend/app/db/routing.py
+# Enrutado de sesiones: escrituras al primario, lecturas a la réplica (si hay
+# DATABASE_REPLICA_URL), con read-your-writes por cliente y fallback al primario
+# cuando la réplica se atrasa o no responde.
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from ..core import metrics
+from .session import get_session_factory
+
+log = logging.getLogger("garimind.db")
+
+# Quién hace el request actual (lo fija el middleware en main.py)
+current_client: ContextVar[Optional[str]] = ContextVar("current_client", default=None)
+
+# Lag de una réplica de streaming de Postgres, en segundos (0 si está al día)
+PG_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+class SessionRouter:
+    def __init__(self, primary_url: str, replica_url: Optional[str] = None, sticky_seconds: float = 5,
+                 max_lag_seconds: float = 10, lag_check_seconds: float = 5):
+        self.writer = get_session_factory(primary_url)
+        self.replica = get_session_factory(replica_url) if replica_url and replica_url != primary_url else None
+        self.sticky_seconds = sticky_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_seconds = lag_check_seconds
+        self.routed = {"primary": 0, "replica": 0}
+        self.replica_lag: Optional[float] = None
+        self._lag_checked_at = 0.0
+        self._last_write: Dict[str, float] = {}  # cliente -> time.monotonic() del último commit
+        self._lock = threading.Lock()
+        event.listen(self.writer, "after_commit", self._after_commit)
+
+    def _after_commit(self, session: Session):
+        client = current_client.get()
+        if client is None or self.replica is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._last_write[client] = now
+            if len(self._last_write) > 10_000:  # poda de clientes viejos
+                cutoff = now - self.sticky_seconds
+                self._last_write = {k: v for k, v in self._last_write.items() if v >= cutoff}
+
+    def _sticky(self) -> bool:
+        client = current_client.get()
+        if client is None:
+            return False
+        last = self._last_write.get(client)
+        return last is not None and time.monotonic() - last < self.sticky_seconds
+
+    def _replica_healthy(self) -> bool:
+        now = time.monotonic()
+        if now - self._lag_checked_at >= self.lag_check_seconds:
+            self._lag_checked_at = now
+            try:
+                with self.replica() as session:
+                    if session.get_bind().dialect.name == "postgresql":
+                        self.replica_lag = float(session.execute(PG_REPLICA_LAG_SQL).scalar() or 0)
+                    else:
+                        session.execute(text("SELECT 1"))
+                        self.replica_lag = 0.0
+            except Exception as e:
+                log.warning("Réplica no disponible, leyendo del primario: %s", e)
+                self.replica_lag = None
+        return self.replica_lag is not None and self.replica_lag <= self.max_lag_seconds
+
+    def reader(self) -> Session:
+        """Sesión para endpoints de solo lectura."""
+        target = "replica" if self.replica is not None and not self._sticky() and self._replica_healthy() else "primary"
+        self.routed[target] += 1
+        return self.replica() if target == "replica" else self.writer()
+
+_routers: list = []
+
+def get_session_router(primary_url: str, replica_url: Optional[str] = None, **kwargs) -> SessionRouter:
+    r = SessionRouter(primary_url, replica_url, **kwargs)
+    _routers.append(r)
+    return r
+
+@metrics.register_collector
+def _routing_metrics():
+    lines = []
+    routed = [({"target": t}, n) for r in _routers for t, n in r.routed.items()]
+    if routed:
+        lines.extend(metrics.counter_lines("garimind_db_reads_routed_total", "Lecturas enviadas a primario / réplica", routed))
+    lag = [({}, r.replica_lag) for r in _routers if r.replica is not None and r.replica_lag is not None]
+    if lag:
+        lines.extend(metrics.gauge_lines("garimind_db_replica_lag_seconds", "Último lag medido de la réplica", lag))
+    return lines
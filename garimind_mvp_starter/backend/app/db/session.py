@@ -1,19 +1,100 @@
-from sqlalchemy import create_engine
+import threading
+from functools import lru_cache
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from .utils import is_async_url
+from ..core.config import settings
+from ..core import metrics
+from .utils import to_sync_url
+
+# Un solo engine (y pool) por URL y por proceso: routes, mirror, readiness, etc.
+# comparten conexiones en vez de crear un engine cada uno.
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def _is_sqlite_memory(url: str) -> bool:
+    database = make_url(url).database
+    return not database or database == ":memory:"
+
+def engine_options(database_url: str) -> Dict[str, Any]:
+    """kwargs de create_engine según el backend y los DB_* / SQLITE_* de Settings."""
+    opts: Dict[str, Any] = {"future": True, "echo": False, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    connect_args: Dict[str, Any] = {}
+    if _is_sqlite(database_url):
+        # la conexión se usa desde el threadpool de FastAPI, no solo desde el hilo que la creó
+        connect_args["check_same_thread"] = False
+        connect_args["timeout"] = settings.SQLITE_BUSY_TIMEOUT_MS / 1000
+        if _is_sqlite_memory(database_url):
+            opts["connect_args"] = connect_args
+            return opts
+    elif settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        # la URL ya es la del driver síncrono (psycopg2)
+        connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    opts.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        connect_args=connect_args,
+    )
+    return opts
 
-def get_engines(database_url: str):
-    if database_url.startswith("sqlite+aiosqlite") or database_url.startswith("postgresql+asyncpg"):
-        async_engine = create_async_engine(database_url, future=True, echo=False)
-        return async_engine, None
-    else:
-        engine = create_engine(database_url, future=True, echo=False)
-        return None, engine
+def _sqlite_pragmas(dbapi_conn, connection_record):
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cur.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cur.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")  # negativo = KiB
+    cur.execute("PRAGMA foreign_keys=ON")  # para que ON DELETE SET NULL aplique
+    cur.close()
 
+def _configure(engine: Engine, database_url: str) -> Engine:
+    if _is_sqlite(database_url) and not _is_sqlite_memory(database_url):
+        event.listen(engine, "connect", _sqlite_pragmas)
+    return engine
+
+_engines: Dict[str, Engine] = {}
+_lock = threading.Lock()
+
+def get_engine(database_url: str) -> Engine:
+    """Engine síncrono compartido (lo usan todas las rutas, que son síncronas)."""
+    url = to_sync_url(database_url)
+    with _lock:
+        engine = _engines.get(url)
+        if engine is None:
+            engine = _engines[url] = _configure(create_engine(url, **engine_options(url)), url)
+        return engine
+
+@lru_cache(maxsize=None)
 def get_session_factory(database_url: str):
-    async_engine, engine = get_engines(database_url)
-    if async_engine:
-        return sessionmaker(async_engine, expire_on_commit=False, class_=AsyncSession)
-    else:
-        return sessionmaker(engine, autoflush=False, autocommit=False)
+    # Las rutas usan `with SessionFactory() as session` (sesiones síncronas), así que
+    # también con una URL async (sqlite+aiosqlite por defecto) se sirve por el driver síncrono.
+    return sessionmaker(get_engine(database_url), autoflush=False, autocommit=False)
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Estado de cada pool: tamaño, conexiones prestadas / libres y overflow."""
+    out = {}
+    for url, engine in list(_engines.items()):
+        pool = engine.pool
+        stats: Dict[str, Any] = {"class": type(pool).__name__}
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            fn = getattr(pool, name, None)
+            if callable(fn):
+                stats[name] = fn()
+        out[make_url(url).render_as_string(hide_password=True)] = stats
+    return out
+
+@metrics.register_collector
+def _pool_metrics():
+    stats = pool_stats()
+    lines = []
+    for name, help in (("checkedout", "Conexiones prestadas"), ("checkedin", "Conexiones libres en el pool"),
+                       ("size", "Tamaño configurado del pool"), ("overflow", "Conexiones por encima de pool_size")):
+        samples = [({"engine": url}, s[name]) for url, s in stats.items() if name in s]
+        if samples:
+            lines.extend(metrics.gauge_lines(f"garimind_db_pool_{name}", help, samples))
+    return lines
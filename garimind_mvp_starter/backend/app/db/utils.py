@@ -1,2 +1,6 @@
 def is_async_url(url: str) -> bool:
     return url.startswith("sqlite+aiosqlite") or url.startswith("postgresql+asyncpg")
+
+def to_sync_url(url: str) -> str:
+    """Misma base de datos, pero con driver síncrono (para DDL, seeds y scripts)."""
+    return url.replace("+aiosqlite", "").replace("postgresql+asyncpg", "postgresql+psycopg2")
@@ -0,0 +1,48 @@
+# backend/app/db/versions.py
+# Contador de cambios por (usuario, tabla) en la propia DB: cada flush que toca
+# proyectos / tareas / recuerdos / interacciones lo incrementa en la misma
+# transacción. Los listados lo leen (una fila por PK) para sus ETag, así que un
+# 304 se decide sin cargar los datos y vale entre workers y réplicas.
+from typing import Dict, Iterable, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..models.models import Proyecto, Tarea, Recuerdo, Interaccion, VersionDatos
+
+TRACKED = {m.__tablename__: m for m in (Proyecto, Tarea, Recuerdo, Interaccion)}
+
+def bump(conn: Connection, changes: Iterable[Tuple[int, str]]) -> None:
+    """Incrementa la versión de cada (user_id, tabla). Para escrituras por Core (sin ORM)."""
+    changes = sorted(set(changes))
+    if not changes:
+        return
+    insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+    for user_id, tabla in changes:
+        stmt = insert(VersionDatos).values(user_id=user_id, tabla=tabla, version=1)
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id", "tabla"], set_={"version": VersionDatos.version + 1}))
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context):
+    # en after_flush new/dirty/deleted y el historial de atributos aún son los del flush
+    touched = [*session.new, *session.deleted, *(o for o in session.dirty if session.is_modified(o))]
+    changes: Set[Tuple[int, str]] = set()
+    for obj in touched:
+        tabla = getattr(obj, "__tablename__", None)
+        if tabla in TRACKED and obj.user_id is not None:
+            changes.add((obj.user_id, tabla))
+    if changes:
+        bump(session.connection(), changes)
+
+def current(session: Session, user_id: int, tablas: Iterable[str]) -> Dict[str, int]:
+    """Versión actual de cada tabla para el usuario (0 si nunca cambió)."""
+    tablas = list(tablas)
+    rows = session.execute(
+        select(VersionDatos.tabla, VersionDatos.version)
+        .where(VersionDatos.user_id == user_id, VersionDatos.tabla.in_(tablas))
+    ).all()
+    found = dict(rows)
+    return {t: found.get(t, 0) for t in tablas}
@@ -1,14 +1,23 @@
 # backend/app/main.py
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-# 👇 importa los routers de tu paquete api
+# 👇 importa los routers de tu paquete api (las integraciones se importan
+# abajo solo si están habilitadas; sus SDKs se cargan en el primer uso)
 from app.api import routes as base_routes
-from app.api import google as google_routes
-from app.api import microsoft as ms_routes
-from app.api import ai as ai_routes
+from app.api import sync as sync_routes
+from app.api import users as user_routes
+from app.core import metrics
+from app.core.compression import CompressionMiddleware
+from app.core.serialization import ORJSONResponse
+from app.core.config import settings
+from app.db.migrations import schema_status
+from app.db.routing import current_client
 
-app = FastAPI(title="GariMind Second Brain")
+# orjson por defecto; los listados además se saltan el response_model (core/serialization.py)
+app = FastAPI(title="GariMind Second Brain", default_response_class=ORJSONResponse)
 
 # CORS sencillo (ajusta dominios si quieres)
 app.add_middleware(
@@ -19,6 +28,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --------- Latencia por request (histogramas + Server-Timing) ----------
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    spans = metrics.begin_request()
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        dt = time.perf_counter() - t0
+        # plantilla de la ruta (/api/tareas/{id}), no el path crudo, para no explotar cardinalidad
+        route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+        metrics.HTTP_REQUESTS.observe(dt, method=request.method, route=route, status=status)
+    response.headers["Server-Timing"] = metrics.server_timing(spans, dt)
+    return response
+
+# --------- Read-your-writes: identifica al cliente para el enrutado a réplica ----------
+# (los endpoints autenticados lo refinan a "user:<id>" en users.current_user_id)
+@app.middleware("http")
+async def client_identity_middleware(request: Request, call_next):
+    client = request.headers.get("X-Client-Id") or (request.client.host if request.client else None)
+    token = current_client.set(client)
+    try:
+        return await call_next(request)
+    finally:
+        current_client.reset(token)
+
+# --------- Compresión (la más externa: ve las cabeceras finales, ETag incluido) ----------
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_BYTES,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
 # --------- Health & Root ----------
 @app.get("/")
 def root():
@@ -32,13 +78,53 @@ def root():
 def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+def ready():
+    """Readiness: la DB responde por el pool y el esquema está en la última migración."""
+    try:
+        status = schema_status(base_routes.SessionFactory)
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "db_unavailable", "detail": str(e)})
+    if not status["ok"]:
+        return JSONResponse(status_code=503, content={"status": "schema_outdated", **status})
+    return {"status": "ready", "schema": status["current"]}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 # --------- Registro de routers ----------
 # Rutas base (proyectos, tareas, recuerdos, daily-magnet, inbox, etc.)
 app.include_router(base_routes.router)
 
+# Usuarios y API tokens
+app.include_router(user_routes.router)
+
+# Sincronización en segundo plano (después de base_routes: init_db corre primero)
+app.include_router(sync_routes.router)
+
 # Integraciones
-app.include_router(google_routes.router)
-app.include_router(ms_routes.router)
+if settings.GOOGLE_ENABLED:
+    from app.api import google as google_routes
+    app.include_router(google_routes.router)
+if settings.MICROSOFT_ENABLED:
+    from app.api import microsoft as ms_routes
+    app.include_router(ms_routes.router)
+
+# Ingesta push (Graph change notifications / Gmail watch) hacia el espejo local
+if settings.PUSH_ENABLED:
+    from app.api import push as push_routes
+    app.include_router(push_routes.router)
 
 # Motor de razonamiento (OpenAI)
-app.include_router(ai_routes.router)
+if settings.AI_ENABLED:
+    from app.api import ai as ai_routes
+    app.include_router(ai_routes.router)
+
+# Perfilado (al final: instrument envuelve los endpoints de todas las rutas ya registradas)
+if settings.PROFILING_ENABLED:
+    from app.api import admin as admin_routes
+    from app.core import profiling
+    app.include_router(admin_routes.router)
+    if settings.PROFILE_SLOW_REQUEST_MS > 0:
+        profiling.instrument(app)
@@ -1,52 +1,203 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Text, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from .base import Base
 
+# Usuario creado por la migración 0003: dueño de los datos previos al multi-usuario
+# y el que se usa cuando AUTH_REQUIRED=false y el request no trae token.
+DEFAULT_USER_ID = 1
+
 def now_utc():
     return datetime.now(timezone.utc)
 
+def user_id_column():
+    return Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
+
+class Usuario(Base):
+    __tablename__ = "usuarios"
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String(255), nullable=False, unique=True)
+    nombre = Column(String(255), nullable=True)
+    token_hash = Column(String(64), nullable=True, unique=True)  # sha256 del API token
+    creado_en = Column(DateTime(timezone=True), default=now_utc)
+
+class CredencialProveedor(Base):
+    """Tokens OAuth (Google / Microsoft) de cada usuario, cifrados con CREDENTIALS_KEY."""
+    __tablename__ = "credenciales"
+    __table_args__ = (UniqueConstraint("user_id", "proveedor", name="uq_credenciales_user_proveedor"),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = user_id_column()
+    proveedor = Column(String(50), nullable=False)  # google, microsoft
+    datos_cifrados = Column(Text, nullable=False)
+    actualizado_en = Column(DateTime(timezone=True), default=now_utc, onupdate=now_utc)
+
 class Proyecto(Base):
     __tablename__ = "proyectos"
+    __table_args__ = (Index("ix_proyectos_user_fecha_inicio", "user_id", "fecha_inicio"),)
     id = Column(Integer, primary_key=True, index=True)
+    user_id = user_id_column()
     nombre = Column(String(255), nullable=False)
     objetivo = Column(Text, nullable=True)
     estado = Column(String(50), default="activo")
-    fecha_inicio = Column(DateTime, default=now_utc)
+    fecha_inicio = Column(DateTime(timezone=True), default=now_utc)
 
     tareas = relationship("Tarea", back_populates="proyecto")
     recuerdos = relationship("Recuerdo", back_populates="proyecto")
 
 class Tarea(Base):
     __tablename__ = "tareas"
+    __table_args__ = (
+        Index("ix_tareas_user_creada_en", "user_id", "creada_en"),
+        Index("ix_tareas_user_proyecto", "user_id", "proyecto_id"),
+        Index("ix_tareas_enriquecimiento", "enriquecimiento"),
+    )
     id = Column(Integer, primary_key=True, index=True)
+    user_id = user_id_column()
     titulo = Column(String(255), nullable=False)
     responsable = Column(String(255), nullable=True)
     prioridad = Column(String(50), default="media")
-    proyecto_id = Column(Integer, ForeignKey("proyectos.id"), nullable=True, index=True)
-    fecha_limite = Column(DateTime, nullable=True)
+    proyecto_id = Column(Integer, ForeignKey("proyectos.id", ondelete="SET NULL"), nullable=True, index=True)
+    fecha_limite = Column(DateTime(timezone=True), nullable=True)
     estado = Column(String(50), default="abierta")
-    creada_en = Column(DateTime, default=now_utc)
+    creada_en = Column(DateTime(timezone=True), default=now_utc)
+    tags = Column(String(255), nullable=True)
+    enriquecimiento = Column(String(20), nullable=True)  # pendiente, modelo, local (services/enrich.py)
 
     proyecto = relationship("Proyecto", back_populates="tareas")
 
 class Recuerdo(Base):
     __tablename__ = "recuerdos"
+    __table_args__ = (
+        Index("ix_recuerdos_user_fecha", "user_id", "fecha"),
+        Index("ix_recuerdos_user_proyecto", "user_id", "proyecto_id"),
+        Index("ix_recuerdos_enriquecimiento", "enriquecimiento"),
+    )
     id = Column(Integer, primary_key=True, index=True)
+    user_id = user_id_column()
     tipo = Column(String(50), default="profesional")  # personal, emocional, familiar, profesional
     contenido = Column(Text, nullable=False)
-    fecha = Column(DateTime, default=now_utc)
+    fecha = Column(DateTime(timezone=True), default=now_utc)
     tags = Column(String(255), nullable=True)
-    proyecto_id = Column(Integer, ForeignKey("proyectos.id"), nullable=True, index=True)
+    proyecto_id = Column(Integer, ForeignKey("proyectos.id", ondelete="SET NULL"), nullable=True, index=True)
     doc_url = Column(String(512), nullable=True)
+    enriquecimiento = Column(String(20), nullable=True)
 
     proyecto = relationship("Proyecto", back_populates="recuerdos")
 
 class Interaccion(Base):
     __tablename__ = "interacciones"
+    __table_args__ = (Index("ix_interacciones_user_fecha", "user_id", "fecha"),)
     id = Column(Integer, primary_key=True, index=True)
+    user_id = user_id_column()
     usuario = Column(String(255), nullable=True)
     medio = Column(String(50), default="texto")  # texto, voz, whatsapp
     contenido = Column(Text, nullable=False)
     respuesta = Column(Text, nullable=True)
-    fecha = Column(DateTime, default=now_utc)
+    fecha = Column(DateTime(timezone=True), default=now_utc)
+
+class ItemSincronizado(Base):
+    """Copia local de lo último traído de un proveedor (Gmail, Outlook, Calendar, Drive)."""
+    __tablename__ = "items_sincronizados"
+    __table_args__ = (Index("ix_items_sincronizados_user_fuente", "user_id", "fuente", "posicion"),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = user_id_column()
+    fuente = Column(String(50), nullable=False)  # gmail, outlook_mail, gcal, mscal, drive...
+    posicion = Column(Integer, nullable=False, default=0)
+    datos = Column(Text, nullable=False)  # JSON del item tal como lo devuelve la API
+    sincronizado_en = Column(DateTime(timezone=True), default=now_utc)
+
+class EstadoSincronizacion(Base):
+    __tablename__ = "estado_sincronizacion"
+    __table_args__ = (UniqueConstraint("user_id", "fuente", name="uq_estado_sincronizacion_user_fuente"),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = user_id_column()
+    fuente = Column(String(50), nullable=False)
+    ultima_sync = Column(DateTime(timezone=True), nullable=True)
+    ultimo_intento = Column(DateTime(timezone=True), nullable=True)
+    ultimo_error = Column(Text, nullable=True)
+    fallos = Column(Integer, default=0)
+    cursor = Column(String(255), nullable=True)  # startPageToken de changes.list (Drive)
+
+class VersionDatos(Base):
+    """Contador de cambios por usuario y tabla (db/versions.py): base de los ETag de los listados."""
+    __tablename__ = "versiones"
+    user_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), primary_key=True)
+    tabla = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class SuscripcionPush(Base):
+    """Suscripción a notificaciones push: Graph subscription (correo / calendario) o Gmail watch."""
+    __tablename__ = "suscripciones_push"
+    __table_args__ = (UniqueConstraint("user_id", "recurso", name="uq_suscripciones_push_user_recurso"),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = user_id_column()
+    proveedor = Column(String(50), nullable=False)  # google, microsoft
+    recurso = Column(String(50), nullable=False)  # gmail, outlook_mail, mscal
+    externo_id = Column(String(255), nullable=True, index=True)  # id de la subscription en Graph
+    cuenta = Column(String(255), nullable=True, index=True)  # email de la cuenta (así identifica Gmail al usuario)
+    secreto = Column(String(128), nullable=True)  # clientState de Graph
+    cursor = Column(String(64), nullable=True)  # último historyId de Gmail aplicado
+    expira_en = Column(DateTime(timezone=True), nullable=True)
+    actualizado_en = Column(DateTime(timezone=True), default=now_utc, onupdate=now_utc)
+
+class Captura(Base):
+    """Captura rápida ya aplicada (services/capture.py): su clave de idempotencia y lo que creó."""
+    __tablename__ = "capturas"
+    __table_args__ = (UniqueConstraint("user_id", "clave", name="uq_capturas_user_clave"),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = user_id_column()
+    clave = Column(String(64), nullable=False)  # Idempotency-Key del cliente (o generada)
+    tipo = Column(String(20), nullable=False)  # tarea, recuerdo
+    objeto_id = Column(Integer, nullable=True)  # id de la tarea / recuerdo creado
+    recibida_en = Column(DateTime(timezone=True), nullable=False)  # cuándo entró al journal
+    aplicada_en = Column(DateTime(timezone=True), default=now_utc)
+
+class Documento(Base):
+    """
+    Documento indexado: archivo de la carpeta de un proyecto (services/indexer.py), o de Google
+    Drive (services/drive.py), con `externo_id` y sin proyecto.
+    """
+    __tablename__ = "documentos"
+    __table_args__ = (
+        UniqueConstraint("proyecto_id", "ruta", name="uq_documentos_proyecto_ruta"),
+        UniqueConstraint("user_id", "externo_id", name="uq_documentos_user_externo"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = user_id_column()
+    proyecto_id = Column(Integer, ForeignKey("proyectos.id", ondelete="CASCADE"), nullable=True)
+    externo_id = Column(String(128), nullable=True)  # id del archivo en Drive
+    ruta = Column(String(1024), nullable=False)  # relativa a la carpeta del proyecto, con "/"; en Drive el nombre
+    tamano = Column(BigInteger, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    fragmentos = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)  # formato no soportado, archivo ilegible...
+    indexado_en = Column(DateTime(timezone=True), default=now_utc)
+
+class Fragmento(Base):
+    """Trozo de texto de un documento. El índice full-text (FTS5 / tsvector) lo crea la migración 0008."""
+    __tablename__ = "fragmentos"
+    __table_args__ = (Index("ix_fragmentos_documento_posicion", "documento_id", "posicion"),)
+    id = Column(Integer, primary_key=True)
+    documento_id = Column(Integer, ForeignKey("documentos.id", ondelete="CASCADE"), nullable=False)
+    user_id = user_id_column()
+    proyecto_id = Column(Integer, ForeignKey("proyectos.id", ondelete="CASCADE"), nullable=True, index=True)
+    posicion = Column(Integer, nullable=False)
+    texto = Column(Text, nullable=False)
+
+class ArchivoDrive(Base):
+    """Metadatos de un archivo de Google Drive, al día con changes.list (services/drive.py)."""
+    __tablename__ = "drive_archivos"
+    __table_args__ = (
+        UniqueConstraint("user_id", "file_id", name="uq_drive_archivos_user_file"),
+        Index("ix_drive_archivos_user_modificado", "user_id", "modificado"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = user_id_column()
+    file_id = Column(String(128), nullable=False)
+    nombre = Column(String(1024), nullable=False)
+    mime_type = Column(String(255), nullable=True)
+    modificado = Column(DateTime(timezone=True), nullable=True)  # modifiedTime
+    web_view_link = Column(String(1024), nullable=True)
+    tamano = Column(BigInteger, nullable=True)  # los Docs nativos no tienen
+    sincronizado_en = Column(DateTime(timezone=True), default=now_utc, onupdate=now_utc)
@@ -0,0 +1,234 @@
+# backend/app/services/calendar.py
+# Calendario por días locales. "Hoy" y las ventanas de consulta salen de settings.TIMEZONE (no
+# de UTC: en Bogotá el día UTC empieza a las 19:00). Los eventos de cada proveedor se guardan en
+# cubos por (usuario, proveedor, día local) con TTL; los días que faltan se piden en una sola
+# llamada por proveedor y el prefetcher mantiene calientes hoy y los próximos CALENDAR_PREFETCH_DAYS.
+# Los cubos viven en core/cache.py: con CACHE_BACKEND=shared o redis los comparten todos los workers
+# y el fetch de cada (usuario, proveedor) lo hace uno solo.
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import date, datetime, time as dtime, timedelta, timezone, tzinfo
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from ..core import cache, metrics
+from ..core.config import settings
+from ..core.resilience import current_account
+from . import credentials
+
+log = logging.getLogger("garimind.calendar")
+
+PROVEEDORES = {"google": settings.GOOGLE_ENABLED, "microsoft": settings.MICROSOFT_ENABLED}
+STOP_TIMEOUT_SECONDS = 10
+ERROR_BACKOFF_SECONDS = 30
+PREFETCH_CLAIM_FRACTION = 0.9  # la reserva vence un poco antes de la próxima vuelta
+
+Event = Dict[str, Any]
+
+def tz() -> tzinfo:
+    try:
+        return ZoneInfo(settings.TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+def today() -> date:
+    return datetime.now(tz()).date()
+
+def day_window(first: date, last: Optional[date] = None) -> Tuple[datetime, datetime]:
+    """[medianoche local de `first`, medianoche local del día siguiente a `last`) con zona."""
+    z = tz()
+    return (datetime.combine(first, dtime(), z),
+            datetime.combine((last or first) + timedelta(days=1), dtime(), z))
+
+def _days(first: date, last: date) -> List[date]:
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    if len(value) == 10:  # día completo: la fecha es local
+        return datetime.combine(date.fromisoformat(value), dtime(), tz())
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=tz())
+
+def _local_days(e: Event) -> List[date]:
+    """Días locales que toca un evento (el fin es exclusivo, como en las dos APIs)."""
+    start = _parse(e.get("start"))
+    if start is None:
+        return []
+    end = _parse(e.get("end")) or start
+    first = start.astimezone(tz()).date()
+    # el día del fin solo cuenta si el evento pasa de su medianoche
+    last_moment = end - timedelta(microseconds=1) if end > start else start
+    return _days(first, last_moment.astimezone(tz()).date())
+
+def sort_key(e: Event):
+    start = _parse(e.get("start")) or datetime.max.replace(tzinfo=timezone.utc)
+    return start, not e.get("allDay"), e.get("title") or ""
+
+# ------------------------------------------------------------------
+# Cubos por día (core/cache.py con TTL)
+# ------------------------------------------------------------------
+stats: Dict[str, int] = defaultdict(int)
+
+def _key(user_id: int, proveedor: str, d: Optional[date] = None) -> str:
+    return f"calendar:{user_id}:{proveedor}:" + (d.isoformat() if d else "")
+
+def _get(user_id: int, proveedor: str, d: date, stale: bool = False) -> Optional[List[Event]]:
+    return cache.get_value(_key(user_id, proveedor, d), stale=stale)
+
+def _put(user_id: int, proveedor: str, days: List[date], events: List[Event]) -> Dict[date, List[Event]]:
+    by_day: Dict[date, List[Event]] = {d: [] for d in days}
+    for e in events:
+        for d in _local_days(e):
+            if d in by_day:
+                by_day[d].append(e)
+    for d, items in by_day.items():  # los días sin eventos también quedan en cache
+        cache.set_value(_key(user_id, proveedor, d), items, settings.CALENDAR_CACHE_TTL_SECONDS)
+    return by_day
+
+def invalidate(user_id: int, proveedor: Optional[str] = None):
+    for p in [proveedor] if proveedor else PROVEEDORES:
+        cache.delete_prefix(_key(user_id, p))
+
+def _fetch(user_id: int, proveedor: str, start: datetime, end: datetime) -> Optional[List[Event]]:
+    """Eventos del proveedor en [start, end); None si el usuario no lo conectó."""
+    # import aquí: la integración solo se carga si está habilitada (ver main.py)
+    if proveedor == "google":
+        from ..api import google as g
+        creds = g.load_creds(user_id)
+        return g.fetch_calendar(creds, start, end) if creds else None
+    from ..api import microsoft as ms
+    if not ms.load_token(user_id):
+        return None
+    return ms.fetch_calendar(ms.ensure_access_token(user_id), start, end)
+
+def events(user_id: int, proveedor: str, first: date, last: date, refresh: bool = False) -> Optional[List[Event]]:
+    """
+    Eventos de `proveedor` entre los días locales `first` y `last` (inclusive), desde los cubos.
+    Los días que falten (o todos, con refresh) se piden en una sola llamada. None si no está conectado.
+    Si el proveedor falla (o su circuito está abierto) se sirven los cubos vencidos, si están todos.
+    """
+    days = _days(first, last)
+    # un solo fetch por (usuario, proveedor) a la vez, también entre workers: quien espera encuentra
+    # los cubos ya llenos
+    with cache.lock(_key(user_id, proveedor)):
+        cached = {} if refresh else {d: _get(user_id, proveedor, d) for d in days}
+        missing = [d for d in days if cached.get(d) is None]
+        stats["hit"] += len(days) - len(missing)
+        if missing:
+            stats["miss"] += len(missing)
+            stats["fetch"] += 1
+            try:
+                fetched = _fetch(user_id, proveedor, *day_window(missing[0], missing[-1]))
+            except Exception:
+                stale = {d: _get(user_id, proveedor, d, stale=True) for d in missing}
+                if refresh or any(v is None for v in stale.values()):
+                    raise
+                stats["stale"] += len(missing)
+                cached.update(stale)
+            else:
+                if fetched is None:
+                    return None
+                cached.update(_put(user_id, proveedor, _days(missing[0], missing[-1]), fetched))
+    out: List[Event] = []
+    seen = set()
+    for d in days:
+        for e in cached.get(d) or []:
+            if e.get("id") not in seen:  # un evento de varios días está en varios cubos
+                seen.add(e.get("id"))
+                out.append(e)
+    return out
+
+def timeline(user_id: int, first: date, last: date) -> Tuple[List[Event], Dict[str, str]]:
+    """Eventos de Google y Outlook en una sola línea de tiempo ordenada, con `source`; y errores por proveedor."""
+    merged: List[Event] = []
+    errors: Dict[str, str] = {}
+    for proveedor, enabled in PROVEEDORES.items():
+        if not enabled:
+            continue
+        try:
+            items = events(user_id, proveedor, first, last)
+        except Exception as e:
+            errors[proveedor] = str(e)
+            continue
+        merged.extend(dict(e, source=proveedor) for e in items or [])
+    merged.sort(key=sort_key)
+    return merged, errors
+
+def today_source(proveedor: str):
+    """Fetcher del sync para gcal/mscal: refresca el cubo de hoy y lo devuelve para el espejo."""
+    def run(user_id: int) -> Optional[List[Event]]:
+        day = today()
+        return events(user_id, proveedor, day, day, refresh=True)
+    return run
+
+# ------------------------------------------------------------------
+# Prefetch: hoy + CALENDAR_PREFETCH_DAYS para cada usuario conectado
+# ------------------------------------------------------------------
+def prefetch_once() -> int:
+    """Refresca la semana de cada usuario y proveedor (una llamada por par). Devuelve cuántos pares."""
+    first = today()
+    last = first + timedelta(days=settings.CALENDAR_PREFETCH_DAYS)
+    n = 0
+    for proveedor, enabled in PROVEEDORES.items():
+        if not enabled:
+            continue
+        for user_id in credentials.users_with(proveedor):
+            current_account.set(user_id)
+            try:
+                events(user_id, proveedor, first, last, refresh=True)
+                stats["prefetch"] += 1
+                n += 1
+            except Exception as e:
+                stats["prefetch_error"] += 1
+                log.warning("Prefetch de calendario (%s, usuario %s): %s", proveedor, user_id, e)
+    return n
+
+class Prefetcher:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="calendar-prefetch", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = STOP_TIMEOUT_SECONDS):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        # refresca antes de que venza el TTL: las lecturas de la semana no llegan al proveedor
+        while not self._stop.is_set():
+            wait = settings.CALENDAR_PREFETCH_INTERVAL_SECONDS
+            try:
+                # con cache compartida cada vuelta la hace un solo worker: el primero que la reserva
+                if cache.add("calendar:prefetch", os.getpid(), wait * PREFETCH_CLAIM_FRACTION):
+                    prefetch_once()
+            except Exception:
+                log.exception("Prefetch de calendario: error")
+                wait = ERROR_BACKOFF_SECONDS
+            self._stop.wait(wait)
+
+prefetcher = Prefetcher()
+
+@metrics.register_collector
+def _calendar_metrics():
+    if not stats:
+        return []
+    return metrics.counter_lines("garimind_calendar_cache_total", "Días servidos desde los cubos (hit) o pedidos al "
+                                 "proveedor (miss), vencidos servidos por error del proveedor (stale), llamadas de "
+                                 "fetch y vueltas de prefetch",
+                                 [({"resultado": k}, v) for k, v in sorted(stats.items())])
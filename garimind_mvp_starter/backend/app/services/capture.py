@@ -0,0 +1,463 @@
+# backend/app/services/capture.py
+# Journal de capturas rápidas (/api/inbox/capturar). Cada captura se añade a un archivo
+# local (una línea JSON) y se confirma en cuanto está en disco; varios requests comparten
+# un mismo fsync. Un drainer la pasa después a tareas / recuerdos en lotes, una transacción
+# por lote. Si la DB está lenta o caída las capturas esperan en el journal, y lo que quede
+# sin aplicar al apagarse se reaplica al arrancar. La tabla `capturas` guarda la clave de
+# idempotencia de cada captura aplicada, así un reintento del cliente no duplica nada.
+import glob
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import exc as sa_exc, select
+
+from ..core import metrics
+from ..core.config import settings
+from ..db.session import get_session_factory
+from ..models.models import Captura, Proyecto, Recuerdo, Tarea
+from . import enrich
+
+try:  # flock: con varios workers cada uno escribe su segmento y solo adopta los huérfanos
+    import fcntl
+except ImportError:  # Windows: un solo proceso
+    fcntl = None
+
+log = logging.getLogger("garimind.capture")
+
+SessionFactory = get_session_factory(settings.DATABASE_URL)
+
+SEGMENT_GLOB = "capturas-*.log"
+MAX_KNOWN = 10_000        # claves aplicadas recordadas en memoria (respuestas a reintentos)
+RETRY_MAX_SECONDS = 30.0  # backoff máximo del drainer con la DB caída
+MAX_ATTEMPTS = 3          # una captura que falla sola tantas veces va a DEAD_LETTER_FILE
+DEAD_LETTER_FILE = "capturas-descartadas.jsonl"  # fuera de SEGMENT_GLOB: no se reaplica al arrancar
+# errores de conexión / pool: la DB no está, el lote se reintenta entero; cualquier otro error
+# puede ser de una captura concreta (p. ej. un título más largo que la columna) y se parte el lote
+_TRANSIENT = (sa_exc.OperationalError, sa_exc.InterfaceError, sa_exc.DisconnectionError, sa_exc.TimeoutError)
+STOP_TIMEOUT_SECONDS = 5.0
+
+Key = Tuple[int, str]  # (user_id, clave)
+
+class JournalError(Exception):
+    """No se pudo escribir en el journal: el endpoint guarda la captura directo en la DB."""
+
+def tipo_de(como: Optional[str]) -> str:
+    return "recuerdo" if como == "recuerdo" else "tarea"
+
+def record(user_id: int, como: Optional[str], entrada: str, proyecto_id: Optional[int],
+           clave: Optional[str] = None) -> Dict[str, Any]:
+    return {"u": user_id, "k": clave or uuid.uuid4().hex, "tipo": tipo_de(como), "entrada": entrada,
+            "proyecto_id": proyecto_id, "ts": time.time()}
+
+def apply_batch(records: List[Dict[str, Any]]) -> Dict[Key, Tuple[str, Optional[int]]]:
+    """
+    Aplica las capturas en una transacción y devuelve clave → (tipo, id creado). Las que ya
+    estaban en `capturas` no se repiten (devuelven lo que crearon). Un proyecto borrado después
+    de aceptar la captura no la tumba: se guarda sin proyecto.
+    """
+    out: Dict[Key, Tuple[str, Optional[int]]] = {}
+    with SessionFactory() as session:
+        by_user: Dict[int, List[str]] = {}
+        for r in records:
+            by_user.setdefault(r["u"], []).append(r["k"])
+        for user_id, claves in by_user.items():
+            for clave, tipo, objeto_id in session.execute(
+                select(Captura.clave, Captura.tipo, Captura.objeto_id)
+                .where(Captura.user_id == user_id, Captura.clave.in_(claves))
+            ).all():
+                out[(user_id, clave)] = (tipo, objeto_id)
+        pids = {r["proyecto_id"] for r in records if r.get("proyecto_id")}
+        owners = dict(session.execute(select(Proyecto.id, Proyecto.user_id).where(Proyecto.id.in_(pids))).all()) if pids else {}
+
+        nuevos: List[Tuple[Dict[str, Any], Any]] = []
+        for r in records:
+            if (r["u"], r["k"]) in out:
+                continue
+            pid = r.get("proyecto_id")
+            pid = pid if pid and owners.get(pid) == r["u"] else None
+            # la fecha es la de la captura, no la del drenado
+            cuando = datetime.fromtimestamp(r["ts"], timezone.utc)
+            if r["tipo"] == "recuerdo":
+                obj = Recuerdo(user_id=r["u"], contenido=r["entrada"], proyecto_id=pid, fecha=cuando,
+                               enriquecimiento=enrich.PENDIENTE)
+            else:
+                obj = Tarea(user_id=r["u"], titulo=r["entrada"], proyecto_id=pid, creada_en=cuando,
+                            enriquecimiento=enrich.PENDIENTE)
+            session.add(obj)
+            nuevos.append((r, obj))
+        if not nuevos:
+            return out
+        session.flush()  # ids de los objetos creados
+        for r, obj in nuevos:
+            session.add(Captura(user_id=r["u"], clave=r["k"], tipo=r["tipo"], objeto_id=obj.id,
+                                recibida_en=datetime.fromtimestamp(r["ts"], timezone.utc)))
+            out[(r["u"], r["k"])] = (r["tipo"], obj.id)
+        session.commit()
+    enrich.notify()
+    return out
+
+def apply_one(rec: Dict[str, Any]) -> Dict[str, Any]:
+    """Aplica una captura ya, sin journal (journal apagado o sin disco), con la misma idempotencia."""
+    key = (rec["u"], rec["k"])
+    try:
+        tipo, objeto_id = apply_batch([rec])[key]
+    except sa_exc.IntegrityError:
+        # la misma clave aplicada a la vez por otro request: vale lo que creó el primero
+        found = lookup(*key)
+        if found is None:
+            raise
+        tipo, objeto_id = found
+    return {"tipo": tipo, "id": objeto_id, "clave": rec["k"], "estado": "guardada"}
+
+def lookup(user_id: int, clave: str) -> Optional[Tuple[str, Optional[int]]]:
+    with SessionFactory() as session:
+        row = session.execute(
+            select(Captura.tipo, Captura.objeto_id).where(Captura.user_id == user_id, Captura.clave == clave)
+        ).first()
+    return tuple(row) if row else None
+
+@dataclass
+class _Pending:
+    rec: Dict[str, Any]
+    written: bool = False           # ya con fsync (las leídas del journal al arrancar, desde el inicio)
+    failed: bool = False            # la escritura falló: no se confirmó
+    attempts: int = 0               # veces que falló sola al aplicarla a la DB
+    segment: Optional[str] = None   # archivo donde quedó escrita
+
+class _Segment:
+    def __init__(self, path: str, fd: int, size: int = 0):
+        self.path, self.fd, self.size = path, fd, size
+        self.remaining = 0  # capturas escritas aquí que aún no están en la DB
+
+def _open_locked(path: str) -> Optional[int]:
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o600)
+    if fcntl is not None:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:  # es el segmento activo de otro worker vivo
+            os.close(fd)
+            return None
+    return fd
+
+def _fsync(fd: int):
+    (getattr(os, "fdatasync", None) or os.fsync)(fd)
+
+class CaptureJournal:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._io = threading.Lock()  # escritura / truncado del segmento activo (se toma antes que _lock)
+        self._cond = threading.Condition(self._lock)
+        self._buffer: List[Tuple[_Pending, bytes]] = []
+        self._pending: "OrderedDict[Key, _Pending]" = OrderedDict()
+        self._known: "OrderedDict[Key, Tuple[str, Optional[int]]]" = OrderedDict()
+        self._segments: Dict[str, _Segment] = {}
+        self._dead: "OrderedDict[Key, Tuple[str, str]]" = OrderedDict()  # descartadas: clave -> (tipo, error)
+        self._dir: Optional[str] = None
+        self._active: Optional[_Segment] = None
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self.stats = {"recibidas": 0, "duplicadas": 0, "aplicadas": 0, "reaplicadas": 0, "fallos_db": 0,
+                      "descartadas": 0, "fsyncs": 0, "fsync_capturas": 0}
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    # --- arranque / parada ---
+    def start(self, directory: Optional[str] = None):
+        if self.running:
+            return
+        directory = directory or settings.CAPTURE_JOURNAL_DIR
+        os.makedirs(directory, exist_ok=True)
+        self._dir = directory
+        self._stopping = False
+        self._replay(directory)
+        path = os.path.join(directory, f"capturas-{os.getpid()}-{uuid.uuid4().hex[:8]}.log")
+        # se crea fuera de SEGMENT_GLOB y se renombra ya con el flock: el _replay de otro worker
+        # que arranca a la vez no puede adoptarlo vacío y borrarlo
+        fd = _open_locked(path + ".new")
+        os.rename(path + ".new", path)
+        self._active = self._segments[path] = _Segment(path, fd)
+        self._threads = [threading.Thread(target=self._flusher, name="capture-fsync", daemon=True),
+                         threading.Thread(target=self._drainer, name="capture-drain", daemon=True)]
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout: float = STOP_TIMEOUT_SECONDS):
+        """Escribe lo que falte y da `timeout` segundos al drainer; lo no aplicado queda en el journal."""
+        with self._lock:
+            self._stopping = True
+            self._cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        with self._io, self._lock:
+            for seg in list(self._segments.values()):
+                self._close(seg, unlink=seg.remaining == 0)
+            self._active = None
+        self._threads = []
+
+    def _replay(self, directory: str):
+        """Adopta los segmentos sin dueño (worker caído o reinicio) y encola lo que no se aplicó."""
+        for path in sorted(glob.glob(os.path.join(directory, SEGMENT_GLOB))):
+            fd = _open_locked(path)
+            if fd is None:
+                continue
+            seg = _Segment(path, fd)
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        rec = orjson.loads(line)
+                        key = (rec["u"], rec["k"])
+                    except (orjson.JSONDecodeError, KeyError, TypeError):
+                        continue  # cola a medio escribir de un corte: nunca se confirmó
+                    if key not in self._pending:
+                        self._pending[key] = _Pending(rec, written=True, segment=path)
+                        seg.remaining += 1
+            self._segments[path] = seg
+            self.stats["reaplicadas"] += seg.remaining
+            if seg.remaining == 0:
+                self._close(seg, unlink=True)
+        if self._pending:
+            log.info("Journal de capturas: %d capturas pendientes de un arranque anterior", len(self._pending))
+
+    def _close(self, seg: _Segment, unlink: bool):
+        self._segments.pop(seg.path, None)
+        if unlink:
+            os.unlink(seg.path)
+        os.close(seg.fd)  # cerrar suelta el flock
+
+    # --- escritura ---
+    def submit(self, rec: Dict[str, Any]) -> Dict[str, Any]:
+        """Encola la captura y vuelve cuando está en disco (o ya aplicada / ya encolada)."""
+        key = (rec["u"], rec["k"])
+        with self._lock:
+            self.stats["recibidas"] += 1
+            if key in self._known:
+                self.stats["duplicadas"] += 1
+                tipo, objeto_id = self._known[key]
+                return {"tipo": tipo, "id": objeto_id, "clave": rec["k"], "estado": "guardada"}
+            p = self._pending.get(key)
+            if p is not None:
+                self.stats["duplicadas"] += 1
+            else:
+                p = self._pending[key] = _Pending(rec)
+                self._buffer.append((p, orjson.dumps(rec) + b"\n"))
+                self._cond.notify_all()
+            while not (p.written or p.failed):
+                self._cond.wait()
+            if p.failed:
+                raise JournalError("no se pudo escribir el journal de capturas")
+        return {"tipo": p.rec["tipo"], "id": None, "clave": p.rec["k"], "estado": "pendiente"}
+
+    def _flusher(self):
+        delay = settings.CAPTURE_FSYNC_DELAY_MS / 1000
+        while True:
+            with self._lock:
+                while not self._buffer and not self._stopping:
+                    self._cond.wait()
+                if not self._buffer:
+                    return
+            if delay:
+                time.sleep(delay)  # dejar que lleguen más capturas al mismo fsync
+            with self._io:
+                with self._lock:
+                    batch, self._buffer = self._buffer, []
+                    seg = self._rotate_if_full()
+                    for p, _ in batch:
+                        p.segment = seg.path
+                    seg.remaining += len(batch)
+                data = b"".join(line for _, line in batch)
+                try:
+                    os.write(seg.fd, data)
+                    _fsync(seg.fd)
+                    seg.size += len(data)
+                except OSError as e:
+                    log.error("Journal de capturas: fallo al escribir %s: %s", seg.path, e)
+                    with self._lock:
+                        for p, _ in batch:
+                            p.failed = True
+                            self._pending.pop((p.rec["u"], p.rec["k"]), None)
+                        seg.remaining -= len(batch)
+                        self._cond.notify_all()
+                    continue
+            with self._lock:
+                for p, _ in batch:
+                    p.written = True
+                self.stats["fsyncs"] += 1
+                self.stats["fsync_capturas"] += len(batch)
+                self._cond.notify_all()
+
+    def _rotate_if_full(self) -> _Segment:
+        # con _io y _lock tomados; el segmento viejo se borra cuando se aplica todo lo suyo
+        seg = self._active
+        if seg.size >= settings.CAPTURE_SEGMENT_BYTES:
+            path = os.path.join(os.path.dirname(seg.path), f"capturas-{os.getpid()}-{uuid.uuid4().hex[:8]}.log")
+            self._active = self._segments[path] = _Segment(path, _open_locked(path))
+            if seg.remaining == 0:
+                self._close(seg, unlink=True)
+        return self._active
+
+    # --- drenado a la DB ---
+    def _drainer(self):
+        fallos = 0
+        while True:
+            with self._lock:
+                while not self._ready() and not self._stopping:
+                    self._cond.wait()
+                batch = self._take_batch()
+                if not batch:
+                    return
+            try:
+                applied, failed = self._apply_split(batch)
+            except _TRANSIENT as e:
+                # DB caída o lenta: se reintenta el lote entero
+                failed, error = batch, e
+                applied = {}
+            else:
+                error = None
+            if applied:
+                bad = {id(p) for p, _ in failed}
+                self._done([p for p in batch if id(p) not in bad], applied)
+            if not failed:
+                fallos = 0
+                continue
+            self.stats["fallos_db"] += 1
+            if error is None:
+                # las que fallan solas: tras MAX_ATTEMPTS van al dead-letter y el resto sigue
+                dead = []
+                for p, e in failed:
+                    p.attempts += 1
+                    if p.attempts >= MAX_ATTEMPTS:
+                        dead.append((p, e))
+                if dead:
+                    self._discard(dead)
+                if len(dead) == len(failed):
+                    continue
+            fallos += 1
+            wait = min(RETRY_MAX_SECONDS, 0.5 * 2 ** (fallos - 1))
+            log.warning("Journal de capturas: no se pudieron aplicar %d (%s); reintento en %.1f s",
+                        len(failed), error or failed[0][1], wait)
+            with self._lock:
+                if self._stopping:
+                    return
+                self._cond.wait(wait)
+
+    def _apply_split(self, batch: List[_Pending]) -> Tuple[Dict[Key, Tuple[str, Optional[int]]], List[Tuple[_Pending, Exception]]]:
+        """Aplica el lote; si falla por sus datos lo parte en mitades. Devuelve lo aplicado y las que fallan solas."""
+        try:
+            return apply_batch([p.rec for p in batch]), []
+        except _TRANSIENT:
+            raise
+        except Exception as e:
+            if len(batch) == 1:
+                return {}, [(batch[0], e)]
+        mid = len(batch) // 2
+        applied, failed = self._apply_split(batch[:mid])
+        more, failed_more = self._apply_split(batch[mid:])
+        applied.update(more)
+        return applied, failed + failed_more
+
+    def _discard(self, dead: List[Tuple[_Pending, Exception]]):
+        """Pasa al dead-letter las capturas que no entran en la DB; dejan de bloquear el journal."""
+        lines = b"".join(orjson.dumps({**p.rec, "error": str(e)[:500], "descartada_en": time.time()}) + b"\n"
+                         for p, e in dead)
+        with open(os.path.join(self._dir or settings.CAPTURE_JOURNAL_DIR, DEAD_LETTER_FILE), "ab") as f:
+            f.write(lines)
+            f.flush()
+            _fsync(f.fileno())
+        for p, e in dead:
+            log.error("Journal de capturas: captura %s del usuario %s descartada tras %d intentos: %s",
+                      p.rec["k"], p.rec["u"], p.attempts, e)
+        with self._io, self._lock:
+            for p, e in dead:
+                key = (p.rec["u"], p.rec["k"])
+                self._pending.pop(key, None)
+                self._dead[key] = (p.rec["tipo"], str(e)[:500])
+                seg = self._segments.get(p.segment)
+                if seg is not None:
+                    seg.remaining -= 1
+            while len(self._dead) > MAX_KNOWN:
+                self._dead.popitem(last=False)
+            self.stats["descartadas"] += len(dead)
+            self._release_segments()
+
+    def _ready(self) -> bool:
+        first = next(iter(self._pending.values()), None)
+        return first is not None and first.written
+
+    def _take_batch(self) -> List[_Pending]:
+        # las escritas forman un prefijo de _pending: se escriben en orden de llegada
+        batch = []
+        for p in self._pending.values():
+            if not p.written or len(batch) >= settings.CAPTURE_BATCH_SIZE:
+                break
+            batch.append(p)
+        return batch
+
+    def _done(self, batch: List[_Pending], applied: Dict[Key, Tuple[str, Optional[int]]]):
+        with self._io, self._lock:
+            for p in batch:
+                key = (p.rec["u"], p.rec["k"])
+                self._pending.pop(key, None)
+                self._known[key] = applied.get(key, (p.rec["tipo"], None))
+                seg = self._segments.get(p.segment)
+                if seg is not None:
+                    seg.remaining -= 1
+            while len(self._known) > MAX_KNOWN:
+                self._known.popitem(last=False)
+            self.stats["aplicadas"] += len(batch)
+            self._release_segments()
+
+    def _release_segments(self):
+        # con _io y _lock tomados: borra / trunca los segmentos sin capturas pendientes
+        for seg in list(self._segments.values()):
+            if seg.remaining > 0:
+                continue
+            if seg is not self._active:
+                self._close(seg, unlink=True)
+            elif not self._buffer and seg.size:
+                # todo lo escrito ya está en la DB: el segmento activo vuelve a cero
+                os.ftruncate(seg.fd, 0)
+                seg.size = 0
+
+    def status(self, user_id: int, clave: str) -> Optional[Dict[str, Any]]:
+        key = (user_id, clave)
+        with self._lock:
+            if key in self._pending:
+                return {"tipo": self._pending[key].rec["tipo"], "id": None, "clave": clave, "estado": "pendiente"}
+            if key in self._dead:
+                tipo, error = self._dead[key]
+                return {"tipo": tipo, "id": None, "clave": clave, "estado": "descartada", "error": error}
+            known = self._known.get(key)
+        if known is None:
+            known = lookup(user_id, clave)
+        if known is None:
+            return None
+        return {"tipo": known[0], "id": known[1], "clave": clave, "estado": "guardada"}
+
+journal = CaptureJournal()
+
+@metrics.register_collector
+def _capture_metrics():
+    if not journal.running:
+        return []
+    lines = metrics.gauge_lines("garimind_capture_pending", "Capturas en el journal sin aplicar a la DB",
+                                [({}, journal.depth())])
+    lines.extend(metrics.counter_lines(
+        "garimind_capture_total", "Capturas recibidas, duplicadas, aplicadas, reaplicadas al arrancar, "
+        "lotes fallidos en la DB, descartadas al dead-letter, fsyncs y capturas escritas por esos fsyncs",
+        [({"estado": k}, v) for k, v in journal.stats.items()],
+    ))
+    return lines
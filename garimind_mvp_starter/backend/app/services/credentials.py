@@ -0,0 +1,105 @@
+# backend/app/services/credentials.py
+# Tokens OAuth por usuario, cifrados en la tabla `credenciales` (antes: un archivo
+# compartido por proveedor en data/creds). Cache LRU en proceso por (usuario, proveedor).
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..core.config import settings
+from ..core.security import encrypt, decrypt
+from ..db.session import get_session_factory
+from ..models.models import CredencialProveedor, DEFAULT_USER_ID, now_utc
+
+SessionFactory = get_session_factory(settings.DATABASE_URL)
+
+# Archivos de la versión mono-usuario: se importan una vez para el usuario por defecto
+LEGACY_DIR = "data/creds"
+LEGACY_FILES = {"google": "google_token.json", "microsoft": "ms_token.json"}
+
+_CACHE_SIZE = 1024
+_cache: "OrderedDict[Tuple[int, str], Dict[str, Any]]" = OrderedDict()
+_lock = threading.Lock()
+
+def _cache_get(key) -> Optional[Dict[str, Any]]:
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    return None
+
+def _cache_put(key, value):
+    with _lock:
+        _cache[key] = value
+        _cache.move_to_end(key)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def _load_legacy(proveedor: str) -> Optional[Dict[str, Any]]:
+    p = os.path.join(LEGACY_DIR, LEGACY_FILES[proveedor])
+    if not os.path.exists(p):
+        return None
+    with open(p, "r") as f:
+        return json.load(f)
+
+def load(user_id: int, proveedor: str, fresh: bool = False) -> Optional[Dict[str, Any]]:
+    """Credenciales descifradas; `fresh` salta la cache del proceso (otro worker pudo refrescarlas)."""
+    key = (user_id, proveedor)
+    value = None if fresh else _cache_get(key)
+    if value is not None:
+        return value
+    with SessionFactory() as session:
+        row = session.execute(
+            select(CredencialProveedor.datos_cifrados)
+            .where(CredencialProveedor.user_id == user_id, CredencialProveedor.proveedor == proveedor)
+        ).scalar_one_or_none()
+    value = json.loads(decrypt(row)) if row else None
+    if value is None and user_id == DEFAULT_USER_ID:
+        value = _load_legacy(proveedor)
+        if value is not None:
+            save(user_id, proveedor, value)
+            return value
+    if value is not None:
+        # "sin credenciales" no se guarda: el usuario puede conectar la cuenta en otro worker
+        _cache_put(key, value)
+    return value
+
+def save(user_id: int, proveedor: str, data: Dict[str, Any]):
+    blob = encrypt(json.dumps(data))
+    with SessionFactory() as session:
+        row = session.execute(
+            select(CredencialProveedor)
+            .where(CredencialProveedor.user_id == user_id, CredencialProveedor.proveedor == proveedor)
+        ).scalar_one_or_none()
+        if row is None:
+            session.add(CredencialProveedor(user_id=user_id, proveedor=proveedor, datos_cifrados=blob))
+        else:
+            row.datos_cifrados = blob
+            row.actualizado_en = now_utc()
+        try:
+            session.commit()
+        except IntegrityError:
+            # otro proceso insertó la fila entre el select y el insert (refresh concurrente): se actualiza
+            session.rollback()
+            session.execute(
+                update(CredencialProveedor)
+                .where(CredencialProveedor.user_id == user_id, CredencialProveedor.proveedor == proveedor)
+                .values(datos_cifrados=blob, actualizado_en=now_utc())
+            )
+            session.commit()
+    _cache_put((user_id, proveedor), data)
+
+def users_with(proveedor: str) -> List[int]:
+    """Usuarios que conectaron `proveedor` (incluye al usuario por defecto si tiene archivo legacy)."""
+    with SessionFactory() as session:
+        ids = session.execute(
+            select(CredencialProveedor.user_id).where(CredencialProveedor.proveedor == proveedor)
+        ).scalars().all()
+    ids = set(ids)
+    if DEFAULT_USER_ID not in ids and load(DEFAULT_USER_ID, proveedor) is not None:
+        ids.add(DEFAULT_USER_ID)
+    return sorted(ids)
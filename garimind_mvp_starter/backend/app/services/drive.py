@@ -0,0 +1,274 @@
+# backend/app/services/drive.py
+# Espejo de Google Drive con el feed de cambios. La primera vez se lista todo (hasta
+# DRIVE_MAX_FILES) y se guarda el startPageToken en estado_sincronizacion.cursor; después cada
+# vuelta del sync pide solo changes.list desde ese token, que sin cambios es una llamada vacía.
+# "Recientes" y la búsqueda salen de `drive_archivos`. Con DRIVE_INDEX_CONTENT el texto de Docs,
+# Slides y Sheets se exporta al índice full-text de services/indexer.py (documentos con
+# externo_id y sin proyecto), solo cuando cambia su modifiedTime.
+import hashlib
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, delete, func, select, update
+
+from ..core.config import settings
+from ..core.resilience import status_code
+from ..db.session import get_session_factory
+from ..models.models import ArchivoDrive, Documento, EstadoSincronizacion, Fragmento
+from . import indexer
+
+log = logging.getLogger("garimind.drive")
+
+SessionFactory = get_session_factory(settings.DATABASE_URL)
+
+FUENTE = "drive"
+# Archivos nativos de Google que se exportan como texto
+EXPORTS = {
+    "application/vnd.google-apps.document": "text/plain",
+    "application/vnd.google-apps.presentation": "text/plain",
+    "application/vnd.google-apps.spreadsheet": "text/csv",  # solo la primera hoja
+}
+# Token vencido o inválido: se vuelve a listar todo
+CURSOR_EXPIRED = {400, 404, 410}
+# Fallos de export que son del proveedor y no del archivo: se reintenta en la próxima vuelta. Un 403
+# que no es de cuota (exportSizeLimitExceeded, sin permiso) queda como error hasta que el archivo cambie.
+RETRY_CODES = {401, 429, 500, 502, 503, 504}
+QUERY_BATCH = 500  # ids por IN (...)
+
+def _aware(dt: Optional[datetime]) -> Optional[datetime]:
+    return dt.replace(tzinfo=timezone.utc) if dt is not None and dt.tzinfo is None else dt
+
+def _ns(dt: Optional[datetime]) -> int:
+    return int(_aware(dt).timestamp() * 1000) * 1_000_000 if dt else 0
+
+def _values(f: Dict[str, Any]) -> Dict[str, Any]:
+    modified = f.get("modifiedTime")
+    return {
+        "nombre": f.get("name") or "",
+        "mime_type": f.get("mimeType"),
+        "modificado": datetime.fromisoformat(modified.replace("Z", "+00:00")) if modified else None,
+        "web_view_link": f.get("webViewLink"),
+        "tamano": int(f["size"]) if f.get("size") else None,
+    }
+
+def item(r) -> Dict[str, Any]:
+    """Fila de drive_archivos en el esquema compacto de archivos (services/items.py)."""
+    modified = _aware(r.modificado)
+    return {
+        "id": r.file_id,
+        "name": r.nombre,
+        "modifiedTime": modified.isoformat(timespec="milliseconds").replace("+00:00", "Z") if modified else None,
+        "webViewLink": r.web_view_link,
+    }
+
+def _estado(session, user_id: int) -> EstadoSincronizacion:
+    est = session.execute(
+        select(EstadoSincronizacion)
+        .where(EstadoSincronizacion.user_id == user_id, EstadoSincronizacion.fuente == FUENTE)
+    ).scalar_one_or_none()
+    if est is None:
+        est = EstadoSincronizacion(user_id=user_id, fuente=FUENTE, fallos=0)
+        session.add(est)
+    return est
+
+def _cursor(user_id: int) -> Optional[str]:
+    with SessionFactory() as session:
+        return session.execute(
+            select(EstadoSincronizacion.cursor)
+            .where(EstadoSincronizacion.user_id == user_id, EstadoSincronizacion.fuente == FUENTE)
+        ).scalar_one_or_none()
+
+def synced(user_id: int) -> bool:
+    """True si el espejo de Drive del usuario sirve: sync activo y al menos un listado completo."""
+    return settings.SYNC_ENABLED and _cursor(user_id) is not None
+
+def _upsert(session, user_id: int, files: List[Dict[str, Any]]):
+    existing: Dict[str, ArchivoDrive] = {}
+    ids = [f["id"] for f in files]
+    for i in range(0, len(ids), QUERY_BATCH):
+        existing.update((r.file_id, r) for r in session.execute(
+            select(ArchivoDrive).where(ArchivoDrive.user_id == user_id, ArchivoDrive.file_id.in_(ids[i:i + QUERY_BATCH]))
+        ).scalars())
+    renamed = []
+    for f in files:
+        values = _values(f)
+        r = existing.get(f["id"])
+        if r is None:
+            session.add(ArchivoDrive(user_id=user_id, file_id=f["id"], **values))
+            continue
+        if r.nombre != values["nombre"]:
+            renamed.append({"fid": f["id"], "nombre": values["nombre"]})
+        for k, v in values.items():
+            setattr(r, k, v)
+    if renamed:  # renombrar no cambia el contenido: el documento indexado solo cambia de nombre
+        session.connection().execute(
+            update(Documento).where(Documento.user_id == user_id, Documento.externo_id == bindparam("fid"))
+            .values(ruta=bindparam("nombre")), renamed)
+
+def _remove(session, user_id: int, file_ids: Iterable[str]):
+    file_ids = list(file_ids)
+    for i in range(0, len(file_ids), QUERY_BATCH):
+        batch = file_ids[i:i + QUERY_BATCH]
+        docs = session.execute(select(Documento.id).where(
+            Documento.user_id == user_id, Documento.externo_id.in_(batch))).scalars().all()
+        if docs:
+            indexer.delete_docs(session, docs)
+        session.execute(delete(ArchivoDrive).where(ArchivoDrive.user_id == user_id, ArchivoDrive.file_id.in_(batch)))
+
+def full_sync(user_id: int, creds) -> int:
+    """Lista todo Drive (hasta DRIVE_MAX_FILES) y reemplaza el espejo. Devuelve los archivos."""
+    from ..api import google as g
+    # el token se pide antes de listar: lo que cambie durante el listado llega por changes.list
+    token = g.drive_start_page_token(creds)
+    files: List[Dict[str, Any]] = []
+    page = None
+    while len(files) < settings.DRIVE_MAX_FILES:
+        batch, page = g.drive_list_files(creds, page)
+        files.extend(batch)
+        if not page:
+            break
+    files = files[:settings.DRIVE_MAX_FILES]
+    seen = {f["id"] for f in files}
+    with SessionFactory() as session:
+        known = session.execute(select(ArchivoDrive.file_id).where(ArchivoDrive.user_id == user_id)).scalars().all()
+        _remove(session, user_id, [k for k in known if k not in seen])
+        _upsert(session, user_id, files)
+        _estado(session, user_id).cursor = token
+        session.commit()
+    return len(files)
+
+def apply_changes(user_id: int, creds, cursor: str) -> int:
+    """Aplica changes.list desde `cursor` y guarda el token nuevo. Devuelve los archivos tocados."""
+    from ..api import google as g
+    changes, token = g.drive_changes(creds, cursor)
+    latest = {c["fileId"]: c for c in changes}  # un archivo puede venir varias veces: vale el último
+    gone = {fid for fid, c in latest.items() if c.get("removed") or (c.get("file") or {}).get("trashed")}
+    files = [c["file"] for fid, c in latest.items() if c.get("file") and fid not in gone]
+    with SessionFactory() as session:
+        _remove(session, user_id, gone)
+        _upsert(session, user_id, files)
+        _estado(session, user_id).cursor = token
+        session.commit()
+    return len(latest)
+
+def _index_one(user_id: int, creds, f, known) -> int:
+    from ..api import google as g
+    mtime = _ns(f.modificado)
+    error = None
+    try:
+        data = g.drive_export(creds, f.file_id, EXPORTS[f.mime_type])
+    except Exception as e:
+        code = status_code(e)
+        if code is None or code in RETRY_CODES or (code == 403 and "ratelimit" in str(e).lower()):
+            raise
+        data, error = b"", f"{code} {e}"[:500]  # demasiado grande, sin permiso de export...
+    digest = hashlib.sha256(data).hexdigest()
+    with SessionFactory() as session:
+        conn = session.connection()
+        if known is not None and known.sha256 == digest and error is None:
+            conn.execute(update(Documento).where(Documento.id == known.id).values(mtime_ns=mtime, ruta=f.nombre))
+            session.commit()
+            return 0
+        if known is None:
+            doc = Documento(user_id=user_id, proyecto_id=None, externo_id=f.file_id, ruta=f.nombre,
+                            tamano=len(data), mtime_ns=mtime, sha256=digest, fragmentos=0)
+            session.add(doc)
+            session.flush()
+            doc_id = doc.id
+        else:
+            doc_id = known.id
+            conn.execute(delete(Fragmento).where(Fragmento.documento_id == doc_id))
+        n = 0
+        if error is None:
+            n, error = indexer.write_chunks(conn, doc_id, user_id, None, [data.decode("utf-8", errors="replace")])
+        conn.execute(update(Documento).where(Documento.id == doc_id).values(
+            ruta=f.nombre, tamano=len(data), mtime_ns=mtime, sha256=digest, fragmentos=n, error=error,
+            indexado_en=datetime.now(timezone.utc)))
+        session.commit()
+    return n
+
+def index_content(user_id: int, creds) -> int:
+    """Exporta al índice hasta DRIVE_INDEX_PER_SYNC archivos nativos nuevos o cambiados (los más recientes primero)."""
+    with SessionFactory() as session:
+        files = session.execute(
+            select(ArchivoDrive.file_id, ArchivoDrive.nombre, ArchivoDrive.mime_type, ArchivoDrive.modificado)
+            .where(ArchivoDrive.user_id == user_id, ArchivoDrive.mime_type.in_(EXPORTS))
+            .order_by(ArchivoDrive.modificado.desc().nulls_last())
+        ).all()
+        docs = {r.externo_id: r for r in session.execute(
+            select(Documento.id, Documento.externo_id, Documento.mtime_ns, Documento.sha256)
+            .where(Documento.user_id == user_id, Documento.externo_id.is_not(None))
+        ).all()}
+    pending = [f for f in files if f.file_id not in docs or docs[f.file_id].mtime_ns != _ns(f.modificado)]
+    for f in pending[:settings.DRIVE_INDEX_PER_SYNC]:
+        _index_one(user_id, creds, f, docs.get(f.file_id))
+    return min(len(pending), settings.DRIVE_INDEX_PER_SYNC)
+
+def sync(user_id: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Fetcher de la fuente "drive" del scheduler (services/sync.py): pone al día el espejo y
+    devuelve los SYNC_MAX_ITEMS más recientes para el snapshot. None si Google no está conectado.
+    """
+    from ..api import google as g
+    creds = g.load_creds(user_id)
+    if not creds:
+        return None
+    cursor = _cursor(user_id)
+    if cursor is not None:
+        try:
+            apply_changes(user_id, creds, cursor)
+        except Exception as e:
+            if status_code(e) not in CURSOR_EXPIRED:
+                raise
+            log.warning("startPageToken de Drive inválido (usuario %s): listado completo", user_id)
+            cursor = None
+    if cursor is None:
+        full_sync(user_id, creds)
+    if settings.DRIVE_INDEX_CONTENT:
+        index_content(user_id, creds)
+    return recent(user_id, settings.SYNC_MAX_ITEMS)
+
+def recent(user_id: int, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+    with SessionFactory() as session:
+        rows = session.execute(
+            select(ArchivoDrive.file_id, ArchivoDrive.nombre, ArchivoDrive.modificado, ArchivoDrive.web_view_link)
+            .where(ArchivoDrive.user_id == user_id)
+            .order_by(ArchivoDrive.modificado.desc().nulls_last(), ArchivoDrive.id)
+            .limit(limit).offset(offset)
+        ).all()
+    return [item(r) for r in rows]
+
+def count(user_id: int) -> int:
+    with SessionFactory() as session:
+        return session.execute(select(func.count()).where(ArchivoDrive.user_id == user_id)).scalar_one()
+
+def search(user_id: int, q: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Archivos cuyo nombre tiene todas las palabras de `q` (los más recientes primero) y luego los
+    que las tienen en el texto indexado, con el `fragmento` que coincide.
+    """
+    terms = re.findall(r"\w+", q.lower())
+    if not terms:
+        return []
+    cols = (ArchivoDrive.file_id, ArchivoDrive.nombre, ArchivoDrive.modificado, ArchivoDrive.web_view_link)
+    with SessionFactory() as session:
+        by_name = session.execute(
+            select(*cols).where(ArchivoDrive.user_id == user_id,
+                                *(func.lower(ArchivoDrive.nombre).contains(t, autoescape=True) for t in terms))
+            .order_by(ArchivoDrive.modificado.desc().nulls_last()).limit(limit)
+        ).all()
+        out = {r.file_id: item(r) for r in by_name}
+        hits = indexer.search(session, user_id, q, limit=limit, origen="drive")
+        missing = [h["externo_id"] for h in hits if h["externo_id"] not in out]
+        rows = {r.file_id: r for r in session.execute(
+            select(*cols).where(ArchivoDrive.user_id == user_id, ArchivoDrive.file_id.in_(missing))
+        ).all()} if missing else {}
+    for h in hits:
+        fid = h["externo_id"]
+        if fid not in out and fid in rows:
+            out[fid] = item(rows[fid])
+        if fid in out:
+            out[fid].setdefault("fragmento", h["fragmento"])
+    return list(out.values())[:limit]
@@ -0,0 +1,344 @@
+# backend/app/services/enrich.py
+# Enriquecimiento de capturas en segundo plano. Las tareas / recuerdos que entran por
+# /api/inbox/capturar quedan con enriquecimiento='pendiente'; este worker los toma en lotes y
+# les pone tags, prioridad (tareas), proyecto (si no traían) y tipo (recuerdos). Una llamada al
+# modelo pequeño por lote y usuario, con salida estructurada (JSON schema), y un UPDATE
+# executemany por tabla. Sin IA configurada, o si el modelo falla o devuelve algo inválido, decide
+# el clasificador local, que es determinista.
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+from sqlalchemy import bindparam, select, update
+
+from ..core import metrics, resilience
+from ..core.config import settings
+from ..db import versions
+from ..db.session import get_session_factory
+from ..models.models import Proyecto, Recuerdo, Tarea
+from . import model_router
+
+log = logging.getLogger("garimind.enrich")
+
+SessionFactory = get_session_factory(settings.DATABASE_URL)
+
+PENDIENTE, MODELO, LOCAL = "pendiente", "modelo", "local"
+PRIORIDADES = ("alta", "media", "baja")
+TIPOS = ("personal", "emocional", "familiar", "profesional")
+MAX_TAGS = 5
+MAX_PROYECTOS = 100  # proyectos que se le pasan al modelo
+ERROR_BACKOFF_SECONDS = 10.0
+MODEL_COOLDOWN_SECONDS = 60.0  # tras un fallo del modelo, los lotes siguientes van directo al local
+STOP_TIMEOUT_SECONDS = 5.0
+
+BATCH_SECONDS = metrics.histogram(
+    "garimind_enrich_batch_seconds", "Duración de clasificar un lote (una llamada al modelo o el clasificador local)",
+    buckets=(0.001, 0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+BATCH_ITEMS = metrics.histogram(
+    "garimind_enrich_batch_items", "Items por lote de enriquecimiento", buckets=(1, 2, 5, 10, 25, 50, 100),
+)
+
+@dataclass(frozen=True)
+class Item:
+    key: str        # t<id> / r<id>: la clave con la que el modelo devuelve cada item
+    user_id: int
+    texto: str
+    proyecto_id: Optional[int]
+
+    @property
+    def tabla(self) -> str:
+        return "tareas" if self.key[0] == "t" else "recuerdos"
+
+    @property
+    def id(self) -> int:
+        return int(self.key[1:])
+
+Proyectos = Sequence[Tuple[int, str, Optional[str]]]  # (id, nombre, objetivo)
+
+# ------------------------------------------------------------------
+# Clasificador local (sin red): reglas y coincidencia con el nombre del proyecto
+# ------------------------------------------------------------------
+_ALTA = re.compile(r"\b(urgente|ya|hoy|asap|cr[ií]tic\w*|important\w*|inmediat\w*|vence|plazo|antes de)\b", re.I)
+_BAJA = re.compile(r"\b(alg[uú]n d[ií]a|cuando pueda|quiz[aá]s?|tal vez|idea|eventualmente|sin prisa)\b", re.I)
+_TIPOS = (
+    ("familiar", re.compile(r"\b(mam[aá]|pap[aá]|hij[oa]s?|espos[oa]|familia\w*|herman[oa]s?|abuel[oa]s?|"
+                            r"t[ií][oa]s?|prim[oa]s?|sobrin[oa]s?)\b", re.I)),
+    ("emocional", re.compile(r"\b(siento|sent[ií]|feliz|triste|ansi\w+|miedo|agradecid[oa]|orgullos[oa]|"
+                             r"frustrad[oa]|estr[eé]s|emoci\w+|tranquil[oa])\b", re.I)),
+    ("personal", re.compile(r"\b(salud|m[eé]dic[oa]|gimnasio|ejercicio|viaje|vacaciones|cumplea[nñ]os|"
+                            r"casa|libro|dieta|dormir)\b", re.I)),
+)
+_TAGS = (
+    ("reunion", re.compile(r"\b(reuni[oó]n|junta|meeting|llamada|llamar)\b", re.I)),
+    ("correo", re.compile(r"\b(correo|email|mail|responder)\b", re.I)),
+    ("pago", re.compile(r"\b(pagar|pago|factura\w*|cobr\w+)\b", re.I)),
+    ("compra", re.compile(r"\b(compr\w+)\b", re.I)),
+    ("documento", re.compile(r"\b(documento|informe|reporte|propuesta|presentaci[oó]n|contrato)s?\b", re.I)),
+    ("idea", re.compile(r"\bideas?\b", re.I)),
+)
+_HASHTAG = re.compile(r"#(\w{2,30})")
+_STOP = {"para", "proyecto", "desde", "sobre", "entre", "hacer", "todo", "todos", "como", "esta", "este", "estos",
+         "con", "del", "los", "las", "una", "uno", "que"}
+
+def _norm(text: str) -> str:
+    return unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode()
+
+def _words(text: str) -> set:
+    return {w for w in re.findall(r"\w+", _norm(text)) if len(w) >= 4 and w not in _STOP}
+
+def _match_proyecto(texto: str, proyectos: Proyectos) -> Optional[int]:
+    """El proyecto con más palabras del nombre en el texto; ninguno si hay empate o no hay coincidencias."""
+    words = _words(texto)
+    scored = sorted(((len(words & _words(nombre)), pid) for pid, nombre, _ in proyectos), reverse=True)
+    if not scored or scored[0][0] == 0 or (len(scored) > 1 and scored[1][0] == scored[0][0]):
+        return None
+    return scored[0][1]
+
+def classify_local(item: Item, proyectos: Proyectos) -> Dict[str, Any]:
+    texto = item.texto
+    tags = [_norm(t) for t in _HASHTAG.findall(texto)] + [tag for tag, rx in _TAGS if rx.search(texto)]
+    out: Dict[str, Any] = {"tags": tags, "proyecto_id": _match_proyecto(texto, proyectos)}
+    if item.tabla == "tareas":
+        out["prioridad"] = "alta" if _ALTA.search(texto) else "baja" if _BAJA.search(texto) else "media"
+    else:
+        out["tipo"] = next((tipo for tipo, rx in _TIPOS if rx.search(texto)), "profesional")
+    return out
+
+# ------------------------------------------------------------------
+# Modelo: un lote por llamada, salida con JSON schema estricto
+# ------------------------------------------------------------------
+# Fijo: el mismo prefijo en todas las llamadas para la caché de prompts del proveedor
+SYSTEM_PROMPT = (
+    "Clasificas capturas rápidas del segundo cerebro de una persona. Para cada item devuelve su clave `k`, "
+    "de 1 a 5 tags cortos en minúsculas y sin #, la prioridad (alta, media o baja; solo tareas, null en "
+    "recuerdos), el proyecto_id de uno de los proyectos dados o null si ninguno encaja con claridad, y el "
+    "tipo (personal, emocional, familiar o profesional; solo recuerdos, null en tareas). Responde solo el JSON."
+)
+SCHEMA = {
+    "type": "object",
+    "properties": {"items": {"type": "array", "items": {
+        "type": "object",
+        "properties": {
+            "k": {"type": "string"},
+            "tags": {"type": "array", "items": {"type": "string"}},
+            "prioridad": {"type": ["string", "null"], "enum": [*PRIORIDADES, None]},
+            "proyecto_id": {"type": ["integer", "null"]},
+            "tipo": {"type": ["string", "null"], "enum": [*TIPOS, None]},
+        },
+        "required": ["k", "tags", "prioridad", "proyecto_id", "tipo"],
+        "additionalProperties": False,
+    }}},
+    "required": ["items"],
+    "additionalProperties": False,
+}
+
+_model_down_until = 0.0
+
+def _use_model() -> bool:
+    return (settings.ENRICH_USE_MODEL and settings.AI_ENABLED and bool(settings.OPENAI_API_KEY)
+            and time.monotonic() >= _model_down_until)
+
+def classify_model(items: List[Item], proyectos: Proyectos) -> Dict[str, Dict[str, Any]]:
+    """clave → resultado crudo del modelo. Lanza si la llamada falla o la respuesta no es JSON."""
+    from ..api import ai  # lazy: mismo cliente (y el mismo doble en pruebas) que /api/ai/reason
+
+    payload = {
+        "proyectos": [{"id": pid, "nombre": nombre, "objetivo": (objetivo or "")[:120]}
+                      for pid, nombre, objetivo in proyectos[:MAX_PROYECTOS]],
+        "items": [{"k": i.key, "tipo": "tarea" if i.tabla == "tareas" else "recuerdo",
+                   "texto": i.texto[:settings.ENRICH_MAX_CHARS]} for i in items],
+    }
+    resp = resilience.call(
+        "openai", "responses.create", ai.get_client().responses.create,
+        model=settings.AI_MODEL_SMALL,
+        input=[{"role": "system", "content": SYSTEM_PROMPT},
+               {"role": "user", "content": orjson.dumps(payload).decode()}],
+        text={"format": {"type": "json_schema", "name": "enriquecimiento", "schema": SCHEMA, "strict": True}},
+        temperature=0,
+        extra_body={"prompt_cache_key": settings.AI_PROMPT_CACHE_KEY} if settings.AI_PROMPT_CACHE_KEY else None,
+    )
+    tokens = model_router.usage_of(resp)
+    log.info("Enriquecimiento: %d items, %d tokens de entrada (%d en caché)", len(items), tokens["input"], tokens["cached"])
+    data = orjson.loads(resp.output_text or "null")
+    return {r["k"]: r for r in (data or {}).get("items", []) if isinstance(r, dict) and isinstance(r.get("k"), str)}
+
+def _clean(item: Item, raw: Optional[Dict[str, Any]], local: Dict[str, Any], pids: set) -> Dict[str, Any]:
+    """Campos finales del item: lo del modelo que sea válido, el resto del clasificador local."""
+    raw = raw or {}
+    tags: List[str] = []
+    for t in raw.get("tags") if isinstance(raw.get("tags"), list) else local["tags"]:
+        t = str(t).strip().lstrip("#").lower()[:30]
+        if t and t not in tags:
+            tags.append(t)
+    out: Dict[str, Any] = {"tags": ",".join(tags[:MAX_TAGS])[:255] or None}
+    if item.proyecto_id:  # el que vino en la captura manda
+        out["proyecto_id"] = item.proyecto_id
+    elif "proyecto_id" in raw and (raw["proyecto_id"] is None or raw["proyecto_id"] in pids):
+        out["proyecto_id"] = raw["proyecto_id"]
+    else:
+        out["proyecto_id"] = local["proyecto_id"]
+    if item.tabla == "tareas":
+        out["prioridad"] = raw.get("prioridad") if raw.get("prioridad") in PRIORIDADES else local["prioridad"]
+    else:
+        out["tipo"] = raw.get("tipo") if raw.get("tipo") in TIPOS else local["tipo"]
+    return out
+
+def classify(items: List[Item], proyectos: Proyectos) -> Tuple[List[Dict[str, Any]], str]:
+    """Resultados (en el orden de `items`) y quién decidió: 'modelo' o 'local'."""
+    global _model_down_until
+    t0 = time.perf_counter()
+    raw: Dict[str, Dict[str, Any]] = {}
+    via = LOCAL
+    if _use_model():
+        try:
+            raw = classify_model(items, proyectos)
+            via = MODELO
+        except Exception as e:  # sin red, cuota, JSON inválido: el lote sale igual, con el local
+            _model_down_until = time.monotonic() + MODEL_COOLDOWN_SECONDS
+            log.warning("Enriquecimiento con el modelo falló (%s); se usa el clasificador local", e)
+    pids = {pid for pid, _, _ in proyectos}
+    out = [_clean(i, raw.get(i.key), classify_local(i, proyectos), pids) for i in items]
+    BATCH_SECONDS.observe(time.perf_counter() - t0, via=via)
+    BATCH_ITEMS.observe(len(items), via=via)
+    return out, via
+
+# ------------------------------------------------------------------
+# Lectura de pendientes y escritura en bloque
+# ------------------------------------------------------------------
+def _pending(session, limit: int) -> Dict[int, List[Item]]:
+    """Pendientes más antiguos, hasta `limit` por tabla, agrupados por usuario."""
+    by_user: Dict[int, List[Item]] = defaultdict(list)
+    for prefix, model, texto in (("t", Tarea, Tarea.titulo), ("r", Recuerdo, Recuerdo.contenido)):
+        rows = session.execute(
+            select(model.id, model.user_id, texto, model.proyecto_id)
+            .where(model.enriquecimiento == PENDIENTE).order_by(model.id).limit(limit)
+        ).all()
+        for id_, user_id, text, pid in rows:
+            by_user[user_id].append(Item(f"{prefix}{id_}", user_id, text or "", pid))
+    return by_user
+
+_UPDATE_TAREAS = (
+    update(Tarea.__table__)
+    .where(Tarea.__table__.c.id == bindparam("b_id"), Tarea.__table__.c.enriquecimiento == PENDIENTE)
+    .values(tags=bindparam("b_tags"), prioridad=bindparam("b_prioridad"),
+            proyecto_id=bindparam("b_proyecto_id"), enriquecimiento=bindparam("b_via"))
+)
+_UPDATE_RECUERDOS = (
+    update(Recuerdo.__table__)
+    .where(Recuerdo.__table__.c.id == bindparam("b_id"), Recuerdo.__table__.c.enriquecimiento == PENDIENTE)
+    .values(tags=bindparam("b_tags"), tipo=bindparam("b_tipo"),
+            proyecto_id=bindparam("b_proyecto_id"), enriquecimiento=bindparam("b_via"))
+)
+
+def write(results: List[Tuple[Item, Dict[str, Any], str]]):
+    """Un UPDATE executemany por tabla. Solo toca filas aún pendientes (otro worker o una edición pudo ganar)."""
+    rows: Dict[str, List[Dict[str, Any]]] = {"tareas": [], "recuerdos": []}
+    for item, r, via in results:
+        row = {"b_id": item.id, "b_tags": r["tags"], "b_proyecto_id": r["proyecto_id"], "b_via": via}
+        if item.tabla == "tareas":
+            row["b_prioridad"] = r["prioridad"]
+        else:
+            row["b_tipo"] = r["tipo"]
+        rows[item.tabla].append(row)
+    with SessionFactory() as session:
+        conn = session.connection()
+        if rows["tareas"]:
+            conn.execute(_UPDATE_TAREAS, rows["tareas"])
+        if rows["recuerdos"]:
+            conn.execute(_UPDATE_RECUERDOS, rows["recuerdos"])
+        # escritura por Core: los ETag de los listados no se enteran solos
+        versions.bump(conn, {(item.user_id, item.tabla) for item, _, _ in results})
+        session.commit()
+
+def run_once(limit: Optional[int] = None) -> int:
+    """Enriquece un lote por usuario con pendientes. Devuelve cuántos items procesó."""
+    limit = limit or settings.ENRICH_BATCH_SIZE
+    with SessionFactory() as session:
+        by_user = _pending(session, limit)
+        if not by_user:
+            return 0
+        proyectos: Dict[int, List[Tuple[int, str, Optional[str]]]] = defaultdict(list)
+        for pid, user_id, nombre, objetivo in session.execute(
+            select(Proyecto.id, Proyecto.user_id, Proyecto.nombre, Proyecto.objetivo)
+            .where(Proyecto.user_id.in_(list(by_user))).order_by(Proyecto.id)
+        ).all():
+            proyectos[user_id].append((pid, nombre, objetivo))
+    # la llamada al modelo va sin conexión a la DB tomada
+    results: List[Tuple[Item, Dict[str, Any], str]] = []
+    for user_id, items in by_user.items():
+        items = items[:limit]
+        out, via = classify(items, proyectos[user_id])
+        results.extend((i, r, via) for i, r in zip(items, out))
+        enricher.stats[via] += len(items)
+    write(results)
+    return len(results)
+
+class Enricher:
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = defaultdict(int)  # items por vía (modelo / local)
+        self.batch_errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._wake.set()  # lo que haya quedado pendiente de antes
+        self._thread = threading.Thread(target=self._run, name="enrich", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = STOP_TIMEOUT_SECONDS):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def notify(self):
+        """Hay capturas nuevas: el worker despierta, espera ENRICH_LINGER_SECONDS y procesa el lote."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(settings.ENRICH_INTERVAL_SECONDS)
+            if self._stop.is_set():
+                break
+            if self._wake.is_set():
+                self._stop.wait(settings.ENRICH_LINGER_SECONDS)  # juntar más capturas en el mismo lote
+            self._wake.clear()
+            try:
+                while not self._stop.is_set() and run_once():
+                    pass
+            except Exception:
+                self.batch_errors += 1
+                log.exception("Enriquecimiento: error procesando el lote")
+                self._stop.wait(ERROR_BACKOFF_SECONDS)
+
+enricher = Enricher()
+
+def notify():
+    if enricher.running:
+        enricher.notify()
+
+@metrics.register_collector
+def _enrich_metrics():
+    if not enricher.stats and not enricher.batch_errors:
+        return []
+    lines = metrics.counter_lines("garimind_enrich_items_total", "Items enriquecidos por el modelo o el clasificador local",
+                                  [({"via": k}, v) for k, v in sorted(enricher.stats.items())])
+    lines += metrics.counter_lines("garimind_enrich_batch_errors_total", "Lotes de enriquecimiento que fallaron",
+                                   [({}, enricher.batch_errors)])
+    return lines
@@ -0,0 +1,199 @@
+# backend/app/services/extract.py
+# Texto de los archivos de las carpetas de proyecto, por partes y sin cargar el archivo entero:
+# texto plano con mmap y un decoder incremental, HTML con HTMLParser sobre ese mismo flujo,
+# Office / OpenDocument (zip + XML) con un parser XML alimentado por bloques desde el miembro
+# comprimido, y PDF página a página (pypdf, si está instalado). chunks() arma los fragmentos.
+import codecs
+import fnmatch
+import hashlib
+import mmap
+import os
+import re
+import zipfile
+from html.parser import HTMLParser
+from typing import Iterable, Iterator
+from xml.etree import ElementTree
+
+try:  # PDF opcional
+    import pypdf
+except ImportError:
+    pypdf = None
+
+READ_BLOCK = 1 << 20  # 1 MiB
+HASH_BLOCK = 8 << 20  # hashlib suelta el GIL con bloques grandes
+
+class Unsupported(Exception):
+    """El archivo no se puede indexar: queda en el manifiesto con el motivo y sin fragmentos."""
+
+TEXT_SUFFIXES = {".txt", ".md", ".markdown", ".rst", ".csv", ".tsv", ".json", ".yaml", ".yml", ".xml",
+                 ".log", ".ini", ".toml", ".sql", ".py"}
+HTML_SUFFIXES = {".html", ".htm"}
+# Office Open XML / OpenDocument: miembros del zip con el texto (patrones fnmatch)
+ZIP_MEMBERS = {
+    ".docx": ("word/document.xml", "word/footnotes.xml"),
+    ".pptx": ("ppt/slides/slide*.xml",),
+    ".xlsx": ("xl/sharedStrings.xml",),
+    ".odt": ("content.xml",),
+    ".odp": ("content.xml",),
+    ".ods": ("content.xml",),
+}
+PDF_SUFFIXES = {".pdf"}
+SUFFIXES = TEXT_SUFFIXES | HTML_SUFFIXES | set(ZIP_MEMBERS) | PDF_SUFFIXES
+
+def supported(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in SUFFIXES
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return h.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            for i in range(0, len(view), HASH_BLOCK):
+                h.update(view[i:i + HASH_BLOCK])
+    return h.hexdigest()
+
+def _read_text(path: str) -> Iterator[str]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            try:  # UTF-8 (con o sin BOM); si el primer bloque no lo es, Windows-1252
+                codecs.getincrementaldecoder("utf-8")().decode(view[:READ_BLOCK])
+                encoding = "utf-8-sig"
+            except UnicodeDecodeError:
+                encoding = "cp1252"
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            for i in range(0, len(view), READ_BLOCK):
+                yield decoder.decode(view[i:i + READ_BLOCK])
+            yield decoder.decode(b"", final=True)
+
+_HTML_SKIP = {"script", "style", "noscript", "template"}
+_HTML_BLOCK = {"p", "br", "div", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "pre"}
+
+class _HTMLText(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _HTML_SKIP:
+            self._skip += 1
+        elif tag in _HTML_BLOCK:
+            self.out.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _HTML_SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag in _HTML_BLOCK:
+            self.out.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.out.append(data)
+
+def _read_html(path: str) -> Iterator[str]:
+    parser = _HTMLText()
+    for piece in _read_text(path):
+        parser.feed(piece)
+        yield "".join(parser.out)
+        parser.out.clear()
+    parser.close()
+    yield "".join(parser.out)
+
+# Elementos que cierran un bloque (párrafo, fila, celda...) en Word, PowerPoint, Excel y ODF
+_XML_BREAK = {"p", "br", "tr", "tc", "si", "h", "list-item", "table-row", "table-cell"}
+
+class _XMLText:
+    """Target de XMLParser: junta el texto en orden de documento mientras se parsea."""
+
+    def __init__(self):
+        self.out = []
+
+    def start(self, tag, attrib):
+        if tag.rsplit("}", 1)[-1] == "tab":
+            self.out.append(" ")
+
+    def end(self, tag):
+        if tag.rsplit("}", 1)[-1] in _XML_BREAK:
+            self.out.append("\n")
+
+    def data(self, data):
+        self.out.append(data)
+
+    def close(self):
+        pass
+
+def _natural(name: str):
+    return [int(p) if p.isdigit() else p for p in re.split(r"(\d+)", name)]  # slide2 antes que slide10
+
+def _read_zip_xml(path: str, patterns: Iterable[str]) -> Iterator[str]:
+    try:
+        z = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise Unsupported("archivo dañado (no es un zip)")
+    with z:
+        names = sorted((n for n in z.namelist() if any(fnmatch.fnmatch(n, p) for p in patterns)), key=_natural)
+        for name in names:
+            target = _XMLText()
+            parser = ElementTree.XMLParser(target=target)
+            with z.open(name) as member:
+                while block := member.read(READ_BLOCK):
+                    parser.feed(block)
+                    yield "".join(target.out)
+                    target.out.clear()
+            parser.close()
+            yield "".join(target.out) + "\n"
+
+def _read_pdf(path: str) -> Iterator[str]:
+    if pypdf is None:
+        raise Unsupported("PDF: falta instalar pypdf")
+    for page in pypdf.PdfReader(path).pages:
+        yield (page.extract_text() or "") + "\n"
+
+def extract(path: str) -> Iterator[str]:
+    """Texto del archivo en partes. Lanza Unsupported si el formato no se indexa."""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in TEXT_SUFFIXES:
+        return _read_text(path)
+    if suffix in HTML_SUFFIXES:
+        return _read_html(path)
+    if suffix in ZIP_MEMBERS:
+        return _read_zip_xml(path, ZIP_MEMBERS[suffix])
+    if suffix in PDF_SUFFIXES:
+        return _read_pdf(path)
+    raise Unsupported(f"formato no soportado: {suffix or 'sin extensión'}")
+
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES = re.compile(r"\s*\n\s*\n\s*")
+
+def _cut(buf: str, pos: int, size: int) -> int:
+    """Dónde cortar el fragmento que empieza en `pos`: fin de párrafo, de línea, de frase o de palabra."""
+    for sep in ("\n\n", "\n", ". ", " "):
+        i = buf.rfind(sep, pos + size // 2, pos + size)
+        if i != -1:
+            return i + len(sep)
+    return pos + size
+
+def chunks(pieces: Iterable[str], size: int, overlap: int) -> Iterator[str]:
+    """
+    Fragmentos de ~`size` caracteres a partir de partes de texto de cualquier largo. Cada uno
+    repite las últimas ~`overlap` letras del anterior (desde el inicio de una palabra) para que
+    una frase partida se encuentre igual.
+    """
+    overlap = min(overlap, size // 4)
+    buf, pos = "", 0
+    for piece in pieces:
+        buf = buf[pos:] + _SPACES.sub(" ", piece)
+        pos = 0
+        while len(buf) - pos > size:
+            cut = _cut(buf, pos, size)
+            text = _BLANK_LINES.sub("\n\n", buf[pos:cut]).strip()
+            if text:
+                yield text
+            space = buf.find(" ", cut - overlap, cut) if overlap else -1
+            pos = space + 1 if space != -1 else cut
+    text = _BLANK_LINES.sub("\n\n", buf[pos:]).strip()
+    if text:
+        yield text
@@ -0,0 +1,432 @@
+# backend/app/services/indexer.py
+# Indexado incremental de las carpetas de proyecto (DATA_DIR/<slug>). El manifiesto
+# (`documentos`) guarda tamaño, mtime y sha256 de cada archivo: lo que no cambió de tamaño ni de
+# mtime ni se abre, y si cambió solo el mtime (touch, copia) basta con el hash. El texto se extrae
+# y se trocea en streaming (services/extract.py) hacia `fragmentos`, que tiene su índice
+# full-text (FTS5 en SQLite, tsvector en Postgres; migración 0008). Un worker re-escanea al
+# arrancar y cada INDEX_INTERVAL_SECONDS; con INDEX_WATCH y watchdog instalado, los cambios en
+# disco se indexan al momento sin re-escanear.
+import logging
+import os
+import pathlib
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, or_, select, text, update
+
+from ..core import metrics
+from ..core.config import settings
+from ..db.session import get_session_factory
+from ..models.models import DEFAULT_USER_ID, Documento, Fragmento, Proyecto
+from . import extract
+
+try:  # un solo proceso indexa (con varios workers de uvicorn)
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:  # modo watcher opcional
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+log = logging.getLogger("garimind.indexer")
+
+SessionFactory = get_session_factory(settings.DATABASE_URL)
+
+INSERT_BATCH = 500            # fragmentos por INSERT executemany
+LOCK_FILE = ".indexer.lock"   # en DATA_DIR
+LEADER_RETRY_SECONDS = 60.0
+STOP_TIMEOUT_SECONDS = 10.0
+
+FILE_SECONDS = metrics.histogram(
+    "garimind_index_file_seconds", "Tiempo de indexar un archivo cambiado (hash, extracción, fragmentos)",
+)
+
+Stats = Dict[str, int]  # nuevos, actualizados, sin_cambios, borrados, errores, fragmentos
+
+def to_slug(name: str) -> str:
+    s = re.sub(r"[^a-zA-Z0-9\-\_\s]", "", name).strip().lower()
+    s = re.sub(r"\s+", "-", s)
+    return s[:60] if s else "proyecto"
+
+def project_dir(user_id: int) -> pathlib.Path:
+    # el usuario por defecto conserva DATA_DIR/<slug> de la versión mono-usuario
+    base = pathlib.Path(settings.DATA_DIR)
+    return base if user_id == DEFAULT_USER_ID else base / f"u{user_id}"
+
+def project_folder(user_id: int, nombre: str) -> pathlib.Path:
+    return project_dir(user_id) / to_slug(nombre)
+
+def _skip(name: str) -> bool:
+    return name.startswith(".") or name.startswith("~$")  # ocultos y temporales de Office
+
+def _walk(folder: str) -> Iterator[Tuple[str, os.stat_result]]:
+    """(ruta relativa con "/", stat) de cada archivo indexable bajo `folder`."""
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = os.scandir(current)
+        except OSError:
+            continue
+        with entries:
+            for e in entries:
+                if _skip(e.name):
+                    continue
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif e.is_file(follow_symlinks=False) and extract.supported(e.name):
+                    yield os.path.relpath(e.path, folder).replace(os.sep, "/"), e.stat()
+
+def _manifest(session, proyecto_id: int, ruta: Optional[str] = None) -> Dict[str, Any]:
+    stmt = select(Documento.id, Documento.ruta, Documento.tamano, Documento.mtime_ns, Documento.sha256) \
+        .where(Documento.proyecto_id == proyecto_id)
+    if ruta is not None:
+        stmt = stmt.where(Documento.ruta == ruta)
+    return {r.ruta: r for r in session.execute(stmt).all()}
+
+def write_chunks(conn, doc_id: int, user_id: int, proyecto_id: Optional[int],
+                 pieces: Iterable[str]) -> Tuple[int, Optional[str]]:
+    """Trocea el texto en `fragmentos` del documento. Devuelve (fragmentos, error si se truncó)."""
+    n, error, batch = 0, None, []
+    for texto in extract.chunks(pieces, settings.INDEX_CHUNK_CHARS, settings.INDEX_CHUNK_OVERLAP):
+        batch.append({"documento_id": doc_id, "user_id": user_id, "proyecto_id": proyecto_id,
+                      "posicion": n, "texto": texto})
+        n += 1
+        if len(batch) >= INSERT_BATCH:
+            conn.execute(insert(Fragmento), batch)
+            batch = []
+        if n >= settings.INDEX_MAX_CHUNKS_PER_FILE:
+            error = f"truncado a {n} fragmentos"
+            break
+    if batch:
+        conn.execute(insert(Fragmento), batch)
+    return n, error
+
+def _index_file(proyecto_id: int, user_id: int, folder: str, rel: str, st: os.stat_result, known, stats: Stats):
+    if known is not None and known.tamano == st.st_size and known.mtime_ns == st.st_mtime_ns:
+        stats["sin_cambios"] += 1
+        return
+    t0 = time.perf_counter()
+    path = os.path.join(folder, rel)
+    try:
+        digest = extract.sha256_file(path)
+    except OSError as e:  # se borró o no se puede leer: el próximo escaneo decide
+        log.warning("No se pudo leer %s: %s", path, e)
+        stats["errores"] += 1
+        return
+    with SessionFactory() as session:
+        conn = session.connection()
+        if known is not None and known.sha256 == digest:  # mismo contenido: solo el manifiesto
+            conn.execute(update(Documento).where(Documento.id == known.id)
+                         .values(tamano=st.st_size, mtime_ns=st.st_mtime_ns))
+            session.commit()
+            stats["sin_cambios"] += 1
+            return
+        if known is None:
+            doc = Documento(user_id=user_id, proyecto_id=proyecto_id, ruta=rel, tamano=st.st_size,
+                            mtime_ns=st.st_mtime_ns, sha256=digest, fragmentos=0)
+            session.add(doc)
+            session.flush()
+            doc_id = doc.id
+        else:
+            doc_id = known.id
+            conn.execute(delete(Fragmento).where(Fragmento.documento_id == doc_id))
+
+        try:
+            if st.st_size > settings.INDEX_MAX_FILE_BYTES:
+                raise extract.Unsupported(f"más de {settings.INDEX_MAX_FILE_BYTES} bytes")
+            n, error = write_chunks(conn, doc_id, user_id, proyecto_id, extract.extract(path))
+        except extract.Unsupported as e:
+            n, error = 0, str(e)
+        except Exception as e:  # PDF / XML dañado, etc.: el documento queda con el error y sin fragmentos
+            log.warning("No se pudo extraer texto de %s: %s", path, e)
+            conn.execute(delete(Fragmento).where(Fragmento.documento_id == doc_id))
+            n, error = 0, f"{type(e).__name__}: {e}"[:500]
+        # el stat es el de antes de leer: si el archivo cambió mientras tanto, el próximo escaneo lo ve
+        conn.execute(update(Documento).where(Documento.id == doc_id).values(
+            tamano=st.st_size, mtime_ns=st.st_mtime_ns, sha256=digest, fragmentos=n, error=error,
+            indexado_en=datetime.now(timezone.utc)))
+        session.commit()
+    stats["nuevos" if known is None else "actualizados"] += 1
+    stats["fragmentos"] += n
+    if error:
+        stats["errores"] += 1
+    FILE_SECONDS.observe(time.perf_counter() - t0)
+
+def delete_docs(session, ids: List[int]):
+    # primero los fragmentos, para que los triggers de FTS5 los saquen del índice
+    session.execute(delete(Fragmento).where(Fragmento.documento_id.in_(ids)))
+    session.execute(delete(Documento).where(Documento.id.in_(ids)))
+
+_lock = threading.Lock()  # un indexado a la vez en el proceso (worker, watcher y el endpoint)
+
+def index_project(proyecto_id: int, user_id: int, nombre: str) -> Stats:
+    """Pone al día el índice de la carpeta del proyecto y devuelve los conteos."""
+    folder = str(project_folder(user_id, nombre))
+    stats: Stats = defaultdict(int)
+    with _lock:
+        if not os.path.isdir(folder):  # carpeta no montada o aún no creada: no se borra nada
+            return dict(stats)
+        with SessionFactory() as session:
+            known = _manifest(session, proyecto_id)
+        seen = set()
+        for rel, st in _walk(folder):
+            seen.add(rel)
+            _index_file(proyecto_id, user_id, folder, rel, st, known.get(rel), stats)
+        gone = [r.id for rel, r in known.items() if rel not in seen]
+        if gone:
+            with SessionFactory() as session:
+                delete_docs(session, gone)
+                session.commit()
+            stats["borrados"] += len(gone)
+    return dict(stats)
+
+def _folders() -> Dict[str, Tuple[int, int, str]]:
+    """carpeta absoluta → (proyecto_id, user_id, nombre). Si dos proyectos comparten carpeta, el más viejo."""
+    with SessionFactory() as session:
+        rows = session.execute(select(Proyecto.id, Proyecto.user_id, Proyecto.nombre).order_by(Proyecto.id)).all()
+    out: Dict[str, Tuple[int, int, str]] = {}
+    for pid, user_id, nombre in rows:
+        out.setdefault(os.path.abspath(project_folder(user_id, nombre)), (pid, user_id, nombre))
+    return out
+
+def _owner(path: str, folders: Dict[str, Tuple[int, int, str]]) -> Optional[Tuple[str, Tuple[int, int, str]]]:
+    current = os.path.abspath(path)
+    while True:
+        if current in folders:
+            return current, folders[current]
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+def index_paths(paths: Iterable[str]) -> Stats:
+    """Indexa solo las rutas cambiadas (eventos del watcher): archivos, carpetas nuevas o borradas."""
+    stats: Stats = defaultdict(int)
+    folders = _folders()
+    projects: Dict[int, Tuple[int, str]] = {}
+    for path in paths:
+        found = _owner(path, folders)
+        if found is None:
+            continue
+        folder, (pid, user_id, nombre) = found
+        rel = os.path.relpath(os.path.abspath(path), folder).replace(os.sep, "/")
+        if rel == "." or os.path.isdir(path):  # carpeta creada o movida adentro: el proyecto entero
+            projects[pid] = (user_id, nombre)
+            continue
+        if any(_skip(part) for part in rel.split("/")) or not extract.supported(rel):
+            continue
+        with _lock:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                st = None
+            with SessionFactory() as session:
+                if st is not None:
+                    known = _manifest(session, pid, rel).get(rel)
+                else:  # borrado: el archivo o una carpeta entera
+                    ids = session.execute(select(Documento.id).where(
+                        Documento.proyecto_id == pid,
+                        or_(Documento.ruta == rel, Documento.ruta.startswith(rel + "/", autoescape=True)),
+                    )).scalars().all()
+                    if ids:
+                        delete_docs(session, ids)
+                        session.commit()
+                        stats["borrados"] += len(ids)
+            if st is not None:
+                _index_file(pid, user_id, folder, rel, st, known, stats)
+    for pid, (user_id, nombre) in projects.items():
+        for k, v in index_project(pid, user_id, nombre).items():
+            stats[k] += v
+    return dict(stats)
+
+ORIGENES = {"carpeta": "d.externo_id IS NULL", "drive": "d.externo_id IS NOT NULL"}
+
+def search(session, user_id: int, q: str, proyecto_id: Optional[int] = None, limit: int = 20,
+           origen: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Fragmentos que contienen todas las palabras de `q`, del más relevante al menos. `origen`
+    limita a las carpetas de proyecto ("carpeta") o a Google Drive ("drive", services/drive.py).
+    """
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return []
+    params: Dict[str, Any] = {"u": user_id, "n": limit}
+    where = "f.user_id = :u"
+    if proyecto_id:
+        where += " AND f.proyecto_id = :p"
+        params["p"] = proyecto_id
+    if origen:
+        where += " AND " + ORIGENES[origen]
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        params["q"] = " ".join('"%s"' % t for t in terms)  # AND de términos literales, sin sintaxis FTS5
+        sql = f"""
+            SELECT f.id, f.documento_id, f.proyecto_id, d.ruta, d.externo_id, f.posicion,
+                   snippet(fragmentos_fts, 0, '[', ']', '…', 16) AS fragmento, -bm25(fragmentos_fts) AS score
+            FROM fragmentos_fts
+            JOIN fragmentos f ON f.id = fragmentos_fts.rowid
+            JOIN documentos d ON d.id = f.documento_id
+            WHERE fragmentos_fts MATCH :q AND {where}
+            ORDER BY score DESC LIMIT :n"""
+    elif dialect == "postgresql":
+        params["q"] = " ".join(terms)
+        sql = f"""
+            SELECT f.id, f.documento_id, f.proyecto_id, d.ruta, d.externo_id, f.posicion,
+                   ts_headline('simple', f.texto, plainto_tsquery('simple', :q),
+                               'StartSel=[, StopSel=], MaxWords=32, MinWords=12') AS fragmento,
+                   ts_rank(to_tsvector('simple', f.texto), plainto_tsquery('simple', :q)) AS score
+            FROM fragmentos f JOIN documentos d ON d.id = f.documento_id
+            WHERE to_tsvector('simple', f.texto) @@ plainto_tsquery('simple', :q) AND {where}
+            ORDER BY score DESC LIMIT :n"""
+    else:  # sin índice full-text: LIKE por la primera palabra
+        params["q"] = f"%{terms[0]}%"
+        sql = f"""
+            SELECT f.id, f.documento_id, f.proyecto_id, d.ruta, d.externo_id, f.posicion, substr(f.texto, 1, 200) AS fragmento,
+                   0 AS score
+            FROM fragmentos f JOIN documentos d ON d.id = f.documento_id
+            WHERE f.texto LIKE :q AND {where} LIMIT :n"""
+    return [dict(r._mapping) for r in session.execute(text(sql), params).all()]
+
+class _Handler(FileSystemEventHandler):
+    def __init__(self, indexer: "DocumentIndexer"):
+        super().__init__()
+        self.indexer = indexer
+
+    def on_any_event(self, event):
+        # "modified" de una carpeta llega con cada cambio de un archivo suyo: ese ya trae su evento
+        if event.is_directory and event.event_type == "modified":
+            return
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            if path:
+                self.indexer.mark(os.fsdecode(path))
+
+class DocumentIndexer:
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+        self._dirty: set = set()
+        self._dirty_lock = threading.Lock()
+        self._lock_fd: Optional[int] = None
+        self.stats: Stats = defaultdict(int)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def watching(self) -> bool:
+        return self._observer is not None
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = STOP_TIMEOUT_SECONDS):
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def mark(self, path: str):
+        with self._dirty_lock:
+            self._dirty.add(path)
+        self._wake.set()
+
+    def _acquire(self) -> bool:
+        os.makedirs(settings.DATA_DIR, exist_ok=True)
+        if fcntl is None:
+            return True
+        fd = os.open(os.path.join(settings.DATA_DIR, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:  # otro worker es el que indexa
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def _watch(self):
+        if not settings.INDEX_WATCH:
+            return
+        if Observer is None:
+            log.warning("INDEX_WATCH activo pero watchdog no está instalado: solo re-escaneos periódicos")
+            return
+        observer = Observer()
+        observer.schedule(_Handler(self), settings.DATA_DIR, recursive=True)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+
+    def _add(self, stats: Stats):
+        for k, v in stats.items():
+            self.stats[k] += v
+
+    def scan_all(self) -> Stats:
+        t0 = time.perf_counter()
+        total: Stats = defaultdict(int)
+        for folder, (pid, user_id, nombre) in _folders().items():
+            if self._stop.is_set():
+                break
+            for k, v in index_project(pid, user_id, nombre).items():
+                total[k] += v
+        self._add(total)
+        log.info("Escaneo de carpetas de proyecto en %.2fs: %s", time.perf_counter() - t0, dict(total))
+        return dict(total)
+
+    def _run(self):
+        while not self._acquire():
+            if self._stop.wait(LEADER_RETRY_SECONDS):
+                return
+        self._watch()  # antes del escaneo: lo que cambie mientras tanto queda marcado
+        interval = settings.INDEX_INTERVAL_SECONDS
+        next_scan = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() >= next_scan:
+                    self.scan_all()
+                    next_scan = time.monotonic() + interval if interval > 0 else float("inf")
+                self._wake.wait(None if next_scan == float("inf") else max(0.0, next_scan - time.monotonic()))
+                if self._stop.is_set():
+                    break
+                if self._wake.is_set():
+                    self._stop.wait(settings.INDEX_DEBOUNCE_SECONDS)  # un guardado suele ser varios eventos
+                    self._wake.clear()
+                    with self._dirty_lock:
+                        paths, self._dirty = self._dirty, set()
+                    if paths:
+                        self._add(index_paths(paths))
+            except Exception:
+                self.stats["fallos"] += 1
+                log.exception("Indexado: error")
+                self._stop.wait(LEADER_RETRY_SECONDS)
+
+indexer = DocumentIndexer()
+
+@metrics.register_collector
+def _index_metrics():
+    if not indexer.stats:
+        return []
+    return metrics.counter_lines("garimind_index_files_total", "Archivos indexados por resultado y fragmentos escritos",
+                                 [({"resultado": k}, v) for k, v in sorted(indexer.stats.items())])
@@ -0,0 +1,26 @@
+# backend/app/services/items.py
+# Esquema compacto común a los proveedores: lo que devuelven los fetchers (y guarda el
+# espejo) es un dict plano con estas claves, venga de Google o de Microsoft.
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+
+MAIL_FIELDS = ("id", "from", "subject", "date", "snippet", "isRead")
+EVENT_FIELDS = ("id", "title", "start", "end", "allDay", "location", "organizer", "link")
+FILE_FIELDS = ("id", "name", "modifiedTime", "webViewLink")
+ALL_FIELDS = frozenset(MAIL_FIELDS + EVENT_FIELDS + FILE_FIELDS)
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """`?fields=subject,start` → ["id", "subject", "start"] (el id va siempre); None = todo."""
+    if not fields:
+        return None
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(wanted) - ALL_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos desconocidos: {', '.join(unknown)}")
+    return ["id", *(f for f in wanted if f != "id")]
+
+def project(items: Iterable[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    if fields is None:
+        return list(items)
+    return [{f: i[f] for f in fields if f in i} for i in items]
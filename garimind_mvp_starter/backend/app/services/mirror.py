@@ -0,0 +1,161 @@
+# backend/app/services/mirror.py
+# Espejo local de los datos de proveedores: lo escribe el scheduler de sync
+# y lo leen los endpoints, para no esperar a Google/Microsoft en cada request.
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import orjson
+from sqlalchemy import select, delete, func
+
+from ..core.config import settings
+from ..db.session import get_session_factory
+from ..models.models import ItemSincronizado, EstadoSincronizacion, now_utc
+
+SessionFactory = get_session_factory(settings.DATABASE_URL)
+
+def _aware(dt: Optional[datetime]) -> Optional[datetime]:
+    # SQLite devuelve datetimes sin tzinfo; los guardamos siempre en UTC
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+def _estado(session, user_id: int, fuente: str) -> EstadoSincronizacion:
+    est = session.execute(
+        select(EstadoSincronizacion)
+        .where(EstadoSincronizacion.user_id == user_id, EstadoSincronizacion.fuente == fuente)
+    ).scalar_one_or_none()
+    if est is None:
+        est = EstadoSincronizacion(user_id=user_id, fuente=fuente, fallos=0)
+        session.add(est)
+    return est
+
+def read(user_id: int, fuente: str, limit: Optional[int] = None, offset: int = 0) -> Optional[List[Dict[str, Any]]]:
+    """
+    Devuelve los items espejados de `fuente` del usuario (desde `offset`), o None si el espejo
+    no sirve (sync desactivado, nunca sincronizado o se piden más items de los que guardamos).
+    """
+    if not settings.SYNC_ENABLED:
+        return None
+    if limit is not None and offset + limit > settings.SYNC_MAX_ITEMS:
+        return None
+    with SessionFactory() as session:
+        ultima = session.execute(
+            select(EstadoSincronizacion.ultima_sync)
+            .where(EstadoSincronizacion.user_id == user_id, EstadoSincronizacion.fuente == fuente)
+        ).scalar_one_or_none()
+        if ultima is None:
+            return None
+        stmt = (select(ItemSincronizado.datos)
+                .where(ItemSincronizado.user_id == user_id, ItemSincronizado.fuente == fuente)
+                .order_by(ItemSincronizado.posicion))
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        if offset:
+            stmt = stmt.offset(offset)
+        return [orjson.loads(d) for d in session.execute(stmt).scalars().all()]
+
+def count(user_id: int, fuente: str) -> int:
+    """Items espejados de `fuente` (el total de la paginación cuando se sirve del espejo)."""
+    with SessionFactory() as session:
+        return session.execute(
+            select(func.count())
+            .where(ItemSincronizado.user_id == user_id, ItemSincronizado.fuente == fuente)
+        ).scalar_one()
+
+def synced_at(user_id: int, fuentes: List[str], limit: Optional[int] = None) -> Optional[List[str]]:
+    """
+    ultima_sync de cada fuente ("fuente:iso"), o None si alguna no se serviría desde el
+    espejo (mismas condiciones que read). Sirve de versión barata para los ETag.
+    """
+    if not settings.SYNC_ENABLED or (limit is not None and limit > settings.SYNC_MAX_ITEMS):
+        return None
+    with SessionFactory() as session:
+        rows = dict(session.execute(
+            select(EstadoSincronizacion.fuente, EstadoSincronizacion.ultima_sync)
+            .where(EstadoSincronizacion.user_id == user_id, EstadoSincronizacion.fuente.in_(fuentes))
+        ).all())
+    if any(rows.get(f) is None for f in fuentes):
+        return None
+    return [f"{f}:{_aware(rows[f]).isoformat()}" for f in fuentes]
+
+def _replace(session, user_id: int, fuente: str, items: List[Dict[str, Any]], now: datetime):
+    session.execute(delete(ItemSincronizado).where(ItemSincronizado.user_id == user_id, ItemSincronizado.fuente == fuente))
+    session.add_all([
+        ItemSincronizado(user_id=user_id, fuente=fuente, posicion=i, datos=json.dumps(item, default=str), sincronizado_en=now)
+        for i, item in enumerate(items)
+    ])
+
+def write(user_id: int, fuente: str, items: List[Dict[str, Any]]) -> None:
+    """Reemplaza el snapshot de `fuente` y marca la sync como exitosa."""
+    now = now_utc()
+    with SessionFactory() as session:
+        _replace(session, user_id, fuente, items, now)
+        est = _estado(session, user_id, fuente)
+        est.ultima_sync = now
+        est.ultimo_intento = now
+        est.ultimo_error = None
+        est.fallos = 0
+        session.commit()
+
+def patch(user_id: int, fuente: str, added: List[Dict[str, Any]] = (), updated: List[Dict[str, Any]] = (),
+          removed: Iterable[str] = ()) -> bool:
+    """
+    Cambio incremental (push) sobre el snapshot de `fuente`: los `added` nuevos entran al
+    principio, los `updated` (y `added` ya presentes) se reemplazan en su lugar y los ids
+    de `removed` salen. Devuelve False si la fuente nunca se sincronizó.
+    """
+    now = now_utc()
+    with SessionFactory() as session:
+        est = session.execute(
+            select(EstadoSincronizacion)
+            .where(EstadoSincronizacion.user_id == user_id, EstadoSincronizacion.fuente == fuente)
+        ).scalar_one_or_none()
+        if est is None or est.ultima_sync is None:
+            return False
+        items = [json.loads(d) for d in session.execute(
+            select(ItemSincronizado.datos)
+            .where(ItemSincronizado.user_id == user_id, ItemSincronizado.fuente == fuente)
+            .order_by(ItemSincronizado.posicion)
+        ).scalars().all()]
+        removed = set(removed)
+        present = {i.get("id") for i in items}
+        by_id = {u["id"]: u for u in [*updated, *added]}
+        kept = [by_id.get(i.get("id"), i) for i in items if i.get("id") not in removed]
+        new = [a for a in added if a["id"] not in present and a["id"] not in removed]
+        _replace(session, user_id, fuente, (new + kept)[:settings.SYNC_MAX_ITEMS], now)
+        est.ultima_sync = now
+        est.ultimo_intento = now
+        session.commit()
+    return True
+
+def record_error(user_id: int, fuente: str, error: str) -> int:
+    """Registra un intento fallido y devuelve el número de fallos consecutivos."""
+    with SessionFactory() as session:
+        est = _estado(session, user_id, fuente)
+        est.ultimo_intento = now_utc()
+        est.ultimo_error = error[:2000]
+        est.fallos = (est.fallos or 0) + 1
+        session.commit()
+        return est.fallos
+
+def status(user_id: int) -> List[Dict[str, Any]]:
+    now = now_utc()
+    with SessionFactory() as session:
+        rows = session.execute(
+            select(EstadoSincronizacion)
+            .where(EstadoSincronizacion.user_id == user_id)
+            .order_by(EstadoSincronizacion.fuente)
+        ).scalars().all()
+    out = []
+    for r in rows:
+        ultima = _aware(r.ultima_sync)
+        out.append({
+            "fuente": r.fuente,
+            "ultima_sync": ultima.isoformat() if ultima else None,
+            "lag_seconds": round((now - ultima).total_seconds(), 1) if ultima else None,
+            "ultimo_intento": _aware(r.ultimo_intento).isoformat() if r.ultimo_intento else None,
+            "ultimo_error": r.ultimo_error,
+            "fallos": r.fallos or 0,
+        })
+    return out
@@ -0,0 +1,148 @@
+# backend/app/services/model_router.py
+# Enrutado de modelos para ai.reason: un clasificador local y barato (regex + largo del prompt)
+# manda saludos y consultas puntuales al modelo pequeño y la planificación al grande.
+# También lleva la cuenta de latencia, tokens (incl. los servidos desde la caché de prompts
+# del proveedor) y costo estimado por ruta.
+import json
+import logging
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from ..core import metrics
+from ..core.config import settings
+
+log = logging.getLogger("garimind.ai")
+
+RAPIDO, PROFUNDO = "rapido", "profundo"
+ROUTES = (RAPIDO, PROFUNDO)
+
+SECONDS = metrics.histogram(
+    "garimind_ai_route_seconds", "Latencia total de ai.reason (todos los pases) por ruta y modelo",
+    buckets=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+)
+
+_GREETING = re.compile(
+    r"^\s*(hola|hey|buen[oa]s?(\s+(d[ií]as|tardes|noches))?|saludos|gracias|ok|vale|listo|perfecto|"
+    r"qu[eé] tal|c[oó]mo est[aá]s|chao|adi[oó]s|hi|hello|thanks)\b", re.I)
+_LOOKUP = re.compile(
+    r"\b(qu[eé] tengo|tengo|cu[aá]nt[oa]s?|cu[aá]l(es)?|cu[aá]ndo|d[oó]nde|qui[eé]n|lista|listar|"
+    r"mu[eé]strame|muestra|busca|dame|hay)\b", re.I)
+_PLANNING = re.compile(
+    r"\b(planifica|planea|plan|prioriza|estrategia|organiza|analiza|compara|sugiere|recomienda|"
+    r"prop[oó]n|revisa|resume|eval[uú]a|decide|por qu[eé]|c[oó]mo deber[ií]a|semana|roadmap)\w*", re.I)
+
+@dataclass(frozen=True)
+class Route:
+    name: str
+    model: str
+    motivo: str
+
+def _model(name: str) -> str:
+    return settings.AI_MODEL_SMALL if name == RAPIDO else settings.AI_MODEL_LARGE
+
+def classify(prompt: str) -> Tuple[str, str]:
+    """(ruta, motivo) para `prompt`. Ante la duda, el modelo grande."""
+    words = len(prompt.split())
+    if words > settings.AI_ROUTE_MAX_WORDS:
+        return PROFUNDO, "largo"
+    if _PLANNING.search(prompt):
+        return PROFUNDO, "planificacion"
+    if prompt.count("?") > 1:
+        return PROFUNDO, "varias preguntas"
+    if _GREETING.match(prompt) and words <= 8:
+        return RAPIDO, "saludo"
+    if _LOOKUP.search(prompt):
+        return RAPIDO, "consulta"
+    if words <= 6:
+        return RAPIDO, "corto"
+    return PROFUNDO, "por defecto"
+
+def route(prompt: str, forced: Optional[str] = None) -> Route:
+    if forced in ROUTES:
+        return Route(forced, _model(forced), "forzada")
+    if not settings.AI_ROUTING_ENABLED:
+        return Route(PROFUNDO, _model(PROFUNDO), "enrutado apagado")
+    name, motivo = classify(prompt)
+    return Route(name, _model(name), motivo)
+
+# ------------------------------------------------------------------
+# Costo: USD por millón de tokens (entrada, entrada en caché, salida).
+# AI_MODEL_PRICES='{"mi-modelo": [1.0, 0.5, 4.0]}' agrega o reemplaza precios.
+# ------------------------------------------------------------------
+PRICES: Dict[str, Tuple[float, float, float]] = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+}
+if settings.AI_MODEL_PRICES:
+    try:
+        PRICES.update({k: tuple(v) for k, v in json.loads(settings.AI_MODEL_PRICES).items()})
+    except (ValueError, TypeError) as e:
+        log.warning("AI_MODEL_PRICES inválido, se ignora: %s", e)
+
+def _price(model: str) -> Optional[Tuple[float, float, float]]:
+    # la API devuelve el snapshot (gpt-4o-mini-2024-07-18): gana el prefijo más largo
+    best = max((k for k in PRICES if model == k or model.startswith(k + "-")), key=len, default=None)
+    return PRICES[best] if best else None
+
+def usage_of(resp) -> Dict[str, int]:
+    """Tokens de una respuesta de la API Responses (0 si no vienen)."""
+    u = getattr(resp, "usage", None)
+    details = getattr(u, "input_tokens_details", None)
+    if isinstance(details, dict):  # según la versión del SDK llega sin parsear
+        cached = details.get("cached_tokens")
+    else:
+        cached = getattr(details, "cached_tokens", 0)
+    return {
+        "input": getattr(u, "input_tokens", 0) or 0,
+        "cached": cached or 0,
+        "output": getattr(u, "output_tokens", 0) or 0,
+    }
+
+def cost(model: str, tokens: Dict[str, int]) -> Optional[float]:
+    price = _price(model)
+    if price is None:
+        return None
+    fresh = tokens["input"] - tokens["cached"]
+    return (fresh * price[0] + tokens["cached"] * price[1] + tokens["output"] * price[2]) / 1_000_000
+
+_lock = threading.Lock()
+_requests: Dict[Tuple[str, str], int] = defaultdict(int)
+_tokens: Dict[Tuple[str, str, str], int] = defaultdict(int)
+_cost: Dict[Tuple[str, str], float] = defaultdict(float)
+
+def record(r: Route, seconds: float, tokens: Dict[str, int]) -> Dict[str, Any]:
+    """Registra un ai.reason terminado y devuelve el detalle para la respuesta."""
+    usd = cost(r.model, tokens)
+    SECONDS.observe(seconds, ruta=r.name, modelo=r.model)
+    with _lock:
+        _requests[(r.name, r.model)] += 1
+        for kind, n in tokens.items():
+            _tokens[(r.name, r.model, kind)] += n
+        if usd is not None:
+            _cost[(r.name, r.model)] += usd
+    return {"ruta": r.name, "modelo": r.model, "motivo": r.motivo, "latencia_ms": round(seconds * 1000, 1),
+            "tokens": tokens, "costo_usd": round(usd, 6) if usd is not None else None}
+
+@metrics.register_collector
+def _route_metrics():
+    with _lock:
+        requests, tokens, usd = dict(_requests), dict(_tokens), dict(_cost)
+    if not requests:
+        return []
+    lines = metrics.counter_lines("garimind_ai_route_requests_total", "Pedidos a ai.reason por ruta y modelo",
+                                  [({"ruta": r, "modelo": m}, n) for (r, m), n in sorted(requests.items())])
+    lines.extend(metrics.counter_lines(
+        "garimind_ai_route_tokens_total", "Tokens por ruta, modelo y tipo (input incluye cached)",
+        [({"ruta": r, "modelo": m, "tipo": k}, n) for (r, m, k), n in sorted(tokens.items())],
+    ))
+    lines.extend(metrics.counter_lines(
+        "garimind_ai_route_cost_usd_total", "Costo estimado en USD por ruta y modelo",
+        [({"ruta": r, "modelo": m}, round(v, 6)) for (r, m), v in sorted(usd.items())],
+    ))
+    return lines
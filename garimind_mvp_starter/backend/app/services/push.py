@@ -0,0 +1,441 @@
+# backend/app/services/push.py
+# Ingesta push: las change notifications de Graph y las de Gmail (watch + Pub/Sub)
+# entran a una cola en proceso; los workers aplican al espejo solo lo que cambió
+# (history.list de Gmail, GET del mensaje en Graph) en vez de esperar al polling.
+import asyncio
+import hmac
+import logging
+import secrets
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from ..core import metrics
+from ..core.config import settings
+from ..core.resilience import current_account, status_code
+from ..db.session import get_session_factory
+from ..models.models import SuscripcionPush, now_utc
+from . import calendar, mirror
+# app.api.google / app.api.microsoft se importan dentro de cada función: solo se cargan si la
+# integración está habilitada (ver main.py)
+from .sync import scheduler
+
+log = logging.getLogger("garimind.push")
+
+SessionFactory = get_session_factory(settings.DATABASE_URL)
+
+GRAPH_NOTIFICATION_PATH = "/api/push/graph"
+# recurso de Graph que alimenta cada fuente del espejo
+GRAPH_RESOURCES = {"outlook_mail": "me/messages", "mscal": "me/events"}
+# fuentes del espejo que mantiene al día cada suscripción
+COVERS = {"gmail": ("gmail", "gmail_unread"), "outlook_mail": ("outlook_mail", "outlook_unread"), "mscal": ("mscal",)}
+COVERAGE_TTL_SECONDS = 60
+# un trabajo que falla vuelve a la cola (con sus cambios) con backoff; agotados los intentos se
+# rehace el snapshot de lo que cubría
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 2.0
+RETRY_MAX_SECONDS = 60.0
+FALLBACK_SOURCES = {"gmail": COVERS["gmail"], "graph_mail": COVERS["outlook_mail"]}
+
+# Clave de un trabajo de la cola: ("gmail", user_id) | ("graph_mail", user_id)
+# | ("refresh", user_id, fuente) | ("renew", suscripcion_id)
+Job = Tuple[Any, ...]
+
+# ------------------------------------------------------------------
+# Suscripciones
+# ------------------------------------------------------------------
+def _aware(dt: Optional[datetime]) -> Optional[datetime]:
+    return dt.replace(tzinfo=timezone.utc) if dt is not None and dt.tzinfo is None else dt
+
+def _graph_dt(value: str) -> datetime:
+    # Graph responde "2025-11-20T10:00:00.0000000Z" (7 decimales, siempre UTC)
+    return datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+
+def _as_dict(s: SuscripcionPush) -> Dict[str, Any]:
+    expira = _aware(s.expira_en)
+    return {
+        "id": s.id, "proveedor": s.proveedor, "recurso": s.recurso, "cuenta": s.cuenta,
+        "expira_en": expira.isoformat() if expira else None,
+        "activa": expira is not None and expira > now_utc(),
+        "cubre": list(COVERS.get(s.recurso, ())),
+    }
+
+def _get(**filters) -> Optional[SuscripcionPush]:
+    with SessionFactory() as session:
+        return session.execute(select(SuscripcionPush).filter_by(**filters)).scalars().first()
+
+def _upsert(user_id: int, proveedor: str, recurso: str, **fields) -> Dict[str, Any]:
+    global _covered_at
+    with SessionFactory() as session:
+        sub = session.execute(
+            select(SuscripcionPush).where(SuscripcionPush.user_id == user_id, SuscripcionPush.recurso == recurso)
+        ).scalar_one_or_none()
+        if sub is None:
+            sub = SuscripcionPush(user_id=user_id, proveedor=proveedor, recurso=recurso)
+            session.add(sub)
+        for k, v in fields.items():
+            setattr(sub, k, v)
+        session.commit()
+        _covered_at = 0.0
+        return _as_dict(sub)
+
+def subscriptions(user_id: int) -> List[Dict[str, Any]]:
+    with SessionFactory() as session:
+        rows = session.execute(
+            select(SuscripcionPush).where(SuscripcionPush.user_id == user_id).order_by(SuscripcionPush.recurso)
+        ).scalars().all()
+        return [_as_dict(s) for s in rows]
+
+def _subscribe_graph_one(user_id: int, recurso: str, access: str) -> Dict[str, Any]:
+    from ..api import microsoft as ms
+    secreto = secrets.token_urlsafe(24)
+    expiration = now_utc() + timedelta(minutes=settings.PUSH_GRAPH_EXPIRATION_MINUTES)
+    url = settings.PUSH_BASE_URL.rstrip("/") + GRAPH_NOTIFICATION_PATH
+    sub = ms.create_subscription(access, GRAPH_RESOURCES[recurso], url, secreto, expiration)
+    return _upsert(user_id, "microsoft", recurso, externo_id=sub["id"], secreto=secreto,
+                   expira_en=_graph_dt(sub["expirationDateTime"]))
+
+def subscribe_graph(user_id: int) -> List[Dict[str, Any]]:
+    """Crea (o extiende, si ya existen) las subscriptions de correo y calendario del usuario."""
+    from ..api import microsoft as ms
+    access = ms.ensure_access_token(user_id)
+    out = []
+    for recurso in GRAPH_RESOURCES:
+        prev = _get(user_id=user_id, recurso=recurso)
+        if prev is not None and prev.externo_id:
+            expiration = now_utc() + timedelta(minutes=settings.PUSH_GRAPH_EXPIRATION_MINUTES)
+            r = ms.renew_subscription(access, prev.externo_id, expiration)
+            if r is not None:
+                out.append(_upsert(user_id, "microsoft", recurso, expira_en=_graph_dt(r["expirationDateTime"])))
+                continue
+        out.append(_subscribe_graph_one(user_id, recurso, access))
+    return out
+
+def watch_gmail(user_id: int) -> Dict[str, Any]:
+    """users.watch del INBOX hacia GMAIL_PUBSUB_TOPIC (expira a los 7 días: lo renueva el loop)."""
+    from ..api import google as g
+    creds = g.load_creds(user_id)
+    resp = g.gmail_watch(creds, settings.GMAIL_PUBSUB_TOPIC)
+    email = g.gmail_profile(creds)["emailAddress"].lower()
+    prev = _get(user_id=user_id, recurso="gmail")
+    # al renovar se conserva el cursor para no saltarse cambios
+    cursor = prev.cursor if prev is not None and prev.cursor else str(resp["historyId"])
+    expira = datetime.fromtimestamp(int(resp["expiration"]) / 1000, tz=timezone.utc)
+    return _upsert(user_id, "google", "gmail", cuenta=email, cursor=cursor, expira_en=expira)
+
+def renew(sub_id: int) -> List[Job]:
+    sub = _get(id=sub_id)
+    if sub is None:
+        return []
+    if sub.proveedor == "google":
+        from ..api import google as g
+        if g.load_creds(sub.user_id) is not None:
+            watch_gmail(sub.user_id)
+        return []
+    from ..api import microsoft as ms
+    access = ms.ensure_access_token(sub.user_id)
+    expiration = now_utc() + timedelta(minutes=settings.PUSH_GRAPH_EXPIRATION_MINUTES)
+    r = ms.renew_subscription(access, sub.externo_id, expiration) if sub.externo_id else None
+    if r is not None:
+        _upsert(sub.user_id, sub.proveedor, sub.recurso, expira_en=_graph_dt(r["expirationDateTime"]))
+        return []
+    # Graph la borró: se recrea y se resincroniza lo que pudo cambiar sin aviso
+    _subscribe_graph_one(sub.user_id, sub.recurso, access)
+    return [("refresh", sub.user_id, f) for f in COVERS[sub.recurso]]
+
+def expiring() -> List[int]:
+    limit = now_utc() + timedelta(seconds=settings.PUSH_RENEW_BEFORE_SECONDS)
+    with SessionFactory() as session:
+        return list(session.execute(
+            select(SuscripcionPush.id).where(SuscripcionPush.expira_en < limit)
+        ).scalars().all())
+
+# ------------------------------------------------------------------
+# Cobertura: el scheduler de sync espacia el polling de estas fuentes
+# ------------------------------------------------------------------
+_covered: Set[Tuple[int, str]] = set()
+_covered_at = 0.0
+
+def covered(user_id: int, fuente: str) -> bool:
+    global _covered, _covered_at
+    if time.monotonic() - _covered_at > COVERAGE_TTL_SECONDS:
+        with SessionFactory() as session:
+            rows = session.execute(
+                select(SuscripcionPush.user_id, SuscripcionPush.recurso).where(SuscripcionPush.expira_en > now_utc())
+            ).all()
+        _covered = {(u, f) for u, r in rows for f in COVERS.get(r, ())}
+        _covered_at = time.monotonic()
+    return (user_id, fuente) in _covered
+
+# ------------------------------------------------------------------
+# Notificaciones -> trabajos
+# ------------------------------------------------------------------
+def route_graph(notifications: List[Dict[str, Any]]) -> List[Tuple[Job, Dict[str, str]]]:
+    """Valida el clientState de cada notificación de Graph y la traduce a trabajos de la cola."""
+    jobs: List[Tuple[Job, Dict[str, str]]] = []
+    for n in notifications:
+        sub = _get(externo_id=n.get("subscriptionId")) if n.get("subscriptionId") else None
+        if sub is None or not sub.secreto or not hmac.compare_digest(str(n.get("clientState") or ""), sub.secreto):
+            log.warning("Notificación de Graph descartada (subscription %s desconocida o clientState inválido)",
+                        n.get("subscriptionId"))
+            continue
+        event = n.get("lifecycleEvent")
+        if event in ("reauthorizationRequired", "subscriptionRemoved"):
+            jobs.append((("renew", sub.id), {}))
+        elif event == "missed" or sub.recurso == "mscal":
+            # el calendario del día es una sola llamada: se refresca completo
+            jobs.extend((("refresh", sub.user_id, f), {}) for f in COVERS[sub.recurso])
+        elif event is None:
+            mid = (n.get("resourceData") or {}).get("id")
+            if mid:
+                jobs.append((("graph_mail", sub.user_id), {mid: n.get("changeType", "updated")}))
+    return jobs
+
+def route_gmail(email: str, history_id: Optional[int]) -> List[Job]:
+    sub = _get(recurso="gmail", cuenta=email.lower())
+    if sub is None:
+        return []
+    if sub.cursor and history_id is not None and history_id <= int(sub.cursor):
+        return []  # ya aplicado (Pub/Sub entrega al menos una vez)
+    return [("gmail", sub.user_id)]
+
+# ------------------------------------------------------------------
+# Aplicación incremental al espejo
+# ------------------------------------------------------------------
+def _refresh_if_missing(user_id: int, fuente: str, **changes) -> List[Job]:
+    return [] if mirror.patch(user_id, fuente, **changes) else [("refresh", user_id, fuente)]
+
+def apply_gmail(user_id: int) -> List[Job]:
+    from ..api import google as g
+    sub = _get(user_id=user_id, recurso="gmail")
+    creds = g.load_creds(user_id)
+    if sub is None or creds is None:
+        return []
+    try:
+        records, latest = g.gmail_history(creds, sub.cursor)
+    except Exception as e:
+        if status_code(e) != 404:
+            raise
+        # historyId fuera de la ventana de Gmail: se rehace el snapshot completo
+        _upsert(user_id, "google", "gmail", cursor=str(g.gmail_profile(creds)["historyId"]))
+        return [("refresh", user_id, f) for f in COVERS["gmail"]]
+
+    # estado final de cada mensaje tocado: (tipo, labelIds)
+    final: Dict[str, Tuple[str, List[str]]] = {}
+    for h in records:
+        for kind in ("messagesAdded", "messagesDeleted", "labelsAdded", "labelsRemoved"):
+            for e in h.get(kind, []):
+                m = e["message"]
+                prev = final.get(m["id"], ("",))[0]
+                if kind == "messagesDeleted":
+                    tipo = "deleted"
+                elif kind == "messagesAdded" or prev == "added":
+                    tipo = "added"
+                else:
+                    tipo = "changed"
+                final[m["id"]] = (tipo, m.get("labelIds", []))
+
+    service = g.build_service("gmail", "v1", creds) if final else None
+    added, updated, unread = [], [], []
+    removed, read = set(), set()
+    for mid, (tipo, labels) in final.items():
+        if tipo == "deleted" or "INBOX" not in labels:
+            removed.add(mid)
+            continue
+        if "UNREAD" not in labels:
+            read.add(mid)
+            if tipo == "changed":
+                continue  # marcado como leído: no hace falta traerlo
+        try:
+            m = g.gmail_get(service, mid)
+        except Exception as e:
+            if status_code(e) != 404:
+                raise
+            removed.add(mid)
+            continue
+        item = g.gmail_item(m)
+        (added if tipo == "added" else updated).append(item)
+        if "UNREAD" in m.get("labelIds", []):
+            unread.append(item)
+
+    # history viene del más viejo al más nuevo; el espejo, al revés
+    follow = _refresh_if_missing(user_id, "gmail", added=added[::-1], updated=updated, removed=removed)
+    follow += _refresh_if_missing(user_id, "gmail_unread", added=unread[::-1], removed=removed | read)
+    if latest:
+        _upsert(user_id, "google", "gmail", cursor=str(latest))
+    return follow
+
+def apply_graph_mail(user_id: int, changes: Dict[str, str]) -> List[Job]:
+    from ..api import microsoft as ms
+    access = ms.ensure_access_token(user_id)
+    added, updated, unread = [], [], []
+    removed, read = set(), set()
+    for mid, change in changes.items():
+        m = None if change == "deleted" else ms.fetch_message(access, mid)
+        if m is None:
+            removed.add(mid)
+            continue
+        item = ms.mail_item(m)
+        (added if change == "created" else updated).append(item)
+        if item["isRead"]:
+            read.add(mid)
+        else:
+            unread.append(item)
+    newest_first = lambda i: i.get("date") or ""
+    added.sort(key=newest_first, reverse=True)
+    unread.sort(key=newest_first, reverse=True)
+    follow = _refresh_if_missing(user_id, "outlook_mail", added=added, updated=updated, removed=removed)
+    follow += _refresh_if_missing(user_id, "outlook_unread", added=unread, removed=removed | read)
+    return follow
+
+# ------------------------------------------------------------------
+# Cola
+# ------------------------------------------------------------------
+class PushQueue:
+    """
+    Cola en proceso con coalescencia: mientras un trabajo espera, las notificaciones
+    nuevas con la misma clave se funden en él (una ráfaga de correos = una history.list).
+    """
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Dict[Job, Dict[str, str]] = {}
+        # clave -> [lock, workers que lo tienen o esperan]; se borra al quedar sin nadie (no crece sin fin)
+        self._locks: Dict[Job, list] = {}
+        self._attempts: Dict[Job, int] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {"recibidos": 0, "fusionados": 0, "procesados": 0, "fallidos": 0, "reintentos": 0, "abandonados": 0}
+
+    @property
+    def running(self) -> bool:
+        return any(not t.done() for t in self._tasks)
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(max(1, settings.PUSH_WORKERS))]
+        self._tasks.append(asyncio.create_task(self._renew_loop()))
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def put(self, key: Job, changes: Optional[Dict[str, str]] = None):
+        self.stats["recibidos"] += 1
+        if key in self._pending:
+            self._pending[key].update(changes or {})
+            self.stats["fusionados"] += 1
+            return
+        self._pending[key] = dict(changes or {})
+        self._queue.put_nowait(key)
+
+    async def join(self):
+        """Espera a que se vacíe la cola (bench / pruebas locales)."""
+        await self._queue.join()
+
+    async def _worker(self):
+        while True:
+            key = await self._queue.get()
+            changes: Dict[str, str] = {}
+            try:
+                # dos workers nunca aplican la misma clave a la vez (p.ej. el cursor de Gmail)
+                async with self._key_lock(key):
+                    changes = self._pending.pop(key, {})
+                    for follow in await self._process(key, changes):
+                        self.put(follow)
+                self._attempts.pop(key, None)
+                self.stats["procesados"] += 1
+            except Exception as e:
+                self.stats["fallidos"] += 1
+                self._retry(key, changes, e)
+            finally:
+                self._queue.task_done()
+
+    @asynccontextmanager
+    async def _key_lock(self, key: Job) -> AsyncIterator[None]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def _retry(self, key: Job, changes: Dict[str, str], error: Exception):
+        n = self._attempts.get(key, 0) + 1
+        if n < RETRY_MAX_ATTEMPTS:
+            self._attempts[key] = n
+            delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (n - 1))
+            log.warning("Trabajo push %s falló (%s); reintento %d en %.0f s", key, error, n, delay)
+            self.stats["reintentos"] += 1
+            asyncio.get_running_loop().call_later(delay, self._requeue, key, changes)
+            return
+        self._attempts.pop(key, None)
+        self.stats["abandonados"] += 1
+        # los cambios de Graph / el history de Gmail se pierden: se rehace el snapshot de esas fuentes.
+        # Un refresh o un renew no tienen más red que el polling de respaldo y el loop de renovación
+        follow = [("refresh", key[1], f) for f in FALLBACK_SOURCES.get(key[0], ())]
+        log.error("Trabajo push %s abandonado tras %d intentos (%s)%s", key, n, error,
+                  "; se refresca el espejo" if follow else "")
+        for job in follow:
+            self.put(job)
+
+    def _requeue(self, key: Job, changes: Dict[str, str]):
+        if key in self._pending:
+            # llegó otra notificación mientras esperaba: se funden (lo más nuevo gana)
+            self._pending[key] = {**changes, **self._pending[key]}
+            return
+        self._pending[key] = dict(changes)
+        self._queue.put_nowait(key)
+
+    async def _process(self, key: Job, changes: Dict[str, str]) -> List[Job]:
+        kind, args = key[0], key[1:]
+        if kind != "renew":
+            current_account.set(args[0])  # rate limit por cuenta (core/resilience.py)
+        if kind == "refresh":
+            if args[1] == "mscal":  # el cambio puede ser de otro día: se descartan los cubos de Outlook
+                calendar.invalidate(args[0], "microsoft")
+            await scheduler.sync_once(*args)
+            return []
+        if kind == "gmail":
+            return await asyncio.to_thread(apply_gmail, *args)
+        if kind == "graph_mail":
+            return await asyncio.to_thread(apply_graph_mail, *args, changes)
+        if kind == "renew":
+            return await asyncio.to_thread(renew, *args)
+        raise ValueError(f"trabajo push desconocido: {kind}")
+
+    async def _renew_loop(self):
+        while True:
+            try:
+                for sub_id in await asyncio.to_thread(expiring):
+                    self.put(("renew", sub_id))
+            except Exception as e:
+                log.warning("No se pudieron revisar las suscripciones por vencer: %s", e)
+            await asyncio.sleep(settings.PUSH_RENEW_CHECK_SECONDS)
+
+queue = PushQueue()
+
+@metrics.register_collector
+def _push_metrics():
+    if not queue.running:
+        return []
+    lines = metrics.gauge_lines("garimind_push_queue_depth", "Trabajos push pendientes", [({}, queue.depth())])
+    lines.extend(metrics.counter_lines(
+        "garimind_push_jobs_total", "Notificaciones push recibidas, fusionadas, procesadas, fallidas, "
+        "reintentadas y abandonadas tras agotar los intentos",
+        [({"estado": k}, v) for k, v in queue.stats.items()],
+    ))
+    return lines
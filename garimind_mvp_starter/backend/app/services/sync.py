@@ -0,0 +1,157 @@
+# backend/app/services/sync.py
+# Scheduler asyncio (en proceso) que sincroniza cada (usuario, fuente) conectado
+# hacia el espejo local (services/mirror.py). Un solo despachador con un heap de
+# vencimientos: no hay una tarea por usuario, y SYNC_CONCURRENCY acota las llamadas.
+import asyncio
+import heapq
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from ..core.config import settings
+from ..core.resilience import current_account, status_code
+from . import calendar, credentials, drive, mirror
+
+# Backoff base (segundos) tras el primer error de un proveedor
+BACKOFF_BASE_SECONDS = 15
+# Cada cuánto se buscan usuarios que acaban de conectar un proveedor
+USERS_REFRESH_SECONDS = 60
+
+# Las integraciones se importan al usarlas: con GOOGLE_ENABLED / MICROSOFT_ENABLED en false su
+# módulo (y sus dependencias) no se carga nunca (ver main.py)
+def _google(**kw):
+    def run(user_id: int):
+        from ..api import google as g
+        creds = g.load_creds(user_id)
+        return g.fetch_gmail(creds, settings.SYNC_MAX_ITEMS, **kw) if creds else None
+    return run
+
+def _microsoft(**kw):
+    def run(user_id: int):
+        from ..api import microsoft as ms
+        if not ms.load_token(user_id):
+            return None
+        return ms.fetch_mail(ms.ensure_access_token(user_id), settings.SYNC_MAX_ITEMS, **kw)
+    return run
+
+PROVIDER_ENABLED = {"google": settings.GOOGLE_ENABLED, "microsoft": settings.MICROSOFT_ENABLED}
+
+# fuente -> (proveedor, fetcher). El fetcher devuelve None si el proveedor no está conectado.
+ALL_SOURCES: Dict[str, Tuple[str, Callable[[int], Optional[List[Dict[str, Any]]]]]] = {
+    "gmail": ("google", _google()),
+    "gmail_unread": ("google", _google(unread=True)),
+    "gcal": ("google", calendar.today_source("google")),  # cubo de hoy de services/calendar.py
+    "drive": ("google", drive.sync),  # changes.list sobre el espejo de services/drive.py
+    "outlook_mail": ("microsoft", _microsoft()),
+    "outlook_unread": ("microsoft", _microsoft(unread=True)),
+    "mscal": ("microsoft", calendar.today_source("microsoft")),
+}
+SOURCES = {k: v for k, v in ALL_SOURCES.items() if PROVIDER_ENABLED[v[0]]}
+
+def poll_interval(user_id: int, fuente: str) -> int:
+    """Con push activo (services/push.py) la fuente solo se consulta como red de seguridad."""
+    if settings.PUSH_ENABLED:
+        from . import push  # push importa este módulo
+        if push.covered(user_id, fuente):
+            return settings.PUSH_FALLBACK_POLL_SECONDS
+    return settings.SYNC_INTERVAL_SECONDS
+
+class SyncScheduler:
+    def __init__(self, sources=SOURCES):
+        self.sources = sources
+        self.next_run: Dict[Tuple[int, str], float] = {}  # (usuario, fuente) -> time.time()
+        self._heap: List[Tuple[float, int, str]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._users_checked_at = 0.0
+        self._failures: Dict[Tuple[int, str], int] = {}        # (usuario, proveedor) -> errores consecutivos
+        self._backoff_until: Dict[Tuple[int, str], float] = {}  # (usuario, proveedor) -> hasta cuándo no se consulta
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._sem = asyncio.Semaphore(max(1, settings.SYNC_CONCURRENCY))
+        self._task = asyncio.create_task(self._dispatch())
+
+    async def stop(self):
+        tasks = [t for t in [self._task, *self._inflight] if t is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._inflight.clear()
+
+    def _jitter(self) -> float:
+        return random.uniform(0, settings.SYNC_JITTER_SECONDS)
+
+    def _schedule(self, user_id: int, fuente: str, delay: float):
+        due = time.time() + delay
+        self.next_run[(user_id, fuente)] = due
+        heapq.heappush(self._heap, (due, user_id, fuente))
+
+    async def refresh_users(self):
+        """Agenda las fuentes de usuarios que conectaron un proveedor desde la última vuelta."""
+        self._users_checked_at = time.monotonic()
+        for proveedor in sorted({p for p, _ in self.sources.values()}):
+            for user_id in await asyncio.to_thread(credentials.users_with, proveedor):
+                for fuente, (p, _) in self.sources.items():
+                    # arranque escalonado para no pegarle a todos los proveedores a la vez
+                    if p == proveedor and (user_id, fuente) not in self.next_run:
+                        self._schedule(user_id, fuente, self._jitter())
+
+    async def _dispatch(self):
+        while True:
+            refresh_in = self._users_checked_at + USERS_REFRESH_SECONDS - time.monotonic()
+            if refresh_in <= 0:
+                await self.refresh_users()
+                continue
+            if not self._heap or self._heap[0][0] > time.time():
+                wait = self._heap[0][0] - time.time() if self._heap else refresh_in
+                await asyncio.sleep(min(wait, refresh_in))
+                continue
+            _, user_id, fuente = heapq.heappop(self._heap)
+            wait = self._backoff_until.get((user_id, self.sources[fuente][0]), 0) - time.time()
+            if wait > 0:
+                self._schedule(user_id, fuente, wait + self._jitter())
+                continue
+            await self._sem.acquire()
+            t = asyncio.create_task(self._run(user_id, fuente))
+            self._inflight.add(t)
+            t.add_done_callback(self._inflight.discard)
+
+    async def _run(self, user_id: int, fuente: str):
+        try:
+            delay = await self.sync_once(user_id, fuente)
+        finally:
+            self._sem.release()
+        self._schedule(user_id, fuente, delay)
+
+    async def sync_once(self, user_id: int, fuente: str) -> float:
+        """Sincroniza una fuente de un usuario y devuelve en cuántos segundos volver a intentarlo."""
+        proveedor, fetch = self.sources[fuente]
+        key = (user_id, proveedor)
+        current_account.set(user_id)  # rate limit por cuenta (core/resilience.py)
+        try:
+            items = await asyncio.to_thread(fetch, user_id)
+            if items is not None:
+                await asyncio.to_thread(mirror.write, user_id, fuente, items)
+        except Exception as e:
+            n = self._failures[key] = self._failures.get(key, 0) + 1
+            code = status_code(e)
+            await asyncio.to_thread(mirror.record_error, user_id, fuente, f"{code or ''} {e}".strip())
+            # 429/503: el proveedor nos está frenando, retrocedemos más agresivo
+            exp = n + 2 if code in (429, 503) else n - 1
+            backoff = min(settings.SYNC_MAX_BACKOFF_SECONDS, BACKOFF_BASE_SECONDS * 2 ** exp)
+            self._backoff_until[key] = time.time() + backoff
+            return backoff + self._jitter()
+        self._failures[key] = 0
+        if settings.PUSH_ENABLED:
+            return await asyncio.to_thread(poll_interval, user_id, fuente) + self._jitter()
+        return settings.SYNC_INTERVAL_SECONDS + self._jitter()
+
+scheduler = SyncScheduler()
@@ -0,0 +1,133 @@
+# backend/app/services/tool_output.py
+# Compactación de las salidas de herramientas antes de devolvérselas al modelo (api/ai.py):
+# esquema por herramienta con solo los campos útiles, JSON compacto (no el repr de Python),
+# resumen determinista de las listas largas y recorte a un presupuesto de tokens.
+import logging
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from ..core import metrics
+from ..core.config import settings
+
+try:  # tokenizador real si está instalado; si no, ~4 bytes por token
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+log = logging.getLogger("garimind.ai")
+
+TOKENS = metrics.histogram(
+    "garimind_ai_tool_tokens", "Tokens de la salida de cada herramienta antes y después de compactarla",
+    buckets=(100, 250, 500, 1000, 2000, 5000, 10000, 25000, 50000, 100000),
+)
+
+_encoding = None
+
+def count_tokens(text: str) -> int:
+    global _encoding
+    if tiktoken is None:
+        return math.ceil(len(text.encode()) / 4)
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("o200k_base")
+    return len(_encoding.encode(text))
+
+@dataclass(frozen=True)
+class Schema:
+    fields: Tuple[str, ...]
+    max_chars: Dict[str, int] = field(default_factory=dict)  # textos largos (snippet, asunto) recortados
+    summary: Optional[Callable[[List[Dict[str, Any]]], Dict[str, Any]]] = None
+
+def _cut(v: Any, n: Optional[int]) -> Any:
+    return v[:n - 1] + "…" if n and isinstance(v, str) and len(v) > n else v
+
+def _mail_summary(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    senders = Counter(i.get("from") for i in items if i.get("from"))
+    return {"total": len(items), "no_leidos": sum(1 for i in items if i.get("isRead") is False),
+            "remitentes": [[s, n] for s, n in senders.most_common(5)]}
+
+def _event_summary(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    starts = sorted(i["start"] for i in items if i.get("start"))
+    ends = sorted(i["end"] for i in items if i.get("end"))
+    return {"total": len(items), "primero": starts[0] if starts else None, "ultimo_fin": ends[-1] if ends else None}
+
+MAIL = Schema(("from", "subject", "date", "isRead", "snippet"), {"subject": 120, "snippet": 160}, _mail_summary)
+EVENT = Schema(("title", "start", "end", "allDay", "location"), {"title": 120, "location": 80}, _event_summary)
+FILE = Schema(("name", "modifiedTime"), {"name": 120}, lambda items: {"total": len(items)})
+
+# herramienta -> {clave de la salida: esquema de sus items}. Las demás claves pasan tal cual.
+TOOL_SCHEMAS: Dict[str, Dict[str, Schema]] = {
+    "get_today_unified": {"gmail": MAIL, "outlook_mail": MAIL, "gcal": EVENT, "mscal": EVENT, "drive": FILE},
+}
+
+def source_fields(tool: str) -> Optional[str]:
+    """Campos que la herramienta debe pedir al backend (`?fields=`): lo que el esquema va a conservar."""
+    schemas = TOOL_SCHEMAS.get(tool)
+    if not schemas:
+        return None
+    return ",".join(sorted({f for s in schemas.values() for f in s.fields}))
+
+def _shape(tool: str, output: Any) -> Tuple[Any, Dict[str, List[Dict[str, Any]]]]:
+    """Aplica el esquema: devuelve el resto de la salida y las listas compactadas por clave."""
+    schemas = TOOL_SCHEMAS.get(tool)
+    if not schemas or not isinstance(output, dict):
+        return output, {}
+    rest, lists = {}, {}
+    for key, value in output.items():
+        schema = schemas.get(key)
+        if schema is None or not isinstance(value, list):
+            rest[key] = _cut(value, 300)  # errores por bloque, etc.
+            continue
+        lists[key] = [
+            {f: _cut(i[f], schema.max_chars.get(f)) for f in schema.fields if i.get(f) not in (None, "")}
+            for i in value if isinstance(i, dict)
+        ]
+        if settings.AI_TOOL_OUTPUT_SUMMARY and len(lists[key]) >= settings.AI_TOOL_OUTPUT_SUMMARY_MIN_ITEMS:
+            rest[f"{key}_resumen"] = schema.summary(value) if schema.summary else {"total": len(value)}
+    return rest, lists
+
+def _encode(rest: Any, lists: Dict[str, List[Dict[str, Any]]], cap: Optional[int]) -> str:
+    if not lists:
+        return orjson.dumps(rest).decode()
+    out = dict(rest)
+    for key, items in lists.items():
+        kept = items if cap is None else items[:cap]
+        out[key] = kept
+        if len(kept) < len(items):
+            out[f"{key}_omitidos"] = len(items) - len(kept)
+    return orjson.dumps(out).decode()
+
+def compact(tool: str, output: Any, max_tokens: Optional[int] = None) -> str:
+    """
+    Salida de `tool` lista para el modelo, en JSON y dentro de `max_tokens`. El recorte es
+    determinista: se conserva el mismo número de items (los primeros, que son los más recientes)
+    en cada lista, el mayor que quepa; si ni sin items cabe, se corta el texto.
+    """
+    budget = max_tokens or settings.AI_TOOL_OUTPUT_MAX_TOKENS
+    rest, lists = _shape(tool, output)
+    text = _encode(rest, lists, None)
+    if lists and count_tokens(text) > budget:
+        lo, hi = 0, max(len(v) for v in lists.values())  # búsqueda binaria del tope por lista
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if count_tokens(_encode(rest, lists, mid)) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        text = _encode(rest, lists, lo)
+    if count_tokens(text) > budget:
+        text = text[:budget * 3] + "…[truncado]"  # ~3 caracteres por token deja margen
+    return text
+
+def compact_logged(tool: str, output: Any) -> Tuple[str, Dict[str, int]]:
+    """compact() registrando tokens antes (lo que se mandaba: el repr) y después."""
+    antes = count_tokens(str(output))
+    text = compact(tool, output)
+    despues = count_tokens(text)
+    TOKENS.observe(antes, tool=tool, etapa="antes")
+    TOKENS.observe(despues, tool=tool, etapa="despues")
+    log.info("Salida de %s: %d → %d tokens", tool, antes, despues)
+    return text, {"antes": antes, "despues": despues}
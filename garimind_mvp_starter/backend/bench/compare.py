@@ -0,0 +1,52 @@
+# backend/bench/compare.py
+# Compara dos JSON de bench.run (p.ej. main vs. tu rama) y marca regresiones.
+#
+#   python -m bench.compare base.json nuevo.json --threshold 0.15
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+def compare(base: dict, new: dict, threshold: float, metric: str = "p95_ms"):
+    regressions = []
+    rows = []
+    for db, res in new.get("results", {}).items():
+        base_eps = base.get("results", {}).get(db, {}).get("endpoints", {})
+        for name, cur in res.get("endpoints", {}).items():
+            old = base_eps.get(name)
+            if not old:
+                rows.append((db, name, None, cur.get(metric), None))
+                continue
+            a, b = old.get(metric), cur.get(metric)
+            delta = (b - a) / a if a and b is not None else None
+            rows.append((db, name, a, b, delta))
+            if delta is not None and delta > threshold:
+                regressions.append((db, name, a, b, delta))
+    return rows, regressions
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compara resultados de bench.run")
+    ap.add_argument("base")
+    ap.add_argument("new")
+    ap.add_argument("--metric", choices=METRICS, default="p95_ms")
+    ap.add_argument("--threshold", type=float, default=0.10, help="regresión relativa tolerada (0.10 = 10%%)")
+    args = ap.parse_args(argv)
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    rows, regressions = compare(base, new, args.threshold, args.metric)
+    print(f"{base['meta'].get('commit', '?')[:10]} → {new['meta'].get('commit', '?')[:10]}  ({args.metric})")
+    for db, name, a, b, delta in rows:
+        d = f"{delta:+.1%}" if delta is not None else "n/a"
+        flag = "  ⚠️" if delta is not None and delta > args.threshold else ""
+        print(f"[{db}] {name:<26} {a!s:>10} → {b!s:>10}  {d:>8}{flag}")
+    if regressions:
+        print(f"{len(regressions)} regresiones por encima de {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+# backend/bench/drive.py
+# Espejo de Drive (services/drive.py) contra el fake de Google: cuántas llamadas a Drive cuestan
+# las lecturas de /api/google/drive/recent y /drive/search con el espejo (y sin él, listando
+# cada vez), cuántas cuesta cada vuelta del sync en estado estable, y cuánto tarda un cambio
+# (texto nuevo en un Doc) en aparecer en la búsqueda.
+#
+#   cd backend
+#   python -m bench.drive --files 500 --reads 200 --out drive-results.json
+import argparse
+import json
+import platform
+import shutil
+import tempfile
+import time
+from typing import Any, Dict
+
+import requests
+
+from .fakes import FakeServer, google_routes, start_fakes
+from .push import _wait
+from .run import Server, _git_meta, _write_fake_creds
+from .seed import reset_and_seed
+
+def _drive_calls(google: FakeServer) -> int:
+    # el mismo fake atiende Gmail y Calendar (que el sync también consulta): solo cuentan las rutas de Drive
+    return sum(n for route, n in google.by_route.items() if route.startswith(("GET /files", "GET /changes")))
+
+def _reads(s: requests.Session, url: str, n: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(n):
+        if i % 2:
+            s.get(url + "/api/google/drive/search", params={"q": "documento 1"}, timeout=10).raise_for_status()
+        else:
+            s.get(url + "/api/google/drive/recent", params={"limit": 20}, timeout=10).raise_for_status()
+    return round((time.perf_counter() - t0) * 1000 / n, 3)
+
+def run_case(fakes, google: FakeServer, mirror: bool, args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="garimind-drive-")
+    database_url = f"sqlite:///{workdir}/drive.db"
+    try:
+        reset_and_seed(database_url, proyectos=1, tareas=0, recuerdos=0)
+        _write_fake_creds(workdir)
+        env = {"SYNC_ENABLED": "true" if mirror else "false", "SYNC_INTERVAL_SECONDS": str(args.interval),
+               "SYNC_JITTER_SECONDS": "0", "DRIVE_INDEX_CONTENT": "true", "MICROSOFT_ENABLED": "false",
+               "PUSH_ENABLED": "false"}
+        out: Dict[str, Any] = {"espejo": mirror}
+        with Server(database_url, fakes, workdir, extra_env=env) as srv, requests.Session() as s:
+            if mirror:
+                t0 = time.perf_counter()
+                ok = _wait(lambda: s.get(srv.url + "/api/google/drive/search", params={"q": "comité"}, timeout=10).status_code == 200
+                           and int(s.get(srv.url + "/api/google/drive/recent", timeout=10).headers.get("X-Total-Count", 0)) >= args.files,
+                           timeout=120, every=0.2)
+                out["primer_sync_s"] = round(time.perf_counter() - t0, 3) if ok else None
+                docs = (args.files + 1) // 2  # los Google Docs del fake, que se exportan
+                ok = _wait(lambda: google.by_route.get("GET /files/*/export", 0) >= docs, timeout=300, every=0.2)
+                out["contenido_indexado_s"] = round(time.perf_counter() - t0, 3) if ok else None
+            calls0, t0 = _drive_calls(google), time.perf_counter()
+            if mirror:
+                out["lectura_ms"] = _reads(s, srv.url, args.reads)
+            else:  # sin espejo no hay búsqueda: solo recientes, listando en vivo
+                t1 = time.perf_counter()
+                for _ in range(args.reads):
+                    s.get(srv.url + "/api/google/drive/recent", params={"limit": 20}, timeout=10).raise_for_status()
+                out["lectura_ms"] = round((time.perf_counter() - t1) * 1000 / args.reads, 3)
+            elapsed = time.perf_counter() - t0
+            calls = _drive_calls(google) - calls0
+            out.update({"lecturas": args.reads, "llamadas_drive": calls, "segundos": round(elapsed, 3),
+                        "llamadas_por_lectura": round(calls / args.reads, 3)})
+            if mirror:
+                word = f"palabra{int(time.time())}"
+                t0 = time.perf_counter()
+                s.post(fakes["google"].url + "/_bench/drive/touch", json={"id": "f0", "text": f"Acta nueva con la {word}."},
+                       timeout=10).raise_for_status()
+                ok = _wait(lambda: any("fragmento" in f for f in s.get(
+                    srv.url + "/api/google/drive/search", params={"q": word}, timeout=10).json()), timeout=60, every=0.05)
+                out["cambio_visible_s"] = round(time.perf_counter() - t0, 3) if ok else None
+        return out
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark del espejo de Google Drive")
+    ap.add_argument("--files", type=int, default=500)
+    ap.add_argument("--reads", type=int, default=200)
+    ap.add_argument("--interval", type=int, default=2, help="SYNC_INTERVAL_SECONDS")
+    ap.add_argument("--google-latency-ms", type=float, default=80)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    fakes = start_fakes()
+    fakes["google"].stop()
+    google = fakes["google"] = FakeServer("google", google_routes(files=args.files), args.google_latency_ms).start()
+    results: Dict[str, Any] = {"meta": {"python": platform.python_version(), **_git_meta(), "args": vars(args)},
+                               "results": []}
+    try:
+        for mirror in (False, True):
+            results["results"].append(run_case(fakes, google, mirror, args))
+    finally:
+        for f in fakes.values():
+            f.stop()
+    out = json.dumps(results, indent=2, ensure_ascii=False)
+    print(out)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# backend/bench/enrich.py
+# Enriquecimiento de capturas (services/enrich.py) contra el fake de OpenAI: manda N capturas
+# seguidas y mide cuánto tarda en quedar todo enriquecido y cuántas llamadas al modelo costó,
+# para cada tamaño de lote. Con --batch-sizes 1 25 se ve lo que amortiza el lote.
+#
+#   cd backend
+#   python -m bench.enrich --captures 100 --batch-sizes 1 25 --out enrich-results.json
+import argparse
+import json
+import platform
+import shutil
+import tempfile
+import time
+from typing import Any, Dict
+
+import requests
+from sqlalchemy import create_engine, text
+
+from .fakes import start_fakes
+from .push import _wait
+from .run import Server, _git_meta
+from .seed import reset_and_seed
+
+def _pending(engine) -> int:
+    with engine.connect() as conn:
+        return sum(conn.execute(text(f"SELECT count(*) FROM {t} WHERE enriquecimiento = 'pendiente'")).scalar()
+                   for t in ("tareas", "recuerdos"))
+
+def run_case(fakes, batch_size: int, captures: int, use_model: bool) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="garimind-enrich-")
+    database_url = f"sqlite:///{workdir}/enrich.db"
+    try:
+        reset_and_seed(database_url, proyectos=10, tareas=0, recuerdos=0)
+        env = {"AI_ENABLED": "true", "ENRICH_BATCH_SIZE": str(batch_size), "ENRICH_LINGER_SECONDS": "0.05",
+               "ENRICH_USE_MODEL": "true" if use_model else "false"}
+        engine = create_engine(database_url)
+        with Server(database_url, fakes, workdir, extra_env=env) as srv, requests.Session() as s:
+            calls0 = fakes["openai"].requests
+            t0 = time.perf_counter()
+            for i in range(captures):
+                como = "recuerdo" if i % 3 == 0 else "tarea"
+                s.post(srv.url + "/api/inbox/capturar", json={"entrada": f"captura {i} urgente proyecto", "como": como},
+                       timeout=10).raise_for_status()
+            ok = _wait(lambda: _pending(engine) == 0, timeout=300, every=0.05)
+            seconds = time.perf_counter() - t0
+            calls = fakes["openai"].requests - calls0
+        engine.dispose()
+        return {"batch_size": batch_size, "modelo": use_model, "capturas": captures, "completo": ok,
+                "segundos": round(seconds, 3), "llamadas_modelo": calls,
+                "items_por_llamada": round(captures / calls, 2) if calls else None}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark del enriquecimiento de capturas")
+    ap.add_argument("--captures", type=int, default=100)
+    ap.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 25])
+    ap.add_argument("--openai-latency-ms", type=float, default=500)
+    ap.add_argument("--local", action="store_true", help="también el clasificador local (sin modelo)")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    fakes = start_fakes(openai_ms=args.openai_latency_ms)
+    results: Dict[str, Any] = {"meta": {"python": platform.python_version(), **_git_meta(), "args": vars(args)},
+                               "results": []}
+    try:
+        for size in args.batch_sizes:
+            results["results"].append(run_case(fakes, size, args.captures, use_model=True))
+        if args.local:
+            results["results"].append(run_case(fakes, max(args.batch_sizes), args.captures, use_model=False))
+    finally:
+        for f in fakes.values():
+            f.stop()
+    out = json.dumps(results, indent=2, ensure_ascii=False)
+    print(out)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(out)
+
+if __name__ == "__main__":
+    main()
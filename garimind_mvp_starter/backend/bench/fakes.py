@@ -0,0 +1,447 @@
+# backend/bench/fakes.py
+# Servidores HTTP locales que imitan Google (Gmail/Calendar/Drive), Microsoft Graph
+# y OpenAI Responses, con latencia configurable. Solo para benchmarks.
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+from urllib.request import Request, urlopen
+
+Route = Callable[[str, Dict[str, str], Optional[dict]], Tuple[int, Any]]
+
+def _qs(query: str) -> Dict[str, str]:
+    return {k: v[-1] for k, v in parse_qs(query).items()}
+
+def _iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+class FakeServer:
+    """Un ThreadingHTTPServer en 127.0.0.1:<puerto libre> que responde vía `route`."""
+
+    def __init__(self, name: str, route: Route, latency_ms: float = 0.0, jitter: float = 0.2, seed: int = 42,
+                 port: int = 0):
+        self.name = name
+        self.route = route
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.requests = 0
+        self.by_route: Dict[str, int] = {}  # "GET /changes" -> pedidos (sin ids: /files/<id>/export -> /files/*/export)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._failures: List[Tuple[int, Optional[str]]] = []  # respuestas de error pendientes (fail)
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self, method: str):
+                parsed = urlparse(self.path)
+                body = None
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    body = json.loads(self.rfile.read(length) or b"null")
+                fake._sleep(method, parsed.path)
+                injected = fake._next_failure()
+                if injected is not None:
+                    status, retry_after = injected
+                    data = json.dumps({"error": {"code": status, "message": "falla inyectada"}}).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    if retry_after is not None:
+                        self.send_header("Retry-After", retry_after)
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+                status, payload = fake.route(f"{method} {parsed.path}", _qs(parsed.query), body)
+                if isinstance(payload, dict) and str(payload.get("@odata.nextLink", "")).startswith("/"):
+                    payload["@odata.nextLink"] = fake.url + payload["@odata.nextLink"]  # Graph lo da absoluto
+                raw = isinstance(payload, bytes)  # contenido de un archivo (export de Drive)
+                data = payload if raw else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain; charset=utf-8" if raw else "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=f"fake-{name}", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _sleep(self, method: str, path: str):
+        route = method + " " + "/".join("*" if any(c.isdigit() for c in p) else p for p in path.split("/"))
+        with self._lock:
+            self.requests += 1
+            self.by_route[route] = self.by_route.get(route, 0) + 1
+            factor = 1 + self._rng.uniform(-self.jitter, self.jitter)
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms * factor / 1000)
+
+    def fail(self, status: int, count: int = 1, retry_after: Optional[float] = None):
+        """Los próximos `count` pedidos responden `status` (con Retry-After si se da)."""
+        header = None if retry_after is None else f"{retry_after:g}"
+        with self._lock:
+            self._failures.extend([(status, header)] * count)
+
+    def _next_failure(self) -> Optional[Tuple[int, Optional[str]]]:
+        with self._lock:
+            return self._failures.pop(0) if self._failures else None
+
+    def start(self) -> "FakeServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+# ------------------------------------------------------------------
+# Google: con client_options.api_endpoint, googleapiclient arma
+# <endpoint>/gmail/v1/..., <endpoint>/calendars/..., <endpoint>/files, <endpoint>/changes
+# ------------------------------------------------------------------
+def _parse_iso(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def _events_in(q_min: Optional[str], q_max: Optional[str], n: int, provider: str) -> List[Dict[str, Any]]:
+    """`n` eventos por día UTC que se cruzan con [q_min, q_max) (sin ventana: los de hoy)."""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if not q_min or not q_max:
+        return [_event(i, today, provider) for i in range(n)]
+    start, end = _parse_iso(q_min), _parse_iso(q_max)
+    day, out = start.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0), []
+    while day < end:
+        for i in range(n):
+            ev = _event(i, day, provider)
+            ev_start = day.replace(hour=8) + timedelta(minutes=45 * i)
+            if ev_start < end and ev_start + timedelta(minutes=30) > start:
+                out.append(ev)
+        day += timedelta(days=1)
+    return out
+
+def _event(i: int, day: datetime, provider: str) -> Dict[str, Any]:
+    start = day.replace(hour=8, minute=0) + timedelta(minutes=45 * i)
+    end = start + timedelta(minutes=30)
+    if provider == "google":
+        return {
+            "kind": "calendar#event", "id": f"gev{i}-{day:%Y%m%d}", "status": "confirmed",
+            "htmlLink": f"https://calendar.google.com/event?eid=gev{i}-{day:%Y%m%d}",
+            "created": _iso(day), "updated": _iso(day),
+            "summary": f"Reunión {i}", "description": "Lorem ipsum " * 20,
+            "creator": {"email": "cesar@example.com"}, "organizer": {"email": "cesar@example.com"},
+            "start": {"dateTime": _iso(start)}, "end": {"dateTime": _iso(end)},
+            "attendees": [{"email": f"persona{j}@example.com", "responseStatus": "accepted"} for j in range(5)],
+            "reminders": {"useDefault": True}, "eventType": "default",
+        }
+    return {
+        "id": f"msev{i}-{day:%Y%m%d}", "subject": f"Comité {i}", "bodyPreview": "Lorem ipsum " * 20,
+        "start": {"dateTime": start.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "UTC"},
+        "end": {"dateTime": end.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "UTC"},
+        "location": {"displayName": "Teams"}, "isOnlineMeeting": True, "webLink": f"https://outlook.office.com/{i}",
+        "organizer": {"emailAddress": {"name": "César", "address": "cesar@example.com"}},
+        "attendees": [{"emailAddress": {"address": f"persona{j}@example.com"}, "type": "required"} for j in range(5)],
+    }
+
+def _google_fields(obj: Any, fields: Optional[str]) -> Any:
+    """Proyección `fields=` de Google (subconjunto: "a,b/c,items(x,y/z)"); basta para medir payloads."""
+    if not fields:
+        return obj
+    spec: Dict[str, Optional[str]] = {}
+    depth, token, sub = 0, "", ""
+    for ch in fields + ",":
+        if ch == "(" and depth == 0:
+            depth, sub = 1, ""
+        elif ch == "(":
+            depth += 1
+            sub += ch
+        elif ch == ")":
+            depth -= 1
+            if depth:
+                sub += ch
+        elif depth:
+            sub += ch
+        elif ch == ",":
+            name = token.strip()
+            if name:
+                head, _, rest = name.partition("/")
+                spec[head] = sub or rest or None
+            token, sub = "", ""
+        else:
+            token += ch
+    out = {}
+    for k, inner in spec.items():
+        if k not in obj:
+            continue
+        v = obj[k]
+        if inner and isinstance(v, list):
+            v = [_google_fields(x, inner) for x in v]
+        elif inner and isinstance(v, dict):
+            v = _google_fields(v, inner)
+        out[k] = v
+    return out
+
+def _graph_select(item: Dict[str, Any], select: Optional[str]) -> Dict[str, Any]:
+    if not select:
+        return item
+    keep = {"id", *select.split(",")}
+    return {k: v for k, v in item.items() if k in keep}
+
+DRIVE_DOC = "application/vnd.google-apps.document"
+
+def _drive_file(i: int, modified: datetime) -> Dict[str, Any]:
+    doc = i % 2 == 0  # la mitad son Google Docs (se exportan como texto), la otra .docx
+    return {"id": f"f{i}", "name": f"Documento {i}" + ("" if doc else ".docx"),
+            "mimeType": DRIVE_DOC if doc else "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            "modifiedTime": _iso(modified), "webViewLink": f"https://drive.google.com/{i}", "trashed": False,
+            **({} if doc else {"size": str(20_000 + i)})}
+
+def google_routes(events: int = 8, files: int = 50, messages: int = 5000) -> Route:
+    # historyId del buzón: POST /_bench/gmail/new simula la llegada de un correo
+    state = {"history_id": 1000}
+    lock = threading.Lock()
+    # Drive: archivos, su texto y el log de cambios (el pageToken es la posición en el log).
+    # POST /_bench/drive/touch {"id", "text"} modifica (o crea) un archivo y /_bench/drive/delete lo borra.
+    t0 = datetime.now(timezone.utc).replace(microsecond=0)
+    drive = {f"f{i}": _drive_file(i, t0 - timedelta(minutes=i)) for i in range(files)}
+    texts = {fid: f"{f['name']}: acta de la reunión del comité, punto {fid}. " * 20 for fid, f in drive.items()}
+    changes: list = []
+
+    def drive_route(key: str, q: Dict[str, str], body: Optional[dict]):
+        with lock:
+            if key == "POST /_bench/drive/touch":
+                fid = body.get("id") or f"f{len(drive)}"
+                f = drive.get(fid) or _drive_file(len(drive), t0)
+                drive[fid] = dict(f, id=fid, name=body.get("name", f["name"]),
+                                  modifiedTime=_iso(max(datetime.now(timezone.utc), t0 + timedelta(seconds=len(changes) + 1))))
+                texts[fid] = body.get("text", texts.get(fid, ""))
+                changes.append({"fileId": fid, "removed": False, "file": drive[fid]})
+                return 200, drive[fid]
+            if key == "POST /_bench/drive/delete":
+                drive.pop(body["id"], None)
+                changes.append({"fileId": body["id"], "removed": True})
+                return 200, {"ok": True}
+            if key == "GET /changes/startPageToken":
+                return 200, {"startPageToken": str(len(changes))}
+            if key == "GET /changes":
+                if not q.get("pageToken", "").isdigit() or int(q["pageToken"]) > len(changes):
+                    return 400, {"error": {"code": 400, "message": "Invalid Value", "errors": [{"reason": "invalid"}]}}
+                start, size = int(q["pageToken"]), int(q.get("pageSize", 100))
+                page = changes[start:start + size]
+                more = {"nextPageToken": str(start + size)} if start + size < len(changes) else {"newStartPageToken": str(len(changes))}
+                return 200, _google_fields({"changes": page, **more}, q.get("fields"))
+            if key == "GET /files":
+                offset, size = int(q.get("pageToken") or 0), int(q.get("pageSize", 10))
+                ordered = sorted(drive.values(), key=lambda f: f["modifiedTime"], reverse=True)
+                more = {"nextPageToken": str(offset + size)} if offset + size < len(ordered) else {}
+                return 200, _google_fields({"files": ordered[offset:offset + size], **more}, q.get("fields"))
+            if key.startswith("GET /files/") and key.endswith("/export"):
+                fid = key.split("/")[2]
+                if fid not in drive:
+                    return 404, {"error": {"code": 404, "message": "File not found"}}
+                return 200, texts[fid].encode()
+        return None
+
+    def route(key: str, q: Dict[str, str], body: Optional[dict]):
+        now = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        if key == "POST /_bench/gmail/new":
+            with lock:
+                state["history_id"] += 1
+                return 200, {"historyId": str(state["history_id"])}
+        if key == "GET /gmail/v1/users/me/profile":
+            return 200, {"emailAddress": "cesar@example.com", "historyId": str(state["history_id"])}
+        if key == "POST /gmail/v1/users/me/watch":
+            expiration = int((time.time() + 7 * 86400) * 1000)
+            return 200, {"historyId": str(state["history_id"]), "expiration": str(expiration)}
+        if key == "GET /gmail/v1/users/me/history":
+            start, latest = int(q["startHistoryId"]), state["history_id"]
+            return 200, {"historyId": str(latest), "history": [
+                {"id": str(h), "messagesAdded": [{"message": {"id": f"gmpush{h}", "threadId": f"gmpush{h}", "labelIds": ["INBOX", "UNREAD"]}}]}
+                for h in range(start + 1, latest + 1)
+            ]}
+        if key == "GET /gmail/v1/users/me/messages":
+            # `messages` mensajes en el buzón; el pageToken es la posición
+            start = int(q.get("pageToken") or 0)
+            end = min(start + min(int(q.get("maxResults", 100)), 500), messages)
+            page = {"messages": [{"id": f"gm{i}", "threadId": f"gt{i}"} for i in range(start, end)],
+                    "resultSizeEstimate": messages}
+            if end < messages:
+                page["nextPageToken"] = str(end)
+            return 200, _google_fields(page, q.get("fields"))
+        if key.startswith("GET /gmail/v1/users/me/messages/"):
+            mid = key.rsplit("/", 1)[-1]
+            return 200, _google_fields({
+                "id": mid, "threadId": mid, "labelIds": ["INBOX", "UNREAD"], "snippet": "Hola César, " + "texto " * 30,
+                "sizeEstimate": 4096, "historyId": str(state["history_id"]), "internalDate": "1762178400000",
+                "payload": {"mimeType": "multipart/alternative", "headers": [
+                    {"name": "From", "value": "Remitente <remitente@example.com>"},
+                    {"name": "Subject", "value": f"Asunto {mid}"},
+                    {"name": "Date", "value": "Mon, 3 Nov 2025 09:00:00 -0500"},
+                ]},
+            }, q.get("fields"))
+        if key == "GET /calendars/primary/events":
+            items = _events_in(q.get("timeMin"), q.get("timeMax"), events, "google")
+            return 200, _google_fields({"kind": "calendar#events", "items": items}, q.get("fields"))
+        found = drive_route(key, q, body)
+        if found is not None:
+            return found
+        return 404, {"error": {"code": 404, "message": f"fake google: {key}"}}
+    return route
+
+def _graph_validate(url: str) -> bool:
+    """Como Graph al crear una subscription: POST notificationUrl?validationToken=... y espera el eco."""
+    token = f"val-{random.random()}"
+    sep = "&" if "?" in url else "?"
+    try:
+        with urlopen(Request(url + sep + urlencode({"validationToken": token}), data=b"", method="POST"), timeout=10) as r:
+            return r.status == 200 and r.read().decode() == token
+    except OSError:
+        return False
+
+def graph_routes(events: int = 8, messages: int = 5000) -> Route:
+    subscriptions: Dict[str, dict] = {}
+
+    def route(key: str, q: Dict[str, str], body: Optional[dict]):
+        now = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        if key == "POST /subscriptions":
+            if not _graph_validate(body["notificationUrl"]):
+                return 400, {"error": {"code": "ValidationError", "message": "notificationUrl no respondió el validationToken"}}
+            sub = dict(body, id=f"sub{len(subscriptions) + 1}")
+            subscriptions[sub["id"]] = sub
+            return 201, sub
+        if key.startswith("PATCH /subscriptions/"):
+            sub = subscriptions.get(key.rsplit("/", 1)[-1])
+            if sub is None:
+                return 404, {"error": {"code": "ResourceNotFound", "message": "subscription no existe"}}
+            sub.update(body or {})
+            return 200, sub
+        if key.startswith("GET /me/messages/"):
+            mid = key.rsplit("/", 1)[-1]
+            return 200, {
+                "id": mid, "subject": f"Asunto {mid}", "receivedDateTime": _iso(datetime.now(timezone.utc)),
+                "isRead": False, "bodyPreview": "Recién llegado " * 10,
+                "sender": {"emailAddress": {"name": "Remitente", "address": "remitente@example.com"}},
+            }
+        if key == "GET /me/messages":
+            top, skip = min(int(q.get("$top", 10)), 1000), int(q.get("$skip", 0))
+            end = min(skip + top, messages)
+            page: Dict[str, Any] = {"value": [{
+                "id": f"om{i}", "subject": f"Asunto Outlook {i}", "receivedDateTime": _iso(now), "isRead": i % 3 == 0,
+                "bodyPreview": "Vista previa " * 20,
+                "sender": {"emailAddress": {"name": "Remitente", "address": "remitente@example.com"}},
+            } for i in range(skip, end)]}
+            if end < messages:  # como Graph: el resto de la consulta con $skip avanzado
+                page["@odata.nextLink"] = "/me/messages?" + urlencode(dict(q, **{"$skip": str(end)}))
+            return 200, page
+        if key == "GET /me/calendarView":
+            items = _events_in(q.get("startDateTime"), q.get("endDateTime"), events, "microsoft")
+            return 200, {"value": [_graph_select(e, q.get("$select")) for e in items]}
+        return 404, {"error": {"code": "NotFound", "message": f"fake graph: {key}"}}
+    return route
+
+# Modelos pequeños: fracción de la latencia del grande (el enrutado de ai.reason se nota aquí)
+SMALL_MODEL_LATENCY = 0.35
+CACHE_MIN_TOKENS, CACHE_BLOCK = 1024, 128  # como la caché de prompts de OpenAI
+
+def _is_small(model: str) -> bool:
+    return "mini" in model or "nano" in model
+
+def openai_routes(latency_ms: float = 0.0, jitter: float = 0.2, seed: int = 44) -> Route:
+    """
+    Responses API con latencia por modelo y `cached_tokens` cuando un pedido repite el prefijo
+    (tools + primeros mensajes) de uno anterior del mismo modelo. Tokens ≈ bytes / 4.
+    """
+    rng = random.Random(seed)
+    seen: set = set()
+    lock = threading.Lock()
+
+    def route(key: str, q: Dict[str, str], body: Optional[dict]):
+        if key == "POST /v1/responses":
+            body = body or {}
+            model = body.get("model", "gpt-4o")
+            with lock:
+                factor = 1 + rng.uniform(-jitter, jitter)
+            if latency_ms > 0:
+                time.sleep(latency_ms * factor * (SMALL_MODEL_LATENCY if _is_small(model) else 1) / 1000)
+            msgs = body.get("input") or []
+            msgs = msgs if isinstance(msgs, list) else [msgs]
+            prefix = json.dumps([model, body.get("tools")], sort_keys=True)
+            sizes, digests = [], []
+            for m in msgs:
+                prefix += json.dumps(m, sort_keys=True)
+                sizes.append(len(prefix.encode()) // 4)
+                digests.append(hashlib.sha1(prefix.encode()).hexdigest())
+            total = sizes[-1] if sizes else len(prefix) // 4
+            with lock:
+                hit = max((n for n, d in zip(sizes, digests) if d in seen), default=0)
+                seen.update(digests)
+            cached = hit // CACHE_BLOCK * CACHE_BLOCK if hit >= CACHE_MIN_TOKENS else 0
+            text = "Respuesta simulada de Gari."
+            fmt = (body.get("text") or {}).get("format") or {}
+            if fmt.get("name") == "enriquecimiento":  # services/enrich.py: un resultado por item recibido
+                items = json.loads(msgs[-1]["content"]).get("items", []) if msgs else []
+                text = json.dumps({"items": [
+                    {"k": i["k"], "tags": ["fake"], "proyecto_id": None,
+                     "prioridad": "media" if i.get("tipo") == "tarea" else None,
+                     "tipo": "profesional" if i.get("tipo") == "recuerdo" else None} for i in items]})
+            return 200, {
+                "id": "resp_fake", "object": "response", "created_at": int(time.time()), "status": "completed",
+                "model": model, "error": None, "incomplete_details": None, "instructions": None, "metadata": {},
+                "parallel_tool_calls": True, "temperature": 0.2, "tool_choice": "auto", "tools": [], "top_p": 1.0,
+                "output": [{
+                    "type": "message", "id": "msg_fake", "role": "assistant", "status": "completed",
+                    "content": [{"type": "output_text", "text": text, "annotations": []}],
+                }],
+                "usage": {"input_tokens": total, "output_tokens": 12, "total_tokens": total + 12,
+                          "input_tokens_details": {"cached_tokens": cached}, "output_tokens_details": {"reasoning_tokens": 0}},
+            }
+        return 404, {"error": {"message": f"fake openai: {key}", "type": "invalid_request_error"}}
+    return route
+
+def start_fakes(google_ms: float = 0, graph_ms: float = 0, openai_ms: float = 0, seed: int = 42) -> Dict[str, FakeServer]:
+    return {
+        "google": FakeServer("google", google_routes(), google_ms, seed=seed).start(),
+        "graph": FakeServer("graph", graph_routes(), graph_ms, seed=seed + 1).start(),
+        "openai": FakeServer("openai", openai_routes(openai_ms, seed=seed + 2), seed=seed + 2).start(),
+    }
+
+if __name__ == "__main__":
+    # Un fake suelto para desarrollo sin credenciales, p. ej. OpenAI:
+    #   python -m bench.fakes openai --port 8089
+    #   OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=sk-fake uvicorn app.main:app
+    ap = argparse.ArgumentParser(description="Servidor fake local (Google, Graph u OpenAI)")
+    ap.add_argument("name", choices=["google", "graph", "openai"])
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--latency-ms", type=float, default=0)
+    args = ap.parse_args()
+    if args.name == "openai":
+        server = FakeServer("openai", openai_routes(args.latency_ms), port=args.port)
+    else:
+        server = FakeServer(args.name, google_routes() if args.name == "google" else graph_routes(), args.latency_ms,
+                            port=args.port)
+    print(f"fake {args.name} en {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
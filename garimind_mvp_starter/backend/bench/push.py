@@ -0,0 +1,148 @@
+# backend/bench/push.py
+# Ingesta push con payloads generados localmente: levanta el backend contra los fakes,
+# crea las suscripciones (el fake de Graph valida la notificationUrl como el real),
+# dispara notificaciones de Graph y de Gmail (formato Pub/Sub) y mide cuánto tarda cada
+# correo nuevo en verse en el espejo y cuántas llamadas al proveedor cuesta.
+#
+#   cd backend
+#   python -m bench.push --messages 50 --burst 20 --out push-results.json
+import argparse
+import base64
+import json
+import platform
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import requests
+from sqlalchemy import create_engine, text
+
+from .fakes import start_fakes
+from .run import Server, _git_meta, _percentile, _write_fake_creds
+from .seed import reset_and_seed
+
+PUSH_TOKEN = "bench-push-token"
+GMAIL_ACCOUNT = "cesar@example.com"  # el que devuelve el fake en users.getProfile
+
+def _wait(cond: Callable[[], bool], timeout: float = 15.0, every: float = 0.005) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if cond():
+            return True
+        time.sleep(every)
+    return False
+
+def _first_id(s: requests.Session, url: str, params: Dict[str, Any]) -> str:
+    items = s.get(url, params=params, timeout=10).json()
+    return items[0]["id"] if items else ""
+
+def _summary(latencies: List[float], calls: int, n: int) -> Dict[str, Any]:
+    lat = sorted(latencies)
+    return {
+        "notificaciones": n, "timeouts": n - len(lat),
+        "p50_ms": _percentile(lat, 50), "p95_ms": _percentile(lat, 95), "max_ms": round(lat[-1], 3) if lat else None,
+        "llamadas_proveedor": calls, "llamadas_por_notificacion": round(calls / n, 2) if n else None,
+    }
+
+def graph_notification(subscription_id: str, client_state: str, message_id: str, change: str = "created") -> Dict[str, Any]:
+    return {"value": [{
+        "subscriptionId": subscription_id, "clientState": client_state, "changeType": change,
+        "resource": f"Users/bench/Messages/{message_id}", "tenantId": "bench",
+        "resourceData": {"@odata.type": "#Microsoft.Graph.Message", "@odata.id": f"Users/bench/Messages/{message_id}", "id": message_id},
+    }]}
+
+def gmail_notification(history_id: str) -> Dict[str, Any]:
+    data = json.dumps({"emailAddress": GMAIL_ACCOUNT, "historyId": int(history_id)}).encode()
+    return {"message": {"data": base64.b64encode(data).decode(), "messageId": f"bench-{history_id}"},
+            "subscription": "projects/bench/subscriptions/gmail-push"}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de la ingesta push (Graph / Gmail)")
+    ap.add_argument("--messages", type=int, default=50, help="notificaciones secuenciales por proveedor")
+    ap.add_argument("--burst", type=int, default=20, help="correos de Gmail notificados a la vez (coalescencia)")
+    ap.add_argument("--google-latency-ms", type=float, default=0)
+    ap.add_argument("--graph-latency-ms", type=float, default=0)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    fakes = start_fakes(args.google_latency_ms, args.graph_latency_ms)
+    workdir = tempfile.mkdtemp(prefix="garimind-push-")
+    database_url = f"sqlite:///{workdir}/push.db"
+    results: Dict[str, Any] = {"meta": {"python": platform.python_version(), **_git_meta(), "args": vars(args)}}
+    try:
+        reset_and_seed(database_url, proyectos=0, tareas=0, recuerdos=0)
+        _write_fake_creds(workdir)
+        env = {
+            "PUSH_ENABLED": "true", "SYNC_ENABLED": "true", "SYNC_JITTER_SECONDS": "0",
+            "SYNC_INTERVAL_SECONDS": "3600", "PUSH_VERIFICATION_TOKEN": PUSH_TOKEN,
+            "GMAIL_PUBSUB_TOPIC": "projects/bench/topics/gmail",
+        }
+        with Server(database_url, fakes, workdir, extra_env=env) as srv, requests.Session() as s:
+            s.post(srv.url + "/api/push/graph/subscriptions", timeout=30).raise_for_status()
+            s.post(srv.url + "/api/push/gmail/watch", timeout=30).raise_for_status()
+
+            def synced():
+                st = s.get(srv.url + "/api/sync/status", timeout=10).json()["sources"]
+                return all(x["ultima_sync"] for x in st if x["fuente"] in ("gmail", "outlook_mail"))
+            if not _wait(synced, timeout=60, every=0.2):
+                raise RuntimeError("el espejo no se sincronizó")
+
+            engine = create_engine(database_url)
+            with engine.connect() as conn:
+                sub_id, secret = conn.execute(text(
+                    "SELECT externo_id, secreto FROM suscripciones_push WHERE recurso = 'outlook_mail'")).one()
+            engine.dispose()
+
+            # Graph: un correo nuevo por notificación
+            lat, calls0 = [], fakes["graph"].requests
+            for i in range(args.messages):
+                mid = f"ompush{i}"
+                t0 = time.perf_counter()
+                s.post(srv.url + "/api/push/graph", json=graph_notification(sub_id, secret, mid), timeout=10).raise_for_status()
+                if _wait(lambda: _first_id(s, srv.url + "/api/ms/mail/inbox", {"top": 5}) == mid):
+                    lat.append((time.perf_counter() - t0) * 1000)
+            results["graph"] = _summary(lat, fakes["graph"].requests - calls0, args.messages)
+
+            # Gmail: el fake avanza el historyId y se notifica como lo haría Pub/Sub
+            lat, calls0 = [], fakes["google"].requests
+            for _ in range(args.messages):
+                h = requests.post(fakes["google"].url + "/_bench/gmail/new", timeout=10).json()["historyId"]
+                t0 = time.perf_counter()
+                s.post(srv.url + "/api/push/gmail", params={"token": PUSH_TOKEN}, json=gmail_notification(h), timeout=10).raise_for_status()
+                if _wait(lambda: _first_id(s, srv.url + "/api/google/gmail/inbox", {"max_results": 5}) == f"gmpush{h}"):
+                    lat.append((time.perf_counter() - t0) * 1000)
+            results["gmail"] = _summary(lat, fakes["google"].requests - args.messages - calls0, args.messages)
+
+            # Ráfaga: N correos notificados a la vez se funden en pocas history.list
+            calls0 = fakes["google"].requests
+            hs = [requests.post(fakes["google"].url + "/_bench/gmail/new", timeout=10).json()["historyId"] for _ in range(args.burst)]
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(lambda h: requests.post(srv.url + "/api/push/gmail", params={"token": PUSH_TOKEN},
+                                                      json=gmail_notification(h), timeout=10), hs))
+            ok = _wait(lambda: _first_id(s, srv.url + "/api/google/gmail/inbox", {"max_results": 5}) == f"gmpush{hs[-1]}")
+            results["gmail_rafaga"] = {
+                "notificaciones": args.burst, "timeout": not ok,
+                "hasta_el_ultimo_ms": round((time.perf_counter() - t0) * 1000, 3),
+                "llamadas_proveedor": fakes["google"].requests - args.burst - calls0,
+            }
+            results["cola"] = s.get(srv.url + "/api/push/status", timeout=10).json()["stats"]
+    finally:
+        for f in fakes.values():
+            f.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for name in ("graph", "gmail"):
+        r = results[name]
+        print(f"{name:12s} p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms  llamadas/notificación {r['llamadas_por_notificacion']}  timeouts {r['timeouts']}")
+    r = results["gmail_rafaga"]
+    print(f"{'ráfaga':12s} {r['notificaciones']} notificaciones → {r['llamadas_proveedor']} llamadas a Gmail, {r['hasta_el_ultimo_ms']} ms")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"resultados → {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# backend/bench/seed.py
+# Dataset sintético reproducible (proyectos, tareas, recuerdos) para benchmarks.
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, insert, text
+
+from app.db.migrations import upgrade_head
+from app.db.utils import to_sync_url
+from app.models.base import Base
+from app.models.models import Proyecto, Tarea, Recuerdo, DEFAULT_USER_ID
+
+WORDS = ("reunión proveedor informe dafo cliente presupuesto llamada revisar enviar "
+         "dentisalud equipo estrategia ventas contrato agenda correo propuesta").split()
+TIPOS = ("profesional", "personal", "emocional", "familiar")
+ESTADOS = ("abierta", "en_progreso", "cerrada")
+PRIORIDADES = ("baja", "media", "alta")
+
+def _texto(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+def reset_and_seed(database_url: str, proyectos: int, tareas: int, recuerdos: int, seed: int = 42, batch: int = 1000):
+    """Borra el esquema, lo recrea con las migraciones y luego inserta el dataset en lotes."""
+    rng = random.Random(seed)
+    engine = create_engine(to_sync_url(database_url), future=True)
+    Base.metadata.drop_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+        if engine.dialect.name == "sqlite":  # la tabla FTS5 de la migración 0008 no está en los modelos
+            conn.execute(text("DROP TABLE IF EXISTS fragmentos_fts"))
+    upgrade_head(database_url)
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def rows_proyectos():
+        for i in range(proyectos):
+            yield {"user_id": DEFAULT_USER_ID, "nombre": f"Proyecto {i} {_texto(rng, 2)}", "objetivo": _texto(rng, 12),
+                   "estado": "activo", "fecha_inicio": base + timedelta(hours=i)}
+
+    def rows_tareas():
+        for i in range(tareas):
+            yield {"user_id": DEFAULT_USER_ID, "titulo": _texto(rng, 6), "responsable": rng.choice(("César", "Ana", None)),
+                   "prioridad": rng.choice(PRIORIDADES),
+                   "proyecto_id": rng.randint(1, proyectos) if proyectos and rng.random() < 0.8 else None,
+                   "estado": rng.choice(ESTADOS), "creada_en": base + timedelta(minutes=i)}
+
+    def rows_recuerdos():
+        for i in range(recuerdos):
+            yield {"user_id": DEFAULT_USER_ID, "tipo": rng.choice(TIPOS), "contenido": _texto(rng, 30),
+                   "tags": ",".join(rng.sample(WORDS, 2)),
+                   "proyecto_id": rng.randint(1, proyectos) if proyectos and rng.random() < 0.5 else None,
+                   "fecha": base + timedelta(minutes=i)}
+
+    with engine.begin() as conn:
+        for model, rows in ((Proyecto, rows_proyectos()), (Tarea, rows_tareas()), (Recuerdo, rows_recuerdos())):
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= batch:
+                    conn.execute(insert(model), chunk)
+                    chunk = []
+            if chunk:
+                conn.execute(insert(model), chunk)
+    engine.dispose()
@@ -0,0 +1,96 @@
+# backend/bench/serialize.py
+# Micro-benchmark de serialización de listados: filas/s de la consulta + JSON de
+# /api/tareas por tres caminos, sobre el mismo SQLite sembrado:
+#   orm_pydantic_json    objetos ORM → List[TareaOut] (from_attributes) → json.dumps (lo de antes)
+#   orm_pydantic_orjson  igual, pero el dump final con orjson (solo ORJSONResponse por defecto)
+#   filas_orjson         select de columnas → dicts → orjson (core/serialization.py)
+#
+#   cd backend
+#   python -m bench.serialize --rows 20000 --repeat 5 --out serialize.json
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from .run import _git_meta
+from .seed import reset_and_seed
+
+def _measure(fn: Callable[[], bytes], repeat: int) -> Dict[str, Any]:
+    fn()  # calentamiento (caches de SQLAlchemy / Pydantic)
+    times, size = [], 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        size = len(fn())
+        times.append(time.perf_counter() - t0)
+    return {"median_s": round(statistics.median(times), 4), "min_s": round(min(times), 4), "bytes": size}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Filas/s serializadas por camino de JSON")
+    ap.add_argument("--rows", type=int, default=20000, help="tareas sembradas (todas del usuario por defecto)")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="garimind-serialize-")
+    database_url = f"sqlite:///{workdir}/serialize.db"
+    os.environ["DATABASE_URL"] = database_url
+    try:
+        reset_and_seed(database_url, proyectos=10, tareas=args.rows, recuerdos=0)
+        # después de fijar DATABASE_URL: routes arma sus sesiones al importarse
+        import orjson
+        from fastapi.responses import JSONResponse
+        from pydantic import TypeAdapter
+        from sqlalchemy import select
+        from app.api.routes import SessionFactory, TareaOut, TAREA_COLS
+        from app.core.serialization import ORJSONResponse, rows_response
+        from app.models.models import Tarea, DEFAULT_USER_ID
+
+        adapter = TypeAdapter(List[TareaOut])
+        orm_stmt = select(Tarea).where(Tarea.user_id == DEFAULT_USER_ID).order_by(Tarea.creada_en.desc())
+        cols_stmt = select(*TAREA_COLS).where(Tarea.user_id == DEFAULT_USER_ID).order_by(Tarea.creada_en.desc())
+
+        def validated() -> Any:
+            # lo que hace FastAPI con response_model: validar y volcar en modo json
+            with SessionFactory() as session:
+                objs = session.execute(orm_stmt).scalars().all()
+                return adapter.dump_python(adapter.validate_python(objs, from_attributes=True), mode="json")
+
+        def orm_pydantic_json() -> bytes:
+            return JSONResponse(validated()).body
+
+        def orm_pydantic_orjson() -> bytes:
+            return ORJSONResponse(validated()).body
+
+        def filas_orjson() -> bytes:
+            with SessionFactory() as session:
+                rows = session.execute(cols_stmt).all()
+            return rows_response(rows, TareaOut.model_fields).body
+
+        assert orjson.loads(orm_pydantic_json()) == orjson.loads(filas_orjson()), "los caminos no dan el mismo JSON"
+        results: Dict[str, Any] = {
+            "meta": {"python": platform.python_version(), "orjson": orjson.__version__, **_git_meta(), "args": vars(args)},
+            "caminos": {},
+        }
+        for name, fn in (("orm_pydantic_json", orm_pydantic_json), ("orm_pydantic_orjson", orm_pydantic_orjson),
+                         ("filas_orjson", filas_orjson)):
+            r = _measure(fn, args.repeat)
+            r["rows_per_s"] = round(args.rows / r["median_s"]) if r["median_s"] else None
+            results["caminos"][name] = r
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    base = results["caminos"]["orm_pydantic_json"]["median_s"]
+    for name, r in results["caminos"].items():
+        print(f"{name:20s} {r['rows_per_s']:>10} filas/s  mediana {r['median_s']} s  x{round(base / r['median_s'], 2)}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"resultados → {args.out}")
+
+if __name__ == "__main__":
+    main()
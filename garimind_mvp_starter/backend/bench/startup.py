@@ -0,0 +1,91 @@
+# backend/bench/startup.py
+# Cold start del backend: tiempo de import de app.main, memoria (maxrss), SDKs
+# cargados y perfil de -X importtime agregado por paquete. Salida JSON.
+#
+#   cd backend
+#   python -m bench.startup --repeat 5
+#   python -m bench.startup --scenario solo_core GOOGLE_ENABLED=false MICROSOFT_ENABLED=false AI_ENABLED=false
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_SDKS = ("googleapiclient", "google_auth_oauthlib", "google.oauth2", "msal", "openai")
+
+_CHILD = r"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+import app.main
+dt = time.perf_counter() - t0
+print(json.dumps({
+    "import_seconds": dt,
+    "maxrss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "sdks": sorted(m for m in %r if m in sys.modules),
+}))
+""" % (HEAVY_SDKS,)
+
+def _env(extra: Dict[str, str]) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    env.update(extra)
+    return env
+
+def measure(extra: Dict[str, str], repeat: int) -> Dict:
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.check_output([sys.executable, "-c", _CHILD], cwd=BACKEND_DIR, env=_env(extra), text=True)
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return {
+        "import_seconds_median": round(statistics.median(r["import_seconds"] for r in runs), 4),
+        "import_seconds_min": round(min(r["import_seconds"] for r in runs), 4),
+        "maxrss_mb_median": round(statistics.median(r["maxrss_mb"] for r in runs), 1),
+        "modules": runs[-1]["modules"],
+        "sdks_loaded": runs[-1]["sdks"],
+    }
+
+def importtime_profile(extra: Dict[str, str], top: int) -> List[Dict]:
+    """Suma el tiempo propio (self) de -X importtime por paquete raíz."""
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                       cwd=BACKEND_DIR, env=_env(extra), capture_output=True, text=True, check=True)
+    by_pkg: Dict[str, int] = defaultdict(int)
+    for line in p.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _cumulative, name = line[len("import time:"):].split("|")
+        by_pkg[name.strip().split(".")[0]] += int(self_us)
+    ranked = sorted(by_pkg.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return [{"package": k, "self_ms": round(v / 1000, 1)} for k, v in ranked]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Cold start / import profile de app.main")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--scenario", nargs="+", action="append", metavar=("NOMBRE", "KEY=VALUE"),
+                    help="escenario extra: nombre seguido de variables de entorno")
+    ap.add_argument("--out", default="startup-results.json")
+    args = ap.parse_args(argv)
+
+    scenarios = {"default": {}}
+    for sc in args.scenario or []:
+        scenarios[sc[0]] = dict(kv.split("=", 1) for kv in sc[1:])
+
+    report = {}
+    for name, extra in scenarios.items():
+        report[name] = {"env": extra, **measure(extra, args.repeat), "importtime_top": importtime_profile(extra, args.top)}
+        r = report[name]
+        print(f"{name:<12} import {r['import_seconds_median']:.3f}s  rss {r['maxrss_mb_median']} MB  "
+              f"módulos {r['modules']}  sdks {','.join(r['sdks_loaded']) or '-'}", file=sys.stderr)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"resultados → {args.out}", file=sys.stderr)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# backend/bench/workers.py
+# Cache compartida entre workers: levanta uvicorn con --workers N para cada CACHE_BACKEND y
+# cuenta las llamadas de calendario que llegan a los fakes cuando C clientes piden a la vez la
+# misma semana (fría), y cuántas hace el prefetch por vuelta. Con memory cada worker pide por su
+# cuenta; con shared (o redis) lo hace uno solo.
+#
+#   cd backend
+#   python -m bench.workers --workers 4 --clients 16 --backends memory shared --out workers.json
+import argparse
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+import requests
+
+from .fakes import start_fakes
+from .run import Server, _git_meta, _percentile, _write_fake_creds
+from .seed import reset_and_seed
+
+CALENDAR_ROUTES = {"google": "GET /calendars/primary/events", "graph": "GET /me/calendarView"}
+
+def _calendar_calls(fakes) -> int:
+    return sum(fakes[name].by_route.get(route, 0) for name, route in CALENDAR_ROUTES.items())
+
+def _burst(url: str, first: date, clients: int) -> List[float]:
+    params = {"from": first.isoformat(), "to": (first + timedelta(days=6)).isoformat()}
+
+    def one(_):
+        t0 = time.perf_counter()
+        # una sesión por cliente: conexiones distintas, repartidas entre los workers
+        with requests.Session() as s:
+            s.get(url + "/api/calendar/range", params=params, timeout=60).raise_for_status()
+        return (time.perf_counter() - t0) * 1000
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        return list(pool.map(one, range(clients)))
+
+def run_backend(backend: str, args, fakes, database_url: str, workdir: str) -> Dict[str, Any]:
+    env = {"CACHE_BACKEND": backend, "CACHE_DIR": os.path.join(workdir, "cache-" + backend)}
+    out: Dict[str, Any] = {}
+    with Server(database_url, fakes, workdir, workers=args.workers, extra_env=env) as srv:
+        calls, lat = [], []
+        for r in range(args.rounds):  # cada ronda una semana distinta: siempre en frío
+            calls0 = _calendar_calls(fakes)
+            lat += _burst(srv.url, date.today() + timedelta(days=7 * (r + 1)), args.clients)
+            calls.append(_calendar_calls(fakes) - calls0)
+        lat.sort()
+        out["rafaga"] = {"llamadas_por_ronda": calls, "p50_ms": _percentile(lat, 50), "p95_ms": _percentile(lat, 95)}
+
+    env.update({"CALENDAR_PREFETCH_ENABLED": "true", "CALENDAR_PREFETCH_INTERVAL_SECONDS": str(args.prefetch_interval)})
+    shutil.rmtree(env["CACHE_DIR"], ignore_errors=True)
+    with Server(database_url, fakes, workdir, workers=args.workers, extra_env=env):
+        calls0 = _calendar_calls(fakes)
+        time.sleep(args.prefetch_interval * args.rounds)
+        calls = _calendar_calls(fakes) - calls0
+        out["prefetch"] = {"vueltas": args.rounds, "llamadas": calls, "llamadas_por_vuelta": round(calls / args.rounds, 2)}
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de la cache compartida entre workers")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--clients", type=int, default=16, help="pedidos simultáneos de la misma semana")
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--backends", nargs="+", default=["memory", "shared"], choices=["memory", "shared", "redis"])
+    ap.add_argument("--prefetch-interval", type=int, default=2, help="segundos entre vueltas del prefetch")
+    ap.add_argument("--google-latency-ms", type=float, default=80)
+    ap.add_argument("--graph-latency-ms", type=float, default=80)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    fakes = start_fakes(args.google_latency_ms, args.graph_latency_ms)
+    workdir = tempfile.mkdtemp(prefix="garimind-workers-")
+    database_url = f"sqlite:///{workdir}/workers.db"
+    results: Dict[str, Any] = {"meta": {"python": platform.python_version(), **_git_meta(), "args": vars(args)}}
+    try:
+        reset_and_seed(database_url, proyectos=0, tareas=0, recuerdos=0)
+        _write_fake_creds(workdir)
+        for backend in args.backends:
+            results[backend] = run_backend(backend, args, fakes, database_url, workdir)
+    finally:
+        for f in fakes.values():
+            f.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for backend in args.backends:
+        r = results[backend]
+        print(f"{backend:8s} ráfaga de {args.clients}: llamadas por ronda {r['rafaga']['llamadas_por_ronda']}  "
+              f"p50 {r['rafaga']['p50_ms']} ms  p95 {r['rafaga']['p95_ms']} ms  |  "
+              f"prefetch: {r['prefetch']['llamadas_por_vuelta']} llamadas por vuelta")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"resultados → {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.core.config import settings
+from app.db.utils import to_sync_url
+from app.models.base import Base
+from app.models import models  # noqa: F401  (registra las tablas en Base.metadata)
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def _include_object(obj, name, type_, reflected, compare_to):
+    # el índice full-text de fragmentos (tabla virtual FTS5 en SQLite, índice GIN en Postgres) vive
+    # solo en la migración 0008: no está en los modelos y autogenerate no debe proponer borrarlo
+    return not (name or "").startswith(("fragmentos_fts", "ix_fragmentos_fts"))
+
+def _url() -> str:
+    # Permite `alembic -x url=...`; por defecto DATABASE_URL (con driver síncrono)
+    return to_sync_url(context.get_x_argument(as_dictionary=True).get("url") or config.attributes.get("url") or settings.DATABASE_URL)
+
+def run_migrations_offline():
+    context.configure(url=_url(), target_metadata=target_metadata, literal_binds=True,
+                      dialect_opts={"paramstyle": "named"}, render_as_batch=True,
+                      include_object=_include_object)
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    connectable = create_engine(_url(), poolclass=pool.NullPool, future=True)
+    with connectable.connect() as connection:
+        # render_as_batch: SQLite no soporta ALTER TABLE completo
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True,
+                          include_object=_include_object)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
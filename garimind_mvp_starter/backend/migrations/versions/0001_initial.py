@@ -0,0 +1,68 @@
+"""esquema inicial: proyectos, tareas, recuerdos, interacciones
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-11-03
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "proyectos",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nombre", sa.String(255), nullable=False),
+        sa.Column("objetivo", sa.Text(), nullable=True),
+        sa.Column("estado", sa.String(50), nullable=True),
+        sa.Column("fecha_inicio", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_proyectos_id", "proyectos", ["id"])
+
+    op.create_table(
+        "tareas",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("titulo", sa.String(255), nullable=False),
+        sa.Column("responsable", sa.String(255), nullable=True),
+        sa.Column("prioridad", sa.String(50), nullable=True),
+        sa.Column("proyecto_id", sa.Integer(), sa.ForeignKey("proyectos.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("fecha_limite", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("estado", sa.String(50), nullable=True),
+        sa.Column("creada_en", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_tareas_id", "tareas", ["id"])
+    op.create_index("ix_tareas_proyecto_id", "tareas", ["proyecto_id"])
+
+    op.create_table(
+        "recuerdos",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("tipo", sa.String(50), nullable=True),
+        sa.Column("contenido", sa.Text(), nullable=False),
+        sa.Column("fecha", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("tags", sa.String(255), nullable=True),
+        sa.Column("proyecto_id", sa.Integer(), sa.ForeignKey("proyectos.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("doc_url", sa.String(512), nullable=True),
+    )
+    op.create_index("ix_recuerdos_id", "recuerdos", ["id"])
+    op.create_index("ix_recuerdos_proyecto_id", "recuerdos", ["proyecto_id"])
+
+    op.create_table(
+        "interacciones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("usuario", sa.String(255), nullable=True),
+        sa.Column("medio", sa.String(50), nullable=True),
+        sa.Column("contenido", sa.Text(), nullable=False),
+        sa.Column("respuesta", sa.Text(), nullable=True),
+        sa.Column("fecha", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_interacciones_id", "interacciones", ["id"])
+
+def downgrade():
+    op.drop_table("interacciones")
+    op.drop_table("recuerdos")
+    op.drop_table("tareas")
+    op.drop_table("proyectos")
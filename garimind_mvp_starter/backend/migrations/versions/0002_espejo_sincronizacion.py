@@ -0,0 +1,40 @@
+"""espejo local de integraciones: items_sincronizados, estado_sincronizacion
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-11-10
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "items_sincronizados",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fuente", sa.String(50), nullable=False),
+        sa.Column("posicion", sa.Integer(), nullable=False),
+        sa.Column("datos", sa.Text(), nullable=False),
+        sa.Column("sincronizado_en", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_items_sincronizados_id", "items_sincronizados", ["id"])
+    op.create_index("ix_items_sincronizados_fuente", "items_sincronizados", ["fuente"])
+
+    op.create_table(
+        "estado_sincronizacion",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fuente", sa.String(50), nullable=False, unique=True),
+        sa.Column("ultima_sync", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("ultimo_intento", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("ultimo_error", sa.Text(), nullable=True),
+        sa.Column("fallos", sa.Integer(), nullable=True),
+    )
+    op.create_index("ix_estado_sincronizacion_id", "estado_sincronizacion", ["id"])
+
+def downgrade():
+    op.drop_table("estado_sincronizacion")
+    op.drop_table("items_sincronizados")
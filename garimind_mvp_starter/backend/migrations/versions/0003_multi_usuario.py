@@ -0,0 +1,121 @@
+"""multi-usuario: usuarios, credenciales cifradas y user_id en todas las tablas
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-11-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+DEFAULT_USER_ID = 1
+
+# tabla -> índices compuestos (todos empiezan por user_id)
+USER_TABLES = {
+    "proyectos": {"ix_proyectos_user_fecha_inicio": ["user_id", "fecha_inicio"]},
+    "tareas": {"ix_tareas_user_creada_en": ["user_id", "creada_en"], "ix_tareas_user_proyecto": ["user_id", "proyecto_id"]},
+    "recuerdos": {"ix_recuerdos_user_fecha": ["user_id", "fecha"], "ix_recuerdos_user_proyecto": ["user_id", "proyecto_id"]},
+    "interacciones": {"ix_interacciones_user_fecha": ["user_id", "fecha"]},
+}
+
+def _user_id():
+    return sa.Column("user_id", sa.Integer(), sa.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
+
+def upgrade():
+    op.create_table(
+        "usuarios",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("nombre", sa.String(255), nullable=True),
+        sa.Column("token_hash", sa.String(64), nullable=True, unique=True),
+        sa.Column("creado_en", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_usuarios_id", "usuarios", ["id"])
+    usuarios = sa.table("usuarios", sa.column("id", sa.Integer), sa.column("email", sa.String), sa.column("nombre", sa.String))
+    op.bulk_insert(usuarios, [{"id": DEFAULT_USER_ID, "email": "default@garimind.local", "nombre": "Default"}])
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("SELECT setval(pg_get_serial_sequence('usuarios', 'id'), (SELECT MAX(id) FROM usuarios))")
+
+    op.create_table(
+        "credenciales",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        _user_id(),
+        sa.Column("proveedor", sa.String(50), nullable=False),
+        sa.Column("datos_cifrados", sa.Text(), nullable=False),
+        sa.Column("actualizado_en", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("user_id", "proveedor", name="uq_credenciales_user_proveedor"),
+    )
+    op.create_index("ix_credenciales_id", "credenciales", ["id"])
+
+    # Los datos existentes pasan al usuario por defecto
+    for table, indexes in USER_TABLES.items():
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column("user_id", sa.Integer(), nullable=False, server_default=str(DEFAULT_USER_ID)))
+            batch.create_foreign_key(f"fk_{table}_user_id", "usuarios", ["user_id"], ["id"], ondelete="CASCADE")
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column("user_id", server_default=None)
+            for name, cols in indexes.items():
+                batch.create_index(name, cols)
+
+    # El espejo de integraciones es regenerable: se recrea con user_id
+    op.drop_table("estado_sincronizacion")
+    op.drop_table("items_sincronizados")
+    op.create_table(
+        "items_sincronizados",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        _user_id(),
+        sa.Column("fuente", sa.String(50), nullable=False),
+        sa.Column("posicion", sa.Integer(), nullable=False),
+        sa.Column("datos", sa.Text(), nullable=False),
+        sa.Column("sincronizado_en", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_items_sincronizados_id", "items_sincronizados", ["id"])
+    op.create_index("ix_items_sincronizados_user_fuente", "items_sincronizados", ["user_id", "fuente", "posicion"])
+    op.create_table(
+        "estado_sincronizacion",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        _user_id(),
+        sa.Column("fuente", sa.String(50), nullable=False),
+        sa.Column("ultima_sync", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("ultimo_intento", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("ultimo_error", sa.Text(), nullable=True),
+        sa.Column("fallos", sa.Integer(), nullable=True),
+        sa.UniqueConstraint("user_id", "fuente", name="uq_estado_sincronizacion_user_fuente"),
+    )
+    op.create_index("ix_estado_sincronizacion_id", "estado_sincronizacion", ["id"])
+
+def downgrade():
+    op.drop_table("estado_sincronizacion")
+    op.drop_table("items_sincronizados")
+    op.create_table(
+        "items_sincronizados",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fuente", sa.String(50), nullable=False),
+        sa.Column("posicion", sa.Integer(), nullable=False),
+        sa.Column("datos", sa.Text(), nullable=False),
+        sa.Column("sincronizado_en", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_items_sincronizados_id", "items_sincronizados", ["id"])
+    op.create_index("ix_items_sincronizados_fuente", "items_sincronizados", ["fuente"])
+    op.create_table(
+        "estado_sincronizacion",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fuente", sa.String(50), nullable=False, unique=True),
+        sa.Column("ultima_sync", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("ultimo_intento", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("ultimo_error", sa.Text(), nullable=True),
+        sa.Column("fallos", sa.Integer(), nullable=True),
+    )
+    op.create_index("ix_estado_sincronizacion_id", "estado_sincronizacion", ["id"])
+    for table, indexes in USER_TABLES.items():
+        with op.batch_alter_table(table) as batch:
+            for name in indexes:
+                batch.drop_index(name)
+            batch.drop_constraint(f"fk_{table}_user_id", type_="foreignkey")
+            batch.drop_column("user_id")
+    op.drop_table("credenciales")
+    op.drop_table("usuarios")
@@ -0,0 +1,35 @@
+"""suscripciones push (Graph change notifications / Gmail watch)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-11-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "suscripciones_push",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("proveedor", sa.String(50), nullable=False),
+        sa.Column("recurso", sa.String(50), nullable=False),
+        sa.Column("externo_id", sa.String(255), nullable=True),
+        sa.Column("cuenta", sa.String(255), nullable=True),
+        sa.Column("secreto", sa.String(128), nullable=True),
+        sa.Column("cursor", sa.String(64), nullable=True),
+        sa.Column("expira_en", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("actualizado_en", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("user_id", "recurso", name="uq_suscripciones_push_user_recurso"),
+    )
+    op.create_index("ix_suscripciones_push_id", "suscripciones_push", ["id"])
+    op.create_index("ix_suscripciones_push_externo_id", "suscripciones_push", ["externo_id"])
+    op.create_index("ix_suscripciones_push_cuenta", "suscripciones_push", ["cuenta"])
+
+def downgrade():
+    op.drop_table("suscripciones_push")
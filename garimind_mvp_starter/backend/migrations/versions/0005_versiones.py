@@ -0,0 +1,24 @@
+"""versiones por usuario y tabla (ETag de los listados)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-11-20
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "versiones",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("usuarios.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("tabla", sa.String(50), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table("versiones")
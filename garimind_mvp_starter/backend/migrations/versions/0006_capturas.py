@@ -0,0 +1,30 @@
+"""capturas aplicadas desde el journal (idempotencia de /api/inbox/capturar)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-11-22
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "capturas",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("clave", sa.String(64), nullable=False),
+        sa.Column("tipo", sa.String(20), nullable=False),
+        sa.Column("objeto_id", sa.Integer(), nullable=True),
+        sa.Column("recibida_en", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("aplicada_en", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("user_id", "clave", name="uq_capturas_user_clave"),
+    )
+    op.create_index("ix_capturas_id", "capturas", ["id"])
+
+def downgrade():
+    op.drop_table("capturas")
@@ -0,0 +1,31 @@
+"""enriquecimiento de capturas: tags en tareas y estado del enriquecimiento
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-11-24
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("tareas") as batch:
+        batch.add_column(sa.Column("tags", sa.String(255), nullable=True))
+        batch.add_column(sa.Column("enriquecimiento", sa.String(20), nullable=True))
+    with op.batch_alter_table("recuerdos") as batch:
+        batch.add_column(sa.Column("enriquecimiento", sa.String(20), nullable=True))
+    op.create_index("ix_tareas_enriquecimiento", "tareas", ["enriquecimiento"])
+    op.create_index("ix_recuerdos_enriquecimiento", "recuerdos", ["enriquecimiento"])
+
+def downgrade():
+    op.drop_index("ix_recuerdos_enriquecimiento", table_name="recuerdos")
+    op.drop_index("ix_tareas_enriquecimiento", table_name="tareas")
+    with op.batch_alter_table("recuerdos") as batch:
+        batch.drop_column("enriquecimiento")
+    with op.batch_alter_table("tareas") as batch:
+        batch.drop_column("enriquecimiento")
+        batch.drop_column("tags")
@@ -0,0 +1,72 @@
+"""documentos de las carpetas de proyecto, sus fragmentos y el índice full-text
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-11-26
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+# SQLite: FTS5 con contenido externo (el texto vive solo en `fragmentos`), al día por triggers
+SQLITE_FTS = [
+    """CREATE VIRTUAL TABLE fragmentos_fts USING fts5(
+           texto, content='fragmentos', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER fragmentos_fts_ai AFTER INSERT ON fragmentos BEGIN
+           INSERT INTO fragmentos_fts(rowid, texto) VALUES (new.id, new.texto);
+       END""",
+    """CREATE TRIGGER fragmentos_fts_ad AFTER DELETE ON fragmentos BEGIN
+           INSERT INTO fragmentos_fts(fragmentos_fts, rowid, texto) VALUES ('delete', old.id, old.texto);
+       END""",
+    """CREATE TRIGGER fragmentos_fts_au AFTER UPDATE ON fragmentos BEGIN
+           INSERT INTO fragmentos_fts(fragmentos_fts, rowid, texto) VALUES ('delete', old.id, old.texto);
+           INSERT INTO fragmentos_fts(rowid, texto) VALUES (new.id, new.texto);
+       END""",
+]
+
+def upgrade():
+    op.create_table(
+        "documentos",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("proyecto_id", sa.Integer(), sa.ForeignKey("proyectos.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("ruta", sa.String(1024), nullable=False),
+        sa.Column("tamano", sa.BigInteger(), nullable=False),
+        sa.Column("mtime_ns", sa.BigInteger(), nullable=False),
+        sa.Column("sha256", sa.String(64), nullable=False),
+        sa.Column("fragmentos", sa.Integer(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("indexado_en", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("proyecto_id", "ruta", name="uq_documentos_proyecto_ruta"),
+    )
+    op.create_index("ix_documentos_id", "documentos", ["id"])
+    op.create_table(
+        "fragmentos",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("documento_id", sa.Integer(), sa.ForeignKey("documentos.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("proyecto_id", sa.Integer(), sa.ForeignKey("proyectos.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("posicion", sa.Integer(), nullable=False),
+        sa.Column("texto", sa.Text(), nullable=False),
+    )
+    op.create_index("ix_fragmentos_documento_posicion", "fragmentos", ["documento_id", "posicion"])
+    op.create_index("ix_fragmentos_proyecto_id", "fragmentos", ["proyecto_id"])
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for stmt in SQLITE_FTS:
+            op.execute(stmt)
+    elif dialect == "postgresql":
+        op.execute("CREATE INDEX ix_fragmentos_fts ON fragmentos USING gin (to_tsvector('simple', texto))")
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        for name in ("fragmentos_fts_ai", "fragmentos_fts_ad", "fragmentos_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute("DROP TABLE IF EXISTS fragmentos_fts")
+    op.drop_table("fragmentos")
+    op.drop_table("documentos")
@@ -0,0 +1,78 @@
+"""espejo de Google Drive (changes.list) y documentos de Drive en el índice full-text
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-11-28
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+# En SQLite batch_alter_table recrea `fragmentos` y con ella se van sus triggers de FTS5 (0008):
+# se vuelven a crear. La tabla fragmentos_fts no se toca (los ids se conservan en la copia).
+SQLITE_TRIGGERS = [
+    """CREATE TRIGGER fragmentos_fts_ai AFTER INSERT ON fragmentos BEGIN
+           INSERT INTO fragmentos_fts(rowid, texto) VALUES (new.id, new.texto);
+       END""",
+    """CREATE TRIGGER fragmentos_fts_ad AFTER DELETE ON fragmentos BEGIN
+           INSERT INTO fragmentos_fts(fragmentos_fts, rowid, texto) VALUES ('delete', old.id, old.texto);
+       END""",
+    """CREATE TRIGGER fragmentos_fts_au AFTER UPDATE ON fragmentos BEGIN
+           INSERT INTO fragmentos_fts(fragmentos_fts, rowid, texto) VALUES ('delete', old.id, old.texto);
+           INSERT INTO fragmentos_fts(rowid, texto) VALUES (new.id, new.texto);
+       END""",
+]
+
+def _proyecto_nullable(nullable: bool):
+    sqlite = op.get_bind().dialect.name == "sqlite"
+    if sqlite:
+        for name in ("fragmentos_fts_ai", "fragmentos_fts_ad", "fragmentos_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    with op.batch_alter_table("fragmentos") as batch:
+        batch.alter_column("proyecto_id", existing_type=sa.Integer(), nullable=nullable)
+    if sqlite:
+        for stmt in SQLITE_TRIGGERS:
+            op.execute(stmt)
+
+def upgrade():
+    op.create_table(
+        "drive_archivos",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("file_id", sa.String(128), nullable=False),
+        sa.Column("nombre", sa.String(1024), nullable=False),
+        sa.Column("mime_type", sa.String(255), nullable=True),
+        sa.Column("modificado", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("web_view_link", sa.String(1024), nullable=True),
+        sa.Column("tamano", sa.BigInteger(), nullable=True),
+        sa.Column("sincronizado_en", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("user_id", "file_id", name="uq_drive_archivos_user_file"),
+    )
+    op.create_index("ix_drive_archivos_id", "drive_archivos", ["id"])
+    op.create_index("ix_drive_archivos_user_modificado", "drive_archivos", ["user_id", "modificado"])
+    with op.batch_alter_table("estado_sincronizacion") as batch:
+        batch.add_column(sa.Column("cursor", sa.String(255), nullable=True))
+    with op.batch_alter_table("documentos") as batch:
+        batch.add_column(sa.Column("externo_id", sa.String(128), nullable=True))
+        batch.alter_column("proyecto_id", existing_type=sa.Integer(), nullable=True)
+        batch.create_unique_constraint("uq_documentos_user_externo", ["user_id", "externo_id"])
+    _proyecto_nullable(True)
+
+def downgrade():
+    # los documentos de Drive no tienen proyecto: salen del índice antes de volver a NOT NULL
+    op.execute("DELETE FROM fragmentos WHERE proyecto_id IS NULL")
+    op.execute("DELETE FROM documentos WHERE proyecto_id IS NULL")
+    _proyecto_nullable(False)
+    with op.batch_alter_table("documentos") as batch:
+        batch.drop_constraint("uq_documentos_user_externo", type_="unique")
+        batch.alter_column("proyecto_id", existing_type=sa.Integer(), nullable=False)
+        batch.drop_column("externo_id")
+    with op.batch_alter_table("estado_sincronizacion") as batch:
+        batch.drop_column("cursor")
+    op.drop_index("ix_drive_archivos_user_modificado", table_name="drive_archivos")
+    op.drop_index("ix_drive_archivos_id", table_name="drive_archivos")
+    op.drop_table("drive_archivos")
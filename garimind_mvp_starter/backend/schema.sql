@@ -1,38 +1,175 @@
 -- GariMind MVP schema (PostgreSQL)
+-- Referencia legible: la fuente de verdad son las migraciones en backend/migrations
+-- (alembic upgrade head).
+CREATE TABLE IF NOT EXISTS usuarios (
+  id SERIAL PRIMARY KEY,
+  email VARCHAR(255) NOT NULL UNIQUE,
+  nombre VARCHAR(255),
+  token_hash VARCHAR(64) UNIQUE,  -- sha256 del API token
+  creado_en TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+-- Usuario por defecto: dueño de los datos previos al multi-usuario
+INSERT INTO usuarios (id, email, nombre) VALUES (1, 'default@garimind.local', 'Default') ON CONFLICT DO NOTHING;
+SELECT setval(pg_get_serial_sequence('usuarios', 'id'), (SELECT MAX(id) FROM usuarios));
+
+CREATE TABLE IF NOT EXISTS credenciales (
+  id SERIAL PRIMARY KEY,
+  user_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+  proveedor VARCHAR(50) NOT NULL,
+  datos_cifrados TEXT NOT NULL,  -- token OAuth cifrado (Fernet, CREDENTIALS_KEY)
+  actualizado_en TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  CONSTRAINT uq_credenciales_user_proveedor UNIQUE (user_id, proveedor)
+);
+
 CREATE TABLE IF NOT EXISTS proyectos (
   id SERIAL PRIMARY KEY,
+  user_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
   nombre VARCHAR(255) NOT NULL,
   objetivo TEXT,
   estado VARCHAR(50) DEFAULT 'activo',
   fecha_inicio TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
+CREATE INDEX IF NOT EXISTS ix_proyectos_user_fecha_inicio ON proyectos (user_id, fecha_inicio);
 
 CREATE TABLE IF NOT EXISTS tareas (
   id SERIAL PRIMARY KEY,
+  user_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
   titulo VARCHAR(255) NOT NULL,
   responsable VARCHAR(255),
   prioridad VARCHAR(50) DEFAULT 'media',
   proyecto_id INTEGER REFERENCES proyectos(id) ON DELETE SET NULL,
   fecha_limite TIMESTAMP WITH TIME ZONE,
   estado VARCHAR(50) DEFAULT 'abierta',
-  creada_en TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+  creada_en TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  tags VARCHAR(255),
+  enriquecimiento VARCHAR(20)
 );
+CREATE INDEX IF NOT EXISTS ix_tareas_user_creada_en ON tareas (user_id, creada_en);
+CREATE INDEX IF NOT EXISTS ix_tareas_user_proyecto ON tareas (user_id, proyecto_id);
+CREATE INDEX IF NOT EXISTS ix_tareas_enriquecimiento ON tareas (enriquecimiento);
 
 CREATE TABLE IF NOT EXISTS recuerdos (
   id SERIAL PRIMARY KEY,
+  user_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
   tipo VARCHAR(50) DEFAULT 'profesional',
   contenido TEXT NOT NULL,
   fecha TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
   tags VARCHAR(255),
   proyecto_id INTEGER REFERENCES proyectos(id) ON DELETE SET NULL,
-  doc_url VARCHAR(512)
+  doc_url VARCHAR(512),
+  enriquecimiento VARCHAR(20)
 );
+CREATE INDEX IF NOT EXISTS ix_recuerdos_user_fecha ON recuerdos (user_id, fecha);
+CREATE INDEX IF NOT EXISTS ix_recuerdos_user_proyecto ON recuerdos (user_id, proyecto_id);
+CREATE INDEX IF NOT EXISTS ix_recuerdos_enriquecimiento ON recuerdos (enriquecimiento);
 
 CREATE TABLE IF NOT EXISTS interacciones (
   id SERIAL PRIMARY KEY,
+  user_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
   usuario VARCHAR(255),
   medio VARCHAR(50) DEFAULT 'texto',
   contenido TEXT NOT NULL,
   respuesta TEXT,
   fecha TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
+CREATE INDEX IF NOT EXISTS ix_interacciones_user_fecha ON interacciones (user_id, fecha);
+
+CREATE TABLE IF NOT EXISTS items_sincronizados (
+  id SERIAL PRIMARY KEY,
+  user_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+  fuente VARCHAR(50) NOT NULL,
+  posicion INTEGER NOT NULL DEFAULT 0,
+  datos TEXT NOT NULL,
+  sincronizado_en TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS ix_items_sincronizados_user_fuente ON items_sincronizados (user_id, fuente, posicion);
+
+CREATE TABLE IF NOT EXISTS estado_sincronizacion (
+  id SERIAL PRIMARY KEY,
+  user_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+  fuente VARCHAR(50) NOT NULL,
+  ultima_sync TIMESTAMP WITH TIME ZONE,
+  ultimo_intento TIMESTAMP WITH TIME ZONE,
+  ultimo_error TEXT,
+  fallos INTEGER DEFAULT 0,
+  cursor VARCHAR(255),
+  CONSTRAINT uq_estado_sincronizacion_user_fuente UNIQUE (user_id, fuente)
+);
+
+CREATE TABLE IF NOT EXISTS suscripciones_push (
+  id SERIAL PRIMARY KEY,
+  user_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+  proveedor VARCHAR(50) NOT NULL,
+  recurso VARCHAR(50) NOT NULL,      -- gmail, outlook_mail, mscal
+  externo_id VARCHAR(255),           -- id de la subscription en Graph
+  cuenta VARCHAR(255),               -- email de la cuenta de Gmail
+  secreto VARCHAR(128),              -- clientState de Graph
+  cursor VARCHAR(64),                -- último historyId de Gmail aplicado
+  expira_en TIMESTAMP WITH TIME ZONE,
+  actualizado_en TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  CONSTRAINT uq_suscripciones_push_user_recurso UNIQUE (user_id, recurso)
+);
+CREATE INDEX IF NOT EXISTS ix_suscripciones_push_externo_id ON suscripciones_push (externo_id);
+CREATE INDEX IF NOT EXISTS ix_suscripciones_push_cuenta ON suscripciones_push (cuenta);
+
+-- Contador de cambios por usuario y tabla: base de los ETag de los listados
+CREATE TABLE IF NOT EXISTS versiones (
+  user_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+  tabla VARCHAR(50) NOT NULL,
+  version INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (user_id, tabla)
+);
+
+-- Capturas rápidas ya aplicadas desde el journal: clave de idempotencia → objeto creado
+CREATE TABLE IF NOT EXISTS capturas (
+  id SERIAL PRIMARY KEY,
+  user_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+  clave VARCHAR(64) NOT NULL,        -- Idempotency-Key del cliente (o generada)
+  tipo VARCHAR(20) NOT NULL,         -- tarea, recuerdo
+  objeto_id INTEGER,
+  recibida_en TIMESTAMP WITH TIME ZONE NOT NULL,
+  aplicada_en TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  CONSTRAINT uq_capturas_user_clave UNIQUE (user_id, clave)
+);
+
+CREATE TABLE IF NOT EXISTS documentos (
+  id SERIAL PRIMARY KEY,
+  user_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+  proyecto_id INTEGER REFERENCES proyectos(id) ON DELETE CASCADE,
+  externo_id VARCHAR(128),
+  ruta VARCHAR(1024) NOT NULL,
+  tamano BIGINT NOT NULL,
+  mtime_ns BIGINT NOT NULL,
+  sha256 VARCHAR(64) NOT NULL,
+  fragmentos INTEGER NOT NULL,
+  error TEXT,
+  indexado_en TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  CONSTRAINT uq_documentos_proyecto_ruta UNIQUE (proyecto_id, ruta),
+  CONSTRAINT uq_documentos_user_externo UNIQUE (user_id, externo_id)
+);
+
+CREATE TABLE IF NOT EXISTS fragmentos (
+  id SERIAL PRIMARY KEY,
+  documento_id INTEGER NOT NULL REFERENCES documentos(id) ON DELETE CASCADE,
+  user_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+  proyecto_id INTEGER REFERENCES proyectos(id) ON DELETE CASCADE,
+  posicion INTEGER NOT NULL,
+  texto TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_fragmentos_documento_posicion ON fragmentos (documento_id, posicion);
+CREATE INDEX IF NOT EXISTS ix_fragmentos_proyecto_id ON fragmentos (proyecto_id);
+CREATE INDEX IF NOT EXISTS ix_fragmentos_fts ON fragmentos USING gin (to_tsvector('simple', texto));
+
+CREATE TABLE IF NOT EXISTS drive_archivos (
+  id SERIAL PRIMARY KEY,
+  user_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+  file_id VARCHAR(128) NOT NULL,
+  nombre VARCHAR(1024) NOT NULL,
+  mime_type VARCHAR(255),
+  modificado TIMESTAMP WITH TIME ZONE,
+  web_view_link VARCHAR(1024),
+  tamano BIGINT,
+  sincronizado_en TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  CONSTRAINT uq_drive_archivos_user_file UNIQUE (user_id, file_id)
+);
+CREATE INDEX IF NOT EXISTS ix_drive_archivos_user_modificado ON drive_archivos (user_id, modificado);
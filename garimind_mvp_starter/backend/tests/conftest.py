@@ -0,0 +1,42 @@
+# backend/tests/conftest.py
+# Settings se leen del entorno al importar app.*: el entorno de pruebas se fija aquí, antes de
+# que cualquier test importe la app. SQLite y journal en un directorio temporal, sin sync, sin
+# prefetch ni IA; push habilitado para probar sus receptores.
+import os
+import shutil
+import tempfile
+
+import pytest
+
+_tmp = tempfile.mkdtemp(prefix="garimind-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_tmp}/tests.db",
+    DB_MIGRATE_ON_STARTUP="true",
+    DATA_DIR=os.path.join(_tmp, "proyectos"),
+    CAPTURE_JOURNAL_DIR=os.path.join(_tmp, "journal"),
+    SYNC_ENABLED="false",
+    CALENDAR_PREFETCH_ENABLED="false",
+    ENRICH_ENABLED="false",
+    INDEX_ENABLED="false",
+    AI_ENABLED="false",
+    PROFILING_ENABLED="false",
+    PUSH_ENABLED="true",
+    PUSH_VERIFICATION_TOKEN="token-pruebas",
+    CACHE_BACKEND="memory",
+    TIMEZONE="America/Bogota",
+    RETRY_BASE_DELAY_SECONDS="0.001",
+)
+
+USER_ID = 1
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.api.users import current_user_id
+    from app.main import app
+
+    app.dependency_overrides[current_user_id] = lambda: USER_ID
+    with TestClient(app) as c:  # startup: migraciones, journal de capturas, cola push
+        yield c
+    app.dependency_overrides.clear()
+    shutil.rmtree(_tmp, ignore_errors=True)
@@ -0,0 +1,24 @@
+import hashlib
+import os
+
+import pytest
+
+from app.core import cache
+
+def _stripe(name):
+    return int.from_bytes(hashlib.sha1(name.encode()).digest()[:4], "big") % cache.LOCK_STRIPES
+
+@pytest.mark.skipif(os.name != "posix", reason="flock solo en POSIX")
+def test_shared_lock_files_are_striped(tmp_path):
+    c = cache.SharedCache(str(tmp_path), 100)
+    for i in range(500):
+        with c.lock(f"calendar:{i}:google", 1) as acquired:
+            assert acquired
+    assert len(os.listdir(c.lock_dir)) <= cache.LOCK_STRIPES
+
+    # anidados en la misma franja (calendar -> ms-token) no se bloquean dentro del proceso
+    outer = "calendar:1:microsoft"
+    inner = next(f"ms-token:{i}" for i in range(10_000) if _stripe(f"ms-token:{i}") == _stripe(outer))
+    with c.lock(outer, 1) as a, c.lock(inner, 0.05) as b:
+        assert a and b
+    assert c._stripes == {} and c._names._locks == {}
@@ -0,0 +1,64 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.services import calendar
+
+from .conftest import USER_ID
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Proveedor falso: un evento a las 9:00 locales de cada día pedido. Cuenta las llamadas."""
+    calls = []
+
+    def fetch(user_id, proveedor, start, end):
+        calls.append((start.date(), end.date()))
+        out, d = [], start.date()
+        while d < end.date():
+            nine = datetime.combine(d, datetime.min.time(), calendar.tz()).replace(hour=9)
+            out.append({"id": f"{proveedor}-{d.isoformat()}", "title": f"Evento {d.isoformat()}",
+                        "start": nine.isoformat(), "end": (nine + timedelta(hours=1)).isoformat(), "allDay": False})
+            d += timedelta(days=1)
+        return out
+
+    monkeypatch.setattr(calendar, "_fetch", fetch)
+    calendar.invalidate(USER_ID)
+    yield calls
+    calendar.invalidate(USER_ID)
+
+def test_events_across_day_rollover(provider, monkeypatch):
+    day1 = date(2026, 10, 19)
+    day2 = day1 + timedelta(days=1)
+    monkeypatch.setattr(calendar, "today", lambda: day1)
+    assert [e["id"] for e in calendar.events(USER_ID, "google", calendar.today(), calendar.today())] == ["google-2026-10-19"]
+
+    # medianoche local: el cubo de ayer sigue en cache pero "hoy" es otro día
+    monkeypatch.setattr(calendar, "today", lambda: day2)
+    assert [e["id"] for e in calendar.events(USER_ID, "google", calendar.today(), calendar.today())] == ["google-2026-10-20"]
+    assert provider == [(day1, day2), (day2, day2 + timedelta(days=1))]
+
+    # los dos días ya están en cubos: el rango no llama al proveedor
+    both = calendar.events(USER_ID, "google", day1, day2)
+    assert [e["id"] for e in both] == ["google-2026-10-19", "google-2026-10-20"]
+    assert len(provider) == 2
+
+def test_calendar_today_endpoint_follows_local_day(client, provider, monkeypatch):
+    for d in (date(2026, 12, 31), date(2027, 1, 1)):
+        monkeypatch.setattr(calendar, "today", lambda d=d: d)
+        r = client.get("/api/google/calendar/today")
+        assert r.status_code == 200
+        assert [e["id"] for e in r.json()] == [f"google-{d.isoformat()}"]
+
+def test_events_serve_stale_buckets_when_provider_fails(provider, monkeypatch):
+    day = date(2026, 10, 21)
+    monkeypatch.setattr(calendar.settings, "CALENDAR_CACHE_TTL_SECONDS", -1)  # cubos ya vencidos
+    calendar.events(USER_ID, "microsoft", day, day)
+
+    def down(*args):
+        raise RuntimeError("proveedor caído")
+    monkeypatch.setattr(calendar, "_fetch", down)
+    assert [e["id"] for e in calendar.events(USER_ID, "microsoft", day, day)] == ["microsoft-2026-10-21"]
+    with pytest.raises(RuntimeError):
+        calendar.events(USER_ID, "microsoft", day, day, refresh=True)
+    with pytest.raises(RuntimeError):  # sin cubo vencido que servir
+        calendar.events(USER_ID, "microsoft", day, day + timedelta(days=1))
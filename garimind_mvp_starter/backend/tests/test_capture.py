@@ -0,0 +1,103 @@
+import os
+import time
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from sqlalchemy import func, select
+
+from app.models.models import Captura, Proyecto, Tarea, Usuario
+from app.services import capture
+
+from .conftest import USER_ID
+
+def _wait(pred, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if pred():
+            return True
+        time.sleep(0.02)
+    return False
+
+def _tareas(titulo):
+    with capture.SessionFactory() as session:
+        return session.execute(select(func.count()).select_from(Tarea).where(Tarea.titulo == titulo)).scalar_one()
+
+def test_journal_drains_past_poison_record(client, monkeypatch):
+    monkeypatch.setattr(capture, "RETRY_MAX_SECONDS", 0.01)
+    journal = capture.journal
+    assert journal.running
+    recs = [capture.record(USER_ID, "tarea", f"veneno-{i}", None) for i in range(8)]
+    recs[3]["ts"] = "no es un timestamp"  # no entra en la DB: el lote falla en cada intento
+    descartadas = journal.stats["descartadas"]
+    for r in recs:
+        journal.submit(r)
+
+    assert _wait(lambda: all(journal.status(USER_ID, r["k"])["estado"] != "pendiente" for r in recs))
+    estados = [journal.status(USER_ID, r["k"])["estado"] for r in recs]
+    assert estados == ["guardada"] * 3 + ["descartada"] + ["guardada"] * 4
+    assert journal.stats["descartadas"] == descartadas + 1
+    assert all(_tareas(f"veneno-{i}") == 1 for i in range(8) if i != 3)
+
+    path = os.path.join(os.environ["CAPTURE_JOURNAL_DIR"], capture.DEAD_LETTER_FILE)
+    with open(path, "rb") as f:
+        dead = [orjson.loads(line) for line in f]
+    assert recs[3]["k"] in [d["k"] for d in dead]
+
+    r = client.get(f"/api/inbox/capturas/{recs[3]['k']}")
+    assert r.status_code == 200 and r.json()["estado"] == "descartada"
+
+def _capturar(client, entrada, clave, **extra):
+    return client.post("/api/inbox/capturar", json={"entrada": entrada, **extra}, headers={"Idempotency-Key": clave})
+
+def _capturas(clave):
+    with capture.SessionFactory() as session:
+        return session.execute(
+            select(func.count()).select_from(Captura).where(Captura.user_id == USER_ID, Captura.clave == clave)
+        ).scalar_one()
+
+def test_capturar_idempotent_with_journal(client):
+    first = _capturar(client, "con journal", "clave-journal")
+    assert first.status_code in (200, 202)
+    assert _wait(lambda: capture.journal.status(USER_ID, "clave-journal")["estado"] == "guardada")
+    again = _capturar(client, "con journal", "clave-journal")
+    assert again.status_code == 200
+    assert again.json()["estado"] == "guardada"
+    assert _tareas("con journal") == 1
+    assert _capturas("clave-journal") == 1
+
+def test_capturar_idempotent_without_journal(client, monkeypatch):
+    monkeypatch.setattr(capture, "journal", SimpleNamespace(running=False))
+    first = _capturar(client, "sin journal", "clave-directa")
+    again = _capturar(client, "sin journal", "clave-directa")
+    assert first.status_code == again.status_code == 200
+    assert first.json() == again.json()
+    assert first.json()["estado"] == "guardada" and first.json()["id"] is not None
+    assert _tareas("sin journal") == 1
+    assert _capturas("clave-directa") == 1
+
+@pytest.mark.parametrize("running", [True, False])
+def test_capturar_foreign_project_404(client, monkeypatch, running):
+    with capture.SessionFactory() as session:
+        otro = Usuario(email=f"otro-{running}@example.com")
+        session.add(otro)
+        session.flush()
+        ajeno = Proyecto(user_id=otro.id, nombre="ajeno")
+        session.add(ajeno)
+        session.commit()
+        pid = ajeno.id
+    if not running:
+        monkeypatch.setattr(capture, "journal", SimpleNamespace(running=False))
+    r = _capturar(client, "en proyecto ajeno", f"clave-ajena-{running}", proyecto_id=pid)
+    assert r.status_code == 404
+    assert _capturas(f"clave-ajena-{running}") == 0
+
+@pytest.mark.parametrize("payload", [
+    {"entrada": "x" * 256},
+    {"entrada": "x" * 20_001, "como": "recuerdo"},
+])
+def test_capturar_rejects_oversized_input(client, payload):
+    assert client.post("/api/inbox/capturar", json=payload).status_code == 422
+
+def test_capturar_long_recuerdo(client):
+    assert client.post("/api/inbox/capturar", json={"entrada": "x" * 256, "como": "recuerdo"}).status_code in (200, 202)
@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+from app.api import google as g
+
+class _Files:
+    """files().list de Drive sobre `total` archivos, con pageSize topado como la API real."""
+    def __init__(self, total):
+        self.total, self.calls = total, []
+
+    def list(self, pageSize, pageToken=None, **_):
+        assert pageSize <= g.DRIVE_PAGE_SIZE
+        self.calls.append(pageSize)
+        start = int(pageToken or 0)
+        end = min(start + pageSize, self.total)
+        resp = {"files": [{"id": str(i)} for i in range(start, end)]}
+        if end < self.total:
+            resp["nextPageToken"] = str(end)
+        return SimpleNamespace(execute=lambda: resp)
+
+def test_fetch_drive_recent_pages_past_page_size(monkeypatch):
+    files = _Files(2500)
+    monkeypatch.setattr(g, "build_service", lambda *a: SimpleNamespace(files=lambda: files))
+    out = g.fetch_drive_recent(None, 2100)
+    assert [f["id"] for f in out] == [str(i) for i in range(2100)]
+    assert files.calls == [1000, 1000, 100]
+
+    files = _Files(30)
+    monkeypatch.setattr(g, "build_service", lambda *a: SimpleNamespace(files=lambda: files))
+    assert len(g.fetch_drive_recent(None, 100)) == 30 and files.calls == [100]
@@ -0,0 +1,152 @@
+import asyncio
+import base64
+import json
+from datetime import timedelta
+
+import pytest
+
+from app.models.models import now_utc
+from app.services import push
+
+from .conftest import USER_ID
+
+TOKEN = "token-pruebas"
+
+@pytest.fixture
+def subs(client):
+    expira = now_utc() + timedelta(days=1)
+    push._upsert(USER_ID, "microsoft", "outlook_mail", externo_id="sub-correo", secreto="secreto-1", expira_en=expira)
+    push._upsert(USER_ID, "microsoft", "mscal", externo_id="sub-cal", secreto="secreto-2", expira_en=expira)
+    push._upsert(USER_ID, "google", "gmail", cuenta="cesar@example.com", cursor="100", expira_en=expira)
+
+def _graph(sub_id, state, **extra):
+    return {"subscriptionId": sub_id, "clientState": state, **extra}
+
+def test_route_graph_valid_client_state(subs):
+    jobs = push.route_graph([
+        _graph("sub-correo", "secreto-1", changeType="created", resourceData={"id": "m1"}),
+        _graph("sub-cal", "secreto-2", changeType="updated", resourceData={"id": "e1"}),
+        _graph("sub-correo", "secreto-1", lifecycleEvent="reauthorizationRequired"),
+    ])
+    kinds = [key[0] for key, _ in jobs]
+    assert jobs[0] == (("graph_mail", USER_ID), {"m1": "created"})
+    assert jobs[1] == (("refresh", USER_ID, "mscal"), {})
+    assert kinds[2] == "renew"
+
+@pytest.mark.parametrize("notification", [
+    _graph("sub-correo", "otro", resourceData={"id": "m1"}),
+    _graph("sub-correo", None, resourceData={"id": "m1"}),
+    _graph("sub-cal", "secreto-1"),  # clientState de otra suscripción
+    _graph("desconocida", "secreto-1", resourceData={"id": "m1"}),
+    _graph(None, "secreto-1"),
+])
+def test_route_graph_invalid_client_state(subs, notification):
+    assert push.route_graph([notification]) == []
+
+def test_route_gmail_history_id(subs):
+    assert push.route_gmail("Cesar@Example.com", 101) == [("gmail", USER_ID)]
+    assert push.route_gmail("cesar@example.com", None) == [("gmail", USER_ID)]
+    assert push.route_gmail("cesar@example.com", 100) == []  # ya aplicado
+    assert push.route_gmail("otro@example.com", 500) == []
+
+def _pubsub(data):
+    raw = data if isinstance(data, bytes) else json.dumps(data).encode()
+    return {"message": {"data": base64.b64encode(raw).decode()}}
+
+@pytest.mark.parametrize("body", [
+    [],
+    "x",
+    {"value": "x"},
+    {"value": ["x"]},
+    {"value": [{"subscriptionId": {"$ne": ""}, "clientState": "secreto-1"}]},
+    {"value": [{"subscriptionId": "sub-correo", "clientState": 1}]},
+    {"value": [{"subscriptionId": "sub-correo"}]},
+    {"value": [{"subscriptionId": "sub-correo", "clientState": "secreto-1", "resourceData": ["m1"]}]},
+    {"value": [{"subscriptionId": "sub-correo", "clientState": "secreto-1", "resourceData": {"id": {"a": 1}}}]},
+    {"value": [{"subscriptionId": "sub-correo", "clientState": "secreto-1", "changeType": 5}]},
+])
+def test_graph_notification_invalid_payload(client, subs, body):
+    assert client.post("/api/push/graph", json=body).status_code == 400
+
+def test_graph_notification_valid(client, subs, monkeypatch):
+    queued = []
+    monkeypatch.setattr(push.queue, "put", lambda key, changes=None: queued.append((key, changes)))
+    body = {"value": [_graph("sub-correo", "secreto-1", changeType="created", resourceData={"id": "m1"}),
+                      _graph("sub-correo", "otro", changeType="created", resourceData={"id": "m2"})]}
+    assert client.post("/api/push/graph", json=body).status_code == 202
+    assert queued == [(("graph_mail", USER_ID), {"m1": "created"})]
+    assert client.post("/api/push/graph", json={}).status_code == 202
+
+@pytest.mark.parametrize("data", [
+    {"emailAddress": "cesar@example.com", "historyId": "abc"},
+    {"emailAddress": "cesar@example.com", "historyId": [1]},
+    {"emailAddress": ["cesar@example.com"], "historyId": "200"},
+    {"historyId": "200"},
+    ["cesar@example.com"],
+    b"no es json",
+])
+def test_gmail_notification_invalid_payload(client, subs, data):
+    r = client.post("/api/push/gmail", params={"token": TOKEN}, json=_pubsub(data))
+    assert r.status_code == 400
+
+def test_gmail_notification_valid(client, subs, monkeypatch):
+    queued = []
+    monkeypatch.setattr(push.queue, "put", lambda key, changes=None: queued.append(key))
+    r = client.post("/api/push/gmail", params={"token": TOKEN},
+                    json=_pubsub({"emailAddress": "cesar@example.com", "historyId": "200"}))
+    assert r.status_code == 204
+    assert queued == [("gmail", USER_ID)]
+    r = client.post("/api/push/gmail", params={"token": "otro"},
+                    json=_pubsub({"emailAddress": "cesar@example.com", "historyId": "200"}))
+    assert r.status_code == 403
+
+def test_queue_retries_failed_job_with_its_changes(monkeypatch):
+    monkeypatch.setattr(push, "RETRY_BASE_SECONDS", 0.01)
+    seen = []
+
+    async def run():
+        q = push.PushQueue()
+        failures = {"graph_mail": 1, "gmail": push.RETRY_MAX_ATTEMPTS}
+
+        async def process(key, changes):
+            seen.append((key, dict(changes)))
+            if failures.get(key[0], 0) > 0:
+                failures[key[0]] -= 1
+                raise RuntimeError("caído")
+            return []
+        q._process = process
+        q._queue = asyncio.Queue()
+        q._tasks = [asyncio.create_task(q._worker())]
+        q.put(("graph_mail", USER_ID), {"m1": "created"})
+        q.put(("gmail", USER_ID))
+        await asyncio.sleep(0.5)
+        await q.stop()
+        return q.stats
+
+    stats = asyncio.run(run())
+    graph = [changes for key, changes in seen if key == ("graph_mail", USER_ID)]
+    assert graph == [{"m1": "created"}, {"m1": "created"}]  # reintentado con sus cambios
+    assert [key for key, _ in seen if key[0] == "gmail"] == [("gmail", USER_ID)] * push.RETRY_MAX_ATTEMPTS
+    # agotados los intentos se rehace el snapshot de lo que cubría
+    assert [key for key, _ in seen if key[0] == "refresh"] == [("refresh", USER_ID, f) for f in push.COVERS["gmail"]]
+    assert stats["abandonados"] == 1
+
+def test_queue_drops_key_locks_after_jobs():
+    async def run():
+        q = push.PushQueue()
+
+        async def process(key, changes):
+            await asyncio.sleep(0.01)
+            return []
+        q._process = process
+        q._queue = asyncio.Queue()
+        q._tasks = [asyncio.create_task(q._worker()) for _ in range(2)]
+        for i in range(20):
+            q.put(("graph_mail", i), {f"m{i}": "created"})
+        await q.join()
+        await q.stop()
+        return q
+
+    q = asyncio.run(run())
+    assert q.stats["procesados"] == 20
+    assert q._locks == {}  # un lock por clave solo mientras hay un trabajo con ella
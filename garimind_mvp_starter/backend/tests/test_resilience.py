@@ -0,0 +1,108 @@
+import time
+
+import pytest
+import requests
+
+from app.core import resilience
+from app.core.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, RetryBudget
+
+class Flaky:
+    """fn para call(): levanta `errors` (en orden) y después responde `ok`."""
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+class Throttled(Exception):
+    status_code = 429
+
+@pytest.fixture
+def google(monkeypatch):
+    """Breaker y presupuesto propios para "google": 2 fallos abren, 50 ms de cooldown."""
+    breaker = CircuitBreaker("google", failures=2, cooldown=0.05)
+    budget = RetryBudget(ratio=0.5, cap=2)
+    monkeypatch.setitem(resilience.breakers, "google", breaker)
+    monkeypatch.setitem(resilience.budgets, "google", budget)
+    return breaker, budget
+
+def test_breaker_transitions():
+    b = CircuitBreaker("google", failures=2, cooldown=0.05)
+    b.before()
+    b.failure()
+    assert b.state == CLOSED
+    b.failure()
+    assert b.state == OPEN
+    with pytest.raises(CircuitOpen) as e:
+        b.before()
+    assert e.value.status_code == 503 and "Retry-After" in e.value.headers
+
+    time.sleep(0.06)
+    b.before()  # pasado el cooldown: una sola prueba
+    assert b.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        b.before()
+    b.failure()  # la prueba falló: abierto otra vez, sin esperar al umbral
+    assert b.state == OPEN
+
+    time.sleep(0.06)
+    b.before()
+    b.release()  # la prueba no llegó al proveedor
+    assert b.state == OPEN
+    b.before()
+    b.success()
+    assert b.state == CLOSED and b.failures == 0
+
+def test_budget_transitions():
+    budget = RetryBudget(ratio=0.5, cap=2)
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()  # 0.5: no alcanza para un reintento
+    budget.deposit()
+    assert budget.withdraw()
+    for _ in range(10):
+        budget.deposit()
+    assert budget.balance == 2  # tope
+
+def test_call_retries_then_succeeds(google):
+    breaker, _ = google
+    fn = Flaky(requests.ConnectionError("red"))
+    assert resilience.call("google", "prueba", fn) == "ok"
+    assert fn.calls == 2
+    assert breaker.state == CLOSED
+
+def test_call_opens_breaker_and_rejects_without_calling(google):
+    breaker, _ = google
+    fn = Flaky(*[requests.ConnectionError("red")] * 10)
+    with pytest.raises(requests.ConnectionError):
+        resilience.call("google", "prueba", fn)
+    assert breaker.state == OPEN
+    calls = fn.calls
+    with pytest.raises(CircuitOpen):
+        resilience.call("google", "prueba", fn)
+    assert fn.calls == calls
+
+    time.sleep(0.06)
+    assert resilience.call("google", "prueba", Flaky()) == "ok"  # la prueba pasa: se cierra
+    assert breaker.state == CLOSED
+
+def test_call_stops_retrying_when_budget_is_spent(google, monkeypatch):
+    breaker, budget = google
+    monkeypatch.setattr(breaker, "threshold", 100)  # que no corte el circuito
+    budget.balance = 0
+    fn = Flaky(requests.ConnectionError("red"), requests.ConnectionError("red"))
+    with pytest.raises(requests.ConnectionError):
+        resilience.call("google", "prueba", fn)
+    assert fn.calls == 1  # el depósito de la llamada (0.5) no alcanza para reintentar
+
+def test_throttling_does_not_open_breaker(google):
+    breaker, _ = google
+    fn = Flaky(Throttled(), Throttled())
+    assert resilience.call("google", "prueba", fn) == "ok"
+    assert fn.calls == 3
+    assert breaker.state == CLOSED
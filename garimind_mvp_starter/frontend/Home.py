@@ -1,13 +1,12 @@
+import uuid
+
 import streamlit as st
 import requests
-import os
-from dotenv import load_dotenv
 
 # =============================
-# 🔧 Configuración
+# 🔧 Configuración (BACKEND_URL / GARIMIND_API_TOKEN en .env, ver api_client.py)
 # =============================
-load_dotenv()
-BACKEND_URL = os.getenv("BACKEND_URL", "https://garimind-secondbrain-ai.onrender.com")
+import api_client as api
 
 st.set_page_config(page_title="🧠 GariMind • Daily Magnet", layout="wide", page_icon="🧲")
 
@@ -17,19 +16,26 @@ st.set_page_config(page_title="🧠 GariMind • Daily Magnet", layout="wide", p
 st.title("🧲 Daily Magnet")
 st.caption("Lo de ayer • Lo crítico de hoy • Recuerdo • Frase de bondad")
 
+# Las tres secciones se piden a la vez (cacheadas; la captura de abajo invalida tareas/recuerdos)
+data = api.fetch_all({
+    "daily_magnet": ("/api/daily-magnet", None),
+    "tareas": ("/api/tareas", None),
+    "recuerdos": ("/api/recuerdos", None),
+})
+
 # =============================
 # 📊 Bloque Daily Magnet
 # =============================
-try:
-    dm = requests.get(f"{BACKEND_URL}/api/daily-magnet", timeout=10).json()
+dm = data["daily_magnet"]
+if isinstance(dm, Exception):
+    st.error(f"No pude cargar el Daily Magnet: {dm}")
+    st.info("Verifica que el backend esté disponible o la variable BACKEND_URL sea correcta.")
+else:
     cols = st.columns(4)
     cols[0].metric("Ayer", dm.get("ayer", "-"))
     cols[1].metric("Hoy", dm.get("hoy", "-"))
     cols[2].metric("Recuerdo", dm.get("recuerdo", "-"))
     cols[3].metric("Bondad", dm.get("frase_bondad", "-"))
-except Exception as e:
-    st.error(f"No pude cargar el Daily Magnet: {e}")
-    st.info("Verifica que el backend esté disponible o la variable BACKEND_URL sea correcta.")
 
 st.divider()
 
@@ -44,6 +50,8 @@ colA, colB, colC = st.columns([1, 1, 2])
 tipo = colA.selectbox("Tipo", ["tarea", "recuerdo"])
 proyecto_id = colB.number_input("Proyecto ID (opcional)", min_value=0, step=1)
 enviar = colC.button("🚀 Capturar ahora")
+capturado = False
+pendiente = None  # captura aceptada que el backend aún no guarda en la DB
 
 if enviar:
     if entrada.strip() == "":
@@ -55,11 +63,20 @@ if enviar:
                 "como": tipo,
                 "proyecto_id": int(proyecto_id) if proyecto_id else None
             }
-            r = requests.post(f"{BACKEND_URL}/api/inbox/capturar", json=payload, timeout=10)
-            if r.status_code in [200, 201]:
-                st.success(f"✅ Capturado correctamente: {r.json()}")
+            # la misma captura reintentada (p.ej. tras un timeout) conserva su clave: no se duplica
+            sig = repr(sorted(payload.items()))
+            if st.session_state.get("captura_sig") != sig:
+                st.session_state["captura_sig"], st.session_state["captura_clave"] = sig, uuid.uuid4().hex
+            out = api.post("/api/inbox/capturar", json=payload, idempotency_key=st.session_state["captura_clave"])
+            del st.session_state["captura_sig"], st.session_state["captura_clave"]
+            if out.get("estado") == "pendiente":
+                st.success(f"✅ Capturado ({out['tipo']}); se guarda en segundo plano")
+                pendiente = out["tipo"]
             else:
-                st.error(f"⚠️ Error {r.status_code}: {r.text}")
+                st.success(f"✅ Capturado correctamente: {out}")
+            capturado = True
+        except requests.HTTPError as e:
+            st.error(f"⚠️ Error {e.response.status_code}: {e.response.text}")
         except Exception as e:
             st.error(f"❌ Error al enviar: {e}")
 
@@ -72,29 +89,36 @@ st.subheader("📋 Últimas tareas y recuerdos")
 
 col1, col2 = st.columns(2)
 
+ULTIMOS = 10
+if capturado:
+    # la captura invalidó estas rutas: se vuelven a pedir para que aparezca ya
+    data.update(api.fetch_all({"tareas": ("/api/tareas", None), "recuerdos": ("/api/recuerdos", None)}))
+
 with col1:
     st.write("### ✅ Tareas")
-    try:
-        tareas = requests.get(f"{BACKEND_URL}/api/tareas").json()
-        if tareas:
-            for t in tareas:
-                st.write(f"- {t.get('title', 'Sin título')} (id: {t.get('id')})")
-        else:
-            st.info("No hay tareas registradas.")
-    except Exception as e:
-        st.error(f"Error al obtener tareas: {e}")
+    tareas = data["tareas"]
+    if isinstance(tareas, Exception):
+        st.error(f"Error al obtener tareas: {tareas}")
+    elif tareas or pendiente == "tarea":
+        if pendiente == "tarea" and (not tareas or tareas[0].get("titulo") != entrada):
+            st.write(f"- ⏳ {entrada} (guardando…)")
+        for t in tareas[:ULTIMOS]:
+            st.write(f"- {t.get('titulo', 'Sin título')} (id: {t.get('id')})")
+    else:
+        st.info("No hay tareas registradas.")
 
 with col2:
     st.write("### 💭 Recuerdos")
-    try:
-        recuerdos = requests.get(f"{BACKEND_URL}/api/recuerdos").json()
-        if recuerdos:
-            for r in recuerdos:
-                st.write(f"- {r.get('texto', 'Sin texto')} (id: {r.get('id')})")
-        else:
-            st.info("No hay recuerdos aún.")
-    except Exception as e:
-        st.error(f"Error al obtener recuerdos: {e}")
+    recuerdos = data["recuerdos"]
+    if isinstance(recuerdos, Exception):
+        st.error(f"Error al obtener recuerdos: {recuerdos}")
+    elif recuerdos or pendiente == "recuerdo":
+        if pendiente == "recuerdo" and (not recuerdos or recuerdos[0].get("contenido") != entrada):
+            st.write(f"- ⏳ {entrada} (guardando…)")
+        for r in recuerdos[:ULTIMOS]:
+            st.write(f"- {r.get('contenido', 'Sin texto')} (id: {r.get('id')})")
+    else:
+        st.info("No hay recuerdos aún.")
 
 st.divider()
 st.caption("Desarrollado con 💙 por CésarStyle™ — GariMind Second Brain")
@@ -0,0 +1,201 @@
+# frontend/api_client.py
+# Cliente del backend compartido por Home.py y pages/:
+# - una requests.Session por proceso (pool keep-alive) con el API token si hay GARIMIND_API_TOKEN
+# - GETs cacheados con st.cache_data (TTL) por ruta + params, revalidados con ETag al vencer
+# - cada escritura invalida las rutas que cambia (WRITE_INVALIDATES)
+# - fetch_all: secciones independientes en paralelo (la página tarda lo que la más lenta)
+# - get_page: una página de un listado (+ total) y la siguiente precargada en segundo plano
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+import streamlit as st
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+load_dotenv()
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+API_TOKEN = os.getenv("GARIMIND_API_TOKEN")
+TIMEOUT = float(os.getenv("BACKEND_TIMEOUT", "10"))
+CACHE_TTL = int(os.getenv("FRONTEND_CACHE_TTL", "60"))
+# La memoria del proceso la acotan estas entradas (cada una es una respuesta, no el listado entero)
+CACHE_MAX_ENTRIES = int(os.getenv("FRONTEND_CACHE_MAX_ENTRIES", "128"))
+MAX_ETAGS = 128
+# Tras un 202 (p.ej. captura en el journal del backend) la escritura aún no está en la DB: durante
+# esta ventana los GET de las rutas afectadas no usan la caché (solo revalidan por ETag)
+PENDING_WRITE_SECONDS = float(os.getenv("FRONTEND_PENDING_WRITE_SECONDS", "5"))
+TOTAL_HEADER = "X-Total-Count"
+
+# Qué listados cambia cada escritura
+WRITE_INVALIDATES = {
+    "/api/projects": ("/api/projects",),
+    "/api/tareas": ("/api/tareas", "/api/diario"),
+    "/api/recuerdos": ("/api/recuerdos", "/api/diario"),
+    "/api/inbox/capturar": ("/api/tareas", "/api/recuerdos", "/api/diario"),
+    "/api/actions/task_from_email": ("/api/tareas", "/api/diario"),
+    "/api/actions/task_from_event": ("/api/tareas", "/api/diario"),
+}
+
+class _State:
+    """Estado del proceso (compartido por todas las sesiones de Streamlit)."""
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if API_TOKEN:
+            self.session.headers["Authorization"] = f"Bearer {API_TOKEN}"
+        self.generations: Dict[str, int] = {}  # ruta -> generación (entra en la clave de caché)
+        self.settling: Dict[str, float] = {}  # ruta -> hasta cuándo hay una escritura aceptada sin aplicar
+        self.etags: "OrderedDict[Tuple, Tuple[str, Any, Optional[int]]]" = OrderedDict()  # (ruta, params) -> (ETag, datos, total)
+        self.timings: Dict[str, str] = {}  # ruta -> Server-Timing del último request real
+        self.lock = threading.Lock()
+        self.prefetcher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+        self.prefetching: set = set()  # claves de página en vuelo (no repetir la precarga)
+
+@st.cache_resource
+def _state() -> _State:
+    return _State()
+
+def _params_key(params: Optional[Dict[str, Any]]) -> Tuple:
+    return tuple(sorted((k, v) for k, v in (params or {}).items() if v is not None))
+
+def request(method: str, path: str, **kwargs) -> requests.Response:
+    """Request crudo por la sesión compartida (sin caché ni raise_for_status)."""
+    kwargs.setdefault("timeout", TIMEOUT)
+    s = _state()
+    r = s.session.request(method, BACKEND_URL + path, **kwargs)
+    if "Server-Timing" in r.headers:
+        s.timings[path] = r.headers["Server-Timing"]
+    return r
+
+def server_timing(path: str) -> Optional[str]:
+    """Server-Timing del último request que llegó al backend para `path` (no de la caché)."""
+    return _state().timings.get(path)
+
+def _fetch(path: str, params: Tuple) -> Tuple[Any, Optional[int]]:
+    """GET con revalidación por ETag → (datos, X-Total-Count si el backend lo manda)."""
+    s = _state()
+    key = (path, params)
+    with s.lock:
+        known = s.etags.get(key)
+    headers = {"If-None-Match": known[0]} if known else None
+    r = request("GET", path, params=list(params), headers=headers)
+    if r.status_code == 304 and known:
+        return known[1], known[2]
+    r.raise_for_status()
+    data = r.json()
+    total = int(r.headers[TOTAL_HEADER]) if TOTAL_HEADER in r.headers else None
+    etag = r.headers.get("ETag")
+    if etag:
+        with s.lock:
+            s.etags[key] = (etag, data, total)
+            s.etags.move_to_end(key)
+            while len(s.etags) > MAX_ETAGS:
+                s.etags.popitem(last=False)
+    return data, total
+
+def _get(path: str, params: Tuple) -> Any:
+    return _fetch(path, params)[0]
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_get(path: str, params: Tuple, generation: int) -> Any:
+    return _get(path, params)
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_page(path: str, params: Tuple, generation: int) -> Tuple[Any, Optional[int]]:
+    return _fetch(path, params)
+
+def _settling(path: str) -> bool:
+    until = _state().settling.get(path)
+    return until is not None and until > time.monotonic()
+
+def get(path: str, params: Optional[Dict[str, Any]] = None, cache: bool = True) -> Any:
+    """GET JSON; con cache=False va siempre al backend (p.ej. auth-url)."""
+    key = _params_key(params)
+    if not cache or _settling(path):
+        return _get(path, key)
+    return _cached_get(path, key, _state().generations.get(path, 0))
+
+def _page_key(params, size_param: str, page_size: int, page: int) -> Tuple:
+    return _params_key({**(params or {}), size_param: page_size, "offset": page * page_size})
+
+def _prefetch(path: str, key: Tuple, generation: int):
+    s = _state()
+    try:
+        _cached_page(path, key, generation)
+    except Exception:
+        pass  # la precarga es oportunista: si falla, la página se pide al abrirla
+    finally:
+        with s.lock:
+            s.prefetching.discard((path, key, generation))
+
+def get_page(path: str, params: Optional[Dict[str, Any]] = None, page: int = 0, page_size: int = 50,
+             size_param: str = "limit", prefetch: bool = True) -> Tuple[List[Any], Optional[int]]:
+    """
+    Página `page` (desde 0) de un listado paginado del backend → (filas, total o None).
+    Con `prefetch` deja pidiendo la siguiente en segundo plano si puede existir, para que
+    "Siguiente" salga de la caché.
+    """
+    s = _state()
+    generation = s.generations.get(path, 0)
+    key = _page_key(params, size_param, page_size, page)
+    if _settling(path):
+        return _fetch(path, key)
+    rows, total = _cached_page(path, key, generation)
+    more = (page + 1) * page_size < total if total is not None else len(rows) == page_size
+    if prefetch and more:
+        nxt = (path, _page_key(params, size_param, page_size, page + 1), generation)
+        with s.lock:
+            start = nxt not in s.prefetching
+            s.prefetching.add(nxt)
+        if start:
+            s.prefetcher.submit(_prefetch, *nxt)
+    return rows, total
+
+def invalidate(*paths: str):
+    s = _state()
+    with s.lock:
+        for p in paths:
+            s.generations[p] = s.generations.get(p, 0) + 1
+
+def post(path: str, json: Any = None, invalidates: Optional[Iterable[str]] = None, timeout: Optional[float] = None,
+         idempotency_key: Optional[str] = None) -> Any:
+    """
+    POST JSON; al responder bien invalida las rutas de WRITE_INVALIDATES[path] (o `invalidates`).
+    Con `idempotency_key` un reintento de la misma escritura no la duplica en el backend.
+    """
+    headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+    r = request("POST", path, json=json, headers=headers, timeout=timeout or TIMEOUT)
+    r.raise_for_status()
+    paths = tuple(invalidates if invalidates is not None else WRITE_INVALIDATES.get(path, ()))
+    invalidate(*paths)
+    if r.status_code == 202:
+        until = time.monotonic() + PENDING_WRITE_SECONDS
+        with _state().lock:
+            for p in paths:
+                _state().settling[p] = until
+    return r.json()
+
+def fetch_all(sections: Dict[str, Tuple[str, Optional[Dict[str, Any]]]]) -> Dict[str, Any]:
+    """
+    {"nombre": (ruta, params)} en paralelo → {"nombre": datos o la excepción}. Las secciones
+    que fallan no tumban a las demás: la página decide qué mostrar.
+    """
+    ctx = get_script_run_ctx()
+
+    def one(item):
+        name, (path, params) = item
+        add_script_run_ctx(threading.current_thread(), ctx)  # st.cache_data dentro del hilo
+        try:
+            return name, get(path, params)
+        except Exception as e:
+            return name, e
+
+    with ThreadPoolExecutor(max_workers=max(1, len(sections))) as pool:
+        return dict(pool.map(one, sections.items()))
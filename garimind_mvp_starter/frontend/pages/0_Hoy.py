@@ -1,32 +1,52 @@
-import streamlit as st, requests, os, pandas as pd
-from dotenv import load_dotenv
-from datetime import datetime
-load_dotenv()
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+import streamlit as st, pandas as pd
+from datetime import date, datetime, timedelta
+import api_client as api
+
+# Columnas que muestra cada tabla (esquema compacto del backend, ver services/items.py)
+EVENT_COLS = ["title", "start", "end", "location"]
+MAIL_COLS = ["from", "subject", "date", "isRead"]
+FILE_COLS = ["name", "modifiedTime", "webViewLink"]
 
 st.set_page_config(page_title="Hoy • Hub", layout="wide")
 st.title("🗓️📁📬 Hoy — Hub unificado")
 
 with st.spinner("Cargando..."):
     try:
-        data = requests.get(f"{BACKEND_URL}/api/unified/today", params={"max_emails": 50, "max_drive": 10}).json()
+        data = api.get("/api/unified/today", {
+            "max_emails": 50, "max_drive": 10, "fields": ",".join(EVENT_COLS + MAIL_COLS + FILE_COLS),
+        })
     except Exception as e:
         st.error(f"No pude cargar el hub: {e}")
         st.stop()
 
+# Dónde se fue el tiempo en el backend (db / google / microsoft / app) la última vez que se pidió
+timing = api.server_timing("/api/unified/today")
+if timing:
+    st.caption(f"⏱️ Server-Timing: {timing}")
+
 # Calendarios
 c1, c2 = st.columns(2)
 with c1:
     st.subheader("Google Calendar — Hoy")
     gcal = data.get("gcal", [])
-    if gcal: st.dataframe(pd.DataFrame(gcal))
+    if gcal: st.dataframe(pd.DataFrame(gcal, columns=EVENT_COLS))
     else: st.info("Sin eventos o sin autorización.")
 with c2:
     st.subheader("Outlook Calendar — Hoy")
     mscal = data.get("mscal", [])
-    if mscal: st.dataframe(pd.DataFrame(mscal))
+    if mscal: st.dataframe(pd.DataFrame(mscal, columns=EVENT_COLS))
     else: st.info("Sin eventos o sin autorización.")
 
+with st.expander("📅 Próximos 7 días (Google + Outlook)"):
+    hoy = date.today()
+    try:
+        semana = api.get("/api/calendar/range", {"from": hoy.isoformat(), "to": (hoy + timedelta(days=7)).isoformat()})
+        eventos = semana.get("events", [])
+        if eventos: st.dataframe(pd.DataFrame(eventos, columns=["source"] + EVENT_COLS))
+        else: st.info("Sin eventos o sin autorización.")
+    except Exception as e:
+        st.error(e)
+
 st.divider()
 
 # Emails
@@ -34,12 +54,12 @@ e1, e2 = st.columns(2)
 with e1:
     st.subheader("Gmail — Inbox (50)")
     gmail = data.get("gmail", [])
-    if gmail: st.dataframe(pd.DataFrame(gmail))
+    if gmail: st.dataframe(pd.DataFrame(gmail, columns=MAIL_COLS))
     else: st.info("Sin correos o sin autorización.")
 with e2:
     st.subheader("Outlook — Inbox (50)")
     outlook = data.get("outlook_mail", [])
-    if outlook: st.dataframe(pd.DataFrame(outlook))
+    if outlook: st.dataframe(pd.DataFrame(outlook, columns=MAIL_COLS))
     else: st.info("Sin correos o sin autorización.")
 
 st.divider()
@@ -47,7 +67,7 @@ st.divider()
 # Drive
 st.subheader("Google Drive — Recientes (10)")
 drv = data.get("drive", [])
-if drv: st.dataframe(pd.DataFrame(drv))
+if drv: st.dataframe(pd.DataFrame(drv, columns=FILE_COLS))
 else: st.info("Sin archivos o sin autorización.")
 
 st.divider()
@@ -70,7 +90,6 @@ with st.form("quick_task"):
                 st.warning("Fecha inválida; se ignorará. Use formato ISO.")
         try:
             endpoint = "/api/actions/task_from_email" if "Mail" in fuente else "/api/actions/task_from_event" if "Calendar" in fuente else "/api/actions/task_from_email"
-            r = requests.post(f"{BACKEND_URL}{endpoint}", json=payload)
-            st.success(r.json())
+            st.success(api.post(endpoint, json=payload))
         except Exception as e:
             st.error(e)
@@ -1,13 +1,11 @@
-import streamlit as st, requests, os
-from dotenv import load_dotenv
-load_dotenv()
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+import streamlit as st
+import api_client as api
 
 st.set_page_config(page_title="Diario Ejecutivo", layout="wide")
 st.title("📜 Diario Ejecutivo")
 
 try:
-    items = requests.get(f"{BACKEND_URL}/api/diario").json()
+    items = api.get("/api/diario")
     for it in items:
         if it.get("tipo") == "tarea":
             st.write(f"✅ **Tarea**: {it['titulo']} · {it['fecha']} · *{it.get('estado','')}*")
@@ -1,7 +1,6 @@
-import streamlit as st, requests, os, pandas as pd
-from dotenv import load_dotenv
-load_dotenv()
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+import streamlit as st
+import api_client as api
+from tables import paged_table
 
 st.set_page_config(page_title="Memoria & Tareas", layout="wide")
 st.title("📚 Memoria & ✅ Tareas")
@@ -18,11 +17,9 @@ with tab1:
         if q: params["q"] = q
         if tag: params["tag"] = tag
         if proyecto_id: params["proyecto_id"] = int(proyecto_id)
-        try:
-            data = requests.get(f"{BACKEND_URL}/api/recuerdos", params=params).json()
-            st.dataframe(pd.DataFrame(data))
-        except Exception as e:
-            st.error(e)
+        st.session_state["recuerdos_filtros"] = params  # la búsqueda sigue al cambiar de página
+    if "recuerdos_filtros" in st.session_state:
+        paged_table("/api/recuerdos", st.session_state["recuerdos_filtros"], key="recuerdos")
 
 with tab2:
     c1, c2 = st.columns([3,1])
@@ -32,16 +29,11 @@ with tab2:
         try:
             payload = {"titulo": titulo}
             if proyecto_id_t: payload["proyecto_id"] = int(proyecto_id_t)
-            r = requests.post(f"{BACKEND_URL}/api/tareas", json=payload)
-            st.success(r.json())
+            st.success(api.post("/api/tareas", json=payload))
         except Exception as e:
             st.error(e)
 
     st.subheader("Listado")
     params = {}
     if proyecto_id_t: params["proyecto_id"] = int(proyecto_id_t)
-    try:
-        data = requests.get(f"{BACKEND_URL}/api/tareas", params=params).json()
-        st.dataframe(pd.DataFrame(data))
-    except Exception as e:
-        st.error(e)
+    paged_table("/api/tareas", params, key="tareas")
@@ -1,7 +1,6 @@
-import streamlit as st, requests, os, pandas as pd
-from dotenv import load_dotenv
-load_dotenv()
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+import streamlit as st
+import api_client as api
+from tables import paged_table
 
 st.set_page_config(page_title="Proyectos", layout="wide")
 st.title("🗂️ Proyectos")
@@ -12,15 +11,37 @@ with st.form("crear_proyecto"):
     submitted = st.form_submit_button("Crear proyecto + carpeta")
     if submitted and nombre.strip():
         try:
-            r = requests.post(f"{BACKEND_URL}/api/projects", json={"nombre": nombre, "objetivo": objetivo})
-            st.success(f"Creado: {r.json()}")
+            st.success(f"Creado: {api.post('/api/projects', json={'nombre': nombre, 'objetivo': objetivo})}")
         except Exception as e:
             st.error(e)
 
 st.subheader("Proyectos existentes")
+paged_table("/api/projects", key="proyectos")
+st.info("Las carpetas se crean en el servidor en `data/projects/<slug>`.")
+
+st.subheader("🔎 Buscar en los documentos")
 try:
-    data = requests.get(f"{BACKEND_URL}/api/projects").json()
-    st.dataframe(pd.DataFrame(data))
-    st.info("Las carpetas se crean en el servidor en `data/projects/<slug>`.")
+    proyectos = {p["nombre"]: p["id"] for p in api.get("/api/projects", {"limit": 500})}
 except Exception as e:
+    proyectos = {}
     st.error(e)
+c1, c2, c3 = st.columns([3, 2, 1])
+q = c1.text_input("Palabras a buscar", key="docs_q")
+elegido = c2.selectbox("Proyecto", ["(todos)", *proyectos], key="docs_proyecto")
+pid = proyectos.get(elegido)
+if c3.button("Reindexar", disabled=pid is None, help="Indexa lo que cambió en la carpeta del proyecto"):
+    try:
+        st.success(api.post(f"/api/projects/{pid}/indexar", invalidates=(), timeout=300))
+    except Exception as e:
+        st.error(e)
+if len(q.strip()) >= 2:
+    try:
+        hits = api.get("/api/documentos/buscar", {"q": q, **({"proyecto_id": pid} if pid else {})}, cache=False)
+    except Exception as e:
+        hits = []
+        st.error(e)
+    if not hits:
+        st.caption("Sin resultados.")
+    for h in hits:
+        st.markdown(f"**{h['ruta']}** · fragmento {h['posicion'] + 1}")
+        st.caption(h["fragmento"])
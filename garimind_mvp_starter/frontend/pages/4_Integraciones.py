@@ -1,7 +1,5 @@
-import streamlit as st, requests, os, pandas as pd
-from dotenv import load_dotenv
-load_dotenv()
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+import streamlit as st, pandas as pd
+import api_client as api
 
 st.set_page_config(page_title="Integraciones", layout="wide")
 st.title("🔌 Integraciones: Google & Microsoft")
@@ -12,21 +10,27 @@ with col1:
     st.subheader("Google (Drive + Calendar)")
     if st.button("Conectar Google"):
         try:
-            r = requests.get(f"{BACKEND_URL}/api/google/auth-url").json()
+            r = api.get("/api/google/auth-url", cache=False)
             st.markdown(f"[Abrir autorización de Google]({r['auth_url']})")
         except Exception as e:
             st.error(e)
     st.caption("Archivos recientes (Drive)")
     if st.button("Ver recientes de Drive"):
         try:
-            data = requests.get(f"{BACKEND_URL}/api/google/drive/recent").json()
+            data = api.get("/api/google/drive/recent")
             st.dataframe(pd.DataFrame(data))
         except Exception as e:
             st.error(e)
+    q = st.text_input("Buscar en Drive (nombre o contenido)", key="drive_q")
+    if len(q.strip()) >= 2:
+        try:
+            st.dataframe(pd.DataFrame(api.get("/api/google/drive/search", {"q": q}, cache=False)))
+        except Exception as e:
+            st.error(e)
     st.caption("Eventos de hoy (Google Calendar)")
     if st.button("Ver hoy (Google)"):
         try:
-            events = requests.get(f"{BACKEND_URL}/api/google/calendar/today").json()
+            events = api.get("/api/google/calendar/today")
             st.dataframe(pd.DataFrame(events))
         except Exception as e:
             st.error(e)
@@ -35,14 +39,14 @@ with col2:
     st.subheader("Microsoft (Outlook Calendar)")
     if st.button("Conectar Microsoft"):
         try:
-            r = requests.get(f"{BACKEND_URL}/api/ms/auth-url").json()
+            r = api.get("/api/ms/auth-url", cache=False)
             st.markdown(f"[Abrir autorización de Microsoft]({r['auth_url']})")
         except Exception as e:
             st.error(e)
     st.caption("Eventos de hoy (Outlook)")
     if st.button("Ver hoy (Outlook)"):
         try:
-            data = requests.get(f"{BACKEND_URL}/api/ms/calendar/today").json()
+            data = api.get("/api/ms/calendar/today")
             st.dataframe(pd.DataFrame(data))
         except Exception as e:
             st.error(e)
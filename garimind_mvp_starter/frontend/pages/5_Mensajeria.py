@@ -1,43 +1,30 @@
-import streamlit as st, requests, os, pandas as pd
-from dotenv import load_dotenv
-load_dotenv()
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+import streamlit as st
+from tables import paged_table
 
 st.set_page_config(page_title="Mensajería", layout="wide")
 st.title("📬 Mensajería unificada (Gmail + Outlook)")
 
+MAIL_COLS = ["from", "subject", "date", "snippet", "isRead"]
+
 col1, col2 = st.columns(2)
 
+# Cada bandeja se pide por páginas; el botón solo elige cuál mostrar (queda en session_state)
 with col1:
     st.subheader("Gmail")
-    max_g = st.number_input("Cantidad (Gmail)", min_value=1, max_value=200, value=50, step=5)
     c1, c2 = st.columns(2)
     if c1.button("Gmail: Inbox"):
-        try:
-            data = requests.get(f"{BACKEND_URL}/api/google/gmail/inbox", params={"max_results": int(max_g)}).json()
-            st.dataframe(pd.DataFrame(data))
-        except Exception as e:
-            st.error(e)
+        st.session_state["gmail_ruta"] = "/api/google/gmail/inbox"
     if c2.button("Gmail: No leídos"):
-        try:
-            data = requests.get(f"{BACKEND_URL}/api/google/gmail/unread", params={"max_results": int(max_g)}).json()
-            st.dataframe(pd.DataFrame(data))
-        except Exception as e:
-            st.error(e)
+        st.session_state["gmail_ruta"] = "/api/google/gmail/unread"
+    if "gmail_ruta" in st.session_state:
+        paged_table(st.session_state["gmail_ruta"], key="gmail", size_param="max_results", columns=MAIL_COLS)
 
 with col2:
     st.subheader("Outlook")
-    max_o = st.number_input("Cantidad (Outlook)", min_value=1, max_value=1000, value=50, step=5, key="olmax")
     c3, c4 = st.columns(2)
     if c3.button("Outlook: Inbox"):
-        try:
-            data = requests.get(f"{BACKEND_URL}/api/ms/mail/inbox", params={"top": int(max_o)}).json()
-            st.dataframe(pd.DataFrame(data))
-        except Exception as e:
-            st.error(e)
+        st.session_state["outlook_ruta"] = "/api/ms/mail/inbox"
     if c4.button("Outlook: No leídos"):
-        try:
-            data = requests.get(f"{BACKEND_URL}/api/ms/mail/unread", params={"top": int(max_o)}).json()
-            st.dataframe(pd.DataFrame(data))
-        except Exception as e:
-            st.error(e)
+        st.session_state["outlook_ruta"] = "/api/ms/mail/unread"
+    if "outlook_ruta" in st.session_state:
+        paged_table(st.session_state["outlook_ruta"], key="outlook", size_param="top", columns=MAIL_COLS)
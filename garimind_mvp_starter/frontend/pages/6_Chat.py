@@ -1,11 +1,9 @@
-import os
-import requests
 import streamlit as st
 
-st.set_page_config(page_title="Gari • Chat", layout="wide")
+# ✅ URL base del backend (BACKEND_URL, solo la raíz, sin /api ni /Chat): ver api_client.py
+import api_client as api
 
-# ✅ URL base del backend (solo la raíz, sin /api ni /Chat)
-BACKEND_URL = os.getenv("BACKEND_URL", "https://garimind-secondbrain-ai.onrender.com")
+st.set_page_config(page_title="Gari • Chat", layout="wide")
 
 st.title("💬 Gari • Motor de Razonamiento")
 prompt = st.text_input(
@@ -15,10 +13,10 @@ prompt = st.text_input(
 
 if st.button("Enviar"):
     try:
-        url = f"{BACKEND_URL}/api/ai/reason"   # o /api/ai/chat (ambos son POST)
+        url = f"{api.BACKEND_URL}/api/ai/reason"   # o /api/ai/chat (ambos son POST)
         st.info(f"📡 Enviando a: {url}")
 
-        r = requests.post(url, json={"prompt": prompt}, timeout=60)
+        r = api.request("POST", "/api/ai/reason", json={"prompt": prompt}, timeout=60)
 
         # 🩺 Depuración: si no es JSON, mostrar contenido crudo
         ctype = r.headers.get("content-type", "")
@@ -30,6 +28,9 @@ if st.button("Enviar"):
             st.success(data.get("answer", "(sin respuesta)"))
             if data.get("tools_used"):
                 st.caption(f"Herramientas usadas: {', '.join(data['tools_used'])}")
+            if rt := data.get("route"):
+                costo = f" · ~US${rt['costo_usd']:.4f}" if rt.get("costo_usd") is not None else ""
+                st.caption(f"Ruta {rt['ruta']} ({rt['modelo']}, {rt['motivo']}) · {rt['latencia_ms']:.0f} ms{costo}")
 
     except Exception as e:
         st.error(f"Error llamando al backend: {e}")
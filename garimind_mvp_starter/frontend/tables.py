@@ -0,0 +1,47 @@
+# frontend/tables.py
+# Tabla paginada: pide al backend una página cada vez (api.get_page, que precarga la
+# siguiente) y en session_state guarda solo el número de página, nunca las filas.
+from typing import Any, Dict, Optional, Sequence
+
+import pandas as pd
+import streamlit as st
+
+import api_client as api
+
+PAGE_SIZES = (25, 50, 100, 200)
+
+def _move(key: str, delta: int):
+    st.session_state[key] = max(0, st.session_state.get(key, 0) + delta)
+
+def paged_table(path: str, params: Optional[Dict[str, Any]] = None, key: str = "tabla",
+                size_param: str = "limit", columns: Optional[Sequence[str]] = None, page_size: int = 50):
+    """
+    Listado `path` paginado en el servidor (`size_param` + `offset`). Cambiar los filtros
+    (`params`) o el tamaño de página vuelve a la primera página.
+    """
+    page_key, sig_key = f"{key}_page", f"{key}_sig"
+    nav = st.columns([1, 1, 3, 1])
+    size = nav[3].selectbox("Por página", PAGE_SIZES, index=PAGE_SIZES.index(page_size) if page_size in PAGE_SIZES else 1,
+                            key=f"{key}_size", label_visibility="collapsed")
+    sig = (path, repr(sorted((params or {}).items())), size)
+    if st.session_state.get(sig_key) != sig:
+        st.session_state[sig_key] = sig
+        st.session_state[page_key] = 0
+    page = st.session_state[page_key]
+
+    try:
+        rows, total = api.get_page(path, params, page=page, page_size=size, size_param=size_param)
+    except Exception as e:
+        st.error(e)
+        return
+    if not rows and page > 0:  # la página quedó vacía (borrados, otro filtro): volver a la primera
+        st.session_state[page_key] = 0
+        st.rerun()
+
+    more = (page + 1) * size < total if total is not None else len(rows) == size
+    nav[0].button("◀ Anterior", key=f"{key}_prev", disabled=page == 0, on_click=_move, args=(page_key, -1))
+    nav[1].button("Siguiente ▶", key=f"{key}_next", disabled=not more, on_click=_move, args=(page_key, 1))
+    first = page * size + 1 if rows else 0
+    last = page * size + len(rows)
+    nav[2].caption(f"Filas {first}–{last}" + (f" de {total}" if total is not None else "") + f" · página {page + 1}")
+    st.dataframe(pd.DataFrame(rows, columns=columns) if columns else pd.DataFrame(rows), use_container_width=True)